@@ -18,11 +18,19 @@ Usage:
 
     # Or with custom output directory
     python scripts/generate_golden_runs.py --output-dir /tmp/grfics-runs
+
+    # Adaptive RK45 physics (te_model.py) instead of one Euler step per sample
+    python scripts/generate_golden_runs.py --solver rk45 --output-dir /tmp/grfics-rk45
+
+    # Start nominal / attack runs at the solved equilibrium (te_steady_state.py)
+    python scripts/generate_golden_runs.py --warm-start steady --output-dir /tmp/grfics-steady
+
+The defaults (Euler, one step per 500 ms sample, 200 warm-up steps) keep
+the golden runs reproducible: same seed, same bytes.
 """
 
 import argparse
-import csv
-import json
+import functools
 import math
 import os
 import random
@@ -30,6 +38,10 @@ import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "tools"))
+from spherekit.bundle import RunBundleWriter
+
 # Tennessee Eastman physics constants (from TE_process.cc / demo.yaml)
 VALVE_TAU_SEC = 10.0       # Valve time constant
 POLL_INTERVAL_MS = 500     # Sample period
@@ -117,6 +129,14 @@ class TEReactor:
         self.purge_sp = 0.0
         self.product_sp = 0.0
 
+    def set_state(self, valves, pressure_kpa: float, comp):
+        """Set valve positions (feed1, feed2, purge, product), pressure and purge composition."""
+        for lag, pos in zip((self.feed1_valve, self.feed2_valve, self.purge_valve,
+                             self.product_valve), valves):
+            lag.state = float(pos)
+        self.pressure = float(pressure_kpa)
+        self.comp_a, self.comp_b, self.comp_c = (float(c) for c in comp)
+
     def set_setpoints(self, feed1: float, feed2: float, purge: float, product: float):
         """Set valve setpoints (0-100%)."""
         self.feed1_sp = max(0, min(100, feed1))
@@ -233,80 +253,78 @@ def add_noise(values: dict, rng: random.Random) -> dict:
     return noisy
 
 
-def write_bundle(output_dir: Path, scenario_id: str, profile_name: str,
-                 start_time: datetime, samples: list, events: list):
-    """Write a run bundle to disk."""
-    output_dir.mkdir(parents=True, exist_ok=True)
+def warm_up(reactor, setpoints, steady=None):
+    """Bring reactor to its operating point: 200 pre-run steps, or the cached equilibrium."""
+    if steady is None:
+        for _ in range(200):
+            reactor.step(DT_SEC)
+        return
+    valve, pressure, comp = steady.lookup([setpoints])
+    reactor.set_state(valve[0], pressure[0], comp[0])
+
+
+def open_bundle(output_dir: Path) -> RunBundleWriter:
+    """Open a run bundle; samples stream into its tags.csv as they are generated."""
+    return RunBundleWriter(output_dir, ["timestamp_utc"] + TAGS, keep=False)
+
 
+def write_sample(bundle: RunBundleWriter, start_time: datetime, sample: dict):
+    """Write one sample, timestamped by its position in the run."""
+    ts = start_time + timedelta(milliseconds=bundle.rows * POLL_INTERVAL_MS)
+    row = {"timestamp_utc": ts.isoformat().replace("+00:00", "Z")}
+    for tag in TAGS:
+        val = sample.get(tag, 0)
+        row[tag] = f"{val:.2f}" if isinstance(val, float) else str(val)
+    bundle.writerow(row)
+
+
+def write_bundle(bundle: RunBundleWriter, profile_name: str, events: list):
+    """Finish tags.csv and write meta.json and events.json."""
     # meta.json - matches pkg/backend/runbundle.go RunMeta struct
-    end_time = start_time + timedelta(seconds=(len(samples) - 1) * DT_SEC)
     meta = {
         "usecase_id": "grfics-tennessee-eastman",
         "contract_version": "1.0.0",
         "backend_type": "synthetic",
         "endpoints": ["synthetic://genruns"],
         "mapping_file": "source_map.yaml",
-        "start_utc": start_time.isoformat().replace("+00:00", "Z"),
-        "end_utc": end_time.isoformat().replace("+00:00", "Z"),
+        "start_utc": bundle.start_utc,
+        "end_utc": bundle.end_utc,
         "poll_interval_ms": POLL_INTERVAL_MS,
         "tag_selection": "all",
         "tags": TAGS,
         "bundle_schema_version": "1.1.0",
         "profile_name": profile_name,
     }
-    with open(output_dir / "meta.json", "w") as f:
-        json.dump(meta, f, indent=2)
-        f.write("\n")
-
-    # events.json
-    with open(output_dir / "events.json", "w") as f:
-        json.dump(events, f, indent=2)
-        f.write("\n")
-
-    # tags.csv
-    with open(output_dir / "tags.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["timestamp_utc"] + TAGS)
-        for i, sample in enumerate(samples):
-            ts = start_time + timedelta(milliseconds=i * POLL_INTERVAL_MS)
-            ts_str = ts.isoformat().replace("+00:00", "Z")
-            row = [ts_str]
-            for tag in TAGS:
-                val = sample.get(tag, 0)
-                if isinstance(val, float):
-                    row.append(f"{val:.2f}")
-                else:
-                    row.append(str(val))
-            writer.writerow(row)
-
-    print(f"  Wrote {output_dir} ({len(samples)} samples)")
-
-
-def generate_nominal(output_dir: Path, rng: random.Random):
+    bundle.finish(meta, events)
+
+    print(f"  Wrote {bundle.dir} ({bundle.rows} samples)")
+
+
+def generate_nominal(output_dir: Path, rng: random.Random, make_reactor=TEReactor,
+                     steady=None):
     """Generate steady-state nominal run."""
     print("Generating run-nominal...")
 
     # Start at steady state
-    reactor = TEReactor(pressure_kpa=NOMINAL_PRESSURE_KPA, level_pct=NOMINAL_LEVEL_PCT)
+    reactor = make_reactor(pressure_kpa=NOMINAL_PRESSURE_KPA, level_pct=NOMINAL_LEVEL_PCT)
 
     # Nominal setpoints (maintain steady state)
     reactor.set_setpoints(feed1=25, feed2=20, purge=30, product=35)
 
     # Pre-run to reach steady state
-    for _ in range(200):
-        reactor.step(DT_SEC)
+    warm_up(reactor, (25, 20, 30, 35), steady)
 
     # Collect samples
-    samples = []
+    bundle = open_bundle(output_dir / "run-nominal")
+    start_time = datetime(2026, 3, 4, 10, 0, 0, tzinfo=timezone.utc)
     duration_sec = 60
     num_samples = int(duration_sec / DT_SEC)
 
     for _ in range(num_samples):
         values = reactor.step(DT_SEC)
         noisy = add_noise(values, rng)
-        samples.append(noisy)
+        write_sample(bundle, start_time, noisy)
 
-    start_time = datetime(2026, 3, 4, 10, 0, 0, tzinfo=timezone.utc)
     events = [
         {"timestamp": start_time.isoformat().replace("+00:00", "Z"),
          "type": "start", "message": "Nominal steady-state run started"},
@@ -316,17 +334,18 @@ def generate_nominal(output_dir: Path, rng: random.Random):
          "type": "stop", "message": "Nominal run completed"},
     ]
 
-    write_bundle(output_dir / "run-nominal", "grfics-te-nominal", "demo", start_time, samples, events)
+    write_bundle(bundle, "demo", events)
 
 
-def generate_startup(output_dir: Path, rng: random.Random):
+def generate_startup(output_dir: Path, rng: random.Random, make_reactor=TEReactor):
     """Generate cold-start to steady-state run."""
     print("Generating run-startup...")
 
     # Start cold (low pressure, low level)
-    reactor = TEReactor(pressure_kpa=1000, level_pct=20)
+    reactor = make_reactor(pressure_kpa=1000, level_pct=20)
 
-    samples = []
+    bundle = open_bundle(output_dir / "run-startup")
+    start_time = datetime(2026, 3, 4, 10, 5, 0, tzinfo=timezone.utc)
     duration_sec = 60
     num_samples = int(duration_sec / DT_SEC)
 
@@ -352,9 +371,8 @@ def generate_startup(output_dir: Path, rng: random.Random):
 
         values = reactor.step(DT_SEC)
         noisy = add_noise(values, rng)
-        samples.append(noisy)
+        write_sample(bundle, start_time, noisy)
 
-    start_time = datetime(2026, 3, 4, 10, 5, 0, tzinfo=timezone.utc)
     events = [
         {"timestamp": start_time.isoformat().replace("+00:00", "Z"),
          "type": "start", "message": "Cold startup initiated"},
@@ -366,22 +384,23 @@ def generate_startup(output_dir: Path, rng: random.Random):
          "type": "stop", "message": "Startup sequence completed"},
     ]
 
-    write_bundle(output_dir / "run-startup", "grfics-te-startup", "demo", start_time, samples, events)
+    write_bundle(bundle, "demo", events)
 
 
-def generate_attack_spoof(output_dir: Path, rng: random.Random):
+def generate_attack_spoof(output_dir: Path, rng: random.Random, make_reactor=TEReactor,
+                          steady=None):
     """Generate attack run with spoofed pressure sensor."""
     print("Generating run-attack-spoof...")
 
     # Start at steady state
-    reactor = TEReactor(pressure_kpa=NOMINAL_PRESSURE_KPA, level_pct=NOMINAL_LEVEL_PCT)
+    reactor = make_reactor(pressure_kpa=NOMINAL_PRESSURE_KPA, level_pct=NOMINAL_LEVEL_PCT)
     reactor.set_setpoints(feed1=25, feed2=20, purge=30, product=35)
 
     # Pre-run to reach steady state
-    for _ in range(200):
-        reactor.step(DT_SEC)
+    warm_up(reactor, (25, 20, 30, 35), steady)
 
-    samples = []
+    bundle = open_bundle(output_dir / "run-attack-spoof")
+    start_time = datetime(2026, 3, 4, 10, 10, 0, tzinfo=timezone.utc)
     duration_sec = 60
     num_samples = int(duration_sec / DT_SEC)
 
@@ -399,9 +418,8 @@ def generate_attack_spoof(output_dir: Path, rng: random.Random):
             noisy["TE_Tank_Pressure"] += spoof_offset
             noisy["TE_Tank_Pressure"] = min(3200, noisy["TE_Tank_Pressure"])
 
-        samples.append(noisy)
+        write_sample(bundle, start_time, noisy)
 
-    start_time = datetime(2026, 3, 4, 10, 10, 0, tzinfo=timezone.utc)
     events = [
         {"timestamp": start_time.isoformat().replace("+00:00", "Z"),
          "type": "start", "message": "Monitoring run started"},
@@ -413,7 +431,7 @@ def generate_attack_spoof(output_dir: Path, rng: random.Random):
          "type": "stop", "message": "Run completed with attack artifacts"},
     ]
 
-    write_bundle(output_dir / "run-attack-spoof", "grfics-te-attack-spoof", "demo", start_time, samples, events)
+    write_bundle(bundle, "demo", events)
 
 
 def main():
@@ -432,8 +450,41 @@ def main():
         default=42,
         help="Random seed for reproducibility (default: 42)",
     )
+    parser.add_argument(
+        "--solver",
+        choices=["euler", "rk4", "rk45"],
+        default="euler",
+        help="Physics integrator (default: euler, the reference golden runs)",
+    )
+    parser.add_argument(
+        "--physics-dt",
+        type=float,
+        default=None,
+        help=f"Physics step in seconds, samples are decimated to {DT_SEC}s "
+             f"(default: {DT_SEC}; rk45: initial step)",
+    )
+    parser.add_argument(
+        "--warm-start",
+        choices=["warmup", "steady"],
+        default="warmup",
+        help="Nominal/attack starting point: 200 pre-run steps (default) or the "
+             "solved equilibrium of their setpoints",
+    )
+    parser.add_argument(
+        "--steady-cache",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent / ".cache" / "te-steady-state.json",
+        help="Equilibrium cache file for --warm-start steady (default: ../.cache/te-steady-state.json)",
+    )
     args = parser.parse_args()
 
+    if args.solver == "euler" and args.physics_dt is None:
+        make_reactor = TEReactor
+    else:
+        from te_model import SolvedTEReactor
+        make_reactor = functools.partial(SolvedTEReactor, solver=args.solver,
+                                         physics_dt=args.physics_dt)
+
     # Determine output directory
     if args.output_dir:
         output_dir = args.output_dir
@@ -447,10 +498,17 @@ def main():
     # Initialize RNG for reproducibility
     rng = random.Random(args.seed)
 
+    steady = None
+    if args.warm_start == "steady":
+        from te_steady_state import SteadyStateCache
+        steady = SteadyStateCache(args.steady_cache)
+
     # Generate all runs
-    generate_nominal(output_dir, rng)
-    generate_startup(output_dir, rng)
-    generate_attack_spoof(output_dir, rng)
+    generate_nominal(output_dir, rng, make_reactor, steady)
+    generate_startup(output_dir, rng, make_reactor)
+    generate_attack_spoof(output_dir, rng, make_reactor, steady)
+    if steady is not None:
+        steady.save()
 
     print("\nDone! Validate bundles with:")
     print(f"  ./bin/validate-bundle {output_dir}/run-nominal")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Generate labeled Tennessee Eastman datasets from parameter sweeps.
+
+Expands a sweep file into runs — every combination (grid) or N random
+draws (monte_carlo) of setpoints, sensor noise sigmas and pressure/level/
+flow spoofing attacks — and simulates them in batches with the vectorized
+model in te_model.py, spread over a process pool.  Physics constants,
+default sigmas and the physics step (timing.dt_sec) come from a SimProfile
+(profiles/demo.yaml); runs are integrated with --solver and decimated to
+the poll interval.
+
+Every run gets its own noise seed derived from (--seed, run index), so a
+dataset is reproducible regardless of --workers or --batch-size.
+
+Runs start at the equilibrium of their setpoints (te_steady_state.py,
+memoized in --steady-cache) at the sweep's initial level; with
+--warm-start warmup they instead pre-run warmup_steps from the initial
+pressure and level.
+
+Sweep file (see sweeps/pressure-spoof.yaml):
+
+    mode: grid                  # grid | monte_carlo
+    runs: 1000                  # monte_carlo only: number of draws
+    duration_sec: 60
+    warmup_steps: 200           # --warm-start warmup only
+    initial:
+      level_pct: 45
+    setpoints:                  # value, [min, max, n] (grid) or [min, max] (monte_carlo)
+      feed1: [20, 30, 3]
+      feed2: 20
+      purge: 30
+      product: 35
+    noise:                      # sigmas; profile values when omitted
+      pressure: [2.5, 10, 4]
+    attack:
+      tag: TE_Tank_Pressure
+      offset: [0, 400, 5]       # 0 = clean run (one per point, no window)
+      start_sec: [10, 30, 3]
+      duration_sec: 20
+
+Output:
+    <output>/shard-00000.npz    values (runs, samples, tags) float32 and
+                                attack (runs, samples) bool labels
+    <output>/index.csv          one row per run: shard/row, seed, parameters, label
+    <output>/dataset.json       tags, sample period, profile, sweep
+
+Usage:
+    python scripts/generate_te_dataset.py --sweep sweeps/pressure-spoof.yaml \\
+        --output datasets/pressure-spoof --workers 8
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from te_model import (SENSOR_CLASS, SENSOR_CLASSES, SOLVERS, TAGS, Attacks, BatchTEReactor,
+                      TEParams, simulate)
+from te_steady_state import SteadyStateCache, warm_start
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(SCRIPT_DIR.parents[2] / "tools"))
+from spherekit.bundle import atomic_write_bytes, atomic_write_json, atomic_write_text
+
+DEFAULT_PROFILE = SCRIPT_DIR.parent / "profiles" / "demo.yaml"
+DEFAULT_STEADY_CACHE = SCRIPT_DIR.parent / ".cache" / "te-steady-state.json"
+DEFAULT_BATCH_SIZE = 256
+SETPOINTS = ("feed1", "feed2", "purge", "product")
+ATTACK_TAGS = ("TE_Tank_Pressure", "TE_Tank_Level", "TE_Feed1_Flow", "TE_Feed2_Flow",
+               "TE_Purge_Flow", "TE_Product_Flow", "TE_Purge_CompA", "TE_Purge_CompB",
+               "TE_Purge_CompC")
+
+# Sensor class -> tag columns it sets the noise sigma of
+CLASS_COLUMNS = np.array([[SENSOR_CLASS.get(tag, (None,))[0] == name for tag in TAGS]
+                          for name in SENSOR_CLASSES], dtype=float)
+
+# Swept parameters, in index.csv column order
+AXES = ([f"{name}_sp" for name in SETPOINTS]
+        + [f"{name}_sigma" for name in SENSOR_CLASSES]
+        + ["attack_offset", "attack_start_sec", "attack_duration_sec"])
+
+
+class SweepError(ValueError):
+    """The sweep file cannot be expanded."""
+
+
+# ── Sweep expansion ──────────────────────────────────────────────────
+
+def axis_spec(spec, name, mode):
+    """Values of one axis: a list for grid, a (min, max) pair for monte_carlo."""
+    if isinstance(spec, (int, float)):
+        return [float(spec)] if mode == "grid" else (float(spec), float(spec))
+    if not isinstance(spec, (list, tuple)):
+        raise SweepError(f"{name}: expected a value or a list, got {spec!r}")
+    if mode == "grid":
+        if len(spec) != 3:
+            raise SweepError(f"{name}: grid axes are [min, max, n]")
+        return np.linspace(float(spec[0]), float(spec[1]), int(spec[2])).tolist()
+    if len(spec) != 2:
+        raise SweepError(f"{name}: monte_carlo axes are [min, max]")
+    return float(spec[0]), float(spec[1])
+
+
+def load_sweep(path, params: TEParams):
+    """(sweep, axes): the sweep file and {axis: values or (min, max)}."""
+    with open(path) as f:
+        sweep = yaml.safe_load(f) or {}
+    mode = sweep.setdefault("mode", "grid")
+    if mode not in ("grid", "monte_carlo"):
+        raise SweepError(f"unknown mode '{mode}' (grid or monte_carlo)")
+
+    setpoints = sweep.get("setpoints") or {}
+    noise = sweep.get("noise") or {}
+    attack = sweep.get("attack") or {}
+    unknown = (set(setpoints) - set(SETPOINTS)) | (set(noise) - set(SENSOR_CLASSES))
+    if unknown:
+        raise SweepError(f"unknown sweep keys: {', '.join(sorted(unknown))}")
+    tag = attack.get("tag", "TE_Tank_Pressure")
+    if tag not in ATTACK_TAGS:
+        raise SweepError(f"attack tag '{tag}' is not a sensor tag")
+    sweep.setdefault("attack", {})["tag"] = tag
+
+    axes = {}
+    for name in SETPOINTS:
+        if name not in setpoints:
+            raise SweepError(f"setpoints.{name} is required")
+        axes[f"{name}_sp"] = axis_spec(setpoints[name], f"setpoints.{name}", mode)
+    for name in SENSOR_CLASSES:
+        axes[f"{name}_sigma"] = axis_spec(noise.get(name, getattr(params, f"{name}_sigma")),
+                                          f"noise.{name}", mode)
+    axes["attack_offset"] = axis_spec(attack.get("offset", 0), "attack.offset", mode)
+    axes["attack_start_sec"] = axis_spec(attack.get("start_sec", 0), "attack.start_sec", mode)
+    axes["attack_duration_sec"] = axis_spec(attack.get("duration_sec", 0),
+                                            "attack.duration_sec", mode)
+    return sweep, axes
+
+
+def expand_runs(sweep, axes, seed):
+    """(runs, AXES) float64 parameter matrix.
+
+    Clean runs (offset 0) have no attack window: their start and duration
+    are zeroed, and the grid keeps one clean run per operating point and
+    noise level instead of one per start/duration combination.
+    """
+    window = [AXES.index("attack_start_sec"), AXES.index("attack_duration_sec")]
+    if sweep["mode"] == "grid":
+        runs = np.array(list(itertools.product(*(axes[a] for a in AXES))), dtype=float)
+        clean = runs[:, AXES.index("attack_offset")] == 0
+        runs[np.ix_(clean, window)] = 0
+        _, first = np.unique(runs, axis=0, return_index=True)
+        return runs[np.sort(first)]
+    n = int(sweep.get("runs", 0))
+    if n <= 0:
+        raise SweepError("monte_carlo needs runs > 0")
+    # Parameter draws use their own stream, separate from the noise seeds
+    rng = np.random.default_rng([seed, 0])
+    lo = np.array([axes[a][0] for a in AXES])
+    hi = np.array([axes[a][1] for a in AXES])
+    runs = rng.uniform(lo, hi, size=(n, len(AXES)))
+    runs[np.ix_(runs[:, AXES.index("attack_offset")] == 0, window)] = 0
+    return runs
+
+
+def run_seed(seed, run_id):
+    """Noise seed of one run, independent of batching."""
+    return int(np.random.SeedSequence([seed, 1, run_id]).generate_state(1)[0])
+
+
+# ── Simulation ───────────────────────────────────────────────────────
+
+def simulate_shard(task):
+    """Simulate one shard of runs and write it; returns its index rows."""
+    shard_path, first_run, runs, seed, sweep, params, solver, steady = task
+    m = len(runs)
+    col = {a: i for i, a in enumerate(AXES)}
+    dt = params.dt_sec
+    n_samples = int(round(float(sweep.get("duration_sec", 60)) / dt))
+    initial = sweep.get("initial") or {}
+
+    setpoints = runs[:, [col[f"{name}_sp"] for name in SETPOINTS]]
+    reactor = BatchTEReactor(m, pressure_kpa=float(initial.get("pressure_kpa", 2700)),
+                             level_pct=float(initial.get("level_pct", 45)), params=params,
+                             solver=solver)
+    if steady is None:
+        reactor.set_setpoints(setpoints)
+        reactor.run(int(sweep.get("warmup_steps", 200)), dt)
+    else:
+        warm_start(reactor, setpoints, steady)
+
+    sigma = runs[:, [col[f"{name}_sigma"] for name in SENSOR_CLASSES]] @ CLASS_COLUMNS
+    start = np.rint(runs[:, col["attack_start_sec"]] / dt).astype(int)
+    length = np.rint(runs[:, col["attack_duration_sec"]] / dt).astype(int)
+    offset = runs[:, col["attack_offset"]]
+    # A zero offset or window is a clean run: no labels
+    length[(offset == 0) | (length <= 0)] = 0
+    attacks = Attacks.single(m, sweep["attack"]["tag"], offset, start, start + length)
+
+    seeds = [run_seed(seed, first_run + i) for i in range(m)]
+    values = simulate(reactor, setpoints, n_samples, seeds=seeds, attacks=attacks, dt=dt,
+                      noise_sigma=sigma)
+    k = np.arange(n_samples)
+    labels = (k >= attacks.start[:, None]) & (k < attacks.end[:, None])
+
+    buf = io.BytesIO()
+    np.savez_compressed(buf, values=values.astype(np.float32), attack=labels)
+    atomic_write_bytes(shard_path, buf.getvalue())
+
+    rows = []
+    for i in range(m):
+        rows.append([first_run + i, shard_path.name, i, seeds[i]]
+                    + [float(v) for v in runs[i]]
+                    + ["attack" if labels[i].any() else "nominal"])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate labeled Tennessee Eastman datasets from parameter sweeps"
+    )
+    parser.add_argument("--sweep", required=True, type=Path, help="Sweep YAML file")
+    parser.add_argument("--output", required=True, type=Path, help="Output dataset directory")
+    parser.add_argument("--profile", type=Path, default=DEFAULT_PROFILE,
+                        help="SimProfile with physics constants (default: ../profiles/demo.yaml)")
+    parser.add_argument("--solver", choices=SOLVERS, default="rk45",
+                        help="Physics integrator (default: rk45)")
+    parser.add_argument("--warm-start", choices=["steady", "warmup"], default="steady",
+                        help="Start runs at the solved equilibrium (default) or pre-run warmup_steps")
+    parser.add_argument("--steady-cache", type=Path, default=DEFAULT_STEADY_CACHE,
+                        help="Equilibrium cache file (default: ../.cache/te-steady-state.json)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Base seed for parameter draws and noise (default: 42)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Runs per shard (default: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    params = TEParams.from_profile(args.profile) if args.profile.exists() else TEParams()
+    try:
+        sweep, axes = load_sweep(args.sweep, params)
+        runs = expand_runs(sweep, axes, args.seed)
+    except (OSError, SweepError) as e:
+        print(f"Error: {args.sweep}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    steady = None
+    if args.warm_start == "steady":
+        cache = SteadyStateCache(args.steady_cache, params)
+        steady = cache.lookup(runs[:, [AXES.index(f"{name}_sp") for name in SETPOINTS]])
+        cache.save()
+        print(f"Steady states: {cache.hits} cached, {cache.misses} solved")
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    tasks = []
+    for shard, first in enumerate(range(0, len(runs), args.batch_size)):
+        rows = slice(first, first + args.batch_size)
+        tasks.append((args.output / f"shard-{shard:05d}.npz", first, runs[rows], args.seed,
+                      sweep, params, args.solver,
+                      None if steady is None else tuple(a[rows] for a in steady)))
+    print(f"{len(runs)} runs ({sweep['mode']}) in {len(tasks)} shards, "
+          f"{args.workers} workers -> {args.output}")
+
+    started = time.monotonic()
+    rows = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(tasks)))) as pool:
+        for shard_rows in pool.map(simulate_shard, tasks):
+            rows.extend(shard_rows)
+
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(["run_id", "shard", "row", "seed"] + AXES + ["label"])
+    writer.writerows(rows)
+    atomic_write_text(args.output / "index.csv", text.getvalue())
+
+    dt = params.dt_sec
+    atomic_write_json(args.output / "dataset.json", {
+        "usecase_id": "grfics-tennessee-eastman",
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "tags": TAGS,
+        "sample_period_sec": dt,
+        "solver": args.solver,
+        "physics_dt_sec": params.physics_dt_sec,
+        "warm_start": args.warm_start,
+        "samples_per_run": int(round(float(sweep.get("duration_sec", 60)) / dt)),
+        "runs": len(runs),
+        "attack_runs": sum(1 for r in rows if r[-1] == "attack"),
+        "shards": [t[0].name for t in tasks],
+        "index_file": "index.csv",
+        "seed": args.seed,
+        "profile": str(args.profile),
+        "params": params._asdict(),
+        "sweep": sweep,
+    })
+    print(f"Done in {time.monotonic() - started:.1f}s "
+          f"({sum(1 for r in rows if r[-1] == 'attack')} attack runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,7 +31,7 @@ Usage (deprecated):
     python grfics_bridge.py --output runs/run-01 --duration 120
 
 Requirements:
-    pip install pymodbus pyyaml
+    pip install pymodbus pyyaml numpy
 """
 
 import warnings
@@ -42,17 +42,16 @@ warnings.warn(
 )
 
 import argparse
-import csv
-import json
 import logging
 import os
 import signal
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 try:
     from pymodbus.client import ModbusTcpClient
@@ -62,6 +61,11 @@ except ImportError:
     print("Error: pymodbus required.  pip install pymodbus")
     sys.exit(1)
 
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "tools"))
+from spherekit.bundle import RunBundleWriter
+from spherekit.scaling import MISSING, QUALITY_NAMES, BlockScaler, LinearScale
+
 log = logging.getLogger("grfics_bridge")
 
 
@@ -76,13 +80,19 @@ class ScaleConfig:
     raw_max: int = 65535
     eng_min: float = 0.0
     eng_max: float = 100.0
+    linear: LinearScale = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Gain/offset are derived once, not per conversion
+        self.linear = LinearScale(self.raw_min, self.raw_max, self.eng_min, self.eng_max)
 
     def to_eng(self, raw: int) -> float:
         """Convert raw register value to engineering units."""
-        if self.raw_max == self.raw_min:
-            return self.eng_min
-        ratio = (raw - self.raw_min) / (self.raw_max - self.raw_min)
-        return ratio * (self.eng_max - self.eng_min) + self.eng_min
+        return self.linear.to_eng(raw)
+
+    def to_raw(self, eng: float) -> int:
+        """Convert an engineering value (e.g. a setpoint) to a raw register value."""
+        return self.linear.to_raw(eng)
 
 
 @dataclass
@@ -97,6 +107,50 @@ class TagMapping:
     scale: ScaleConfig
 
 
+@dataclass
+class ReadGroup:
+    """One contiguous block read covering every mapping of a group."""
+    host: str
+    port: int
+    slave_id: int
+    register_type: str
+    address: int
+    count: int
+    mappings: List[Tuple[TagMapping, int]]  # (mapping, offset into the block)
+
+
+# Modbus limit on registers per read request
+MAX_READ_COUNT = 125
+
+# Unused registers a block read may span rather than splitting in two
+MAX_READ_GAP = 16
+
+
+def build_read_groups(mappings: List[TagMapping]) -> List[ReadGroup]:
+    """Group mappings by (host, port, slave_id, register_type) into block reads.
+
+    Each group is read as one contiguous block from its lowest to highest
+    address.  A block is split where it would exceed MAX_READ_COUNT
+    registers or span more than MAX_READ_GAP unmapped ones, so a read never
+    reaches far into addresses no mapping defines.
+    """
+    groups: List[ReadGroup] = []
+    ordered = sorted(mappings, key=lambda m: (m.host, m.port, m.slave_id, m.register_type, m.address))
+    for m in ordered:
+        last = groups[-1] if groups else None
+        if (last is not None
+                and (last.host, last.port, last.slave_id, last.register_type)
+                == (m.host, m.port, m.slave_id, m.register_type)
+                and m.address - last.address < MAX_READ_COUNT
+                and m.address - (last.address + last.count) <= MAX_READ_GAP):
+            last.count = max(last.count, m.address - last.address + 1)
+            last.mappings.append((m, m.address - last.address))
+        else:
+            groups.append(ReadGroup(m.host, m.port, m.slave_id, m.register_type,
+                                    m.address, 1, [(m, 0)]))
+    return groups
+
+
 # Default mappings based on GRFICSv3 mbconfig.cfg
 DEFAULT_MAPPINGS: List[TagMapping] = [
     # Feed 1 (192.168.95.10)
@@ -130,12 +184,23 @@ DEFAULT_MAPPINGS: List[TagMapping] = [
 # ─────────────────────────────────────────────────────────────────────────────
 
 class GRFICSPoller:
-    """Polls GRFICSv3 Modbus servers and returns scaled tag values."""
+    """Polls GRFICSv3 Modbus servers and returns scaled tag values.
+
+    Mappings are coalesced into one block read per (host, port, slave_id,
+    register_type), and the endpoints are queried concurrently, each on its
+    own client, so a full snapshot costs about one round trip.
+    """
 
     def __init__(self, mappings: List[TagMapping], timeout: float = 2.0):
         self.mappings = mappings
         self.timeout = timeout
         self._clients: Dict[str, ModbusTcpClient] = {}
+        self.groups = build_read_groups(mappings)
+        self._by_endpoint: Dict[Tuple[str, int], List[ReadGroup]] = {}
+        for group in self.groups:
+            self._by_endpoint.setdefault((group.host, group.port), []).append(group)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.scaler = BlockScaler([m.scale.linear for m in mappings], digits=4)
 
     def _get_client(self, host: str, port: int) -> ModbusTcpClient:
         """Get or create a Modbus client for the given host:port."""
@@ -162,37 +227,62 @@ class GRFICSPoller:
 
     def disconnect_all(self):
         """Close all Modbus connections."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
         for key, client in self._clients.items():
             client.close()
             log.debug("Disconnected from %s", key)
         self._clients.clear()
 
-    def _read_register(self, mapping: TagMapping) -> Optional[int]:
-        """Read a single register value."""
-        client = self._get_client(mapping.host, mapping.port)
+    def _read_block(self, group: ReadGroup) -> Optional[List[int]]:
+        """Read a group's contiguous register block."""
+        client = self._get_client(group.host, group.port)
         try:
-            if mapping.register_type == "input_register":
-                rr = client.read_input_registers(mapping.address, 1, slave=mapping.slave_id)
+            if group.register_type == "input_register":
+                rr = client.read_input_registers(group.address, group.count, slave=group.slave_id)
             else:
-                rr = client.read_holding_registers(mapping.address, 1, slave=mapping.slave_id)
+                rr = client.read_holding_registers(group.address, group.count, slave=group.slave_id)
 
             if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
-                log.debug("Read error for %s: %s", mapping.tag, rr)
+                log.debug("Read error for %s:%d %s %d+%d: %s", group.host, group.port,
+                          group.register_type, group.address, group.count, rr)
                 return None
-            return rr.registers[0]
+            return list(rr.registers[:group.count])
         except (ConnectionException, Exception) as exc:
-            log.debug("Read exception for %s: %s", mapping.tag, exc)
+            log.debug("Read exception for %s:%d %s %d+%d: %s", group.host, group.port,
+                      group.register_type, group.address, group.count, exc)
             return None
 
+    def _read_endpoint(self, groups: List[ReadGroup]) -> Dict[str, Optional[int]]:
+        """Read every group of one endpoint; returns tag → raw value."""
+        raw: Dict[str, Optional[int]] = {}
+        for group in groups:
+            values = self._read_block(group)
+            for mapping, offset in group.mappings:
+                raw[mapping.tag] = values[offset] if values and offset < len(values) else None
+        return raw
+
     def poll(self) -> Dict[str, Optional[float]]:
         """Poll all tags and return a dict of tag name → scaled value."""
-        result = {}
-        for mapping in self.mappings:
-            raw = self._read_register(mapping)
-            if raw is not None:
-                result[mapping.tag] = round(mapping.scale.to_eng(raw), 4)
-            else:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max(1, len(self._by_endpoint)),
+                                                thread_name_prefix="grfics-poll")
+        futures = [self._executor.submit(self._read_endpoint, groups)
+                   for groups in self._by_endpoint.values()]
+        raw: Dict[str, Optional[int]] = {}
+        for future in futures:
+            raw.update(future.result())
+
+        eng, quality = self.scaler.to_eng([raw.get(m.tag) for m in self.mappings])
+        result: Dict[str, Optional[float]] = {}
+        for mapping, value, flag in zip(self.mappings, eng.tolist(), quality.tolist()):
+            if flag == MISSING:
                 result[mapping.tag] = None
+                continue
+            if flag:
+                log.debug("%s raw value out of range (%s), clamped", mapping.tag, QUALITY_NAMES[flag])
+            result[mapping.tag] = value
         return result
 
 
@@ -202,40 +292,40 @@ class GRFICSPoller:
 
 @dataclass
 class RunBundle:
-    """Accumulates tag samples and events for writing a run bundle."""
+    """Streams tag samples into a run bundle as they are polled.
+
+    tags.csv is opened up front and written row by row; only the sample
+    count, first/last timestamp and the events are kept until write().
+    """
     output_dir: Path
+    tags: List[str]
     use_case_id: str = "grfics-tennessee-eastman"
     scenario_id: str = "grfics-live-capture"
-    tags: List[str] = field(default_factory=list)
-    samples: List[Dict] = field(default_factory=list)
-    events: List[Dict] = field(default_factory=list)
-    start_time: Optional[datetime] = None
-    end_time: Optional[datetime] = None
+    writer: RunBundleWriter = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.writer = RunBundleWriter(self.output_dir, ["timestamp_utc"] + self.tags, keep=False)
+
+    @property
+    def sample_count(self) -> int:
+        return self.writer.rows
 
     def add_sample(self, timestamp: datetime, values: Dict[str, Optional[float]]):
-        """Add a tag sample."""
-        if not self.tags:
-            self.tags = list(values.keys())
-        if self.start_time is None:
-            self.start_time = timestamp
-        self.end_time = timestamp
+        """Write a tag sample."""
         sample = {"timestamp_utc": timestamp.isoformat(timespec="milliseconds") + "Z"}
         sample.update(values)
-        self.samples.append(sample)
+        self.writer.writerow(sample)
 
     def add_event(self, timestamp: datetime, event_type: str, msg: str):
         """Add an event."""
-        self.events.append({
+        self.writer.add_event({
             "time_utc": timestamp.isoformat(timespec="milliseconds") + "Z",
             "type": event_type,
             "msg": msg
         })
 
     def write(self):
-        """Write the run bundle to disk."""
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-
-        # meta.json
+        """Finish tags.csv and write meta.json and events.json."""
         meta = {
             "use_case_id": self.use_case_id,
             "backend": "grfics-v3",
@@ -250,30 +340,16 @@ class RunBundle:
                 "analyzer": "192.168.95.15:502",
             },
             "timestamps": {
-                "start_utc": self.start_time.isoformat(timespec="milliseconds") + "Z" if self.start_time else None,
-                "end_utc": self.end_time.isoformat(timespec="milliseconds") + "Z" if self.end_time else None,
+                "start_utc": self.writer.start_utc,
+                "end_utc": self.writer.end_utc,
             },
             "tags": self.tags,
-            "sample_count": len(self.samples),
+            "sample_count": self.sample_count,
         }
-        with open(self.output_dir / "meta.json", "w") as f:
-            json.dump(meta, f, indent=2)
-
-        # tags.csv
-        if self.samples:
-            with open(self.output_dir / "tags.csv", "w", newline="") as f:
-                fieldnames = ["timestamp_utc"] + self.tags
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for sample in self.samples:
-                    writer.writerow(sample)
-
-        # events.json
-        with open(self.output_dir / "events.json", "w") as f:
-            json.dump(self.events, f, indent=2)
+        self.writer.finish(meta)
 
         log.info("Wrote run bundle to %s (%d samples, %d events)",
-                 self.output_dir, len(self.samples), len(self.events))
+                 self.output_dir, self.sample_count, len(self.writer.events))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -309,7 +385,8 @@ def main():
 
     # Initialize poller and bundle
     poller = GRFICSPoller(DEFAULT_MAPPINGS)
-    bundle = RunBundle(output_dir, scenario_id=args.scenario_id)
+    bundle = RunBundle(output_dir, [m.tag for m in DEFAULT_MAPPINGS],
+                       scenario_id=args.scenario_id)
 
     # Connect to all endpoints
     if not poller.connect_all(retries=args.retries):
@@ -353,8 +430,8 @@ def main():
             bundle.add_sample(now, csv_values)
 
             # Log progress every 10 samples
-            if len(bundle.samples) % 10 == 0:
-                log.info("Samples: %d, Elapsed: %.1fs", len(bundle.samples), elapsed)
+            if bundle.sample_count % 10 == 0:
+                log.info("Samples: %d, Elapsed: %.1fs", bundle.sample_count, elapsed)
 
             # Sleep for remaining poll interval
             poll_elapsed = time.monotonic() - t0
@@ -369,7 +446,7 @@ def main():
         bundle.write()
 
     log.info("Capture complete: %d samples over %.1fs",
-             len(bundle.samples), (end_time - start_time).total_seconds())
+             bundle.sample_count, (end_time - start_time).total_seconds())
 
 
 if __name__ == "__main__":
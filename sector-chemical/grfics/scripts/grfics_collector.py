@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+SPHERE GRFICS Collector — source_map.yaml → Run Bundle
+
+Polls the Tennessee Eastman tags from the SPHERE-native dual-PLC deployment
+and streams a run bundle (meta.json, tags.csv, events.json).  Everything is
+read from the Controller PLC as described by source_map.yaml: endpoint
+host/port (with ${VAR:-default} expansion, or a deployment preset), register
+types, addresses and 16-bit scaling.
+
+Mappings are planned into contiguous block reads per endpoint and register
+type before the run.  For the current map that is two holding-register
+reads per cycle (setpoints HR 0..3, sensors HR 300..312), and each block is
+scaled in one step, so captures can run at 10 Hz or faster.
+
+Usage:
+    cd sphere-usecases/sector-chemical/grfics
+    python scripts/grfics_collector.py --output runs/run-local-01 --duration 120
+
+    # SPHERE testbed controller, 20 Hz
+    python scripts/grfics_collector.py --preset sphere_testbed \\
+        --output runs/run-testbed-01 --poll-ms 50
+
+    # Endpoint from the environment (see source_map.yaml)
+    CONTROLLER_HOST=10.100.0.10 CONTROLLER_PORT=502 \\
+        python scripts/grfics_collector.py --output runs/run-01
+
+Requirements:
+    pip install pymodbus pyyaml numpy
+"""
+
+import argparse
+import inspect
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+try:
+    from pymodbus.client import ModbusTcpClient
+except ImportError:
+    print("Error: pymodbus required.  pip install pymodbus")
+    sys.exit(1)
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(SCRIPT_DIR.parents[2] / "tools"))
+from spherekit.bundle import RunBundleWriter
+from spherekit.scaling import MISSING, QUALITY_NAMES, BlockScaler, LinearScale
+from spherekit.scenario import BIT_TYPES, READ_FUNCTIONS, READ_LIMITS
+
+log = logging.getLogger("grfics_collector")
+
+DEFAULT_SOURCE_MAP = SCRIPT_DIR.parent / "source_map.yaml"
+DEFAULT_TAG_CONTRACT = SCRIPT_DIR.parent / "tag_contract.yaml"
+USE_CASE_ID = "grfics-tennessee-eastman"
+
+# Unused registers a block read may span rather than splitting in two
+MAX_READ_GAP = 16
+
+# The unit-id keyword of the pymodbus read calls was renamed across 3.x
+UNIT_KEYWORD = ("device_id" if "device_id" in
+                inspect.signature(ModbusTcpClient.read_holding_registers).parameters
+                else "slave")
+
+ENV_PATTERN = re.compile(r"\$\{(\w+)(?::-([^}]*))?\}")
+
+
+class SourceMapError(ValueError):
+    """source_map.yaml cannot be used for collection."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Source map
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class Endpoint:
+    """One Modbus server named in the source map."""
+    name: str
+    host: str
+    port: int
+    slave_id: int = 1
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+@dataclass
+class SourceTag:
+    """One tag's register binding and scaling."""
+    tag: str
+    endpoint: str
+    register_type: str
+    address: int
+    scale: LinearScale
+    units: str = ""
+
+
+@dataclass
+class ReadBlock:
+    """One contiguous block read; slots are (column index, offset into block)."""
+    endpoint: str
+    register_type: str
+    address: int
+    count: int
+    slots: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def expand_env(value):
+    """Expand ${VAR} and ${VAR:-default} from the environment."""
+    if not isinstance(value, str):
+        return value
+    return ENV_PATTERN.sub(lambda m: os.environ.get(m.group(1), m.group(2) or ""), value)
+
+
+def load_source_map(path, preset: Optional[str] = None) -> Tuple[Dict[str, Endpoint], List[SourceTag]]:
+    """Endpoints (env-expanded, preset applied) and tag bindings of a source map."""
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+
+    presets = data.get("deployment_presets") or {}
+    if preset is not None and preset not in presets:
+        raise SourceMapError(f"unknown deployment preset '{preset}' "
+                             f"(available: {', '.join(presets) or 'none'})")
+    overrides = presets.get(preset) or {}
+
+    endpoints: Dict[str, Endpoint] = {}
+    for name, spec in (data.get("endpoints") or {}).items():
+        spec = {**{k: expand_env(v) for k, v in (spec or {}).items()}, **(overrides.get(name) or {})}
+        try:
+            endpoints[name] = Endpoint(name, str(spec["host"]), int(spec["port"]),
+                                       int(spec.get("slave_id", 1)))
+        except (KeyError, TypeError, ValueError) as e:
+            raise SourceMapError(f"endpoint '{name}': bad host/port ({e})") from None
+
+    tags: List[SourceTag] = []
+    for tag, spec in (data.get("mappings") or {}).items():
+        endpoint = spec.get("endpoint")
+        if endpoint not in endpoints:
+            raise SourceMapError(f"{tag}: unknown endpoint '{endpoint}'")
+        register_type = spec.get("register_type")
+        if register_type not in READ_FUNCTIONS:
+            raise SourceMapError(f"{tag}: unsupported register type '{register_type}'")
+        if register_type in BIT_TYPES:
+            scale = LinearScale.from_gain(1.0, raw_min=0, raw_max=1)
+        else:
+            scale = LinearScale.from_config(spec.get("scale"))
+        tags.append(SourceTag(tag, endpoint, register_type, int(spec["address"]), scale,
+                              (spec.get("scale") or {}).get("eng_units", "")))
+    if not tags:
+        raise SourceMapError(f"{path}: no mappings")
+    return endpoints, tags
+
+
+def contract_order(tags: List[SourceTag], contract_path) -> List[SourceTag]:
+    """Tags in tag-contract order (unlisted tags keep map order, at the end)."""
+    if not contract_path or not Path(contract_path).exists():
+        return tags
+    with open(contract_path) as f:
+        contract = yaml.safe_load(f) or {}
+    rank = {t["name"]: i for i, t in enumerate(contract.get("tags") or []) if "name" in t}
+    return sorted(tags, key=lambda t: rank.get(t.tag, len(rank)))
+
+
+def plan_reads(tags: List[SourceTag], max_gap: int = MAX_READ_GAP) -> List[ReadBlock]:
+    """Coalesce tags into contiguous block reads per (endpoint, register type)."""
+    blocks: List[ReadBlock] = []
+    indexed = sorted(enumerate(tags), key=lambda it: (it[1].endpoint, it[1].register_type,
+                                                      it[1].address))
+    for column, t in indexed:
+        last = blocks[-1] if blocks else None
+        if (last is not None
+                and (last.endpoint, last.register_type) == (t.endpoint, t.register_type)
+                and t.address - (last.address + last.count) <= max_gap
+                and t.address - last.address < READ_LIMITS[t.register_type]):
+            last.count = max(last.count, t.address - last.address + 1)
+        else:
+            last = ReadBlock(t.endpoint, t.register_type, t.address, 1)
+            blocks.append(last)
+        last.slots.append((column, t.address - last.address))
+    return blocks
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Collector
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Collector:
+    """Reads the planned blocks and returns one scaled row per poll."""
+
+    def __init__(self, endpoints: Dict[str, Endpoint], tags: List[SourceTag],
+                 timeout: float = 2.0):
+        self.endpoints = endpoints
+        self.tags = tags
+        self.blocks = plan_reads(tags)
+        self.scaler = BlockScaler([t.scale for t in tags], digits=4)
+        self.clients = {name: ModbusTcpClient(ep.host, port=ep.port, timeout=timeout)
+                        for name, ep in endpoints.items()
+                        if any(b.endpoint == name for b in self.blocks)}
+        self._raw = np.empty(len(tags), dtype=np.float64)
+
+    def connect(self, retries: int = 5, delay: float = 2.0) -> bool:
+        """Connect to every endpoint that has tags."""
+        for name, client in self.clients.items():
+            ep = self.endpoints[name]
+            for attempt in range(retries):
+                if client.connect():
+                    log.info("Connected to %s (%s)", name, ep.address)
+                    break
+                log.warning("Connect attempt %d/%d failed for %s (%s)",
+                            attempt + 1, retries, name, ep.address)
+                time.sleep(delay)
+            else:
+                log.error("Failed to connect to %s (%s)", name, ep.address)
+                return False
+        return True
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+    def _read(self, block: ReadBlock) -> Optional[List[int]]:
+        client = self.clients[block.endpoint]
+        unit = {UNIT_KEYWORD: self.endpoints[block.endpoint].slave_id}
+        try:
+            rr = getattr(client, READ_FUNCTIONS[block.register_type])(
+                block.address, count=block.count, **unit)
+            if rr is None or rr.isError():
+                log.debug("Read error %s %s %d+%d: %s", block.endpoint, block.register_type,
+                          block.address, block.count, rr)
+                return None
+            values = rr.bits if block.register_type in BIT_TYPES else rr.registers
+            return values[:block.count]
+        except Exception as exc:
+            log.debug("Read exception %s %s %d+%d: %s", block.endpoint, block.register_type,
+                      block.address, block.count, exc)
+            return None
+
+    def poll(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(eng, quality) arrays in tag order; failed reads are NaN / MISSING."""
+        raw = self._raw
+        raw.fill(np.nan)
+        for block in self.blocks:
+            values = self._read(block)
+            if values is None:
+                continue
+            for column, offset in block.slots:
+                if offset < len(values):
+                    raw[column] = values[offset]
+        return self.scaler.to_eng(raw)
+
+
+def utc_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="milliseconds") \
+        .replace("+00:00", "Z")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="SPHERE GRFICS collector (source_map.yaml)")
+    parser.add_argument("--output", "-o", required=True,
+                        help="Output directory for run bundle")
+    parser.add_argument("--source-map", default=str(DEFAULT_SOURCE_MAP),
+                        help="Source map YAML (default: ../source_map.yaml)")
+    parser.add_argument("--tag-contract", default=str(DEFAULT_TAG_CONTRACT),
+                        help="Tag contract giving the column order (default: ../tag_contract.yaml)")
+    parser.add_argument("--preset",
+                        help="Deployment preset from the source map (e.g. local_docker, sphere_testbed)")
+    parser.add_argument("--duration", "-d", type=float, default=60,
+                        help="Capture duration in seconds (default: 60)")
+    parser.add_argument("--poll-ms", type=int, default=100,
+                        help="Poll interval in milliseconds (default: 100)")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Connection retry count per endpoint")
+    parser.add_argument("--scenario-id", default="grfics-live-capture",
+                        help="Scenario ID for metadata")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Enable debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+
+    try:
+        endpoints, tags = load_source_map(args.source_map, args.preset)
+    except (OSError, SourceMapError) as e:
+        log.error("Cannot load source map: %s", e)
+        sys.exit(1)
+    tags = contract_order(tags, args.tag_contract)
+    collector = Collector(endpoints, tags)
+
+    poll_sec = args.poll_ms / 1000.0
+    log.info("Output: %s", args.output)
+    log.info("Endpoints: %s", ", ".join(f"{n}={ep.address}" for n, ep in endpoints.items()))
+    log.info("Polling %d tags with %d block reads every %dms for %.0fs",
+             len(tags), len(collector.blocks), args.poll_ms, args.duration)
+
+    if not collector.connect(retries=args.retries):
+        sys.exit(1)
+
+    stop = threading.Event()
+
+    def signal_handler(sig, frame):
+        log.info("Signal %d received, stopping...", sig)
+        stop.set()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    names = [t.tag for t in tags]
+    bundle = RunBundleWriter(args.output, ["timestamp_utc"] + names, keep=False)
+    missing = late = 0
+
+    # Samples sit on a fixed grid of one monotonic clock anchored to UTC
+    start = time.monotonic()
+    wall_start = time.time()
+    bundle.add_event({"time_utc": utc_iso(wall_start), "type": "start", "msg": "Capture started"})
+    try:
+        slot = 0
+        while slot * poll_sec < args.duration:
+            if stop.wait(max(0.0, start + slot * poll_sec - time.monotonic())):
+                break
+            elapsed = time.monotonic() - start
+            eng, quality = collector.poll()
+
+            row = {"timestamp_utc": utc_iso(wall_start + elapsed)}
+            for name, value, flag in zip(names, eng.tolist(), quality.tolist()):
+                if flag == MISSING:
+                    row[name] = ""
+                    missing += 1
+                    continue
+                if flag:
+                    log.debug("%s raw value out of range (%s), clamped", name, QUALITY_NAMES[flag])
+                row[name] = value
+            bundle.writerow(row)
+
+            if bundle.rows % max(1, round(10 / poll_sec)) == 0:
+                log.info("Samples: %d, Elapsed: %.1fs", bundle.rows, elapsed)
+
+            # Skip grid slots that already passed instead of bursting
+            slot += 1
+            now = time.monotonic() - start
+            if now > slot * poll_sec:
+                late += 1
+                slot = int(now // poll_sec) + 1
+    finally:
+        elapsed = time.monotonic() - start
+        bundle.add_event({"time_utc": utc_iso(wall_start + elapsed), "type": "stop",
+                          "msg": "Capture stopped"})
+        collector.close()
+        bundle.finish({
+            "usecase_id": USE_CASE_ID,
+            "backend_type": "sphere-openplc",
+            "scenario_id": args.scenario_id,
+            "profile_name": "live",
+            "endpoints": {n: ep.address for n, ep in endpoints.items()},
+            "mapping_file": Path(args.source_map).name,
+            "deployment_preset": args.preset,
+            "poll_interval_ms": args.poll_ms,
+            "start_utc": bundle.start_utc,
+            "end_utc": bundle.end_utc,
+            "sample_count": bundle.rows,
+            "tag_selection": "all",
+            "tags": names,
+            "bundle_schema_version": "1.1.0",
+        })
+
+    if missing:
+        log.warning("%d tag values missing (failed reads)", missing)
+    if late:
+        log.warning("%d of %d samples overran the poll interval", late, bundle.rows)
+    log.info("Capture complete: %d samples over %.1fs, bundle at %s",
+             bundle.rows, elapsed, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""Batched Tennessee Eastman reactor model for synthetic dataset generation.
+
+BatchTEReactor advances M independent copies of the TEReactor model from
+generate_golden_runs.py as NumPy arrays: each instance has its own state
+and setpoints, and one step() updates all of them.  Rows come back in the
+canonical TAGS column order, shape (M, len(TAGS)).
+
+simulate() runs a whole batch: per-instance setpoints (constant or per
+sample), sensor noise drawn from one generator per instance seed (sigmas
+shared or per instance), and an optional spoofing attack per instance
+(tag, offset, sample window).  Physics constants and sensor sigmas are a
+TEParams, by default the script constants; TEParams.from_profile() reads
+them from a SimProfile such as profiles/demo.yaml.
+
+The physics step is decoupled from the output sample period: advance(dt)
+integrates one output interval in physics_dt_sec substeps and only the end
+state is recorded (decimation).  solver picks the integrator:
+
+    euler   forward Euler, bit-for-bit the scalar TEReactor (default)
+    rk4     classic Runge-Kutta at physics_dt_sec
+    rk45    adaptive Dormand-Prince, step size shared by the batch
+
+rk4 and rk45 advance the valve lags with their exact solution (the setpoint
+is constant over an output interval) and integrate pressure, level and
+composition around them.
+
+    reactor = BatchTEReactor(1000)
+    reactor.set_setpoints(setpoints)                # (M, 4) feed1, feed2, purge, product
+    reactor.run(200, DT_SEC)                        # warm up (100 s)
+    values = simulate(reactor, setpoints, 120, seeds=range(1000),
+                      attacks=Attacks.single(1000, "TE_Tank_Pressure", 200, 40, 80))
+    values.shape                                    # (1000, 120, 17)
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import yaml
+
+from generate_golden_runs import (
+    COMP_NOISE_SIGMA, CV_FEED1, CV_FEED2, CV_PRODUCT, CV_PURGE, DT_SEC, FLOW_NOISE_SIGMA,
+    LEVEL_NOISE_SIGMA, NOMINAL_LEVEL_PCT, NOMINAL_PRESSURE_KPA, POLL_INTERVAL_MS,
+    PRESSURE_NOISE_SIGMA, TAGS, VALVE_TAU_SEC, YA1, YB1, YC1,
+)
+
+TAG_INDEX = {tag: i for i, tag in enumerate(TAGS)}
+VALVES = ("Feed1", "Feed2", "Purge", "Product")
+COMP_TAU_SEC = 30.0
+SOLVERS = ("euler", "rk4", "rk45")
+
+# Dormand-Prince 5(4) tableau: stage coefficients, 5th-order weights and the
+# difference to the embedded 4th-order weights (error estimate; the last
+# entry weights the rate at the new state)
+DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0)
+DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+DP_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+DP_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+# Noisy sensors: sensor class and clamp range per tag (add_noise)
+SENSOR_CLASS = {
+    "TE_Tank_Pressure": ("pressure", 0, 3200),
+    "TE_Tank_Level": ("level", 0, 100),
+    "TE_Purge_CompA": ("analyzer", 0, 1),
+    "TE_Purge_CompB": ("analyzer", 0, 1),
+    "TE_Purge_CompC": ("analyzer", 0, 1),
+    "TE_Feed1_Flow": ("flow", 0, np.inf),
+    "TE_Feed2_Flow": ("flow", 0, np.inf),
+    "TE_Purge_Flow": ("flow", 0, np.inf),
+    "TE_Product_Flow": ("flow", 0, np.inf),
+}
+SENSOR_CLASSES = ("pressure", "level", "analyzer", "flow")
+NOISY = np.array([TAG_INDEX[tag] for tag in SENSOR_CLASS])
+CLAMP_MIN = np.full(len(TAGS), -np.inf)
+CLAMP_MAX = np.full(len(TAGS), np.inf)
+for _tag, (_cls, _lo, _hi) in SENSOR_CLASS.items():
+    CLAMP_MIN[TAG_INDEX[_tag]] = _lo
+    CLAMP_MAX[TAG_INDEX[_tag]] = _hi
+
+# Column of each valve's position / setpoint / flow tag
+POS_COLS = [TAG_INDEX[f"TE_{v}_Valve_Pos"] for v in VALVES]
+SP_COLS = [TAG_INDEX[f"TE_{v}_Valve_SP"] for v in VALVES]
+FLOW_COLS = [TAG_INDEX[f"TE_{v}_Flow"] for v in VALVES]
+PRESSURE_COL = TAG_INDEX["TE_Tank_Pressure"]
+LEVEL_COL = TAG_INDEX["TE_Tank_Level"]
+COMP_COLS = [TAG_INDEX[f"TE_Purge_Comp{c}"] for c in "ABC"]
+
+
+class TEParams(NamedTuple):
+    """Physics constants and sensor noise of the TE model."""
+    valve_tau_sec: float = VALVE_TAU_SEC
+    cv_feed1: float = CV_FEED1
+    cv_feed2: float = CV_FEED2
+    cv_purge: float = CV_PURGE
+    cv_product: float = CV_PRODUCT
+    ya1: float = YA1
+    yb1: float = YB1
+    yc1: float = YC1
+    nominal_pressure_kpa: float = NOMINAL_PRESSURE_KPA
+    poll_interval_ms: int = POLL_INTERVAL_MS
+    physics_dt_sec: float = DT_SEC
+    pressure_sigma: float = PRESSURE_NOISE_SIGMA
+    level_sigma: float = LEVEL_NOISE_SIGMA
+    analyzer_sigma: float = COMP_NOISE_SIGMA
+    flow_sigma: float = FLOW_NOISE_SIGMA
+
+    @classmethod
+    def from_profile(cls, path):
+        """Parameters from a SimProfile; anything it does not set keeps its default."""
+        with open(path) as f:
+            profile = yaml.safe_load(f) or {}
+        physics = profile.get("physics") or {}
+        cv = physics.get("flow_coefficients") or {}
+        feed1 = physics.get("feed1_composition") or {}
+        sensors = profile.get("sensors") or {}
+        values = {
+            "valve_tau_sec": ((profile.get("actuators") or {}).get("control_valve") or {}).get("tau_sec"),
+            "cv_feed1": cv.get("feed1_cv"),
+            "cv_feed2": cv.get("feed2_cv"),
+            "cv_purge": cv.get("purge_cv"),
+            "cv_product": cv.get("product_cv"),
+            "ya1": feed1.get("ya1"),
+            "yb1": feed1.get("yb1"),
+            "yc1": feed1.get("yc1"),
+            "nominal_pressure_kpa": (physics.get("initial") or {}).get("pressure_kPa"),
+            "poll_interval_ms": (profile.get("timing") or {}).get("poll_interval_ms"),
+            "physics_dt_sec": (profile.get("timing") or {}).get("dt_sec"),
+        }
+        for name in SENSOR_CLASSES:
+            values[f"{name}_sigma"] = (sensors.get(name) or {}).get("noise_sigma")
+        return cls(**{k: type(cls._field_defaults[k])(v) for k, v in values.items() if v is not None})
+
+    @property
+    def dt_sec(self) -> float:
+        """Output sample period."""
+        return self.poll_interval_ms / 1000.0
+
+    def noise_sigma(self) -> np.ndarray:
+        """Per-tag sensor noise sigma in TAGS order (0 for noiseless tags)."""
+        sigma = np.zeros(len(TAGS))
+        for tag, (cls, _, _) in SENSOR_CLASS.items():
+            sigma[TAG_INDEX[tag]] = getattr(self, f"{cls}_sigma")
+        return sigma
+
+
+DEFAULT_PARAMS = TEParams()
+
+
+class BatchTEReactor:
+    """M independent TEReactor instances stepped together as arrays.
+
+    physics_dt defaults to params.physics_dt_sec; for rk45 it is only the
+    initial step size, and rtol/atol set the per-step error tolerance.
+    """
+
+    def __init__(self, m: int, pressure_kpa=NOMINAL_PRESSURE_KPA, level_pct=NOMINAL_LEVEL_PCT,
+                 params: TEParams = DEFAULT_PARAMS, solver: str = "euler",
+                 physics_dt: float = None, rtol: float = 1e-6, atol: float = 1e-6):
+        if solver not in SOLVERS:
+            raise ValueError(f"unknown solver '{solver}' ({', '.join(SOLVERS)})")
+        self.m = m
+        self.params = params
+        self.solver = solver
+        self.physics_dt = params.physics_dt_sec if physics_dt is None else float(physics_dt)
+        self.rtol = rtol
+        self.atol = atol
+        self.valve_tau = params.valve_tau_sec
+        self._cv = np.array([params.cv_feed1, params.cv_feed2, params.cv_purge, params.cv_product])
+        self._h = self.physics_dt
+        self.steps = 0          # physics steps taken (rk45: accepted)
+        self.rejected = 0       # rk45 steps rejected by the error control
+        self.pressure = np.broadcast_to(np.asarray(pressure_kpa, dtype=float), (m,)).copy()
+        self.level = np.broadcast_to(np.asarray(level_pct, dtype=float), (m,)).copy()
+        # Purge composition (A, B, C) and valve positions / setpoints, one row per instance
+        self.comp = np.tile([0.47, 0.06, 0.47], (m, 1))
+        self.valve = np.zeros((m, 4))
+        self.sp = np.zeros((m, 4))
+        self._out = np.empty((m, len(TAGS)))
+
+    def set_setpoints(self, setpoints):
+        """Valve setpoints (0-100%): shape (4,) for all instances or (M, 4)."""
+        self.sp[:] = np.clip(setpoints, 0, 100)
+
+    def step(self, dt: float) -> np.ndarray:
+        """Advance every instance by dt seconds; returns (M, len(TAGS)) tag values.
+
+        The returned array is reused by the next step; copy it to keep it.
+        """
+        # Valve positions (first-order lag)
+        if self.valve_tau <= 0:
+            self.valve[:] = self.sp
+        else:
+            self.valve += (dt / self.valve_tau) * (self.sp - self.valve)
+        feed1_pos, feed2_pos, purge_pos, product_pos = self.valve.T
+
+        # Flows; outlets are driven by sqrt(P - 100)
+        p = self.params
+        feed1_flow = p.cv_feed1 * feed1_pos
+        feed2_flow = p.cv_feed2 * feed2_pos
+        sqrt_dp = np.sqrt(np.maximum(self.pressure - 100, 0))
+        purge_flow = p.cv_purge * purge_pos * sqrt_dp
+        product_flow = p.cv_product * product_pos * sqrt_dp
+
+        # Pressure from the gas balance
+        comp_a, comp_b, comp_c = self.comp.T
+        reaction_rate = 0.1 * self.pressure / p.nominal_pressure_kpa * (comp_a * comp_c)
+        net_gas = feed1_flow + feed2_flow - purge_flow - reaction_rate * 100
+        np.clip(self.pressure + net_gas * 0.05 * dt, 0, 3200, out=self.pressure)
+
+        # Level from product accumulation
+        dlevel_dt = (reaction_rate * 50 - product_flow * 0.5) * 0.01
+        np.clip(self.level + dlevel_dt * dt, 0, 100, out=self.level)
+
+        # Composition relaxes towards the feed mix (only while there is feed)
+        total_a = feed1_flow * p.ya1 + feed2_flow
+        total_b = feed1_flow * p.yb1
+        total_c = feed1_flow * p.yc1
+        total_in = total_a + total_b + total_c
+        fed = total_in > 0
+        safe_in = np.where(fed, total_in, 1.0)
+        target = np.stack([total_a / safe_in * 0.95, total_b / safe_in,
+                           total_c / safe_in * 0.95], axis=1)
+        self.comp += np.where(fed[:, None], (dt / COMP_TAU_SEC) * (target - self.comp), 0.0)
+        total_comp = self.comp.sum(axis=1, keepdims=True)
+        np.divide(self.comp, total_comp, out=self.comp, where=total_comp > 0)
+
+        out = self._out
+        out[:, POS_COLS] = self.valve
+        out[:, SP_COLS] = self.sp
+        out[:, FLOW_COLS] = np.stack([feed1_flow, feed2_flow, purge_flow, product_flow], axis=1)
+        out[:, PRESSURE_COL] = self.pressure
+        out[:, LEVEL_COL] = self.level
+        out[:, COMP_COLS] = self.comp
+        return out
+
+    def run(self, n_steps: int, dt: float = DT_SEC) -> np.ndarray:
+        """Advance n_steps output intervals without recording; returns the last values."""
+        out = self._out
+        for _ in range(n_steps):
+            out = self.advance(dt)
+        return out
+
+    # ── Solvers ──────────────────────────────────────────────────────
+
+    def advance(self, dt: float) -> np.ndarray:
+        """Integrate one output interval of dt seconds with the reactor's solver.
+
+        Setpoints are held over the interval; returns (M, len(TAGS)) values
+        at its end (reused by the next call, like step()).
+        """
+        if self.solver == "rk45":
+            self._advance_rk45(dt)
+            return self._outputs()
+        n = max(1, int(np.ceil(dt / self.physics_dt - 1e-9)))
+        h = dt / n
+        if self.solver == "euler":
+            for _ in range(n):
+                out = self.step(h)
+            self.steps += n
+            return out
+        y = self._state()
+        for _ in range(n):
+            y = self._rk4_step(y, h)
+        self.steps += n
+        return self._outputs()
+
+    def _valve_at(self, valve0, t):
+        """Exact first-order lag: valve positions t seconds after valve0."""
+        if self.valve_tau <= 0:
+            return self.sp
+        return self.sp + (valve0 - self.sp) * np.exp(-t / self.valve_tau)
+
+    def _flows(self, valve, pressure):
+        """(M, 4) feed1, feed2, purge, product flows."""
+        flows = valve * self._cv
+        flows[:, 2:] *= np.sqrt(np.maximum(pressure - 100, 0))[:, None]
+        return flows
+
+    def _state(self):
+        """(M, 5) pressure, level, comp A, B, C."""
+        return np.column_stack([self.pressure, self.level, self.comp])
+
+    def rates(self, y, valve):
+        """d/dt of the (M, 5) pressure, level, comp A/B/C state with the valves
+        at the given positions (level does not feed back into any rate)."""
+        p = self.params
+        pressure, comp = y[:, 0], y[:, 2:]
+        flows = self._flows(valve, pressure)
+        reaction_rate = 0.1 * pressure / p.nominal_pressure_kpa * (comp[:, 0] * comp[:, 2])
+        dy = np.empty_like(y)
+        dy[:, 0] = (flows[:, 0] + flows[:, 1] - flows[:, 2] - reaction_rate * 100) * 0.05
+        dy[:, 1] = (reaction_rate * 50 - flows[:, 3] * 0.5) * 0.01
+
+        total = np.stack([flows[:, 0] * p.ya1 + flows[:, 1], flows[:, 0] * p.yb1,
+                          flows[:, 0] * p.yc1], axis=1)
+        total_in = total.sum(axis=1)
+        fed = total_in > 0
+        target = total / np.where(fed, total_in, 1.0)[:, None] * [0.95, 1.0, 0.95]
+        relax = np.where(fed[:, None], (target - comp) / COMP_TAU_SEC, 0.0)
+        # Relaxation projected onto sum(comp) = 1: the dt -> 0 limit of
+        # TEReactor's relax-then-renormalize step
+        dy[:, 2:] = relax - comp * relax.sum(axis=1, keepdims=True)
+        return dy
+
+    def _commit(self, y, valve):
+        """Take y as the new state: clamp pressure / level, renormalize composition."""
+        self.valve[:] = valve
+        np.clip(y[:, 0], 0, 3200, out=self.pressure)
+        np.clip(y[:, 1], 0, 100, out=self.level)
+        self.comp[:] = y[:, 2:]
+        total_comp = self.comp.sum(axis=1, keepdims=True)
+        np.divide(self.comp, total_comp, out=self.comp, where=total_comp > 0)
+        return self._state()
+
+    def _rk4_step(self, y, h):
+        valve0 = self.valve.copy()
+        valve_mid = self._valve_at(valve0, h / 2)
+        valve_end = self._valve_at(valve0, h)
+        k1 = self.rates(y, valve0)
+        k2 = self.rates(y + (h / 2) * k1, valve_mid)
+        k3 = self.rates(y + (h / 2) * k2, valve_mid)
+        k4 = self.rates(y + h * k3, valve_end)
+        return self._commit(y + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4), valve_end)
+
+    def _advance_rk45(self, dt):
+        """Adaptive Dormand-Prince over dt; one step size for the whole batch."""
+        y = self._state()
+        t = 0.0
+        while dt - t > 1e-12:
+            h = min(self._h, dt - t)
+            valve0 = self.valve.copy()
+            k = []
+            for c, a in zip(DP_C, DP_A):
+                yi = y + h * sum(ai * ki for ai, ki in zip(a, k)) if k else y
+                k.append(self.rates(yi, self._valve_at(valve0, c * h)))
+            y_new = y + h * sum(b * ki for b, ki in zip(DP_B, k) if b)
+            valve_end = self._valve_at(valve0, h)
+            k.append(self.rates(y_new, valve_end))
+            err = h * sum(e * ki for e, ki in zip(DP_E, k) if e)
+            scale = self.atol + self.rtol * np.maximum(np.abs(y), np.abs(y_new))
+            norm = float(np.sqrt(np.mean((err / scale) ** 2, axis=1)).max())
+            factor = 5.0 if norm == 0 else min(5.0, max(0.2, 0.9 * norm ** -0.2))
+            if norm <= 1.0:
+                y = self._commit(y_new, valve_end)
+                t += h
+                self.steps += 1
+                # A step cut short by the interval end does not shrink the next one
+                if h == self._h:
+                    self._h = h * factor
+            else:
+                self._h = h * factor
+                self.rejected += 1
+
+    def _outputs(self):
+        out = self._out
+        out[:, POS_COLS] = self.valve
+        out[:, SP_COLS] = self.sp
+        out[:, FLOW_COLS] = self._flows(self.valve, self.pressure)
+        out[:, PRESSURE_COL] = self.pressure
+        out[:, LEVEL_COL] = self.level
+        out[:, COMP_COLS] = self.comp
+        return out
+
+
+class SolvedTEReactor:
+    """TEReactor's interface (keyword setpoints, dict rows) over one BatchTEReactor instance.
+
+    Lets the golden-run generator use the rk4 / rk45 solvers and a physics
+    step finer than its sample period.
+    """
+
+    def __init__(self, pressure_kpa: float = NOMINAL_PRESSURE_KPA,
+                 level_pct: float = NOMINAL_LEVEL_PCT, params: TEParams = DEFAULT_PARAMS,
+                 solver: str = "rk45", physics_dt: float = None):
+        self.batch = BatchTEReactor(1, pressure_kpa, level_pct, params=params, solver=solver,
+                                    physics_dt=physics_dt)
+
+    def set_state(self, valves, pressure_kpa: float, comp):
+        self.batch.valve[0] = valves
+        self.batch.pressure[0] = pressure_kpa
+        self.batch.comp[0] = comp
+
+    def set_setpoints(self, feed1: float, feed2: float, purge: float, product: float):
+        self.batch.set_setpoints([feed1, feed2, purge, product])
+
+    def step(self, dt: float) -> dict:
+        """Advance one sample period of dt seconds, return tag values."""
+        return dict(zip(TAGS, self.batch.advance(dt)[0].tolist()))
+
+
+class Attacks(NamedTuple):
+    """Per-instance sensor spoofing: offset added to column in [start, end) samples."""
+    column: np.ndarray   # (M,) int, TAGS column
+    offset: np.ndarray   # (M,) engineering units (0 = no attack)
+    start: np.ndarray    # (M,) int sample index
+    end: np.ndarray      # (M,) int sample index (exclusive)
+
+    @classmethod
+    def single(cls, m, tag, offset, start, end):
+        """The same tag attacked in every instance; offset/start/end may be per instance."""
+        def per_instance(value, dtype):
+            return np.broadcast_to(np.asarray(value, dtype=dtype), (m,)).copy()
+        return cls(per_instance(TAG_INDEX[tag], int), per_instance(offset, float),
+                   per_instance(start, int), per_instance(end, int))
+
+
+def sensor_noise(seeds, n_samples: int, sigma=None) -> np.ndarray:
+    """(M, n_samples, len(TAGS)) Gaussian sensor noise, one generator per seed.
+
+    sigma is per tag, (len(TAGS),) or (M, len(TAGS)); default DEFAULT_PARAMS.
+    """
+    seeds = list(seeds)
+    sigma = DEFAULT_PARAMS.noise_sigma() if sigma is None else np.asarray(sigma, dtype=float)
+    noise = np.zeros((len(seeds), n_samples, len(TAGS)))
+    for i, seed in enumerate(seeds):
+        noise[i][:, NOISY] = np.random.default_rng(seed).standard_normal((n_samples, len(NOISY)))
+    noise *= sigma[..., None, :] if sigma.ndim == 2 else sigma
+    return noise
+
+
+def simulate(reactor: BatchTEReactor, setpoints, n_samples: int, seeds=None,
+             attacks: Attacks = None, dt: float = DT_SEC, noise_sigma=None) -> np.ndarray:
+    """Record n_samples output intervals of dt seconds; returns (M, n_samples, len(TAGS)).
+
+    setpoints is (M, 4) / (4,) for the whole run, or (n_samples, M, 4) for
+    a per-sample schedule.  With seeds (one per instance) sensor noise is
+    added and clamped as add_noise() does, with the reactor's sigmas unless
+    noise_sigma is given; attacks are applied after the noise and clamped
+    to the tag's range.
+    """
+    m = reactor.m
+    setpoints = np.asarray(setpoints, dtype=float)
+    scheduled = setpoints.ndim == 3
+    if not scheduled:
+        reactor.set_setpoints(setpoints)
+    values = np.empty((m, n_samples, len(TAGS)))
+    for k in range(n_samples):
+        if scheduled:
+            reactor.set_setpoints(setpoints[k])
+        values[:, k] = reactor.advance(dt)
+
+    if seeds is not None:
+        if noise_sigma is None:
+            noise_sigma = reactor.params.noise_sigma()
+        values += sensor_noise(seeds, n_samples, noise_sigma)
+        np.clip(values, CLAMP_MIN, CLAMP_MAX, out=values)
+    if attacks is not None:
+        k = np.arange(n_samples)
+        active = (k >= attacks.start[:, None]) & (k < attacks.end[:, None])      # (M, n)
+        rows, cols = np.nonzero(active)
+        columns = attacks.column[rows]
+        values[rows, cols, columns] = np.clip(values[rows, cols, columns] + attacks.offset[rows],
+                                              CLAMP_MIN[columns], CLAMP_MAX[columns])
+    return values
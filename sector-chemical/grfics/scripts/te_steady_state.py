@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Steady-state warm starts for the Tennessee Eastman model.
+
+Instead of stepping a fresh reactor for a few hundred warm-up steps, solve
+for the equilibrium of a setpoint vector directly and start from it:
+
+  - valves sit at their setpoints
+  - purge composition is the normalized feed mix (the fixed point of the
+    relax-then-renormalize step)
+  - pressure is the root of dP/dt = 0 with the above, found by vectorized
+    bisection on BatchTEReactor.rates(); the rate falls monotonically with
+    pressure, so the root is unique (clamped to 0..3200 kPa)
+
+Level is a pure integrator (reaction in, product out, nothing feeds back),
+so it has no equilibrium of its own: a warm start keeps the caller's level.
+
+The same setpoints recur across sweeps, so equilibria are memoized in a
+JSON file keyed by a hash of the physics parameters and the setpoints:
+
+    cache = SteadyStateCache(".cache/te-steady-state.json", params)
+    valve, pressure, comp = cache.lookup(setpoints)     # (M, 4) -> arrays
+    cache.save()
+    warm_start(reactor, setpoints, (valve, pressure, comp))
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from te_model import DEFAULT_PARAMS, BatchTEReactor, TEParams
+
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "tools"))
+from spherekit.bundle import atomic_write_json
+
+CACHE_VERSION = 1
+BISECT_ITERATIONS = 64      # halves 3200 kPa down to float64 resolution
+PRESSURE_MAX_KPA = 3200.0
+
+# TEParams fields the equilibrium depends on (not noise, timing or valve tau)
+PHYSICS_FIELDS = ("cv_feed1", "cv_feed2", "cv_purge", "cv_product", "ya1", "yb1", "yc1",
+                  "nominal_pressure_kpa")
+
+
+def steady_state(setpoints, params: TEParams = DEFAULT_PARAMS):
+    """(valve, pressure, comp) equilibrium arrays for (M, 4) or (4,) setpoints."""
+    setpoints = np.clip(np.atleast_2d(np.asarray(setpoints, dtype=float)), 0, 100)
+    m = len(setpoints)
+    reactor = BatchTEReactor(m, params=params)
+    valve = setpoints
+
+    # Composition: normalized feed mix; without feed it keeps the initial mix
+    feed1 = params.cv_feed1 * valve[:, 0]
+    feed2 = params.cv_feed2 * valve[:, 1]
+    target = np.stack([(feed1 * params.ya1 + feed2) * 0.95, feed1 * params.yb1,
+                       feed1 * params.yc1 * 0.95], axis=1)
+    total = target.sum(axis=1, keepdims=True)
+    comp = np.where(total > 0, target / np.where(total > 0, total, 1.0), reactor.comp)
+
+    # Pressure: bisection on the sign of dP/dt over [0, PRESSURE_MAX_KPA]
+    y = np.zeros((m, 5))
+    y[:, 2:] = comp
+
+    def pressure_rate(pressure):
+        y[:, 0] = pressure
+        return reactor.rates(y, valve)[:, 0]
+
+    lo = np.zeros(m)
+    hi = np.full(m, PRESSURE_MAX_KPA)
+    for _ in range(BISECT_ITERATIONS):
+        mid = 0.5 * (lo + hi)
+        rising = pressure_rate(mid) > 0
+        lo = np.where(rising, mid, lo)
+        hi = np.where(rising, hi, mid)
+    pressure = 0.5 * (lo + hi)
+    # Still rising at the top / falling at the bottom: the clamp is the equilibrium
+    pressure[pressure_rate(np.full(m, PRESSURE_MAX_KPA)) >= 0] = PRESSURE_MAX_KPA
+    pressure[pressure_rate(np.zeros(m)) <= 0] = 0.0
+    return valve, pressure, comp
+
+
+def warm_start(reactor: BatchTEReactor, setpoints, state):
+    """Put every instance of reactor at its (valve, pressure, comp) equilibrium."""
+    valve, pressure, comp = state
+    reactor.set_setpoints(setpoints)
+    reactor.valve[:] = valve
+    reactor.pressure[:] = pressure
+    reactor.comp[:] = comp
+
+
+class SteadyStateCache:
+    """Equilibria memoized on disk, keyed by physics parameters and setpoints."""
+
+    def __init__(self, path, params: TEParams = DEFAULT_PARAMS):
+        self.path = Path(path)
+        self.params = params
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._physics = {name: getattr(params, name) for name in PHYSICS_FIELDS}
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("entries", {})
+
+    def key(self, setpoints) -> str:
+        """Cache key of one (4,) setpoint vector."""
+        text = json.dumps({"physics": self._physics,
+                           "setpoints": [float(v) for v in np.clip(setpoints, 0, 100)]},
+                          sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def lookup(self, setpoints):
+        """(valve, pressure, comp) arrays for (M, 4) setpoints; misses are solved in one batch."""
+        setpoints = np.atleast_2d(np.asarray(setpoints, dtype=float))
+        keys = [self.key(row) for row in setpoints]
+        missing = sorted({k: i for i, k in enumerate(keys) if k not in self.entries}.items())
+        if missing:
+            rows = setpoints[[i for _, i in missing]]
+            valve, pressure, comp = steady_state(rows, self.params)
+            for j, (k, _) in enumerate(missing):
+                self.entries[k] = {"valve": valve[j].tolist(), "pressure_kpa": float(pressure[j]),
+                                   "comp": comp[j].tolist()}
+            self._dirty = True
+        self.misses += len(missing)
+        self.hits += len(set(keys)) - len(missing)
+
+        entries = [self.entries[k] for k in keys]
+        return (np.array([e["valve"] for e in entries]),
+                np.array([e["pressure_kpa"] for e in entries]),
+                np.array([e["comp"] for e in entries]))
+
+    def save(self):
+        """Write the cache back if lookups added entries."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(self.path, {"version": CACHE_VERSION, "entries": self.entries})
+        self._dirty = False
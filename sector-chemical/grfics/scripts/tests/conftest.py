@@ -0,0 +1,12 @@
+"""
+Pytest setup for the GRFICS script tests.
+
+Puts scripts/ on sys.path, as running a script from there does, so the
+tests import te_model and friends the way the generators do.
+"""
+
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS))
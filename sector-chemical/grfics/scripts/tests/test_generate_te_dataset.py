@@ -0,0 +1,136 @@
+"""
+Dataset generator tests
+
+The grid keeps one clean run per operating point and noise level, and a
+dataset depends only on the sweep and --seed: the same runs come out
+whatever --workers and --batch-size split them into shards.
+"""
+
+import csv
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from generate_te_dataset import AXES, expand_runs, load_sweep, run_seed
+from te_model import TEParams
+
+SCRIPTS = Path(__file__).resolve().parents[1]
+PRESSURE_SPOOF = SCRIPTS.parent / "sweeps" / "pressure-spoof.yaml"
+
+OFFSET = AXES.index("attack_offset")
+WINDOW = [AXES.index("attack_start_sec"), AXES.index("attack_duration_sec")]
+POINT = slice(0, OFFSET)          # setpoints and noise sigmas
+
+SMALL_SWEEP = {
+    "mode": "grid",
+    "duration_sec": 8,
+    "initial": {"level_pct": 45},
+    "setpoints": {"feed1": [20, 30, 2], "feed2": 20, "purge": 30, "product": 35},
+    "noise": {"pressure": [2.5, 10, 2]},
+    "attack": {"tag": "TE_Tank_Pressure", "offset": [0, 400, 2], "start_sec": [2, 4, 2],
+               "duration_sec": 3},
+}
+
+
+class TestExpandRuns:
+    """Clean runs are not multiplied by the attack window axes."""
+
+    def test_pressure_spoof_counts(self):
+        sweep, axes = load_sweep(PRESSURE_SPOOF, TEParams())
+        runs = expand_runs(sweep, axes, 42)
+        clean = runs[:, OFFSET] == 0
+        assert (len(runs), clean.sum(), (~clean).sum()) == (1404, 108, 1296)
+
+        # One clean run per operating point and noise level, with no window
+        assert not runs[np.ix_(clean, WINDOW)].any()
+        points = {tuple(r) for r in runs[clean, POINT]}
+        assert len(points) == 108
+        assert points == {tuple(r) for r in runs[~clean, POINT]}
+        # Attacked runs are all distinct and keep their windows
+        assert len(np.unique(runs[~clean], axis=0)) == 1296
+        assert (runs[~clean][:, WINDOW] > 0).all()
+
+    def test_grid_keeps_product_order(self):
+        sweep, axes = load_sweep(PRESSURE_SPOOF, TEParams())
+        runs = expand_runs(sweep, axes, 42)
+        keys = [tuple(r) for r in runs]
+        assert keys == sorted(keys)
+
+    def test_monte_carlo_clean_runs_have_no_window(self, tmp_path):
+        path = tmp_path / "mc.yaml"
+        path.write_text(yaml.safe_dump(dict(
+            SMALL_SWEEP, mode="monte_carlo", runs=200,
+            setpoints={"feed1": [20, 30], "feed2": 20, "purge": 30, "product": 35},
+            noise={}, attack={"offset": [0, 0], "start_sec": [2, 4], "duration_sec": [1, 3]})))
+        runs = expand_runs(*load_sweep(path, TEParams()), 7)
+        assert len(runs) == 200 and not runs[:, WINDOW].any()
+
+    def test_monte_carlo_draws_depend_only_on_seed(self, tmp_path):
+        path = tmp_path / "mc.yaml"
+        path.write_text(yaml.safe_dump(dict(
+            SMALL_SWEEP, mode="monte_carlo", runs=50,
+            setpoints={"feed1": [20, 30], "feed2": 20, "purge": 30, "product": 35},
+            noise={}, attack={"offset": [50, 400], "start_sec": [2, 4], "duration_sec": 3})))
+        sweep, axes = load_sweep(path, TEParams())
+        np.testing.assert_array_equal(expand_runs(sweep, axes, 7), expand_runs(sweep, axes, 7))
+        assert not np.array_equal(expand_runs(sweep, axes, 7), expand_runs(sweep, axes, 8))
+
+
+class TestRunSeed:
+    """Noise seeds depend on (seed, run index) only."""
+
+    def test_distinct_and_stable(self):
+        seeds = [run_seed(42, i) for i in range(1000)]
+        assert len(set(seeds)) == 1000
+        assert seeds == [run_seed(42, i) for i in range(1000)]
+        assert run_seed(43, 0) != seeds[0]
+
+
+def generate(tmp_path, name, workers, batch_size):
+    sweep = tmp_path / "small.yaml"
+    sweep.write_text(yaml.safe_dump(SMALL_SWEEP))
+    out = tmp_path / name
+    subprocess.run([sys.executable, str(SCRIPTS / "generate_te_dataset.py"),
+                    "--sweep", str(sweep), "--output", str(out), "--seed", "5",
+                    "--steady-cache", str(tmp_path / "steady.json"),
+                    "--workers", str(workers), "--batch-size", str(batch_size)],
+                   check=True, capture_output=True)
+    with open(out / "index.csv", newline="") as f:
+        index = list(csv.DictReader(f))
+    values, attack = [], []
+    for shard in sorted(out.glob("shard-*.npz")):
+        with np.load(shard) as data:
+            values.append(data["values"])
+            attack.append(data["attack"])
+    return index, np.concatenate(values), np.concatenate(attack)
+
+
+@pytest.fixture(scope="module")
+def datasets(tmp_path_factory):
+    """The small sweep generated in one shard, and in three over two workers."""
+    tmp_path = tmp_path_factory.mktemp("datasets")
+    return (generate(tmp_path, "one", workers=1, batch_size=64),
+            generate(tmp_path, "many", workers=2, batch_size=5))
+
+
+class TestReproducible:
+    """Sharding and worker count do not change the dataset."""
+
+    def test_same_runs(self, datasets):
+        (index_a, _, _), (index_b, _, _) = datasets
+        # 2 feeds x 2 sigmas x (1 clean + 1 offset x 2 onsets)
+        assert len(index_a) == len(index_b) == 12
+        drop = ("shard", "row")
+        assert ([{k: v for k, v in r.items() if k not in drop} for r in index_a]
+                == [{k: v for k, v in r.items() if k not in drop} for r in index_b])
+        assert sum(r["label"] == "nominal" for r in index_a) == 4
+
+    def test_same_values_and_labels(self, datasets):
+        (_, values_a, attack_a), (_, values_b, attack_b) = datasets
+        np.testing.assert_array_equal(values_a, values_b)
+        np.testing.assert_array_equal(attack_a, attack_b)
+        assert attack_a.any(axis=1).sum() == 8
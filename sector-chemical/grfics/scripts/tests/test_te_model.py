@@ -0,0 +1,113 @@
+"""
+Batched TE model tests
+
+BatchTEReactor with the Euler solver is documented as bit-for-bit the
+scalar TEReactor of generate_golden_runs.py; the golden bundles and the
+generated datasets rely on that, so it is checked exactly.  rk4 and rk45
+are checked against a fine-step reference run.
+"""
+
+import numpy as np
+import pytest
+
+from generate_golden_runs import DT_SEC, TEReactor
+from te_model import TAGS, BatchTEReactor
+
+# (pressure kPa, level %, setpoints before / after the change at step 300)
+CASES = [
+    (2700.0, 45.0, (25, 20, 30, 35), (25, 20, 30, 35)),
+    (0.0, 0.0, (0, 0, 0, 0), (60, 40, 20, 50)),         # cold start
+    (3100.0, 95.0, (100, 100, 0, 0), (10, 5, 80, 100)),  # pressure clamp, then blow-down
+    (150.0, 2.0, (30, 0, 100, 100), (0, 0, 0, 0)),       # level clamp, feed cut
+]
+
+
+def scalar_run(pressure, level, before, after, steps):
+    reactor = TEReactor(pressure, level)
+    rows = []
+    for k in range(steps):
+        reactor.set_setpoints(*(before if k < 300 else after))
+        values = reactor.step(DT_SEC)
+        rows.append([values[tag] for tag in TAGS])
+    return np.array(rows)
+
+
+class TestEulerMatchesScalar:
+    """Every instance of the batch follows its own scalar reactor exactly."""
+
+    def test_batch_equals_scalar_reactor(self):
+        steps = 800
+        batch = BatchTEReactor(len(CASES), pressure_kpa=[c[0] for c in CASES],
+                               level_pct=[c[1] for c in CASES])
+        got = np.empty((len(CASES), steps, len(TAGS)))
+        for k in range(steps):
+            batch.set_setpoints([c[2] if k < 300 else c[3] for c in CASES])
+            got[:, k] = batch.advance(DT_SEC)
+        for i, case in enumerate(CASES):
+            np.testing.assert_array_equal(got[i], scalar_run(*case, steps), err_msg=f"case {i}")
+
+    def test_finer_physics_step_is_substeps_of_the_scalar_step(self):
+        batch = BatchTEReactor(1, physics_dt=DT_SEC / 4)
+        batch.set_setpoints([40, 10, 30, 30])
+        scalar = TEReactor()
+        scalar.set_setpoints(40, 10, 30, 30)
+        for _ in range(100):
+            out = batch.advance(DT_SEC)
+            for _ in range(4):
+                values = scalar.step(DT_SEC / 4)
+        np.testing.assert_array_equal(out[0], [values[tag] for tag in TAGS])
+
+
+
+# Setpoint changes from open valves, where the model is smooth, and from
+# closed ones (the constructor's state), held against rk4 at 1/32 the step
+OPEN_VALVES = np.array([[25, 20, 30, 35], [60, 40, 20, 50], [10, 5, 80, 100], [40, 10, 30, 30]],
+                       dtype=float)
+NEW_SETPOINTS = np.array([[40, 10, 30, 30], [30, 25, 30, 40], [25, 20, 30, 35], [10, 5, 60, 60]],
+                         dtype=float)
+
+
+def solver_run(solver, physics_dt=None, open_valves=True, seconds=200):
+    reactor = BatchTEReactor(len(NEW_SETPOINTS), pressure_kpa=[2700, 2000, 3000, 1500],
+                             level_pct=[45, 50, 50, 30], solver=solver, physics_dt=physics_dt)
+    if open_valves:
+        reactor.valve[:] = OPEN_VALVES
+    reactor.set_setpoints(NEW_SETPOINTS)
+    for _ in range(int(seconds / DT_SEC)):
+        out = reactor.advance(DT_SEC)
+    return out.copy()
+
+
+@pytest.fixture(scope="module")
+def open_reference():
+    return solver_run("rk4", DT_SEC / 32)
+
+
+@pytest.fixture(scope="module")
+def cold_reference():
+    return solver_run("rk4", DT_SEC / 32, open_valves=False)
+
+
+def max_error(reference, solver, physics_dt=None, open_valves=True):
+    return np.abs(solver_run(solver, physics_dt, open_valves) - reference).max()
+
+
+class TestSolverAccuracy:
+    """rk4 and rk45 converge on the fine-step trajectory; Euler does not."""
+
+    def test_rk4_is_fourth_order(self, open_reference):
+        ratio = (max_error(open_reference, "rk4")
+                 / max_error(open_reference, "rk4", DT_SEC / 2))
+        assert 12 < ratio < 20
+
+    def test_open_valves(self, open_reference):
+        assert max_error(open_reference, "rk4") < 1e-6
+        assert max_error(open_reference, "rk45") < 1e-7
+        assert max_error(open_reference, "euler") > 1e-2
+
+    def test_cold_start(self, cold_reference):
+        # Valves opening from 0 switch the feed composition on within the
+        # first step, which caps every solver at first order from there
+        assert max_error(cold_reference, "rk4", open_valves=False) < 3.5e-3
+        assert max_error(cold_reference, "rk45", open_valves=False) < 3.5e-3
+        assert max_error(cold_reference, "euler", open_valves=False) > 1.0
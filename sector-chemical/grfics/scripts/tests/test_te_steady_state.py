@@ -0,0 +1,73 @@
+"""
+Steady-state warm start tests
+
+steady_state() must land where a long run of the model settles, and a
+reactor warm-started there must stay put.  The cache must return the same
+equilibria it solved.
+"""
+
+import numpy as np
+import pytest
+
+from generate_golden_runs import DT_SEC
+from te_model import BatchTEReactor
+from te_steady_state import PRESSURE_MAX_KPA, SteadyStateCache, steady_state, warm_start
+
+SETPOINTS = np.array([
+    [25, 20, 30, 35],       # nominal
+    [20, 15, 30, 30],       # pressure-spoof sweep corners
+    [30, 25, 30, 40],
+    [60, 40, 20, 50],
+    [100, 100, 0, 0],       # no outlet: pressure settles on the clamp
+], dtype=float)
+
+
+def long_run(setpoints, seconds, solver="euler"):
+    """Cold start, then run until well past the slowest (pressure) time constant."""
+    reactor = BatchTEReactor(len(setpoints), solver=solver)
+    reactor.set_setpoints(setpoints)
+    reactor.run(int(seconds / DT_SEC), DT_SEC)
+    return reactor
+
+
+class TestSteadyState:
+    """The solved equilibrium is the one the model converges to."""
+
+    @pytest.mark.parametrize("solver", ["euler", "rk4"])
+    def test_matches_long_run(self, solver):
+        valve, pressure, comp = steady_state(SETPOINTS)
+        reactor = long_run(SETPOINTS, 6000, solver)
+        np.testing.assert_allclose(reactor.valve, valve, atol=1e-9)
+        np.testing.assert_allclose(reactor.pressure, pressure, rtol=1e-7, atol=1e-6)
+        np.testing.assert_allclose(reactor.comp, comp, atol=1e-9)
+        assert pressure[-1] == PRESSURE_MAX_KPA
+
+    def test_warm_start_stays_put(self):
+        state = steady_state(SETPOINTS)
+        reactor = BatchTEReactor(len(SETPOINTS), level_pct=45.0)
+        warm_start(reactor, SETPOINTS, state)
+        reactor.run(200, DT_SEC)
+        np.testing.assert_allclose(reactor.pressure, state[1], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(reactor.comp, state[2], atol=1e-12)
+
+    def test_without_feed_pressure_bleeds_to_zero(self):
+        _, pressure, comp = steady_state([0, 0, 50, 50])
+        assert pressure[0] == 0.0
+        np.testing.assert_array_equal(comp[0], [0.47, 0.06, 0.47])
+
+
+class TestSteadyStateCache:
+    """Equilibria are solved once and survive a round trip through the file."""
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "steady.json"
+        cache = SteadyStateCache(path)
+        first = cache.lookup(np.vstack([SETPOINTS, SETPOINTS[:2]]))
+        assert (cache.misses, cache.hits) == (len(SETPOINTS), 0)
+        cache.save()
+
+        again = SteadyStateCache(path)
+        second = again.lookup(SETPOINTS)
+        assert (again.misses, again.hits) == (0, len(SETPOINTS))
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a[:len(SETPOINTS)], b)
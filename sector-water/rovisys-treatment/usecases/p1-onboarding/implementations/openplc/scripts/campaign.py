@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+SPHERE Campaign Runner — scenario × profile sweeps across parallel PLC pairs
+
+Runs validation_harness.py for every scenario/profile combination, spread
+over N isolated controller/simulator pairs, and aggregates the bundles
+into a pass/fail matrix.  Each pair runs one harness (and its own bridge)
+at a time; the next combination goes to whichever pair frees up first.
+
+Pairs come from one of:
+    --pair CTRL:PORT,SIM:PORT   existing pairs (repeat per pair)
+    --docker N                  N local OpenPLC pairs started here on
+                                distinct ports (base-port, base-port+1, ...)
+    --virtual N                 N virtual-plant stand-ins (harness --virtual;
+                                only harnesses that have it, not water
+                                distribution)
+
+--harness runs another use case's validation_harness.py (default: the one
+next to this script).
+
+Usage:
+    python -P campaign.py --scenario ../../../scenarios/*.yaml \\
+        --profile ../../../../../profiles/realistic.yaml \\
+        --virtual 4 --output runs/campaign-nightly
+
+    python -P campaign.py --campaign campaign.yaml --docker 3 \\
+        --controller-program ../st/controller.st \\
+        --simulator-program ../st/simulator.st --output runs/regression
+
+A campaign file holds the same lists:
+    scenarios: [scenarios/nominal_startup.yaml, scenarios/alarm_hh.yaml]
+    profiles: [profiles/realistic.yaml]
+
+Output:
+    <output>/runs/<scenario_id>--<profile>/   one bundle per combination
+    <output>/campaign.json                    per-run results + summary
+    <output>/matrix.md                        scenario × profile matrix
+
+Exits non-zero if any run FAILs or ERRORs, and also when no run was
+validated at all (every cell UNCHECKED, e.g. the invariant rules file is
+missing) unless --allow-unchecked is given.
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:
+    print("Error: PyYAML required.  pip install pyyaml")
+    sys.exit(1)
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+HARNESS = SCRIPT_DIR / "validation_harness.py"
+DEFAULT_IMAGE = os.environ.get("OPENPLC_IMAGE", "sphere-openplc:master")
+
+log = logging.getLogger("campaign")
+
+
+# ── Combinations ─────────────────────────────────────────────────────
+
+def expand_paths(patterns, base=None):
+    """Expand globs (relative to base when given) into sorted file paths."""
+    paths = []
+    for pattern in patterns:
+        if base is not None and not os.path.isabs(pattern):
+            pattern = str(Path(base) / pattern)
+        matched = sorted(glob.glob(pattern))
+        if not matched:
+            raise ValueError(f"no files match {pattern}")
+        paths.extend(matched)
+    return paths
+
+
+def scenario_id(path):
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    return data.get("scenario_id") or Path(path).stem
+
+
+def profile_name(path):
+    if not path:
+        return "default"
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    return (data.get("metadata") or {}).get("name") or Path(path).stem
+
+
+def build_jobs(scenarios, profiles):
+    """One job per scenario × profile combination."""
+    jobs = []
+    for scen, prof in itertools.product(scenarios, profiles or [None]):
+        sid, pname = scenario_id(scen), profile_name(prof)
+        jobs.append({
+            "scenario": scen,
+            "scenario_id": sid,
+            "profile": prof,
+            "profile_name": pname,
+            "name": f"{sid}--{pname}",
+        })
+    names = [j["name"] for j in jobs]
+    dupes = {n for n in names if names.count(n) > 1}
+    if dupes:
+        raise ValueError(f"duplicate scenario/profile names: {', '.join(sorted(dupes))}")
+    return jobs
+
+
+# ── PLC pairs ────────────────────────────────────────────────────────
+
+class Slot:
+    """One isolated controller/simulator pair (or virtual stand-in)."""
+
+    def __init__(self, name, controller=None, simulator=None, virtual=False):
+        self.name = name
+        self.controller = controller
+        self.simulator = simulator
+        self.virtual = virtual
+        self.containers = []
+
+    def harness_args(self):
+        if self.virtual:
+            return ["--virtual"]
+        return ["--controller", self.controller, "--simulator", self.simulator]
+
+
+def wait_for_port(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(1)
+    return False
+
+
+def start_docker_pairs(count, image, ctrl_program, sim_program, base_port, scan_ms,
+                       ready_timeout):
+    """Start count OpenPLC pairs on 127.0.0.1:base_port+2i / +2i+1."""
+    slots = []
+    tag = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    for i in range(count):
+        slot = Slot(f"pair{i}")
+        for role, program, port in (("ctrl", ctrl_program, base_port + 2 * i),
+                                    ("sim", sim_program, base_port + 2 * i + 1)):
+            program = Path(program).resolve()
+            name = f"sphere-campaign-{tag}-{i}-{role}"
+            cmd = [
+                "docker", "run", "-d", "--rm", "--name", name,
+                "-p", f"127.0.0.1:{port}:502",
+                "-v", f"{program.parent}:/programs:ro",
+                "-e", f"OPENPLC_PROGRAM=/programs/{program.name}",
+                "-e", f"OPENPLC_SCAN_CYCLE_MS={scan_ms}",
+                image,
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                stop_docker_pairs(slots + [slot])
+                raise RuntimeError(f"docker run {name} failed: {result.stderr.strip()}")
+            slot.containers.append(name)
+            if role == "ctrl":
+                slot.controller = f"127.0.0.1:{port}"
+            else:
+                slot.simulator = f"127.0.0.1:{port}"
+        slots.append(slot)
+        log.info("Started %s: controller %s, simulator %s", slot.name,
+                 slot.controller, slot.simulator)
+
+    for slot in slots:
+        for addr in (slot.controller, slot.simulator):
+            host, port = addr.rsplit(":", 1)
+            if not wait_for_port(host, int(port), ready_timeout):
+                stop_docker_pairs(slots)
+                raise RuntimeError(f"{slot.name}: {addr} not ready after {ready_timeout}s")
+    return slots
+
+
+def stop_docker_pairs(slots):
+    names = [c for s in slots for c in s.containers]
+    if names:
+        subprocess.run(["docker", "stop", "-t", "2"] + names, capture_output=True)
+        log.info("Stopped %d containers", len(names))
+
+
+# ── Runs ─────────────────────────────────────────────────────────────
+
+def read_result(run_dir):
+    """Classify a finished bundle: PASS, FAIL (violations) or UNCHECKED."""
+    report = Path(run_dir) / "artifacts" / "model-validate" / "report.json"
+    if not report.exists():
+        return "UNCHECKED", None
+    try:
+        data = json.loads(report.read_text())
+    except (OSError, json.JSONDecodeError):
+        return "UNCHECKED", None
+    violations = data.get("total_violations", len(data.get("violations", [])))
+    return ("PASS" if violations == 0 else "FAIL"), violations
+
+
+def harness_supports(harness, option):
+    """True if the harness's --help lists option among its options."""
+    env = dict(os.environ, PYTHONSAFEPATH="1")
+    result = subprocess.run([sys.executable, str(harness), "--help"], capture_output=True,
+                            text=True, env=env)
+    listed = re.compile(rf"^\s+{re.escape(option)}(?=[\s,]|$)", re.MULTILINE)
+    return result.returncode == 0 and listed.search(result.stdout) is not None
+
+
+def run_job(job, slot, out_root, extra_args, timeout, harness=HARNESS):
+    run_dir = Path(out_root) / "runs" / job["name"]
+    run_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [sys.executable, str(harness),
+           "--scenario", job["scenario"], "--output", str(run_dir)]
+    if job["profile"]:
+        cmd += ["--profile", job["profile"]]
+    cmd += slot.harness_args() + extra_args
+    # operator.py in the scripts directory would shadow the stdlib module
+    env = dict(os.environ, PYTHONSAFEPATH="1")
+
+    started = time.monotonic()
+    with open(run_dir / "harness.log", "w") as logf:
+        try:
+            rc = subprocess.run(cmd, stdout=logf, stderr=subprocess.STDOUT,
+                                env=env, timeout=timeout).returncode
+        except subprocess.TimeoutExpired:
+            rc = None
+    elapsed = time.monotonic() - started
+
+    if rc is None:
+        status, violations = "ERROR", None
+        log.error("%s timed out on %s", job["name"], slot.name)
+    elif rc != 0 or not (run_dir / "tags.csv").exists():
+        status, violations = "ERROR", None
+        log.error("%s failed on %s (exit %s), see %s", job["name"], slot.name, rc,
+                  run_dir / "harness.log")
+    else:
+        status, violations = read_result(run_dir)
+    log.info("%-40s %-9s %6.1fs on %s", job["name"], status, elapsed, slot.name)
+    return dict(job, slot=slot.name, status=status, violations=violations,
+                returncode=rc, elapsed_sec=round(elapsed, 2),
+                bundle=str(run_dir.relative_to(out_root)))
+
+
+def run_campaign(jobs, slots, out_root, extra_args=(), timeout=None, harness=HARNESS):
+    """Run jobs across slots, one harness per slot at a time."""
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    results = []
+    lock = threading.Lock()
+
+    def worker(slot):
+        while True:
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                return
+            result = run_job(job, slot, out_root, list(extra_args), timeout, harness)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker, args=(s,), name=s.name, daemon=True)
+               for s in slots]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    order = {j["name"]: i for i, j in enumerate(jobs)}
+    return sorted(results, key=lambda r: order[r["name"]])
+
+
+# ── Reporting ────────────────────────────────────────────────────────
+
+def format_matrix(results):
+    scenarios = list(dict.fromkeys(r["scenario_id"] for r in results))
+    profiles = list(dict.fromkeys(r["profile_name"] for r in results))
+    cell = {(r["scenario_id"], r["profile_name"]): r for r in results}
+    lines = ["| Scenario | " + " | ".join(profiles) + " |",
+             "|---" * (len(profiles) + 1) + "|"]
+    for sid in scenarios:
+        row = []
+        for pname in profiles:
+            r = cell.get((sid, pname))
+            if r is None:
+                row.append("-")
+            elif r["status"] == "FAIL":
+                row.append(f"FAIL ({r['violations']})")
+            else:
+                row.append(r["status"])
+        lines.append(f"| {sid} | " + " | ".join(row) + " |")
+    return "\n".join(lines)
+
+
+def write_report(out_root, results, slots, wall_sec):
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    summary = {
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "runs": len(results),
+        "pairs": len(slots),
+        "wall_sec": round(wall_sec, 1),
+        "run_sec_total": round(sum(r["elapsed_sec"] for r in results), 1),
+        "counts": counts,
+    }
+    out = Path(out_root)
+    (out / "campaign.json").write_text(
+        json.dumps({"summary": summary, "results": results}, indent=2) + "\n")
+    matrix = format_matrix(results)
+    (out / "matrix.md").write_text(
+        "# Campaign Results\n\n"
+        f"{len(results)} runs on {len(slots)} pairs in {wall_sec:.0f}s "
+        f"({', '.join(f'{k}: {v}' for k, v in sorted(counts.items()))})\n\n"
+        + matrix + "\n")
+    return summary, matrix
+
+
+# ── Main ─────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="SPHERE Campaign Runner")
+    parser.add_argument("--campaign", help="Campaign YAML with scenarios/profiles lists")
+    parser.add_argument("--scenario", action="append", default=[],
+                        help="Scenario YAML or glob (repeatable)")
+    parser.add_argument("--profile", action="append", default=[],
+                        help="Sim profile YAML or glob (repeatable)")
+    parser.add_argument("--output", required=True, help="Campaign output directory")
+    parser.add_argument("--harness", type=Path, default=HARNESS,
+                        help="validation_harness.py to run (default: this use case's)")
+    pairs = parser.add_mutually_exclusive_group(required=True)
+    pairs.add_argument("--pair", action="append", metavar="CTRL:PORT,SIM:PORT",
+                       help="Existing controller/simulator pair (repeatable)")
+    pairs.add_argument("--docker", type=int, metavar="N", help="Start N local OpenPLC pairs")
+    pairs.add_argument("--virtual", type=int, metavar="N", help="Run N virtual-plant stand-ins")
+    parser.add_argument("--image", default=DEFAULT_IMAGE, help="OpenPLC image for --docker")
+    parser.add_argument("--controller-program", help="Controller ST/XML for --docker")
+    parser.add_argument("--simulator-program", help="Simulator ST/XML for --docker")
+    parser.add_argument("--base-port", type=int, default=15020, help="First host port for --docker")
+    parser.add_argument("--scan-ms", type=int, default=50, help="OpenPLC scan cycle for --docker")
+    parser.add_argument("--ready-timeout", type=float, default=300,
+                        help="Seconds to wait for --docker PLCs to compile and listen")
+    parser.add_argument("--run-timeout", type=float, default=None,
+                        help="Abort a single harness run after this many seconds")
+    parser.add_argument("--harness-arg", action="append", default=[],
+                        help="Extra argument passed to every harness run (repeatable)")
+    parser.add_argument("--allow-unchecked", action="store_true",
+                        help="Exit 0 even if no run was checked against invariant rules")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+
+    scen_patterns, prof_patterns = list(args.scenario), list(args.profile)
+    base = None
+    if args.campaign:
+        with open(args.campaign) as f:
+            spec = yaml.safe_load(f) or {}
+        base = Path(args.campaign).resolve().parent
+        scen_patterns = (spec.get("scenarios") or []) + scen_patterns
+        prof_patterns = (spec.get("profiles") or []) + prof_patterns
+    try:
+        scenarios = expand_paths(scen_patterns, base)
+        profiles = expand_paths(prof_patterns, base)
+        jobs = build_jobs(scenarios, profiles)
+    except (OSError, ValueError) as e:
+        log.error("Cannot build campaign: %s", e)
+        sys.exit(1)
+    if not jobs:
+        log.error("No scenarios given")
+        sys.exit(1)
+
+    for option, count in (("--docker", args.docker), ("--virtual", args.virtual)):
+        if count is not None and count < 1:
+            parser.error(f"{option} needs N >= 1, got {count}")
+    if args.virtual is not None and not harness_supports(args.harness, "--virtual"):
+        parser.error(f"{args.harness} has no --virtual mode (the water distribution harness "
+                     "runs against live PLCs only); use --pair or --docker")
+
+    if args.pair:
+        slots = []
+        for i, spec in enumerate(args.pair):
+            ctrl, _, sim = spec.partition(",")
+            if not sim:
+                parser.error(f"--pair needs CTRL:PORT,SIM:PORT, got {spec}")
+            slots.append(Slot(f"pair{i}", ctrl, sim))
+    elif args.docker is not None:
+        if not (args.controller_program and args.simulator_program):
+            parser.error("--docker needs --controller-program and --simulator-program")
+        try:
+            slots = start_docker_pairs(args.docker, args.image, args.controller_program,
+                                       args.simulator_program, args.base_port, args.scan_ms,
+                                       args.ready_timeout)
+        except RuntimeError as e:
+            log.error("%s", e)
+            sys.exit(1)
+    else:
+        slots = [Slot(f"virtual{i}", virtual=True) for i in range(args.virtual)]
+
+    os.makedirs(args.output, exist_ok=True)
+    log.info("Campaign: %d scenarios × %d profiles = %d runs on %d pairs",
+             len(scenarios), max(1, len(profiles)), len(jobs), len(slots))
+    started = time.monotonic()
+    try:
+        results = run_campaign(jobs, slots, args.output, args.harness_arg, args.run_timeout,
+                               args.harness)
+    finally:
+        stop_docker_pairs(slots)
+    summary, matrix = write_report(args.output, results, slots, time.monotonic() - started)
+
+    print(matrix)
+    log.info("Done: %d runs in %.1fs (%.1fs of harness time). Results in %s",
+             summary["runs"], summary["wall_sec"], summary["run_sec_total"], args.output)
+    if any(r["status"] in ("FAIL", "ERROR") for r in results):
+        sys.exit(1)
+    unchecked = sum(r["status"] == "UNCHECKED" for r in results)
+    if unchecked:
+        log.warning("%d of %d runs were not checked against invariant rules (no report.json; "
+                    "see --harness-arg=--invariant-rules=PATH)", unchecked, len(results))
+    if unchecked == len(results) and not args.allow_unchecked:
+        log.error("Nothing was validated")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
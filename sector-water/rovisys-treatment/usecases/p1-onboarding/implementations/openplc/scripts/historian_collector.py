@@ -30,6 +30,7 @@ import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
 # Bridge mode uses holding registers 300-331 on the simulator
@@ -43,6 +44,15 @@ except ImportError:
     print("Error: pymodbus is required. Install with: pip install pymodbus")
     sys.exit(1)
 
+# Shared tooling (tools/spherekit). Optional: the historian container
+# (python:3.11-slim) has neither NumPy nor the repository's tools/ tree, so
+# register batches fall back to scaling each tag in plain Python.
+sys.path.insert(0, str(Path(__file__).resolve().parents[7] / "tools"))
+try:
+    from spherekit.scaling import MISSING, BlockScaler, LinearScale
+except ImportError:
+    BlockScaler = None
+
 
 class DataQuality(Enum):
     """OPC-UA style data quality codes"""
@@ -80,7 +90,7 @@ class TagDefinition:
     count: int = 1
     description: str = ""
     units: str = ""
-    scale: float = 1.0
+    scale: float = 1.0  # engineering value = raw register * scale
 
 
 @dataclass
@@ -133,6 +143,7 @@ class RegisterBatch:
     start_address: int
     count: int
     tags: List[TagDefinition] = field(default_factory=list)
+    scaler: Optional[Any] = None  # BlockScaler for register batches, if available
 
 
 class HistorianCollector:
@@ -209,6 +220,10 @@ class HistorianCollector:
             if current_batch:
                 self.batches.append(current_batch)
 
+        for batch in self.batches:
+            if BlockScaler is not None and batch.register_type in ("holding_register", "input_register"):
+                batch.scaler = BlockScaler([LinearScale.from_gain(t.scale) for t in batch.tags])
+
         print(f"Built {len(self.batches)} read batches for {len(self.tags)} tags")
 
     def connect_all(self) -> bool:
@@ -284,6 +299,24 @@ class HistorianCollector:
             # Extract values for each tag in the batch
             plc.consecutive_failures = 0
 
+            if batch.scaler is not None:
+                # Scale the whole register block in one step
+                registers = response.registers
+                raw = []
+                for tag in batch.tags:
+                    offset = tag.address - batch.start_address
+                    raw.append(registers[offset] if offset < len(registers) else None)
+                scaled, flags = batch.scaler.to_eng(raw)
+                for tag, value, flag in zip(batch.tags, scaled.tolist(), flags.tolist()):
+                    if flag != MISSING and tag.scale == 1.0:
+                        value = int(value)      # unscaled tags stay integer counts
+                    results[tag.name] = TagValue(
+                        value=None if flag == MISSING else value,
+                        quality=DataQuality.BAD if flag == MISSING else DataQuality.GOOD,
+                        timestamp=timestamp
+                    )
+                return results
+
             for tag in batch.tags:
                 offset = tag.address - batch.start_address
 
@@ -296,7 +329,9 @@ class HistorianCollector:
                         quality = DataQuality.BAD
                 else:
                     if offset < len(response.registers):
-                        value = response.registers[offset] * tag.scale
+                        value = response.registers[offset]
+                        if tag.scale != 1.0:
+                            value = value * tag.scale
                         quality = DataQuality.GOOD
                     else:
                         value = None
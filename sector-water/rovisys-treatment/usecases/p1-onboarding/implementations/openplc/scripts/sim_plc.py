@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+SPHERE Simulator PLC stand-in — P1 plant physics behind Modbus TCP
+
+Serves the simulator PLC's bridge interface without an OpenPLC container,
+so the bridge, collectors and harnesses can run (and be load-tested at high
+cycle rates) on a laptop.  Physics is spherekit.plants.P1Plant — the same
+model as virtual_plant.py — stepped in vectorized form at --rate Hz.
+
+Register layout (same as the simulator PLC):
+    in   HR 200-211  valve/pump commands    HR 220  pump speed (%, 0 = full)
+    out  HR 300-305  levels and pump flow   HR 320-331  status bits
+    legacy (simulator_flat.st %IW70-75 / %IX2.0-2.6):
+         IR 70-75    same values as HR 300-305
+         DI 16-22    same bits as HR 320-326
+Writing HR 300-305 forces that tank level (set_sim_level, initial
+conditions).  Other addresses read as zero; writes outside the input and
+level registers are rejected with ILLEGAL DATA ADDRESS.
+
+--plants N serves N independent plants, stepped as one batch: unit id k
+(1..N) addresses plant k.  With one plant the unit id is ignored, like
+OpenPLC.
+
+Usage (-P, or PYTHONSAFEPATH=1, keeps this directory off sys.path: its
+operator.py would shadow the standard library module):
+    python -P sim_plc.py --port 1503
+    python -P modbus_bridge.py --controller localhost:502 --simulator localhost:1503
+
+    # 200 plants at 100 Hz, physics 10x faster than wall clock
+    python -P sim_plc.py --port 1503 --plants 200 --rate 100 --time-scale 10
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(SCRIPT_DIR.parents[6] / "tools"))
+from spherekit.plants import P1_COMMANDS, P1_OUTPUTS, P1Params, P1Plant
+
+log = logging.getLogger("sim_plc")
+
+DEFAULT_PROFILE = SCRIPT_DIR.parents[4] / "profiles" / "realistic.yaml"
+
+# Bridge register layout
+SIM_CMD_BASE = 200          # HR 200-211 ← controller coils 40-51
+SIM_SPEED = 220             # HR 220 ← controller HR 100
+SIM_LEVEL_BASE = 300        # HR 300-305 → controller HR 300-305
+SIM_STATUS_BASE = 320       # HR 320-331 → controller HR 320-331
+LEGACY_IR_BASE = 70         # IR 70-75 (ai_7_0..5)
+LEGACY_DI_BASE = 16         # DI 16-22 (di_2_0..6)
+LEGACY_DI_COUNT = 7
+
+IMAGE_SIZE = 1024
+WRITABLE_HR = (set(range(SIM_CMD_BASE, SIM_CMD_BASE + len(P1_COMMANDS))) | {SIM_SPEED}
+               | set(range(SIM_LEVEL_BASE, SIM_LEVEL_BASE + len(P1_OUTPUTS))))
+
+# Function codes and limits (Modbus application protocol v1.1b3)
+READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING, READ_INPUT = 1, 2, 3, 4
+WRITE_COIL, WRITE_REGISTER, WRITE_COILS, WRITE_REGISTERS = 5, 6, 15, 16
+MAX_READ_BITS = 2000
+MAX_READ_REGISTERS = 125
+MAX_WRITE_REGISTERS = 123
+ILLEGAL_FUNCTION, ILLEGAL_ADDRESS, ILLEGAL_VALUE, TARGET_FAILED = 0x01, 0x02, 0x03, 0x0B
+
+
+class ModbusError(Exception):
+    """A request answered with a Modbus exception response."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class SimulatorPLC:
+    """Register images of N simulated P1 plants and their physics loop."""
+
+    def __init__(self, plants: int, params: P1Params, rate_hz=10.0, time_scale=1.0, seed=None):
+        seeds = None if seed is None else np.random.SeedSequence(seed).spawn(plants)
+        self.plant = P1Plant(plants, params, seeds=seeds)
+        self.n = plants
+        self.period = 1.0 / rate_hz
+        self.dt = self.period * time_scale
+        # Per-plant Modbus tables
+        self.hr = np.zeros((plants, IMAGE_SIZE), dtype=np.uint16)
+        self.ir = np.zeros((plants, IMAGE_SIZE), dtype=np.uint16)
+        self.di = np.zeros((plants, IMAGE_SIZE), dtype=bool)
+        self.coils = np.zeros((plants, IMAGE_SIZE), dtype=bool)
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Stats
+        self.steps = 0
+        self.overruns = 0
+        self.requests = 0
+        self.last_step_ms = 0.0
+        self._publish()
+
+    # ------------------------------------------------------------------
+    # Physics
+    # ------------------------------------------------------------------
+    def _publish(self):
+        levels, status = self.plant.registers()
+        levels = np.minimum(levels, 0xFFFF)
+        self.hr[:, SIM_LEVEL_BASE:SIM_LEVEL_BASE + len(P1_OUTPUTS)] = levels
+        self.hr[:, SIM_STATUS_BASE:SIM_STATUS_BASE + len(P1_COMMANDS)] = status
+        self.ir[:, LEGACY_IR_BASE:LEGACY_IR_BASE + len(P1_OUTPUTS)] = levels
+        self.di[:, LEGACY_DI_BASE:LEGACY_DI_BASE + LEGACY_DI_COUNT] = status[:, :LEGACY_DI_COUNT]
+
+    def step(self):
+        """One physics step of every plant on the current command registers."""
+        with self.lock:
+            commands = self.hr[:, SIM_CMD_BASE:SIM_CMD_BASE + len(P1_COMMANDS)]
+            self.plant.step(commands, self.hr[:, SIM_SPEED].astype(np.float64), self.dt)
+            self._publish()
+
+    def _run(self):
+        log.info("Physics loop started (%d plants, %.0f Hz, dt=%.3fs)",
+                 self.n, 1.0 / self.period, self.dt)
+        report_every = max(1, int(round(10.0 / self.period)))
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            self.step()
+            self.steps += 1
+            self.last_step_ms = (time.monotonic() - t0) * 1000
+
+            if self.steps % report_every == 0:
+                log.info("steps=%d  overruns=%d  requests=%d  last=%.2fms",
+                         self.steps, self.overruns, self.requests, self.last_step_ms)
+
+            deadline += self.period
+            sleep = deadline - time.monotonic()
+            if sleep > 0:
+                self._stop.wait(sleep)
+            else:
+                # Fell behind: count it and restart the schedule from now
+                self.overruns += 1
+                deadline = time.monotonic()
+
+        log.info("Physics loop stopped after %d steps (%d overruns)", self.steps, self.overruns)
+
+    def start(self):
+        """Start the physics loop in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the physics loop."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # Modbus requests
+    # ------------------------------------------------------------------
+    def _row(self, unit):
+        if self.n == 1:
+            return 0
+        if not 1 <= unit <= self.n:
+            raise ModbusError(TARGET_FAILED)
+        return unit - 1
+
+    @staticmethod
+    def _range(address, count, limit):
+        if not 1 <= count <= limit:
+            raise ModbusError(ILLEGAL_VALUE)
+        if address + count > IMAGE_SIZE:
+            raise ModbusError(ILLEGAL_ADDRESS)
+        return slice(address, address + count)
+
+    def _write_registers(self, row, address, values):
+        if any(a not in WRITABLE_HR for a in range(address, address + len(values))):
+            raise ModbusError(ILLEGAL_ADDRESS)
+        self.hr[row, address:address + len(values)] = values
+        for offset, value in enumerate(values):
+            index = address + offset - SIM_LEVEL_BASE
+            if 0 <= index < len(P1_OUTPUTS):
+                self.plant.force_level(index, float(value), rows=row)
+
+    def process(self, unit: int, pdu: bytes) -> bytes:
+        """Response PDU for one request PDU."""
+        if not pdu:
+            return bytes([0x80, ILLEGAL_VALUE])
+        fc = pdu[0]
+        try:
+            if len(pdu) < 5:
+                raise ModbusError(ILLEGAL_VALUE)
+            address, value = struct.unpack(">HH", pdu[1:5])
+            row = self._row(unit)
+            self.requests += 1
+            with self.lock:
+                if fc in (READ_COILS, READ_DISCRETE_INPUTS):
+                    table = self.coils if fc == READ_COILS else self.di
+                    bits = table[row, self._range(address, value, MAX_READ_BITS)]
+                    data = np.packbits(bits, bitorder="little").tobytes()
+                    return bytes([fc, len(data)]) + data
+                if fc in (READ_HOLDING, READ_INPUT):
+                    table = self.hr if fc == READ_HOLDING else self.ir
+                    words = table[row, self._range(address, value, MAX_READ_REGISTERS)]
+                    data = words.astype(">u2").tobytes()
+                    return bytes([fc, len(data)]) + data
+                if fc == WRITE_REGISTER:
+                    self._range(address, 1, 1)
+                    self._write_registers(row, address, [value])
+                    return pdu[:5]
+                if fc == WRITE_REGISTERS:
+                    self._range(address, value, MAX_WRITE_REGISTERS)
+                    if len(pdu) < 6 + 2 * value or pdu[5] != 2 * value:
+                        raise ModbusError(ILLEGAL_VALUE)
+                    values = struct.unpack(f">{value}H", pdu[6:6 + 2 * value])
+                    self._write_registers(row, address, values)
+                    return pdu[:5]
+                if fc in (WRITE_COIL, WRITE_COILS):
+                    # The simulator takes its commands on holding registers
+                    raise ModbusError(ILLEGAL_ADDRESS)
+                raise ModbusError(ILLEGAL_FUNCTION)
+        except ModbusError as e:
+            return bytes([fc | 0x80, e.code])
+
+
+class ModbusHandler(socketserver.BaseRequestHandler):
+    """One Modbus TCP connection: MBAP-framed requests until the client closes."""
+
+    def _recv(self, n):
+        buf = b""
+        while len(buf) < n:
+            chunk = self.request.recv(n - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        plc = self.server.plc
+        log.debug("Client connected: %s:%d", *self.client_address[:2])
+        while True:
+            header = self._recv(7)
+            if header is None:
+                break
+            tid, _, length, unit = struct.unpack(">HHHB", header)
+            pdu = self._recv(length - 1) if length > 1 else b""
+            if pdu is None:
+                break
+            reply = plc.process(unit, pdu)
+            self.request.sendall(struct.pack(">HHHB", tid, 0, len(reply) + 1, unit) + reply)
+        log.debug("Client disconnected: %s:%d", *self.client_address[:2])
+
+
+class ModbusServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, plc: SimulatorPLC):
+        super().__init__(address, ModbusHandler)
+        self.plc = plc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPHERE simulator PLC stand-in (P1 physics over Modbus TCP)")
+    parser.add_argument("--host", default=os.environ.get("SIM_HOST", "0.0.0.0"),
+                        help="Listen address (default: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SIM_PORT", "503")),
+                        help="Listen port (default: 503, like the simulator PLC)")
+    parser.add_argument("--profile", type=Path, default=DEFAULT_PROFILE,
+                        help="Sim profile YAML (default: profiles/realistic.yaml)")
+    parser.add_argument("--plants", type=int, default=1,
+                        help="Independent plants, addressed by unit id 1..N (default: 1)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Physics steps per second (default: 1 / profile timing.dt_sec)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Simulated seconds per wall-clock second (default: 1.0)")
+    parser.add_argument("--seed", type=int, default=0, help="Sensor noise seed (default: 0)")
+    parser.add_argument("--no-noise", action="store_true", help="Publish noiseless sensor values")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+
+    if args.profile.exists():
+        params = P1Params.from_profile(args.profile)
+        log.info("Profile: %s", args.profile)
+    else:
+        params = P1Params()
+        log.info("Profile: built-in defaults (realistic)")
+    rate = args.rate
+    if rate is None:
+        dt_sec = 0.1
+        if args.profile.exists():
+            from spherekit.plants import load_sim_profile
+            dt_sec = float((load_sim_profile(args.profile).get("timing") or {}).get("dt_sec", dt_sec))
+        rate = 1.0 / dt_sec
+
+    plc = SimulatorPLC(args.plants, params, rate_hz=rate, time_scale=args.time_scale,
+                       seed=None if args.no_noise else args.seed)
+    server = ModbusServer((args.host, args.port), plc)
+    log.info("Serving %d plant(s) on %s:%d", args.plants, args.host, args.port)
+
+    def _signal_handler(sig, frame):
+        log.info("Signal %d received, stopping...", sig)
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, _signal_handler)
+    signal.signal(signal.SIGTERM, _signal_handler)
+
+    plc.start()
+    try:
+        server.serve_forever()
+    finally:
+        plc.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,53 +6,53 @@ Orchestrates: bridge start → initialize sim state → execute scenario
 timeline → collect historian data → stop → write bundle → run invariant
 check → report.
 
+With --virtual the PLCs and bridge are replaced by virtual_plant.py
+(spherekit.plants.P1Plant and the ported controller logic), stepped in
+lockstep on a simulated clock: the scenario runs as fast as the CPU
+allows, initial conditions are applied for real, and the same bundle is
+written (backend_type "virtual").
+
 Usage:
     python validation_harness.py \\
         --scenario scenarios/nominal_startup.yaml \\
         --output runs/validate-nominal \\
         [--profile profiles/realistic.yaml] \\
         [--controller HOST:PORT] [--simulator HOST:PORT] \\
-        [--invariant-rules PATH]
+        [--invariant-rules PATH] [--virtual [--virtual-dt SEC]]
 """
 
 import argparse
-import csv
-import json
 import logging
 import os
-import shutil
-import subprocess
 import sys
-import time
-from datetime import datetime, timezone
 from pathlib import Path
 
-try:
-    import yaml
-except ImportError:
-    print("Error: PyYAML required.  pip install pyyaml")
-    sys.exit(1)
-
-try:
-    from pymodbus.client import ModbusTcpClient
-    from pymodbus.exceptions import ConnectionException
-    from pymodbus.pdu import ExceptionResponse
-except ImportError:
-    print("Error: pymodbus required.  pip install pymodbus")
-    sys.exit(1)
-
 # Import bridge from sibling module
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
 from modbus_bridge import ModbusBridge, parse_host_port
 
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(SCRIPT_DIR.parents[6] / "tools"))
+try:
+    from spherekit.harness import (HarnessError, RunClock, add_arguments,
+                                   apply_initial_conditions, check_sample, finish_run,
+                                   load_profile_metadata, poll_tags, prepare_run, run_live)
+    from spherekit.scenario import ScheduleRunner
+    from virtual_plant import VirtualPlant, load_profile as load_plant_profile
+except ImportError as e:
+    print(f"Error: PyYAML and NumPy required ({e}).  pip install pyyaml numpy")
+    sys.exit(1)
+
 log = logging.getLogger("validation_harness")
 
 # Default paths (in cps-enclave-model repo)
 _ENCLAVE_MODEL_ROOT = SCRIPT_DIR.parent.parent.parent.parent.parent / "cps-enclave-model"
 DEFAULT_RULES = str(_ENCLAVE_MODEL_ROOT / "tools" / "defense" / "rules" / "water-treatment.yaml")
-DEFAULT_CHECKER = str(_ENCLAVE_MODEL_ROOT / "tools" / "defense" / "invariant_check.py")
 DEFAULT_PROFILE = str(SCRIPT_DIR.parent.parent.parent / "profiles" / "realistic.yaml")
+DEFAULT_TAG_CONTRACT = str(SCRIPT_DIR.parents[4] / "tag_contract.yaml")
+DEFAULT_BACKEND_MAP = str(SCRIPT_DIR.parent / "configs" / "openplc_map.yaml")
+DEFAULT_MODBUS_MAP = str(SCRIPT_DIR.parent / "configs" / "modbus_map.yaml")
 
 # Try to import sim primitives for profile loading
 try:
@@ -64,295 +64,70 @@ except ImportError:
     SimProfile = None
 
 
-# ── Tag polling ──────────────────────────────────────────────────────
-
-# Tags to collect — (name, plc, register_type, address, count)
-# We read everything from the bridge holding registers on each PLC.
-CONTROLLER_HR_TAGS = [
-    # System state coils (read as coils from controller)
-    # We'll also grab bridge HR that the controller sees
-]
-
-# For simplicity the harness reads all data from the simulator's output
-# registers and the controller's state coils.
-
-def read_hr(client, address, count):
-    """Read holding registers, return list or None."""
-    try:
-        rr = client.read_holding_registers(address, count)
-        if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
-            return None
-        return list(rr.registers[:count])
-    except Exception:
-        return None
-
-
-def read_coils(client, address, count):
-    """Read coils, return list of 0/1 or None."""
-    try:
-        rr = client.read_coils(address, count)
-        if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
-            return None
-        return [1 if b else 0 for b in rr.bits[:count]]
-    except Exception:
-        return None
-
-
-TAG_HEADER = [
-    "timestamp_utc",
-    # Levels (from simulator HR 300-305)
-    "RW_Tank_Level", "RW_Pump_Flow",
-    "ChemTreat_NaCl_Level", "ChemTreat_NaOCl_Level", "ChemTreat_HCl_Level",
-    "UF_UFFT_Tank_Level",
-    # Valve/pump status (from simulator HR 320-331)
-    "RW_Tank_PR_Valve_Sts", "RW_Tank_P6B_Valve_Sts", "RW_Tank_P_Valve_Sts",
-    "RW_Pump_Sts", "RW_Pump_Fault",
-    "ChemTreat_NaCl_Valve_Sts", "ChemTreat_NaOCl_Valve_Sts",
-    "ChemTreat_HCl_Valve_Sts",
-    "UF_UFFT_Tank_Valve_Sts", "UF_Drain_Valve_Sts",
-    "UF_ROFT_Valve_Sts", "UF_BWP_Valve_Sts",
-    # Controller commands (coils 40-51)
-    "RW_Tank_PR_Valve_Cmd", "RW_Tank_P6B_Valve_Cmd", "RW_Tank_P_Valve_Cmd",
-    "RW_Pump_Start_Cmd", "RW_Pump_Stop_Cmd",
-    "ChemTreat_NaCl_Valve_Cmd", "ChemTreat_NaOCl_Valve_Cmd",
-    "ChemTreat_HCl_Valve_Cmd",
-    "UF_UFFT_Tank_Valve_Cmd", "UF_Drain_Valve_Cmd",
-    "UF_ROFT_Valve_Cmd", "UF_BWP_Valve_Cmd",
-    # Controller HR 100 (pump speed)
-    "RW_Pump_Speed_Cmd",
-    # System state (controller coils 56-60  i.e. %QX7.0-7.4)
-    "SYS_IDLE", "SYS_START", "SYS_RUNNING", "SYS_SHUTDOWN",
-    "SYS_Permissives_Ready",
-    # Alarms (controller coils 64-67  i.e. %QX8.0-8.3)
-    "Alarm_RW_Tank_LL", "Alarm_RW_Tank_L",
-    "Alarm_RW_Tank_H", "Alarm_RW_Tank_HH",
-    # HMI (controller coils 0-3)
-    "HMI_Start_PB", "HMI_Stop_PB", "HMI_Start_Active", "HMI_Stop_Active",
-]
-
-
-def poll_tags(ctrl_client, sim_client):
-    """Poll all tags and return a dict keyed by TAG_HEADER names."""
-    ts = datetime.now(timezone.utc).isoformat()
-    row = {"timestamp_utc": ts}
-
-    # Simulator levels (HR 300-305)
-    levels = read_hr(sim_client, 300, 6)
-    level_names = TAG_HEADER[1:7]
-    if levels:
-        for name, val in zip(level_names, levels):
-            row[name] = val
-    else:
-        for name in level_names:
-            row[name] = ""
-
-    # Simulator valve/pump status (HR 320-331)
-    status = read_hr(sim_client, 320, 12)
-    status_names = TAG_HEADER[7:19]
-    if status:
-        for name, val in zip(status_names, status):
-            row[name] = val
-    else:
-        for name in status_names:
-            row[name] = ""
-
-    # Controller command coils 40-51
-    cmds = read_coils(ctrl_client, 40, 12)
-    cmd_names = TAG_HEADER[19:31]
-    if cmds:
-        for name, val in zip(cmd_names, cmds):
-            row[name] = val
-    else:
-        for name in cmd_names:
-            row[name] = ""
-
-    # Controller pump speed HR 100
-    speed = read_hr(ctrl_client, 100, 1)
-    row["RW_Pump_Speed_Cmd"] = speed[0] if speed else ""
-
-    # System state coils (QX7.0-7.4 → Modbus coil 56-60)
-    sys_coils = read_coils(ctrl_client, 56, 5)
-    sys_names = TAG_HEADER[32:37]
-    if sys_coils:
-        for name, val in zip(sys_names, sys_coils):
-            row[name] = val
-    else:
-        for name in sys_names:
-            row[name] = ""
-
-    # Alarm coils (QX8.0-8.3 → Modbus coil 64-67)
-    alm_coils = read_coils(ctrl_client, 64, 4)
-    alm_names = TAG_HEADER[37:41]
-    if alm_coils:
-        for name, val in zip(alm_names, alm_coils):
-            row[name] = val
-    else:
-        for name in alm_names:
-            row[name] = ""
-
-    # HMI coils (QX0.0-0.3 → Modbus coil 0-3)
-    hmi_coils = read_coils(ctrl_client, 0, 4)
-    hmi_names = TAG_HEADER[41:45]
-    if hmi_coils:
-        for name, val in zip(hmi_names, hmi_coils):
-            row[name] = val
-    else:
-        for name in hmi_names:
-            row[name] = ""
-
-    return row
-
-
-# ── Timeline actions ─────────────────────────────────────────────────
-
-def execute_action(action, ctrl_client, sim_client):
-    """Execute a scenario timeline action."""
-    if action == "hmi_start":
-        # Write coil 0 = True (HMI Start PB)
-        ctrl_client.write_coil(0, True)
-        ctrl_client.write_coil(1, False)
-        return "HMI Start pressed"
-    elif action == "hmi_stop":
-        ctrl_client.write_coil(0, False)
-        ctrl_client.write_coil(1, True)
-        return "HMI Stop pressed"
-    elif action == "hmi_estop":
-        # Same as stop but immediate
-        ctrl_client.write_coil(0, False)
-        ctrl_client.write_coil(1, True)
-        return "Emergency stop pressed"
-    elif action.startswith("set_sim_level:"):
-        # Format: set_sim_level:register:value
-        parts = action.split(":")
-        reg = int(parts[1])
-        val = int(parts[2])
-        sim_client.write_register(reg, val)
-        return f"Set simulator HR {reg} = {val}"
-    else:
-        log.warning("Unknown action: %s", action)
-        return f"Unknown action: {action}"
-
-
-# ── Initial conditions ───────────────────────────────────────────────
-
-INITIAL_LEVEL_MAP = {
-    "RW_Tank_Level": 300,
-    "UF_UFFT_Tank_Level": 305,
-    "ChemTreat_NaCl_Level": 302,
-    "ChemTreat_NaOCl_Level": 303,
-    "ChemTreat_HCl_Level": 304,
-}
-
+# ── Virtual run ──────────────────────────────────────────────────────
 
-def apply_initial_conditions(sim_client, conditions):
-    """Write initial tank levels to simulator output registers.
+def run_virtual(run, profile_path, dt=0.05, seed=0):
+    """Run the scenario against the virtual plant on simulated time.
 
-    The simulator physics uses internal REAL state, but on first scan it
-    will overwrite these.  For proper initialization the simulator should
-    read its own QW outputs as initial state — which it does since the
-    globals are initialized in the ST VAR section.  Instead, we trust
-    the ST defaults.  This function is a no-op placeholder for future
-    use when we add a sim-reset Modbus command.
+    Timeline steps fire and samples are taken at exactly their scheduled
+    simulated times (waits are checked on simulated time too); timestamps
+    are anchored to the wall clock at start, as in a live run.  Returns the
+    events.
     """
-    if not conditions:
-        return
-    log.info("Initial conditions specified (using ST defaults): %s", conditions)
-
-
-# ── Bundle writer ────────────────────────────────────────────────────
-
-def write_bundle(output_dir, scenario, events, tags_file, invariant_report=None,
-                 profile=None):
-    """Write a run bundle to output_dir."""
-    out = Path(output_dir)
-    out.mkdir(parents=True, exist_ok=True)
-
-    # meta.json
-    meta = {
-        "usecase_id": scenario.get("scenario_id", "unknown"),
-        "description": scenario.get("description", ""),
-        "backend_type": "openplc",
-        "created_utc": datetime.now(timezone.utc).isoformat(),
-        "duration_sec": scenario.get("duration_sec", 0),
-        "poll_interval_ms": scenario.get("poll_interval_ms", 500),
-        "tags_file": "tags.csv",
-        "events_file": "events.json",
-        "bundle_schema_version": "1.1.0",
-    }
-
-    # Add profile metadata if available
-    if profile is not None:
-        meta["profile_name"] = profile.metadata.name
-        meta["params_snapshot"] = profile.to_snapshot()
-
-    (out / "meta.json").write_text(json.dumps(meta, indent=2) + "\n")
-
-    # events.json
-    (out / "events.json").write_text(json.dumps(events, indent=2) + "\n")
-
-    # tags.csv — copy from temp location
-    shutil.copy2(tags_file, out / "tags.csv")
-
-    # Copy scenario for traceability
-    artifacts = out / "artifacts" / "model-validate"
-    artifacts.mkdir(parents=True, exist_ok=True)
-    if invariant_report:
-        for fname in ("report.json", "report.md"):
-            src = Path(invariant_report) / fname
-            if src.exists():
-                shutil.copy2(src, artifacts / fname)
-
-    log.info("Bundle written to %s", out)
-
-
-# ── Invariant check ─────────────────────────────────────────────────
-
-def run_invariant_check(tags_csv, rules_path, checker_path, output_dir):
-    """Run invariant_check.py and return the output directory."""
-    report_dir = os.path.join(output_dir, "artifacts", "model-validate")
-    os.makedirs(report_dir, exist_ok=True)
-
-    if not os.path.exists(checker_path):
-        log.warning("Invariant checker not found at %s, skipping", checker_path)
-        return None
-
-    cmd = [
-        sys.executable, checker_path,
-        "--tags-csv", tags_csv,
-        "--rules", rules_path,
-        "--output", report_dir,
-    ]
-    log.info("Running invariant check: %s", " ".join(cmd))
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            log.warning("Invariant check returned %d:\n%s", result.returncode, result.stderr)
-        else:
-            log.info("Invariant check passed")
-        return report_dir
-    except FileNotFoundError:
-        log.warning("Could not run invariant checker")
-        return None
-    except subprocess.TimeoutExpired:
-        log.warning("Invariant check timed out")
-        return None
+    if profile_path and os.path.exists(profile_path):
+        log.info("Virtual plant profile: %s", profile_path)
+    else:
+        log.info("Virtual plant profile: built-in defaults")
+    plant = VirtualPlant(load_plant_profile(profile_path), seed=seed, dt=dt)
+    ctrl_client, sim_client = plant.client("ctrl"), plant.client("sim")
+    clients = {"ctrl": ctrl_client, "sim": sim_client}
+    initial_state = apply_initial_conditions(clients, run.initial, settle_timeout=0)
+    if initial_state is not None:
+        run.meta["initial_state"] = initial_state
+
+    duration = run.scenario.get("duration_sec", 60)
+    poll_sec = run.scenario.get("poll_interval_ms", 500) / 1000.0
+    clock = RunClock()
+    schedule = ScheduleRunner(run.steps, clients, clock.utc)
+    samples = 0
+
+    log.info("Starting virtual run for %ds (dt=%.3fs)...", duration, dt)
+    with run.bundle:
+        slot = 0
+        while slot * poll_sec < duration:
+            t = slot * poll_sec
+            while True:
+                due = schedule.next_due()
+                if due is None or due > t:
+                    break
+                plant.advance_to(due)
+                for event in schedule.fire(due):
+                    log.info("t=%.3fs  %s", event["time_sec"], event["description"])
+            plant.advance_to(t)
+            row = poll_tags(ctrl_client, sim_client, run.read_plan, ts=clock.utc(plant.time))
+            run.bundle.writerow(row)
+            samples += 1
+            if not check_sample(run.checker, row, plant.time):
+                break
+            slot += 1
+
+    log.info("Virtual run done: %.1fs simulated in %.2fs, %d samples, %d events",
+             plant.time, clock.elapsed(), samples, len(schedule.events))
+    return schedule.events
 
 
 # ── Main ─────────────────────────────────────────────────────────────
 
 def main():
     parser = argparse.ArgumentParser(description="SPHERE Validation Harness")
-    parser.add_argument("--scenario", required=True, help="Scenario YAML file")
-    parser.add_argument("--output", required=True, help="Output run bundle directory")
-    parser.add_argument("--profile", default=os.environ.get("SIM_PROFILE", DEFAULT_PROFILE),
-                        help="Simulation profile YAML (default: realistic)")
-    parser.add_argument("--controller", default=os.environ.get("CONTROLLER_ADDR", "controller:502"))
-    parser.add_argument("--simulator", default=os.environ.get("SIMULATOR_ADDR", "simulator:503"))
-    parser.add_argument("--cycle-ms", type=int, default=100, help="Bridge cycle time")
-    parser.add_argument("--invariant-rules", default=os.environ.get("INVARIANT_RULES", DEFAULT_RULES))
-    parser.add_argument("--invariant-checker", default=os.environ.get("INVARIANT_CHECKER", DEFAULT_CHECKER))
-    parser.add_argument("--no-bridge", action="store_true", help="Assume bridge is running externally")
-    parser.add_argument("-v", "--verbose", action="store_true")
+    add_arguments(parser, profile=DEFAULT_PROFILE, modbus_map=DEFAULT_MODBUS_MAP,
+                  tag_contract=DEFAULT_TAG_CONTRACT, backend_map=DEFAULT_BACKEND_MAP,
+                  rules=DEFAULT_RULES)
+    parser.add_argument("--virtual", action="store_true",
+                        help="Run against the Python virtual plant on simulated time")
+    parser.add_argument("--virtual-dt", type=float, default=0.05,
+                        help="Virtual plant step / controller scan (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="Virtual plant sensor noise seed")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -360,150 +135,24 @@ def main():
         format="%(asctime)s %(name)s %(levelname)s %(message)s",
     )
 
-    # Load simulation profile
-    profile = None
-    if HAS_PRIMITIVES and args.profile and os.path.exists(args.profile):
-        try:
-            profile = load_profile(args.profile)
-            log.info("Loaded profile: %s (v%s)", profile.metadata.name, profile.metadata.version)
-        except Exception as e:
-            log.warning("Failed to load profile %s: %s", args.profile, e)
-    elif args.profile and os.path.exists(args.profile):
-        log.warning("sim.primitives not available, profile metadata will be limited")
-        # Still record profile path even without full parsing
-        with open(args.profile) as f:
-            profile_data = yaml.safe_load(f)
-        # Create minimal profile-like object for metadata
-        class MinimalProfile:
-            class Metadata:
-                def __init__(self, data):
-                    self.name = data.get("metadata", {}).get("name", "unknown")
-                    self.version = data.get("metadata", {}).get("version", "1.0.0")
-            def __init__(self, data):
-                self.metadata = self.Metadata(data)
-                self._data = data
-            def to_snapshot(self):
-                return self._data
-        profile = MinimalProfile(profile_data)
-        log.info("Loaded profile (limited): %s", profile.metadata.name)
-
-    # Load scenario
-    with open(args.scenario) as f:
-        scenario = yaml.safe_load(f)
-
-    log.info("Scenario: %s", scenario.get("scenario_id", "?"))
-    log.info("Duration: %ds, poll: %dms",
-             scenario.get("duration_sec", 0),
-             scenario.get("poll_interval_ms", 500))
-
-    ctrl_host, ctrl_port = parse_host_port(args.controller, 502)
-    sim_host, sim_port = parse_host_port(args.simulator, 503)
-
-    # Connect Modbus clients for polling
-    ctrl_client = ModbusTcpClient(ctrl_host, port=ctrl_port, timeout=3)
-    sim_client = ModbusTcpClient(sim_host, port=sim_port, timeout=3)
-
-    # Start bridge (unless external)
-    bridge = None
-    if not args.no_bridge:
-        bridge = ModbusBridge(ctrl_host, ctrl_port, sim_host, sim_port, args.cycle_ms)
-        if not bridge.connect(retries=30):
-            log.error("Bridge failed to connect")
-            sys.exit(1)
-        bridge.start()
-        log.info("Bridge started")
-
-    # Connect polling clients
-    for attempt in range(30):
-        c_ok = ctrl_client.connect()
-        s_ok = sim_client.connect()
-        if c_ok and s_ok:
-            break
-        time.sleep(1)
-    else:
-        log.error("Polling clients failed to connect")
-        if bridge:
-            bridge.stop()
-            bridge.disconnect()
-        sys.exit(1)
-
-    # Apply initial conditions
-    apply_initial_conditions(sim_client, scenario.get("initial_conditions"))
-
-    # Prepare data collection
-    duration = scenario.get("duration_sec", 60)
-    poll_ms = scenario.get("poll_interval_ms", 500)
-    poll_sec = poll_ms / 1000.0
-    timeline = scenario.get("timeline", [])
-    # Sort timeline by time
-    timeline.sort(key=lambda e: e.get("time_sec", 0))
-
-    events = []
-    tags_tmp = os.path.join(args.output, "_tags_tmp.csv")
-    os.makedirs(args.output, exist_ok=True)
-
-    log.info("Starting data collection for %ds...", duration)
-    start_time = time.monotonic()
-    next_event_idx = 0
+    profile = load_profile_metadata(args.profile, load_profile if HAS_PRIMITIVES else None)
 
     try:
-        with open(tags_tmp, "w", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=TAG_HEADER)
-            writer.writeheader()
-
-            while True:
-                elapsed = time.monotonic() - start_time
-                if elapsed >= duration:
-                    break
-
-                # Check timeline events
-                while next_event_idx < len(timeline):
-                    evt = timeline[next_event_idx]
-                    if elapsed >= evt.get("time_sec", 0):
-                        desc = execute_action(evt["action"], ctrl_client, sim_client)
-                        event_record = {
-                            "time_sec": round(elapsed, 2),
-                            "action": evt["action"],
-                            "description": desc,
-                            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                        }
-                        events.append(event_record)
-                        log.info("t=%.1fs  %s", elapsed, desc)
-                        next_event_idx += 1
-                    else:
-                        break
-
-                # Poll tags
-                row = poll_tags(ctrl_client, sim_client)
-                writer.writerow(row)
-
-                # Sleep to maintain poll rate
-                cycle_elapsed = time.monotonic() - start_time - elapsed
-                sleep = poll_sec - cycle_elapsed
-                if sleep > 0:
-                    time.sleep(sleep)
-
-    except KeyboardInterrupt:
-        log.info("Interrupted")
-    finally:
-        ctrl_client.close()
-        sim_client.close()
-        if bridge:
-            bridge.stop()
-            bridge.disconnect()
-
-    log.info("Collection done: %.1fs, %d events", time.monotonic() - start_time, len(events))
-
-    # Run invariant check
-    report_dir = run_invariant_check(
-        tags_tmp, args.invariant_rules, args.invariant_checker, args.output)
-
-    # Write bundle
-    write_bundle(args.output, scenario, events, tags_tmp, report_dir, profile)
+        run = prepare_run(args, read_timing=not args.virtual)
+        if args.virtual:
+            if args.read_timing:
+                log.info("--read-timing ignored in virtual mode (reads are not timed)")
+            events = run_virtual(run, args.profile, dt=args.virtual_dt, seed=args.seed)
+        else:
+            ctrl = parse_host_port(args.controller, 502)
+            sim = parse_host_port(args.simulator, 503)
+            bridge = None if args.no_bridge else ModbusBridge(*ctrl, *sim, args.cycle_ms)
+            events = run_live(args, run, ctrl, sim, bridge)
+    except HarnessError as e:
+        log.error("%s", e)
+        sys.exit(1)
 
-    # Clean up temp CSV
-    if os.path.exists(tags_tmp):
-        os.remove(tags_tmp)
+    finish_run(args, run, events, profile, backend_type="virtual" if args.virtual else "openplc")
 
     log.info("Done. Bundle at: %s", args.output)
 
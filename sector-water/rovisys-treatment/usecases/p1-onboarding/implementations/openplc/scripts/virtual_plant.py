@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+SPHERE Virtual Plant — P1 simulator and controller without PLCs
+
+Runs the water treatment Process One loop without PLCs, in lockstep on a
+simulated clock, so scenarios finish as fast as the CPU allows:
+
+    sim.step(dt) → bridge sim→ctrl → controller.scan() → bridge ctrl→sim
+
+Both PLCs keep their OpenPLC register images, so the harness polls and
+drives them through VirtualClient, which mimics the pymodbus client calls
+it uses (read_coils, read_holding_registers, write_coil, write_register).
+
+Simulator (the simulator PLC's bridge layout):
+    in   HR 200-211  valve/pump commands    HR 220  pump speed (%)
+    out  HR 300-305  levels and pump flow   HR 320-331  status bits
+Physics is spherekit.plants.P1Plant (one plant), the same model sim_plc.py
+serves over Modbus, parameterized from the sim profile
+(profiles/realistic.yaml).  Writing a level register (set_sim_level
+actions, initial conditions) forces the tank level.
+
+Controller: the P1 logic of st/controller_flat.st (state machine,
+permissives, raw water and pump control, alarms), ported by intent: level
+thresholds use crossings instead of exact REAL equality, START moves to
+RUNNING once permissives are ready, alarms track the current level, and
+pump/valve commands drop when the system is not RUNNING.
+
+    python -P virtual_plant.py --duration 90 --start-at 5
+
+(-P, or PYTHONSAFEPATH=1, keeps this directory off sys.path: its
+operator.py would shadow the standard library module.)
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Shared tooling (tools/spherekit)
+sys.path.insert(0, str(SCRIPT_DIR.parents[6] / "tools"))
+from spherekit.plants import (P, P1_COMMANDS, P1_OUTPUTS, PR, PUMP_START, PUMP_STOP, RW_FLOW,
+                              RW_LEVEL, UF_LEVEL, P1Params, P1Plant)
+
+# Bridge register layout
+SIM_CMD_BASE = 200          # HR 200-211 ← controller coils 40-51
+SIM_SPEED = 220             # HR 220 ← controller HR 100
+SIM_LEVEL_BASE = 300        # HR 300-305 → controller HR 300-305
+SIM_STATUS_BASE = 320       # HR 320-331 → controller HR 320-331
+CTRL_CMD_COILS = 40
+CTRL_SPEED = 100
+
+
+def load_profile(path=None) -> P1Params:
+    """P1 parameters from a sim profile YAML; defaults when path is unset or missing."""
+    if path and Path(path).exists():
+        return P1Params.from_profile(path)
+    return P1Params()
+
+
+class SimImage:
+    """The simulator PLC's holding registers (it has no logic of its own)."""
+
+    def __init__(self):
+        self.hr = [0] * 400
+
+
+class P1Controller:
+    """Process One control logic on the controller PLC's register image."""
+
+    IDLE, START, RUNNING, SHUTDOWN = range(4)
+
+    def __init__(self):
+        self.coils = [0] * 80
+        self.hr = [0] * 400
+        self.state = self.IDLE
+        self.permissives = [False, False]
+        self.coils[56] = 1
+
+    def scan(self):
+        c = self.coils
+        start_active = bool(c[0]) and not c[1]
+        stop_active = bool(c[1])
+        c[2], c[3] = int(start_active), int(stop_active)
+        rw = self.hr[SIM_LEVEL_BASE + RW_LEVEL]
+        uf = self.hr[SIM_LEVEL_BASE + UF_LEVEL]
+
+        # State_change
+        if not start_active and not stop_active:
+            self.state = self.IDLE
+        elif stop_active:
+            self.state = self.SHUTDOWN
+            self.permissives = [False, False]
+        else:
+            if self.state in (self.IDLE, self.SHUTDOWN):
+                self.state = self.START
+            if self.state == self.START:
+                self.permissives = [rw > 250, uf < 1000]
+                if all(self.permissives):
+                    self.state = self.RUNNING
+        running = self.state == self.RUNNING
+
+        cmd = c[CTRL_CMD_COILS:CTRL_CMD_COILS + len(P1_COMMANDS)]
+        alarms = [0, 0, 0, 0]      # LL, L, H, HH
+        if running:
+            # Raw_water_control
+            if rw <= 250:
+                cmd[PUMP_STOP], cmd[PUMP_START] = 1, 0
+                alarms[0] = 1
+            elif rw <= 500:
+                cmd[PR] = 1
+                alarms[1] = 1
+            elif rw >= 1200:
+                cmd[PR] = 0
+                alarms[2] = alarms[3] = 1
+            elif rw >= 800:
+                cmd[PR] = 0
+                alarms[2] = 1
+            # Raw_water_pump
+            if uf <= 800 and rw > 250:
+                cmd[P], cmd[PUMP_START], cmd[PUMP_STOP] = 1, 1, 0
+            elif uf >= 1000:
+                cmd[P], cmd[PUMP_START], cmd[PUMP_STOP] = 0, 0, 1
+        else:
+            cmd = [0] * len(P1_COMMANDS)
+            cmd[PUMP_STOP] = 1 if self.state == self.SHUTDOWN else 0
+
+        c[CTRL_CMD_COILS:CTRL_CMD_COILS + len(P1_COMMANDS)] = cmd
+        c[56:61] = [int(self.state == s) for s in range(4)] + [int(all(self.permissives))]
+        c[64:68] = alarms
+
+
+class VirtualPlant:
+    """Simulator + controller + bridge advanced together on virtual time."""
+
+    def __init__(self, params=None, seed=0, dt=0.05):
+        self.params = params if params is not None else P1Params()
+        self.physics = P1Plant(1, self.params, seeds=[seed])
+        self.sim = SimImage()
+        self.ctrl = P1Controller()
+        self.dt = dt
+        self.time = 0.0
+        self._publish()
+        self._bridge()
+
+    def _publish(self):
+        """Copy the plant's sensed values and status bits into HR 300-331."""
+        levels, status = self.physics.registers()
+        hr = self.sim.hr
+        hr[SIM_LEVEL_BASE:SIM_LEVEL_BASE + len(P1_OUTPUTS)] = levels[0].tolist()
+        hr[SIM_STATUS_BASE:SIM_STATUS_BASE + len(P1_COMMANDS)] = status[0].astype(int).tolist()
+
+    def _bridge(self):
+        sim, ctrl = self.sim, self.ctrl
+        ctrl.hr[300:306] = sim.hr[300:306]
+        ctrl.hr[320:332] = sim.hr[320:332]
+        sim.hr[SIM_CMD_BASE:SIM_CMD_BASE + len(P1_COMMANDS)] = \
+            ctrl.coils[CTRL_CMD_COILS:CTRL_CMD_COILS + len(P1_COMMANDS)]
+        sim.hr[SIM_SPEED] = ctrl.hr[CTRL_SPEED]
+
+    def force_level(self, index: int, value: float):
+        """Force a level (sensor included), e.g. from set_sim_level."""
+        if index == RW_FLOW:
+            return
+        self.physics.force_level(index, float(value))
+        self.sim.hr[SIM_LEVEL_BASE + index] = int(value)
+
+    def step(self):
+        """Advance one tick: sim physics, bridge, controller scan, bridge."""
+        hr = self.sim.hr
+        self.physics.step(hr[SIM_CMD_BASE:SIM_CMD_BASE + len(P1_COMMANDS)], hr[SIM_SPEED],
+                          self.dt)
+        self._publish()
+        self.ctrl.hr[300:306] = hr[300:306]
+        self.ctrl.hr[320:332] = hr[320:332]
+        self.ctrl.scan()
+        self._bridge()
+        self.time += self.dt
+
+    def advance_to(self, t: float):
+        """Step until virtual time reaches t (within half a tick)."""
+        while self.time + self.dt / 2 < t:
+            self.step()
+
+    def client(self, plc: str) -> "VirtualClient":
+        return VirtualClient(self, plc)
+
+
+class _Response:
+    """Just enough of a pymodbus response for the harness helpers."""
+
+    def __init__(self, bits=None, registers=None):
+        self.bits = bits
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class VirtualClient:
+    """pymodbus-style client view of one virtual PLC."""
+
+    def __init__(self, plant: VirtualPlant, plc: str):
+        self.plant = plant
+        self.plc = plc
+
+    def _image(self):
+        return self.plant.ctrl if self.plc == "ctrl" else self.plant.sim
+
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def read_coils(self, address, count=1, **kwargs):
+        coils = getattr(self._image(), "coils", None) or [0] * 400
+        return _Response(bits=[bool(b) for b in coils[address:address + count]])
+
+    def read_holding_registers(self, address, count=1, **kwargs):
+        return _Response(registers=list(self._image().hr[address:address + count]))
+
+    def write_coil(self, address, value, **kwargs):
+        if self.plc == "ctrl":
+            self.plant.ctrl.coils[address] = int(bool(value))
+        return _Response()
+
+    def write_register(self, address, value, **kwargs):
+        if self.plc == "sim" and SIM_LEVEL_BASE <= address < SIM_LEVEL_BASE + len(P1_OUTPUTS):
+            self.plant.force_level(address - SIM_LEVEL_BASE, value)
+        else:
+            self._image().hr[address] = int(value)
+        return _Response()
+
+    def write_coils(self, address, values, **kwargs):
+        for i, value in enumerate(values):
+            self.write_coil(address + i, value)
+        return _Response()
+
+    def write_registers(self, address, values, **kwargs):
+        for i, value in enumerate(values):
+            self.write_register(address + i, value)
+        return _Response()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the virtual P1 plant standalone")
+    parser.add_argument("--profile", help="Sim profile YAML (default: built-in realistic)")
+    parser.add_argument("--duration", type=float, default=90.0)
+    parser.add_argument("--dt", type=float, default=0.05)
+    parser.add_argument("--start-at", type=float, default=5.0, help="Press HMI start at t")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    plant = VirtualPlant(load_profile(args.profile), seed=args.seed, dt=args.dt)
+    names = ["IDLE", "START", "RUNNING", "SHUTDOWN"]
+    t = 0.0
+    while t < args.duration:
+        plant.advance_to(t)
+        hr = plant.sim.hr
+        print(f"t={t:6.1f}s  state={names[plant.ctrl.state]:<8} rw={hr[300]:5d}mm "
+              f"flow={hr[301]:4d}L/min  uf={hr[305]:5d}mm  pump={hr[323]}")
+        if t <= args.start_at < t + 5.0:
+            plant.advance_to(args.start_at)
+            plant.ctrl.coils[0] = 1
+        t += 5.0
+
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,26 @@ Attack injection (Harvey-style inline attacks):
 Attack filters intercept bridge traffic to simulate PLC-level attacks with
 real-time physics feedback. See cps-enclave-model/tools/attack/filters/ for
 available filters.
+
+Traffic recording (ground truth for attack experiments):
+    python bridge.py --usecase ps --record /logs/bridge.log
+    python recorder.py /logs/bridge.log runs/bridge-capture
+
+Live reconfiguration (mappings and attack filters, see hotreload.py):
+    python bridge.py --config /config/bridge.json --attack-manifest /logs/attack.json
+
+Active/standby pair (see failover.py):
+    python bridge.py --failover-listen 0.0.0.0:5020 --failover-peer bridge-standby:5020
+    python bridge.py --failover-listen 0.0.0.0:5020 --failover-peer bridge:5020 \
+        --node-id 2 --standby
+
+Scan phase alignment (start cycles just after the controller's scan):
+    python bridge.py --usecase wt --phase-ref ctrl:coil:40:12 \
+        --phase-ref sim:hr:300:6 --phase-lock ctrl
 """
 
 import argparse
+import functools
 import json
 import logging
 import os
@@ -36,6 +53,14 @@ except ImportError:
     print("Error: pymodbus required.  pip install pymodbus")
     sys.exit(1)
 
+from fastpath import (FC_READ_COILS, FC_READ_HOLDING, FC_WRITE_COILS,
+                      FC_WRITE_REGISTERS, FastModbusClient)
+import phaselock
+from failover import FailoverNode, parse_addr
+from hotreload import ConfigWatcher, load_config_file
+from phaselock import LatencyStats
+from recorder import TrafficRecorder
+
 log = logging.getLogger("modbus_bridge")
 
 
@@ -167,14 +192,31 @@ class ModbusBridge:
 
     Supports optional attack filter injection for security research.
     When an attack filter is active, it intercepts and modifies traffic
-    flowing through the bridge.
+    flowing through the bridge.  An optional TrafficRecorder logs the
+    pre-filter and post-filter values of every transfer each cycle.
+
+    The configuration and attack filter can be replaced while running:
+    stage_reload() compiles the new plan, and the run loop swaps it in
+    between two cycles on the existing connections.
     """
 
+    # stage_reload() sentinel: keep the running attack filter
+    KEEP_FILTER = object()
+
     def __init__(self, ctrl_host, ctrl_port, sim_host, sim_port, config: dict,
-                 cycle_ms=100, attack_filter=None):
-        self.ctrl = ModbusTcpClient(ctrl_host, port=ctrl_port, timeout=2)
-        self.sim = ModbusTcpClient(sim_host, port=sim_port, timeout=2)
+                 cycle_ms=100, attack_filter=None, recorder=None, transport="pymodbus",
+                 phase_tracker=None, failover=None):
+        if transport == "fast":
+            self.ctrl = FastModbusClient(ctrl_host, port=ctrl_port, timeout=2)
+            self.sim = FastModbusClient(sim_host, port=sim_port, timeout=2)
+        elif transport == "pymodbus":
+            self.ctrl = ModbusTcpClient(ctrl_host, port=ctrl_port, timeout=2)
+            self.sim = ModbusTcpClient(sim_host, port=sim_port, timeout=2)
+        else:
+            raise ValueError(f"Unknown transport: {transport}. Valid options: pymodbus, fast")
+        self.transport = transport
         self.config = config
+        self.plan = self._compile_plan(config)
         self.cycle_sec = cycle_ms / 1000.0
         self._stop = threading.Event()
         self._thread = None
@@ -182,10 +224,27 @@ class ModbusBridge:
         # Attack filter (optional)
         self.attack_filter = attack_filter
 
+        # Traffic recorder (optional, see recorder.py)
+        self.recorder = recorder
+
+        # Scan phase alignment and propagation latency (optional, see phaselock.py)
+        self.phase_tracker = phase_tracker
+        self.latency = LatencyStats()
+
+        # Active/standby coordination (optional, see failover.py)
+        self.failover = failover
+
+        # Staged configuration change, applied between cycles
+        self._reload_lock = threading.Lock()
+        self._pending = None
+        self.reloads = []
+
         # Stats
         self.cycles = 0
         self.errors = 0
+        self.overruns = 0
         self.last_cycle_ms = 0.0
+        self.last_wait = 0.0
 
     def _get_client(self, name: str) -> ModbusTcpClient:
         return self.ctrl if name == "ctrl" else self.sim
@@ -219,7 +278,7 @@ class ModbusBridge:
     def _read_coils(client, address, count):
         """Read coils, return list of int (0/1) or None on error."""
         try:
-            rr = client.read_coils(address, count)
+            rr = client.read_coils(address, count=count)
             if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
                 return None
             return [1 if b else 0 for b in rr.bits[:count]]
@@ -231,7 +290,7 @@ class ModbusBridge:
     def _read_hr(client, address, count):
         """Read holding registers, return list of int or None."""
         try:
-            rr = client.read_holding_registers(address, count)
+            rr = client.read_holding_registers(address, count=count)
             if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
                 return None
             return list(rr.registers[:count])
@@ -289,46 +348,94 @@ class ModbusBridge:
 
         return values
 
-    def _execute_transfer(self, transfer: dict) -> bool:
-        """Execute a single transfer operation with optional attack filtering."""
-        src_client = self._get_client(transfer["src_client"])
-        dst_client = self._get_client(transfer["dst_client"])
-        transfer_type = transfer["type"]
-        src_addr = transfer["src_addr"]
-        src_count = transfer["src_count"]
-        dst_addr = transfer["dst_addr"]
-
-        if transfer_type == "coils_to_hr":
-            values = self._read_coils(src_client, src_addr, src_count)
-            if values is None:
-                return False
-            values = self._apply_attack_filter(transfer, values)
-            return self._write_hr(dst_client, dst_addr, values)
-
-        elif transfer_type == "coils_to_coils":
-            values = self._read_coils(src_client, src_addr, src_count)
-            if values is None:
-                return False
-            values = self._apply_attack_filter(transfer, values)
-            return self._write_coils(dst_client, dst_addr, values)
-
-        elif transfer_type == "hr_to_hr":
-            values = self._read_hr(src_client, src_addr, src_count)
-            if values is None:
-                return False
-            values = self._apply_attack_filter(transfer, values)
-            return self._write_hr(dst_client, dst_addr, values)
-
-        else:
-            log.warning("Unknown transfer type: %s", transfer_type)
+    def _compile_plan(self, config: dict) -> list:
+        """Compile transfers into (transfer, read_fn, write_fn) steps.
+
+        Resolving clients, register types and request encoding once up
+        front keeps the per-cycle path to two calls per transfer.  With the
+        fast transport the request frames themselves are prebuilt.
+        """
+        plan = []
+        for transfer in config["transfers"]:
+            transfer_type = transfer["type"]
+            if transfer_type not in ("coils_to_hr", "coils_to_coils", "hr_to_hr"):
+                raise ValueError(f"Unknown transfer type: {transfer_type}")
+            src = self._get_client(transfer["src_client"])
+            dst = self._get_client(transfer["dst_client"])
+            src_addr = transfer["src_addr"]
+            count = transfer["src_count"]
+            dst_addr = transfer["dst_addr"]
+            src_coils = transfer_type.startswith("coils_")
+            dst_coils = transfer_type.endswith("_coils")
+
+            if self.transport == "fast":
+                read_fn = src.read_op(FC_READ_COILS if src_coils else FC_READ_HOLDING,
+                                      src_addr, count)
+                write_fn = dst.write_op(FC_WRITE_COILS if dst_coils else FC_WRITE_REGISTERS,
+                                        dst_addr, count)
+            else:
+                read_fn = functools.partial(
+                    self._read_coils if src_coils else self._read_hr, src, src_addr, count)
+                write_fn = functools.partial(
+                    self._write_coils if dst_coils else self._write_hr, dst, dst_addr)
+            plan.append((transfer, read_fn, write_fn))
+        return plan
+
+    def _execute_transfer(self, step: tuple, trace=None, slot=0, t0=0.0) -> bool:
+        """Execute a single compiled transfer with optional attack filtering.
+
+        When a recorder trace is given, the pre-filter and post-filter
+        values are stored in trace[slot] for the traffic recorder.
+        """
+        transfer, read_fn, write_fn = step
+        values = read_fn()
+        if values is None:
             return False
+        read_at = time.monotonic()
+        filtered = self._apply_attack_filter(transfer, values)
+        if self.failover is not None and not self.failover.may_write():
+            # Demoted mid-cycle, or the lease is unconfirmed: the peer may own the PLCs
+            return True
+        ok = write_fn(filtered)
+        if ok and self.phase_tracker is not None:
+            clocks = self.phase_tracker.clocks
+            path = "command" if self._is_command_transfer(transfer) else "sensor"
+            self.latency.record(path, clocks.get(transfer["src_client"]),
+                                clocks.get(transfer["dst_client"]), read_at, time.monotonic())
+        if trace is not None:
+            trace[slot] = (read_at - t0, values, filtered, ok)
+        return ok
 
     def _cycle(self):
         """Execute one bridge cycle. Returns True if all transfers succeeded."""
         ok = True
-        for transfer in self.config["transfers"]:
-            if not self._execute_transfer(transfer):
-                ok = False
+        trace = None
+        t0 = time.monotonic()
+        self.last_wait = 0.0
+        if self.recorder is not None:
+            trace = self.recorder.new_trace()
+
+        tracker = self.phase_tracker
+        if tracker is None or tracker.lock_to is None:
+            for slot, step in enumerate(self.plan):
+                if not self._execute_transfer(step, trace, slot, t0):
+                    ok = False
+        else:
+            # One window per source PLC, each just after that PLC's scan
+            sources = {step[0]["src_client"] for step in self.plan}
+            for client in tracker.window_order(sources):
+                now = time.monotonic()
+                wait = tracker.window_start(client, now) - now
+                if wait > 0:
+                    self._stop.wait(wait)
+                    self.last_wait += wait
+                for slot, step in enumerate(self.plan):
+                    if step[0]["src_client"] == client:
+                        if not self._execute_transfer(step, trace, slot, t0):
+                            ok = False
+
+        if trace is not None:
+            self.recorder.append(t0, self.cycles, trace)
 
         # Advance attack filter sample counter
         if self.attack_filter is not None:
@@ -336,6 +443,65 @@ class ModbusBridge:
 
         return ok
 
+    # ------------------------------------------------------------------
+    # Live reconfiguration
+    # ------------------------------------------------------------------
+    def stage_reload(self, config: dict, attack_filter=KEEP_FILTER, source="", attack=None):
+        """Compile a new configuration for the run loop to swap in.
+
+        Raises ValueError if the configuration does not compile; the
+        running configuration is untouched in that case.  attack is the
+        attack description recorded in the reload event.
+        """
+        plan = self._compile_plan(config)
+        with self._reload_lock:
+            self._pending = (config, plan, attack_filter, source, attack)
+
+    def _apply_reload(self):
+        """Swap in a staged configuration. Called only between cycles."""
+        with self._reload_lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        config, plan, attack_filter, source, attack = pending
+
+        self.config = config
+        self.plan = plan
+        filter_changed = attack_filter is not self.KEEP_FILTER
+        replaced = None
+        if filter_changed:
+            if self.attack_filter is not None:
+                replaced = self.attack_filter.get_manifest()
+            self.attack_filter = attack_filter
+        if self.recorder is not None:
+            self.recorder.set_layout(config, round(self.cycle_sec * 1000))
+
+        self.reloads.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "cycle": self.cycles,
+            "source": source,
+            "name": config["name"],
+            "transfers": len(config["transfers"]),
+            "attack": attack,
+            "attack_changed": filter_changed,
+            "replaced_filter_manifest": replaced,
+        })
+        log.warning("Configuration reloaded at cycle %d: %s, %d transfers, attack=%s",
+                    self.cycles, config["name"], len(plan),
+                    self.attack_filter.__class__.__name__ if self.attack_filter else "none")
+
+    # ------------------------------------------------------------------
+    # Failover
+    # ------------------------------------------------------------------
+    def _resume_after_takeover(self):
+        """Continue the previous active's cycle count and attack schedule."""
+        failover = self.failover
+        self.cycles = max(self.cycles, failover.peer_cycles + 1)
+        if self.attack_filter is not None:
+            while self.attack_filter.sample <= failover.peer_sample:
+                self.attack_filter.tick()
+        log.warning("Bridging as active from cycle %d", self.cycles)
+
     # ------------------------------------------------------------------
     # Run loop
     # ------------------------------------------------------------------
@@ -343,10 +509,30 @@ class ModbusBridge:
         attack_info = ""
         if self.attack_filter is not None:
             attack_info = f" [ATTACK: {self.attack_filter.__class__.__name__}]"
-        log.info("Bridge loop started: %s (cycle=%.0fms)%s",
-                 self.config["name"], self.cycle_sec * 1000, attack_info)
+        log.info("Bridge loop started: %s (cycle=%.0fms, transport=%s)%s",
+                 self.config["name"], self.cycle_sec * 1000, self.transport, attack_info)
+        tracker = self.phase_tracker
+        if tracker is not None and tracker.lock_to:
+            log.info("Cycles phase-locked to %s scan (+%.1fms); per-PLC read windows for %s",
+                     tracker.lock_to, tracker.offset * 1000, ", ".join(sorted(tracker.clocks)))
+
+        # Status roughly every 10 s regardless of cycle time
+        log_every = max(100, round(10.0 / self.cycle_sec)) if self.cycle_sec > 0 else 100
+        # Cycles start on a fixed grid so short cycle times do not drift
+        next_start = time.monotonic()
 
         while not self._stop.is_set():
+            if self._pending is not None:
+                self._apply_reload()
+            if self.failover is not None:
+                if not self.failover.active:
+                    # Standby: idle on open connections until promoted
+                    if self.failover.wait_active(self.cycle_sec):
+                        self._resume_after_takeover()
+                    next_start = time.monotonic()
+                    continue
+                self.failover.heartbeat(
+                    self.cycles, self.attack_filter.sample if self.attack_filter else 0)
             t0 = time.monotonic()
             success = self._cycle()
             elapsed = time.monotonic() - t0
@@ -354,27 +540,54 @@ class ModbusBridge:
             self.cycles += 1
             if not success:
                 self.errors += 1
+            # Waiting for a phase window is not work; only busy time overruns
+            if elapsed - self.last_wait > self.cycle_sec:
+                self.overruns += 1
 
-            if self.cycles % 100 == 0:
+            if self.cycles % log_every == 0:
                 attack_status = ""
                 if self.attack_filter is not None:
                     active = "ACTIVE" if self.attack_filter.is_active() else "inactive"
                     attack_status = f"  attack={active}(sample={self.attack_filter.sample})"
-                log.info("cycles=%d  errors=%d  last=%.1fms%s",
-                         self.cycles, self.errors, self.last_cycle_ms, attack_status)
-
-            sleep = self.cycle_sec - elapsed
+                if self.recorder is not None:
+                    attack_status += f"  recorded={self.recorder.records}(dropped={self.recorder.dropped})"
+                if self.failover is not None:
+                    attack_status += f"  role={'active' if self.failover.active else 'standby'}"
+                if tracker is not None and self.latency.format():
+                    attack_status += f"  {self.latency.format()}"
+                log.info("cycles=%d  errors=%d  overruns=%d  last=%.1fms%s",
+                         self.cycles, self.errors, self.overruns,
+                         self.last_cycle_ms, attack_status)
+
+            next_start += self.cycle_sec
+            if tracker is not None:
+                next_start = tracker.next_start(next_start, time.monotonic())
+            sleep = next_start - time.monotonic()
             if sleep > 0:
                 self._stop.wait(sleep)
+            else:
+                # Overran: restart the grid instead of bursting to catch up
+                next_start = time.monotonic()
 
         log.info("Bridge loop stopped after %d cycles (%d errors)",
                  self.cycles, self.errors)
+        if tracker is not None and self.latency.format():
+            log.info("Propagation latency p50/p95: %s", self.latency.format())
 
     def get_attack_manifest(self) -> dict | None:
-        """Return attack manifest if filter is active."""
+        """Return attack manifest if a filter is loaded or bridge events occurred."""
+        failover_events = self.failover.events if self.failover is not None else []
         if self.attack_filter is None:
-            return None
-        return self.attack_filter.get_manifest()
+            if not self.reloads and not failover_events:
+                return None
+            manifest = {"attack": None}
+        else:
+            manifest = self.attack_filter.get_manifest()
+        if self.reloads:
+            manifest["reloads"] = self.reloads
+        if failover_events:
+            manifest["failover"] = failover_events
+        return manifest
 
     def start(self):
         """Start the bridge loop in a background thread."""
@@ -421,6 +634,13 @@ Attack filter examples:
                         help="Use case: wt (Water Treatment), wd (Water Distribution), ps (Power Hydro)")
     parser.add_argument("--cycle-ms", type=int, default=int(os.environ.get("CYCLE_MS", "100")),
                         help="Bridge cycle time in ms")
+    parser.add_argument("--transport", choices=["pymodbus", "fast"],
+                        default=os.environ.get("BRIDGE_TRANSPORT", "pymodbus"),
+                        help="Modbus transport; 'fast' uses prebuilt raw-socket frames "
+                             "for sub-10 ms cycles (see fastpath.py)")
+    parser.add_argument("--config", metavar="PATH", default=os.environ.get("BRIDGE_CONFIG"),
+                        help="JSON bridge config (use case, transfers, attack); watched "
+                             "and reloaded live (see hotreload.py)")
     parser.add_argument("--retries", type=int, default=30,
                         help="Connection retry count")
     parser.add_argument("-v", "--verbose", action="store_true")
@@ -438,6 +658,31 @@ Attack filter examples:
     attack_group.add_argument("--list-attacks", action="store_true",
                               help="List available attack filters and exit")
 
+    # Traffic recorder options
+    record_group = parser.add_argument_group("traffic recording")
+    record_group.add_argument("--record", metavar="PATH",
+                              default=os.environ.get("RECORD_PATH"),
+                              help="Record pre/post-filter transfer values to a binary log")
+    record_group.add_argument("--record-buffer", type=int, default=4096, metavar="N",
+                              help="Recorder ring buffer size in cycles (default: 4096)")
+
+    # Scan phase alignment options
+    phaselock.add_arguments(parser)
+
+    # Active/standby failover options
+    failover_group = parser.add_argument_group("active/standby failover")
+    failover_group.add_argument("--failover-peer", metavar="HOST:PORT",
+                                default=os.environ.get("FAILOVER_PEER"),
+                                help="Heartbeat address of the peer bridge; enables failover")
+    failover_group.add_argument("--failover-listen", metavar="[HOST]:PORT",
+                                default=os.environ.get("FAILOVER_LISTEN", "0.0.0.0:5020"),
+                                help="Local heartbeat address (default: 0.0.0.0:5020)")
+    failover_group.add_argument("--node-id", type=int, default=int(os.environ.get("NODE_ID", "1")),
+                                help="Node id, unique within the pair (default: 1)")
+    failover_group.add_argument("--standby", action="store_true",
+                                default=os.environ.get("FAILOVER_ROLE") == "standby",
+                                help="Start as the standby rather than the preferred active")
+
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -466,35 +711,78 @@ Attack filter examples:
     ctrl_host, ctrl_port = parse_host_port(args.controller, 502)
     sim_host, sim_port = parse_host_port(args.simulator, 502)
 
+    attack = None
+    if args.attack:
+        attack = {"filter": args.attack, "start_sample": args.attack_start,
+                  "end_sample": args.attack_end}
     try:
-        config = get_bridge_config(args.usecase)
+        if args.config:
+            config, file_attack = load_config_file(args.config, get_bridge_config, args.usecase)
+            if file_attack is not ...:
+                attack = file_attack
+        else:
+            config = get_bridge_config(args.usecase)
     except ValueError as e:
         log.error(str(e))
         sys.exit(1)
 
     # Load attack filter if specified
     attack_filter = None
-    if args.attack:
-        attack_filter = load_attack_filter(
-            args.attack,
-            start_sample=args.attack_start,
-            end_sample=args.attack_end,
-        )
+    if attack is not None:
+        params = {k: v for k, v in attack.items() if k != "filter"}
+        attack_filter = load_attack_filter(attack["filter"], **params)
         if attack_filter is None:
             sys.exit(1)
-        log.warning("ATTACK FILTER LOADED: %s (samples %d-%d)",
-                    args.attack, args.attack_start, args.attack_end)
+        log.warning("ATTACK FILTER LOADED: %s (%s)", attack["filter"],
+                    ", ".join(f"{k}={v}" for k, v in params.items()))
 
     log.info("Use case: %s", config["name"])
     log.info("Controller: %s:%d", ctrl_host, ctrl_port)
     log.info("Simulator:  %s:%d", sim_host, sim_port)
 
+    try:
+        tracker = phaselock.build_tracker(args, (ctrl_host, ctrl_port), (sim_host, sim_port))
+    except ValueError as e:
+        log.error(str(e))
+        sys.exit(1)
+
+    failover = None
+    if args.failover_peer:
+        try:
+            failover = FailoverNode(args.node_id, parse_addr(args.failover_listen),
+                                    parse_addr(args.failover_peer), args.cycle_ms,
+                                    prefer_active=not args.standby)
+        except (ValueError, OSError) as e:
+            log.error("Failover setup failed: %s", e)
+            sys.exit(1)
+
+    recorder = None
+    if args.record:
+        recorder = TrafficRecorder(args.record, capacity=args.record_buffer)
+
     bridge = ModbusBridge(ctrl_host, ctrl_port, sim_host, sim_port, config,
-                          args.cycle_ms, attack_filter=attack_filter)
+                          args.cycle_ms, attack_filter=attack_filter,
+                          recorder=recorder, transport=args.transport,
+                          phase_tracker=tracker, failover=failover)
 
     if not bridge.connect(retries=args.retries):
         sys.exit(1)
 
+    if recorder is not None:
+        recorder.open(config, args.cycle_ms)
+
+    if tracker is not None:
+        tracker.start()
+
+    if failover is not None:
+        failover.start()
+
+    watcher = None
+    if args.config:
+        watcher = ConfigWatcher(args.config, bridge, get_bridge_config, load_attack_filter,
+                                args.usecase, attack=attack)
+        watcher.start()
+
     def _signal_handler(sig, frame):
         log.info("Signal %d received, stopping...", sig)
         bridge.stop()
@@ -505,8 +793,13 @@ Attack filter examples:
     try:
         bridge.run_blocking()
     finally:
+        if watcher is not None:
+            watcher.stop()
+        if failover is not None:
+            failover.stop()
+
         # Write attack manifest if requested
-        if args.attack_manifest and attack_filter is not None:
+        if args.attack_manifest:
             manifest = bridge.get_attack_manifest()
             if manifest:
                 manifest["timestamp"] = datetime.now(timezone.utc).isoformat()
@@ -520,6 +813,10 @@ Attack filter examples:
                 except IOError as e:
                     log.error("Failed to write attack manifest: %s", e)
 
+        if tracker is not None:
+            tracker.stop()
+        if recorder is not None:
+            recorder.close()
         bridge.disconnect()
 
 
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+SPHERE Bridge Failover — active/standby bridge pair over a UDP heartbeat
+
+Two bridge processes connect to the same controller and simulator.  Exactly
+one (the active) bridges traffic; the other (the standby) keeps its PLC
+connections open and watches the active's heartbeat.
+
+  - The active sends a heartbeat from its bridge loop at the start of every
+    cycle, so a wedged loop stops heartbeating just like a dead process.
+  - The standby takes over once no heartbeat has arrived for 1.5 cycles,
+    i.e. its first cycle starts within two cycles of the active's last one.
+    It claims a higher epoch and continues the active's cycle count and
+    attack filter sample so scheduled attacks stay on time.
+  - Double writes are fenced by epochs and a lease: a node hearing an active
+    peer with a higher epoch stops writing immediately, and the active may
+    only write within 1.25 cycles of sending a heartbeat its peer has
+    acknowledged.  The peer echoes each heartbeat's send time, so the lease
+    always ends before the peer could take over (1.5 cycles after it last
+    heard the active), even when heartbeats or acknowledgements are lost.
+    Once the lease has lapsed the active probes its peer before the next
+    write and skips the write if no acknowledgement comes back in half a
+    cycle.  A peer silent for 1.5 cycles is taken to be down and the active
+    writes alone; a full network partition looks the same from both sides,
+    so it is the one case where both nodes write.
+  - At startup both nodes listen first; the preferred active takes over
+    after 1.5 cycles of silence, the standby only after a longer grace.  A
+    restarted node that hears an active peer joins as standby.
+
+Run a pair (heartbeat over UDP, one port per node):
+
+    python bridge.py --usecase wt --failover-listen 0.0.0.0:5020 \\
+        --failover-peer bridge-standby:5020 --node-id 1
+    python bridge.py --usecase wt --failover-listen 0.0.0.0:5020 \\
+        --failover-peer bridge:5020 --node-id 2 --standby
+"""
+
+import logging
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+log = logging.getLogger("bridge_failover")
+
+# magic, role, flags, node id, epoch, cycles, filter sample,
+# send time, echoed send time of the peer's last active heartbeat
+_HEARTBEAT = struct.Struct("<4sBBBIQqdd")
+_MAGIC = b"SBHB"
+
+ROLE_STANDBY = 0
+ROLE_ACTIVE = 1
+
+FLAG_ACK = 1     # reply to an active heartbeat; never answered itself
+
+TAKEOVER_CYCLES = 1.5
+LEASE_CYCLES = 1.25
+STANDBY_GRACE_CYCLES = 5
+
+
+def parse_addr(s: str, default_host="0.0.0.0"):
+    host, _, port = s.rpartition(":")
+    return (host or default_host), int(port)
+
+
+class FailoverNode:
+    """One member of an active/standby bridge pair."""
+
+    def __init__(self, node_id: int, listen, peer, cycle_ms: float, prefer_active=True):
+        if not 0 < node_id < 256:
+            raise ValueError("node id must be 1-255")
+        self.node_id = node_id
+        self.peer = peer
+        self.cycle_sec = cycle_ms / 1000.0
+        self.takeover_after = TAKEOVER_CYCLES * self.cycle_sec
+        self.lease = LEASE_CYCLES * self.cycle_sec
+        grace_cycles = TAKEOVER_CYCLES if prefer_active else STANDBY_GRACE_CYCLES
+        self.startup_grace = max(grace_cycles * self.cycle_sec, 0 if prefer_active else 1.0)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(listen)
+        self.sock.settimeout(0.2)
+
+        self._lock = threading.Lock()
+        self._reply = threading.Condition(self._lock)
+        self._became_active = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        self.active = False
+        self.epoch = 0
+        self.peer_seen = None      # monotonic time of last heartbeat from an active peer
+        self.peer_heard = None     # monotonic time of last packet of any kind from the peer
+        self.peer_epoch = 0
+        self.peer_cycles = 0
+        self.peer_sample = 0
+        self._cycles = 0
+        self._sample = 0
+        self._peer_stamp = 0.0     # send time of the peer's last active heartbeat
+        self._lease_until = 0.0
+        self._active_since = 0.0
+        self._last_sent = 0.0
+        self._started = 0.0
+        self.events = []
+
+    # ------------------------------------------------------------------
+    # Messaging
+    # ------------------------------------------------------------------
+    def _send(self, flags=0):
+        now = time.monotonic()
+        msg = _HEARTBEAT.pack(_MAGIC, ROLE_ACTIVE if self.active else ROLE_STANDBY,
+                              flags, self.node_id, self.epoch, self._cycles, self._sample,
+                              now, self._peer_stamp)
+        try:
+            self.sock.sendto(msg, self.peer)
+        except OSError as exc:
+            log.debug("heartbeat send failed: %s", exc)
+        self._last_sent = now
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self.sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stop.is_set():
+                    return
+                continue
+            if len(data) != _HEARTBEAT.size:
+                continue
+            magic, role, flags, node_id, epoch, cycles, sample, stamp, echo = \
+                _HEARTBEAT.unpack(data)
+            if magic != _MAGIC or node_id == self.node_id:
+                continue
+            self._handle(role, flags, node_id, epoch, cycles, sample, stamp, echo)
+
+    def _handle(self, role, flags, node_id, epoch, cycles, sample, stamp, echo):
+        now = time.monotonic()
+        with self._lock:
+            self.peer_heard = now
+            if role == ROLE_ACTIVE:
+                self.peer_seen = now
+                self.peer_epoch = epoch
+                self.peer_cycles = cycles
+                self.peer_sample = sample
+                self._peer_stamp = stamp
+                outranked = epoch > self.epoch or (epoch == self.epoch and node_id < self.node_id)
+                if self.active and outranked:
+                    self._set_role(False, f"peer {node_id} is active with epoch {epoch}")
+            if self.active and echo >= self._active_since:
+                # The peer heard our heartbeat sent at `echo`, so it cannot
+                # take over before echo + takeover_after > echo + lease
+                self._lease_until = max(self._lease_until, echo + self.lease)
+            self._reply.notify_all()
+        if role == ROLE_ACTIVE and not flags & FLAG_ACK:
+            self._send(flags=FLAG_ACK)
+
+    # ------------------------------------------------------------------
+    # Role changes
+    # ------------------------------------------------------------------
+    def _set_role(self, active: bool, reason: str):
+        """Change role; caller holds the lock."""
+        if active:
+            self.epoch = max(self.epoch, self.peer_epoch) + 1
+            self._cycles, self._sample = self.peer_cycles, self.peer_sample
+            self._active_since = time.monotonic()
+            self._lease_until = 0.0
+            self._became_active.set()
+        else:
+            self._became_active.clear()
+        self.active = active
+        event = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "node_id": self.node_id,
+            "role": "active" if active else "standby",
+            "epoch": self.epoch,
+            "reason": reason,
+        }
+        self.events.append(event)
+        log.warning("Node %d now %s (epoch %d): %s", self.node_id, event["role"],
+                    self.epoch, reason)
+
+    def _monitor_loop(self):
+        """Standby side: heartbeat once per cycle and watch the active."""
+        tick = self.cycle_sec / 4
+        while not self._stop.wait(tick):
+            now = time.monotonic()
+            with self._lock:
+                if self.active:
+                    continue
+                if self.peer_seen is None:
+                    silent = now - self._started >= self.startup_grace
+                    reason = "no active peer at startup"
+                else:
+                    silent = now - self.peer_seen >= self.takeover_after
+                    reason = f"no heartbeat for {(now - self.peer_seen) * 1000:.0f}ms"
+                if silent:
+                    self._set_role(True, reason)
+            if self.active:
+                # Claim immediately; from now on the bridge loop heartbeats
+                self._send()
+            elif now - self._last_sent >= self.cycle_sec:
+                self._send()
+
+    # ------------------------------------------------------------------
+    # Bridge interface
+    # ------------------------------------------------------------------
+    def start(self):
+        self._started = time.monotonic()
+        self._stop.clear()
+        for target, name in ((self._receive_loop, "failover-rx"),
+                             (self._monitor_loop, "failover-monitor")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1)
+        self.sock.close()
+
+    def wait_active(self, timeout: float) -> bool:
+        """Block up to timeout for this node to become active."""
+        return self._became_active.wait(timeout)
+
+    def heartbeat(self, cycles: int, sample: int):
+        """Announce an active cycle. Called from the bridge loop each cycle."""
+        if self.active:
+            self._cycles, self._sample = cycles, sample
+            self._send()
+
+    def _peer_silent(self, now: float) -> bool:
+        """True if nothing has been heard from the peer for a takeover delay."""
+        last = self.peer_heard if self.peer_heard is not None else self._started
+        return now - last >= self.takeover_after
+
+    def _may_write_now(self) -> bool:
+        """Lease check; caller holds the lock."""
+        now = time.monotonic()
+        return self.active and (now < self._lease_until or self._peer_silent(now))
+
+    def may_write(self) -> bool:
+        """Return True if this node may write to the PLCs right now.
+
+        Writing needs an acknowledged heartbeat within the lease, or a peer
+        that has gone silent.  Otherwise (a lost heartbeat or ack, or a
+        pause) the standby may be about to take over, so the node probes the
+        peer and waits up to half a cycle for the acknowledgement first.
+        """
+        if not self.active:
+            return False
+        with self._lock:
+            if self._may_write_now():
+                return True
+        self._send()
+        with self._lock:
+            self._reply.wait_for(lambda: not self.active or self._may_write_now(),
+                                 timeout=self.cycle_sec / 2)
+            return self._may_write_now()
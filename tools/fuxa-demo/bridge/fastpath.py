@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+SPHERE Bridge Fast Path — raw-socket Modbus TCP transport
+
+The pymodbus sync client builds request/response objects for every call,
+which makes bridge cycles under ~20 ms unreliable.  This module speaks the
+handful of Modbus functions the bridge needs directly over a TCP socket:
+
+  - Every transfer's request frame is encoded once when the plan is
+    compiled; per cycle only the transaction id (and, for writes, the
+    payload) is patched in place with struct.pack_into.
+  - Responses land in one preallocated receive buffer per connection via
+    recv_into, and are decoded straight into a fresh list of values (attack
+    filters may keep the lists they are given across cycles).
+  - TCP_NODELAY is set so small frames are not held back by Nagle.
+
+Supported functions: 1 (read coils), 3 (read holding registers),
+15 (write multiple coils), 16 (write multiple registers).
+
+Benchmark both transports against running PLCs (e.g. the demo stack, whose
+controller and simulator are published on localhost:502 and :503):
+
+    python fastpath.py --usecase wt --controller localhost:502 \\
+        --simulator localhost:503 --cycle-ms 5 --cycles 2000
+"""
+
+import argparse
+import logging
+import math
+import socket
+import statistics
+import struct
+import sys
+import time
+
+log = logging.getLogger("bridge_fastpath")
+
+FC_READ_COILS = 1
+FC_READ_HOLDING = 3
+FC_WRITE_COILS = 15
+FC_WRITE_REGISTERS = 16
+
+_MBAP = struct.Struct(">HHHB")        # transaction, protocol, length, unit
+_READ_PDU = struct.Struct(">BHH")      # function, address, quantity
+_WRITE_PDU = struct.Struct(">BHHB")    # function, address, quantity, byte count
+_TID = struct.Struct(">H")
+_RX_SIZE = 260                         # maximum Modbus TCP ADU
+
+
+class FastModbusClient:
+    """Minimal synchronous Modbus TCP client built for fixed request plans.
+
+    Exposes connect()/close() like the pymodbus client so the bridge can
+    manage connections uniformly; transfers use read_op()/write_op() to get
+    precompiled request callables.
+    """
+
+    def __init__(self, host, port=502, timeout=2.0, unit_id=1):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.unit_id = unit_id
+        self._sock = None
+        self._rx = bytearray(_RX_SIZE)
+        self._rx_view = memoryview(self._rx)
+        self._tid = 0
+
+    # ------------------------------------------------------------------
+    # Connection management
+    # ------------------------------------------------------------------
+    def connect(self) -> bool:
+        """Open the TCP connection. Returns True when connected."""
+        if self._sock is not None:
+            return True
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as exc:
+            log.debug("connect %s:%d failed: %s", self.host, self.port, exc)
+            return False
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        return True
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    # ------------------------------------------------------------------
+    # Request compilation
+    # ------------------------------------------------------------------
+    def read_op(self, function: int, address: int, count: int):
+        """Return a callable performing a fixed read; see _ReadRequest."""
+        return _ReadRequest(self, function, address, count)
+
+    def write_op(self, function: int, address: int, count: int):
+        """Return a callable performing a fixed-size write; see _WriteRequest."""
+        return _WriteRequest(self, function, address, count)
+
+    # ------------------------------------------------------------------
+    # Transaction
+    # ------------------------------------------------------------------
+    def _transact(self, frame: bytearray, function: int) -> int:
+        """Send a prepared frame and receive the response into the rx buffer.
+
+        Returns the response length, or 0 on any transport or protocol
+        error.  Transport errors and desynchronised responses drop the
+        connection; the next transaction reconnects.
+        """
+        if self._sock is None and not self.connect():
+            return 0
+
+        self._tid = (self._tid + 1) & 0xFFFF
+        tid = self._tid
+        _TID.pack_into(frame, 0, tid)
+
+        sock = self._sock
+        rx = self._rx
+        try:
+            sock.sendall(frame)
+            got = sock.recv_into(rx)
+            while got < 9:
+                if got == 0:
+                    raise ConnectionError("connection closed by peer")
+                n = sock.recv_into(self._rx_view[got:])
+                if n == 0:
+                    raise ConnectionError("connection closed by peer")
+                got += n
+            r_tid, _, length, _ = _MBAP.unpack_from(rx, 0)
+            total = 6 + length
+            if r_tid != tid or total > _RX_SIZE:
+                raise ConnectionError(f"response desync (tid {r_tid} != {tid})")
+            while got < total:
+                n = sock.recv_into(self._rx_view[got:total])
+                if n == 0:
+                    raise ConnectionError("connection closed by peer")
+                got += n
+        except (OSError, ConnectionError) as exc:
+            log.debug("%s:%d transaction failed: %s", self.host, self.port, exc)
+            self.close()
+            return 0
+
+        if rx[7] != function:
+            # Exception response (function | 0x80) or unexpected function
+            log.debug("%s:%d exception response fc=0x%02x code=%d",
+                      self.host, self.port, rx[7], rx[8])
+            return 0
+        return total
+
+
+class _ReadRequest:
+    """Precompiled read (coils or holding registers).
+
+    Calling it returns the decoded values as a new list, or None on error.
+    """
+
+    __slots__ = ("client", "function", "count", "frame", "_expected", "_unpack")
+
+    def __init__(self, client: FastModbusClient, function: int, address: int, count: int):
+        if function not in (FC_READ_COILS, FC_READ_HOLDING):
+            raise ValueError(f"unsupported read function {function}")
+        self.client = client
+        self.function = function
+        self.count = count
+        self.frame = bytearray(_MBAP.size + _READ_PDU.size)
+        _MBAP.pack_into(self.frame, 0, 0, 0, 1 + _READ_PDU.size, client.unit_id)
+        _READ_PDU.pack_into(self.frame, _MBAP.size, function, address, count)
+        if function == FC_READ_COILS:
+            self._expected = 9 + math.ceil(count / 8)
+            self._unpack = None
+        else:
+            self._expected = 9 + 2 * count
+            self._unpack = struct.Struct(f">{count}H").unpack_from
+
+    def __call__(self):
+        total = self.client._transact(self.frame, self.function)
+        if total < self._expected:
+            return None
+        rx = self.client._rx
+        if self._unpack is None:
+            return [(rx[9 + (i >> 3)] >> (i & 7)) & 1 for i in range(self.count)]
+        return list(self._unpack(rx, 9))
+
+
+class _WriteRequest:
+    """Precompiled write of a fixed number of coils or holding registers.
+
+    Calling it with the values patches the payload into the prepared frame
+    and returns True on success.  Register values are truncated to int and
+    wrapped to 16 bits (-1 is sent as 0xFFFF), so filters may hand back
+    floats or negative numbers.
+    """
+
+    __slots__ = ("client", "function", "count", "frame", "_nbytes", "_pack_into")
+
+    def __init__(self, client: FastModbusClient, function: int, address: int, count: int):
+        if function == FC_WRITE_COILS:
+            nbytes = math.ceil(count / 8)
+            self._pack_into = None
+        elif function == FC_WRITE_REGISTERS:
+            nbytes = 2 * count
+            self._pack_into = struct.Struct(f">{count}H").pack_into
+        else:
+            raise ValueError(f"unsupported write function {function}")
+        self.client = client
+        self.function = function
+        self.count = count
+        self._nbytes = nbytes
+        pdu_len = _WRITE_PDU.size + nbytes
+        self.frame = bytearray(_MBAP.size + pdu_len)
+        _MBAP.pack_into(self.frame, 0, 0, 0, 1 + pdu_len, client.unit_id)
+        _WRITE_PDU.pack_into(self.frame, _MBAP.size, function, address, count, nbytes)
+
+    def __call__(self, values) -> bool:
+        frame = self.frame
+        base = _MBAP.size + _WRITE_PDU.size
+        try:
+            if self._pack_into is None:
+                for i in range(self._nbytes):
+                    frame[base + i] = 0
+                for i in range(self.count):
+                    if values[i]:
+                        frame[base + (i >> 3)] |= 1 << (i & 7)
+            else:
+                self._pack_into(frame, base, *[int(v) & 0xFFFF for v in values[:self.count]])
+        except (struct.error, IndexError, TypeError, ValueError, OverflowError) as exc:
+            log.debug("write payload rejected: %s", exc)
+            return False
+        # Echo response: MBAP + function + address + quantity
+        return self.client._transact(frame, self.function) >= 12
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Benchmark
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _percentile(sorted_values, pct):
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run_benchmark(usecase, ctrl, sim, transport, cycle_ms, cycles):
+    """Drive bridge cycles back to back at cycle_ms and return timing stats."""
+    from bridge import ModbusBridge, get_bridge_config
+
+    bridge = ModbusBridge(ctrl[0], ctrl[1], sim[0], sim[1], get_bridge_config(usecase),
+                          cycle_ms, transport=transport)
+    if not bridge.connect(retries=3, delay=1):
+        raise ConnectionError("could not connect to both PLCs")
+
+    budget = cycle_ms / 1000.0
+    durations = []
+    errors = 0
+    try:
+        # Warm up connections and caches
+        for _ in range(20):
+            bridge._cycle()
+        next_deadline = time.monotonic()
+        for _ in range(cycles):
+            t0 = time.monotonic()
+            if not bridge._cycle():
+                errors += 1
+            durations.append((time.monotonic() - t0) * 1000.0)
+            next_deadline += budget
+            delay = next_deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        bridge.disconnect()
+
+    durations.sort()
+    return {
+        "transport": transport,
+        "cycles": cycles,
+        "errors": errors,
+        "mean_ms": statistics.fmean(durations),
+        "p50_ms": _percentile(durations, 50),
+        "p99_ms": _percentile(durations, 99),
+        "max_ms": durations[-1],
+        "overruns": sum(1 for d in durations if d > cycle_ms),
+    }
+
+
+def main():
+    from bridge import parse_host_port
+
+    parser = argparse.ArgumentParser(description="Benchmark bridge transports")
+    parser.add_argument("--usecase", default="wt", choices=["wt", "wd", "ps"])
+    parser.add_argument("--controller", default="localhost:502", help="Controller PLC host:port")
+    parser.add_argument("--simulator", default="localhost:503", help="Simulator PLC host:port")
+    parser.add_argument("--cycle-ms", type=float, default=5.0, help="Target cycle time in ms")
+    parser.add_argument("--cycles", type=int, default=2000, help="Measured cycles per transport")
+    parser.add_argument("--transport", choices=["pymodbus", "fast", "both"], default="both")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+
+    ctrl = parse_host_port(args.controller, 502)
+    sim = parse_host_port(args.simulator, 503)
+    transports = ["pymodbus", "fast"] if args.transport == "both" else [args.transport]
+
+    print(f"usecase={args.usecase} target={args.cycle_ms:g}ms cycles={args.cycles}")
+    print(f"{'transport':<10} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8} {'overrun':>8} {'errors':>7}")
+    for transport in transports:
+        try:
+            s = run_benchmark(args.usecase, ctrl, sim, transport, args.cycle_ms, args.cycles)
+        except ConnectionError as e:
+            log.error("%s: %s", transport, e)
+            sys.exit(1)
+        print(f"{s['transport']:<10} {s['mean_ms']:>7.2f}ms {s['p50_ms']:>7.2f}ms "
+              f"{s['p99_ms']:>7.2f}ms {s['max_ms']:>7.2f}ms {s['overruns']:>8d} {s['errors']:>7d}")
+
+
+if __name__ == "__main__":
+    main()
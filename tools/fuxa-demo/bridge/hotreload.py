@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+SPHERE Bridge Hot Reload — swap mappings and attack filters without restarting
+
+The bridge can take its configuration from a JSON file instead of (or on top
+of) the --usecase/--attack flags:
+
+    {
+      "usecase": "ps",
+      "transfers": [ ... optional, replaces the use-case transfers ... ],
+      "attack": {"filter": "harvey_hydro", "start_sample": 40, "end_sample": 90}
+    }
+
+"attack": null removes the filter; omitting the key keeps the --attack
+flags.  ConfigWatcher polls the file and, on change, loads it, compiles the
+new plan and loads the filter in its own thread.  The bridge applies the
+staged result between two cycles, keeping its PLC connections, so no cycle
+is skipped.  A file that fails to load or validate is logged and ignored;
+the bridge keeps running on the previous configuration.
+
+An unchanged attack section keeps the running filter instance (and its
+sample counter).  A changed one starts a new filter whose start/end samples
+count from the reload.
+
+    python bridge.py --config /config/bridge.json --attack-manifest /logs/attack.json
+"""
+
+import json
+import logging
+import os
+import threading
+
+log = logging.getLogger("bridge_hotreload")
+
+
+def load_config_file(path: str, get_config, default_usecase: str):
+    """Load a bridge config file.
+
+    Returns (config, attack) where config is a bridge config dict as
+    returned by get_config(usecase) (with transfers overridden if given)
+    and attack is the attack section: a dict, None to disable, or
+    ... (Ellipsis) when the file does not mention it.
+
+    Raises ValueError on malformed files.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"cannot read {path}: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: top level must be an object")
+
+    config = dict(get_config(data.get("usecase", default_usecase)))
+    if "name" in data:
+        config["name"] = data["name"]
+    if "transfers" in data:
+        transfers = data["transfers"]
+        if not isinstance(transfers, list) or not transfers:
+            raise ValueError(f"{path}: transfers must be a non-empty list")
+        required = ("type", "src_client", "src_addr", "src_count", "dst_client", "dst_addr")
+        for i, t in enumerate(transfers):
+            missing = [k for k in required if k not in t]
+            if missing:
+                raise ValueError(f"{path}: transfer {i} missing {', '.join(missing)}")
+            if t["src_client"] not in ("ctrl", "sim") or t["dst_client"] not in ("ctrl", "sim"):
+                raise ValueError(f"{path}: transfer {i} clients must be ctrl or sim")
+        config["transfers"] = transfers
+
+    attack = data.get("attack", ...)
+    if attack is not None and attack is not ... and (
+            not isinstance(attack, dict) or "filter" not in attack):
+        raise ValueError(f"{path}: attack must be null or an object with a 'filter' name")
+    return config, attack
+
+
+class ConfigWatcher:
+    """Poll a bridge config file and stage reloads on the bridge."""
+
+    def __init__(self, path, bridge, get_config, load_filter, default_usecase,
+                 attack=None, poll_sec=0.5):
+        self.path = path
+        self.bridge = bridge
+        self.get_config = get_config
+        self.load_filter = load_filter
+        self.default_usecase = default_usecase
+        self.attack = attack          # attack section currently in effect
+        self.poll_sec = poll_sec
+        self._mtime = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """Reload if the file changed. Returns True when a reload was staged."""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            config, attack = load_config_file(self.path, self.get_config, self.default_usecase)
+        except ValueError as e:
+            log.error("Config reload rejected: %s", e)
+            return False
+
+        if attack is ...:
+            attack = self.attack
+        if attack == self.attack:
+            attack_filter = self.bridge.KEEP_FILTER
+        elif attack is None:
+            attack_filter = None
+        else:
+            params = {k: v for k, v in attack.items() if k != "filter"}
+            attack_filter = self.load_filter(attack["filter"], **params)
+            if attack_filter is None:
+                log.error("Config reload rejected: cannot load attack filter '%s'",
+                          attack["filter"])
+                return False
+
+        try:
+            self.bridge.stage_reload(config, attack_filter, source=self.path, attack=attack)
+        except ValueError as e:
+            log.error("Config reload rejected: %s", e)
+            return False
+        self.attack = attack
+        log.info("Config change staged from %s", self.path)
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.poll_sec):
+            self.check()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
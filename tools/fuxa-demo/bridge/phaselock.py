@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+SPHERE Bridge Phase Lock — align bridge cycles with the PLC scan
+
+OpenPLC copies Modbus-written inputs into the program and publishes outputs
+once per scan tick.  A bridge sampling at an arbitrary phase therefore sees
+each value up to one full scan late, on every hop of a command→status round
+trip.  This module estimates each PLC's scan period and phase so the bridge
+can start its cycle just after the locked PLC's scan and read every other
+calibrated PLC in its own window just after that PLC's scan.
+
+Scan boundaries are observed by probing a reference register block as fast
+as possible for a short window, on a dedicated connection so bridging keeps
+running:
+
+  - counter mode: the reference is a register the PLC increments every scan
+    (t = phase + period * counter, fitted by least squares);
+  - value-change mode: any block that changes often (e.g. simulator sensor
+    registers).  Intervals between changes are whole multiples of the
+    period; the multiples are recovered by rounding and refined.
+
+Calibration repeats every few seconds in a background thread to follow
+clock drift between the bridge host and the PLCs.
+
+Compare propagation latency with and without alignment:
+
+    python phaselock.py --usecase wt --controller localhost:502 \\
+        --simulator localhost:503 --ref ctrl:coil:40:12 --ref sim:hr:300:6 \\
+        --lock ctrl --cycle-ms 50
+"""
+
+import argparse
+import collections
+import logging
+import math
+import statistics
+import threading
+import time
+
+try:
+    from pymodbus.client import ModbusTcpClient
+    from pymodbus.pdu import ExceptionResponse
+except ImportError:
+    ModbusTcpClient = None
+
+log = logging.getLogger("bridge_phaselock")
+
+MIN_EVENTS = 6
+
+
+def parse_ref(spec: str) -> dict:
+    """Parse a reference spec 'client:kind:address[:count]'.
+
+    client is ctrl or sim, kind is hr or coil, e.g. 'sim:hr:300:6'.
+    """
+    parts = spec.split(":")
+    if len(parts) not in (3, 4) or parts[0] not in ("ctrl", "sim") or parts[1] not in ("hr", "coil"):
+        raise ValueError(f"Invalid phase reference '{spec}' (expected ctrl|sim:hr|coil:ADDR[:COUNT])")
+    return {
+        "client": parts[0],
+        "kind": parts[1],
+        "address": int(parts[2]),
+        "count": int(parts[3]) if len(parts) == 4 else 1,
+    }
+
+
+def _lstsq(xs, ys):
+    """Return (intercept, slope, residual_std) of the least-squares line y = a + b*x."""
+    n = len(xs)
+    mx = sum(xs) / n
+    my = sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        raise ValueError("degenerate fit")
+    b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    a = my - b * mx
+    resid = [y - (a + b * x) for x, y in zip(xs, ys)]
+    return a, b, statistics.pstdev(resid)
+
+
+def fit_scan(events, counter=False):
+    """Fit (phase, period, jitter) from boundary observations.
+
+    events is a list of (t_boundary, value) where t_boundary is the
+    midpoint between the last probe before a change and the first probe
+    after it.  In counter mode value is the counter reading; otherwise it
+    is ignored and scan indices are recovered from the spacing.
+    """
+    if len(events) < MIN_EVENTS:
+        raise ValueError(f"need at least {MIN_EVENTS} scan boundaries, saw {len(events)}")
+    times = [t for t, _ in events]
+
+    if counter:
+        index = [0]
+        for (_, prev), (_, cur) in zip(events, events[1:]):
+            step = (cur - prev) & 0xFFFF  # 16-bit counters wrap
+            index.append(index[-1] + max(step, 1))
+    else:
+        gaps = sorted(b - a for a, b in zip(times, times[1:]))
+        period = gaps[len(gaps) // 10]  # robust "smallest" gap
+        if period <= 0:
+            raise ValueError("non-increasing boundary times")
+        for _ in range(2):
+            index = [0]
+            for a, b in zip(times, times[1:]):
+                index.append(index[-1] + max(1, round((b - a) / period)))
+            _, period, _ = _lstsq(index, times)
+
+    phase, period, jitter = _lstsq(index, times)
+    if period <= 0:
+        raise ValueError("non-positive period")
+    return phase % period, period, jitter
+
+
+class ScanClock:
+    """Scan period/phase estimate for one PLC.
+
+    Holds its own Modbus connection for probing so calibration never
+    competes with the bridge's request stream.
+    """
+
+    def __init__(self, name, host, port, ref: dict, counter=False, timeout=2):
+        if ModbusTcpClient is None:
+            raise RuntimeError("pymodbus required for phase calibration")
+        self.name = name
+        self.ref = ref
+        self.counter = counter
+        self.client = ModbusTcpClient(host, port=port, timeout=timeout)
+        self._lock = threading.Lock()
+        self._estimate = None  # (phase, period, jitter)
+        self._probe_failed = False
+        self.calibrations = 0
+
+    @property
+    def locked(self) -> bool:
+        return self._estimate is not None
+
+    @property
+    def estimate(self):
+        with self._lock:
+            return self._estimate
+
+    def _probe(self):
+        ref = self.ref
+        try:
+            if ref["kind"] == "coil":
+                rr = self.client.read_coils(ref["address"], count=ref["count"])
+                if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
+                    return None
+                return tuple(rr.bits[:ref["count"]])
+            rr = self.client.read_holding_registers(ref["address"], count=ref["count"])
+            if rr is None or isinstance(rr, ExceptionResponse) or rr.isError():
+                return None
+            return tuple(rr.registers[:ref["count"]])
+        except Exception as exc:
+            # Once per calibration window: probes run back to back
+            if not self._probe_failed:
+                log.warning("%s probe error: %s", self.name, exc)
+                self._probe_failed = True
+            return None
+
+    def calibrate(self, window_sec=2.0) -> bool:
+        """Probe the reference for window_sec and refit. Returns True on success."""
+        if not self.client.connected and not self.client.connect():
+            log.warning("%s: phase probe connection failed", self.name)
+            return False
+
+        self._probe_failed = False
+        events = []
+        last_value = None
+        last_t = None
+        deadline = time.monotonic() + window_sec
+        while time.monotonic() < deadline:
+            value = self._probe()
+            t = time.monotonic()
+            if value is None:
+                last_value = None
+                continue
+            if last_value is not None and value != last_value:
+                events.append((0.5 * (last_t + t), value[0]))
+            last_value, last_t = value, t
+
+        try:
+            phase, period, jitter = fit_scan(events, counter=self.counter)
+        except ValueError as e:
+            log.warning("%s: phase calibration failed: %s", self.name, e)
+            return False
+
+        with self._lock:
+            self._estimate = (phase, period, jitter)
+        self.calibrations += 1
+        log.info("%s scan: period=%.2fms jitter=%.2fms (%d boundaries)",
+                 self.name, period * 1000, jitter * 1000, len(events))
+        return True
+
+    def prev_boundary(self, t: float):
+        est = self.estimate
+        if est is None:
+            return None
+        phase, period, _ = est
+        return phase + math.floor((t - phase) / period) * period
+
+    def next_boundary(self, t: float):
+        prev = self.prev_boundary(t)
+        if prev is None:
+            return None
+        return prev + self.estimate[1]
+
+    def close(self):
+        self.client.close()
+
+
+class PhaseTracker:
+    """Keeps ScanClocks calibrated and schedules aligned bridge cycles."""
+
+    def __init__(self, clocks: dict, lock_to=None, offset_ms=2.0,
+                 window_sec=2.0, interval_sec=30.0):
+        self.clocks = clocks
+        self.lock_to = lock_to
+        self.offset = offset_ms / 1000.0
+        self.window_sec = window_sec
+        self.interval_sec = interval_sec
+        self._stop = threading.Event()
+        self._thread = None
+
+    def calibrate_all(self):
+        for clock in self.clocks.values():
+            clock.calibrate(self.window_sec)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_sec):
+            self.calibrate_all()
+
+    def start(self):
+        """Calibrate once synchronously, then keep recalibrating in the background."""
+        self.calibrate_all()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="phase-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.window_sec + 5)
+        for clock in self.clocks.values():
+            clock.close()
+
+    def window_order(self, clients):
+        """Order source clients for a cycle: the locked PLC first."""
+        return sorted(clients, key=lambda c: c != self.lock_to)
+
+    def window_start(self, client: str, now: float) -> float:
+        """Return when transfers sourced from client should run.
+
+        That is now while inside the first half-scan after the offset,
+        otherwise offset seconds after the client's next scan boundary.
+        Clients without a calibrated clock run immediately.
+        """
+        clock = self.clocks.get(client)
+        est = clock.estimate if clock is not None else None
+        if self.lock_to is None or est is None:
+            return now
+        period = est[1]
+        since = now - clock.prev_boundary(now)
+        if self.offset <= since <= self.offset + period / 2:
+            return now
+        if since < self.offset:
+            return now + self.offset - since
+        return clock.next_boundary(now) + self.offset
+
+    def next_start(self, nominal: float, now: float) -> float:
+        """Return the aligned cycle start nearest the nominal start time.
+
+        Aligned starts sit offset seconds after a scan boundary of the
+        locked PLC.  Falls back to the nominal time while unlocked.
+        """
+        clock = self.clocks.get(self.lock_to)
+        est = clock.estimate if clock is not None else None
+        if est is None:
+            return nominal
+        phase, period, _ = est
+        anchor = phase + self.offset
+        n = round((nominal - anchor) / period)
+        start = anchor + n * period
+        while start < now:
+            start += period
+        return start
+
+
+class LatencyStats:
+    """Rolling estimate of per-path value propagation latency.
+
+    For each delivered value: staleness is how long it sat in the source
+    PLC since that PLC's last scan published it; wait is how long it will
+    sit in the destination until that PLC's next scan consumes it.
+    """
+
+    def __init__(self, maxlen=2000):
+        self.samples = {"command": collections.deque(maxlen=maxlen),
+                        "sensor": collections.deque(maxlen=maxlen)}
+
+    def record(self, path, src_clock, dst_clock, read_at, written_at):
+        if src_clock is None or dst_clock is None:
+            return
+        published = src_clock.prev_boundary(read_at)
+        consumed = dst_clock.next_boundary(written_at)
+        if published is None or consumed is None:
+            return
+        self.samples[path].append(consumed - published)
+
+    def summary(self, path):
+        data = sorted(self.samples[path])
+        if not data:
+            return None
+        return {
+            "n": len(data),
+            "mean_ms": statistics.fmean(data) * 1000,
+            "p50_ms": data[len(data) // 2] * 1000,
+            "p95_ms": data[min(len(data) - 1, int(0.95 * len(data)))] * 1000,
+        }
+
+    def format(self) -> str:
+        parts = []
+        for path in ("command", "sensor"):
+            s = self.summary(path)
+            if s:
+                parts.append(f"{path}_prop={s['p50_ms']:.1f}/{s['p95_ms']:.1f}ms")
+        return "  ".join(parts)
+
+
+def build_tracker(args, ctrl, sim):
+    """Create a PhaseTracker from bridge CLI arguments, or None if disabled."""
+    if not args.phase_ref:
+        return None
+    endpoints = {"ctrl": ctrl, "sim": sim}
+    clocks = {}
+    for spec in args.phase_ref:
+        ref = parse_ref(spec)
+        host, port = endpoints[ref["client"]]
+        clocks[ref["client"]] = ScanClock(ref["client"], host, port, ref,
+                                          counter=args.phase_counter)
+    lock_to = args.phase_lock
+    if lock_to is not None and lock_to not in clocks:
+        raise ValueError(f"--phase-lock {lock_to} needs a --phase-ref on {lock_to}")
+    return PhaseTracker(clocks, lock_to=lock_to, offset_ms=args.phase_offset_ms,
+                        interval_sec=args.phase_interval)
+
+
+def add_arguments(parser):
+    """Add phase-lock options to a bridge argument parser."""
+    group = parser.add_argument_group("scan phase alignment")
+    group.add_argument("--phase-ref", action="append", metavar="SPEC",
+                       help="Scan reference block per PLC, e.g. sim:hr:300:6 or "
+                            "ctrl:coil:40:12 (repeatable, one per PLC)")
+    group.add_argument("--phase-counter", action="store_true",
+                       help="Reference registers are per-scan counters, not changing values")
+    group.add_argument("--phase-lock", choices=["ctrl", "sim"],
+                       help="Start bridge cycles just after this PLC's scan")
+    group.add_argument("--phase-offset-ms", type=float, default=2.0,
+                       help="Delay after the scan boundary before the cycle starts (default: 2)")
+    group.add_argument("--phase-interval", type=float, default=30.0,
+                       help="Seconds between background recalibrations (default: 30)")
+
+
+def main():
+    from bridge import ModbusBridge, get_bridge_config, parse_host_port
+
+    parser = argparse.ArgumentParser(description="Compare bridge propagation latency with and "
+                                                 "without scan phase alignment")
+    parser.add_argument("--usecase", default="wt", choices=["wt", "wd", "ps"])
+    parser.add_argument("--controller", default="localhost:502")
+    parser.add_argument("--simulator", default="localhost:503")
+    parser.add_argument("--cycle-ms", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0,
+                        help="Seconds to run each mode (default: 20)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+    if not args.phase_ref or not args.phase_lock:
+        parser.error("--phase-ref and --phase-lock are required")
+
+    ctrl = parse_host_port(args.controller, 502)
+    sim = parse_host_port(args.simulator, 503)
+    config = get_bridge_config(args.usecase)
+
+    results = {}
+    for aligned in (False, True):
+        tracker = build_tracker(args, ctrl, sim)
+        if not aligned:
+            tracker.lock_to = None  # measure only
+        bridge = ModbusBridge(ctrl[0], ctrl[1], sim[0], sim[1], config,
+                              args.cycle_ms, phase_tracker=tracker)
+        if not bridge.connect(retries=3, delay=1):
+            raise SystemExit("could not connect to both PLCs")
+        tracker.start()
+        bridge.start()
+        time.sleep(args.duration)
+        bridge.stop()
+        tracker.stop()
+        bridge.disconnect()
+        results["aligned" if aligned else "free-running"] = bridge.latency
+
+    print(f"{'mode':<14} {'path':<8} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9}")
+    for mode, stats in results.items():
+        for path in ("command", "sensor"):
+            s = stats.summary(path)
+            if s:
+                print(f"{mode:<14} {path:<8} {s['n']:>6d} {s['mean_ms']:>8.1f}ms "
+                      f"{s['p50_ms']:>8.1f}ms {s['p95_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+SPHERE Bridge Traffic Recorder — compact per-cycle transfer log
+
+Captures every value that crosses the controller/simulator boundary inside
+ModbusBridge._cycle: the pre-filter value read from the source PLC and the
+post-filter value written to the destination PLC, for every transfer, with a
+monotonic timestamp.  Records go into an in-memory ring buffer and a
+background thread flushes them to a binary log, so the bridge cycle never
+blocks on disk I/O.  If the writer falls behind, the oldest records are
+dropped and counted rather than stalling the bridge.
+
+Log format (little-endian):
+
+    file    := MAGIC block*
+    block   := b"L" u32:len json:layout          (transfer layout header)
+             | b"C" record                       (one bridge cycle)
+    record  := f64:t_mono u32:cycle slot*        (one slot per transfer)
+    slot    := u8:flags u32:read_offset_us u16[count]:pre u16[count]:post
+
+flags bit 0 = source read succeeded, bit 1 = destination write succeeded.
+The layout JSON carries the transfer list plus a wall-clock/monotonic anchor
+so timestamps can be converted back to UTC.  A new layout block may appear
+mid-file; subsequent records use it.
+
+Convert a log to a run bundle on demand:
+
+    python recorder.py bridge.log runs/bridge-capture
+"""
+
+import argparse
+import collections
+import csv
+import json
+import logging
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+log = logging.getLogger("bridge_recorder")
+
+MAGIC = b"SPHBRLOG\x01"
+_LAYOUT_LEN = struct.Struct("<I")
+
+FLAG_READ_OK = 0x01
+FLAG_WRITE_OK = 0x02
+
+
+def _record_struct(transfers: list) -> struct.Struct:
+    """Build the fixed-size cycle record struct for a transfer layout."""
+    fmt = "<dI" + "".join(f"BI{2 * t['src_count']}H" for t in transfers)
+    return struct.Struct(fmt)
+
+
+def _register_kind(transfer_type: str, side: str) -> str:
+    """Return 'coil' or 'hr' for the source or destination of a transfer."""
+    src, dst = transfer_type.split("_to_")
+    kind = src if side == "src" else dst
+    return "coil" if kind.startswith("coil") else "hr"
+
+
+def transfer_columns(transfer: dict) -> tuple:
+    """Return (pre_columns, post_columns) names for a transfer.
+
+    Pre-filter columns name the source registers, post-filter columns name
+    the destination registers, e.g. ``ctrl_coil_40`` → ``sim_hr_200``.
+    """
+    count = transfer["src_count"]
+    src_kind = _register_kind(transfer["type"], "src")
+    dst_kind = _register_kind(transfer["type"], "dst")
+    pre = [f"{transfer['src_client']}_{src_kind}_{transfer['src_addr'] + i}"
+           for i in range(count)]
+    post = [f"{transfer['dst_client']}_{dst_kind}_{transfer['dst_addr'] + i}"
+            for i in range(count)]
+    return pre, post
+
+
+def _u16(value) -> int:
+    """Wrap a bridged value to 16 bits, as the fast path writes it (-1 → 0xFFFF)."""
+    return int(value) & 0xFFFF
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Recorder
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TrafficRecorder:
+    """Ring-buffered binary recorder for bridge transfers.
+
+    The bridge calls new_trace() at the start of a cycle, fills one slot per
+    transfer, then hands the trace back with append().  Packing happens on
+    the bridge thread (a single struct.pack), everything else on the flush
+    thread.
+    """
+
+    def __init__(self, path, capacity=4096, flush_interval=0.5):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._ring = collections.deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._io_lock = threading.Lock()
+        self._file = None
+        self._record = None
+        self._n_transfers = 0
+        self._counts = []
+        self._zeros = {}
+
+        # Stats
+        self.records = 0
+        self.dropped = 0
+        self.bytes_written = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def open(self, config: dict, cycle_ms: int):
+        """Open the log file, write the layout header and start flushing."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self.set_layout(config, cycle_ms)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop,
+                                        name="bridge-recorder", daemon=True)
+        self._thread.start()
+        log.info("Recording bridge traffic to %s (ring=%d cycles)",
+                 self.path, self.capacity)
+
+    def set_layout(self, config: dict, cycle_ms: int):
+        """Write a layout block; later records are packed against it.
+
+        Layout blocks bypass the ring so they can never be dropped: buffered
+        records are flushed first, then the block is written synchronously.
+        This only happens at open and on configuration changes.
+        """
+        transfers = [
+            {k: t[k] for k in ("type", "src_client", "src_addr", "src_count",
+                               "dst_client", "dst_addr")}
+            for t in config["transfers"]
+        ]
+        layout = {
+            "name": config.get("name", ""),
+            "cycle_ms": cycle_ms,
+            "wall_anchor": time.time(),
+            "mono_anchor": time.monotonic(),
+            "transfers": transfers,
+        }
+        payload = json.dumps(layout, separators=(",", ":")).encode()
+        with self._io_lock:
+            self._drain_locked()
+            block = b"L" + _LAYOUT_LEN.pack(len(payload)) + payload
+            self._file.write(block)
+            self._file.flush()
+            self.bytes_written += len(block)
+            self._record = _record_struct(transfers)
+            self._n_transfers = len(transfers)
+            self._counts = [t["src_count"] for t in transfers]
+            self._zeros = {c: [0] * c for c in self._counts}
+
+    def close(self):
+        """Stop the flush thread and write out whatever is still buffered."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._drain()
+        self._file.close()
+        self._file = None
+        log.info("Recorder closed: %d records, %d dropped, %d bytes",
+                 self.records, self.dropped, self.bytes_written)
+
+    # ------------------------------------------------------------------
+    # Bridge-side API
+    # ------------------------------------------------------------------
+    def new_trace(self) -> list:
+        """Return an empty per-cycle trace with one slot per transfer."""
+        return [None] * self._n_transfers
+
+    def append(self, t_mono: float, cycle: int, trace: list):
+        """Pack one cycle's trace and push it onto the ring buffer.
+
+        Each trace slot is None (source read failed) or a tuple of
+        (read_offset_sec, pre_values, post_values, write_ok).
+        """
+        flat = [t_mono, cycle]
+        for slot, count in zip(trace, self._counts):
+            if slot is None:
+                zeros = self._zeros[count]
+                flat.append(0)
+                flat.append(0)
+                flat.extend(zeros)
+                flat.extend(zeros)
+                continue
+            offset, pre, post, write_ok = slot
+            flat.append(FLAG_READ_OK | (FLAG_WRITE_OK if write_ok else 0))
+            flat.append(int(offset * 1e6))
+            flat.extend(_u16(v) for v in pre[:count])
+            flat.extend(_u16(v) for v in post[:count])
+        data = b"C" + self._record.pack(*flat)
+        if len(self._ring) == self.capacity:
+            self.dropped += 1
+        self._ring.append(data)
+        self.records += 1
+
+    # ------------------------------------------------------------------
+    # Flush thread
+    # ------------------------------------------------------------------
+    def _drain(self):
+        with self._io_lock:
+            self._drain_locked()
+
+    def _drain_locked(self):
+        chunks = []
+        ring = self._ring
+        while ring:
+            chunks.append(ring.popleft())
+        if chunks and self._file is not None:
+            data = b"".join(chunks)
+            self._file.write(data)
+            self._file.flush()
+            self.bytes_written += len(data)
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._drain()
+            except OSError as exc:
+                log.error("Recorder write failed: %s", exc)
+                return
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Log reader
+# ──────────────────────────────────────────────────────────────────────────────
+
+def read_log(path):
+    """Yield ("layout", dict) and ("cycle", dict) entries from a recorder log.
+
+    Cycle entries carry t_mono, cycle and a list of per-transfer dicts with
+    read_ok, write_ok, read_offset_sec, pre and post.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a bridge recorder log")
+        layout = None
+        record = None
+        while True:
+            kind = f.read(1)
+            if not kind:
+                return
+            if kind == b"L":
+                (length,) = _LAYOUT_LEN.unpack(f.read(_LAYOUT_LEN.size))
+                layout = json.loads(f.read(length))
+                record = _record_struct(layout["transfers"])
+                yield "layout", layout
+            elif kind == b"C":
+                if record is None:
+                    raise ValueError(f"{path}: cycle record before layout")
+                raw = f.read(record.size)
+                if len(raw) < record.size:
+                    log.warning("%s: truncated final record ignored", path)
+                    return
+                values = record.unpack(raw)
+                slots = []
+                pos = 2
+                for t in layout["transfers"]:
+                    count = t["src_count"]
+                    flags, offset_us = values[pos], values[pos + 1]
+                    pos += 2
+                    pre = list(values[pos:pos + count])
+                    post = list(values[pos + count:pos + 2 * count])
+                    pos += 2 * count
+                    slots.append({
+                        "read_ok": bool(flags & FLAG_READ_OK),
+                        "write_ok": bool(flags & FLAG_WRITE_OK),
+                        "read_offset_sec": offset_us / 1e6,
+                        "pre": pre,
+                        "post": post,
+                    })
+                yield "cycle", {"t_mono": values[0], "cycle": values[1],
+                                "transfers": slots}
+            else:
+                raise ValueError(f"{path}: corrupt block marker {kind!r}")
+
+
+def _utc(layout: dict, t_mono: float) -> datetime:
+    wall = layout["wall_anchor"] + (t_mono - layout["mono_anchor"])
+    return datetime.fromtimestamp(wall, tz=timezone.utc)
+
+
+def log_to_bundle(log_path, output_dir, usecase_id="bridge-capture"):
+    """Convert a recorder log into a run bundle (meta.json, tags.csv, events.json).
+
+    tags.csv has one row per bridge cycle with the pre-filter source values
+    and post-filter destination values of every transfer.  Cells are empty
+    when the source read or destination write failed.  events.json marks
+    layout changes and the cycles where bridged values start or stop
+    differing from what the source PLC held (i.e. a filter was tampering).
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    events = []
+    header = None
+    layouts = 0
+    rows = 0
+    first = last = None
+    tampering = False
+    layout = None
+    cycle_ms = None
+
+    with open(out / "tags.csv", "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        for kind, entry in read_log(log_path):
+            if kind == "layout":
+                layout = entry
+                layouts += 1
+                cycle_ms = entry["cycle_ms"]
+                columns = ["timestamp_utc", "cycle"]
+                for t in entry["transfers"]:
+                    pre, post = transfer_columns(t)
+                    columns.extend(f"{c}_pre" for c in pre)
+                    columns.extend(f"{c}_post" for c in post)
+                if header is None:
+                    header = columns
+                    writer.writerow(header)
+                elif columns != header:
+                    log.warning("Layout change alters columns; later rows "
+                                "follow the new layout")
+                    header = columns
+                    writer.writerow(header)
+                events.append({
+                    "time_utc": datetime.fromtimestamp(
+                        entry["wall_anchor"], tz=timezone.utc).isoformat(),
+                    "type": "layout",
+                    "msg": f"Bridge layout: {entry['name']} "
+                           f"({len(entry['transfers'])} transfers)",
+                })
+                continue
+
+            ts = _utc(layout, entry["t_mono"])
+            first = first or ts
+            last = ts
+            row = [ts.isoformat(), entry["cycle"]]
+            modified = False
+            for slot in entry["transfers"]:
+                if slot["read_ok"]:
+                    row.extend(slot["pre"])
+                else:
+                    row.extend([""] * len(slot["pre"]))
+                if slot["read_ok"] and slot["write_ok"]:
+                    row.extend(slot["post"])
+                else:
+                    row.extend([""] * len(slot["post"]))
+                if slot["read_ok"] and slot["pre"] != slot["post"]:
+                    modified = True
+            writer.writerow(row)
+            rows += 1
+
+            if modified != tampering:
+                tampering = modified
+                events.append({
+                    "time_utc": ts.isoformat(),
+                    "type": "filter",
+                    "msg": ("Bridged values diverge from source (cycle %d)"
+                            if modified else
+                            "Bridged values match source again (cycle %d)")
+                           % entry["cycle"],
+                })
+
+    meta = {
+        "usecase_id": usecase_id,
+        "description": f"Bridge traffic capture from {Path(log_path).name}",
+        "backend_type": "openplc",
+        "source": "bridge-recorder",
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "start_utc": first.isoformat() if first else None,
+        "end_utc": last.isoformat() if last else None,
+        "duration_sec": round((last - first).total_seconds(), 3) if first else 0,
+        "poll_interval_ms": cycle_ms,
+        "sample_count": rows,
+        "layout_count": layouts,
+        "tags_file": "tags.csv",
+        "events_file": "events.json",
+        "bundle_schema_version": "1.1.0",
+    }
+    (out / "meta.json").write_text(json.dumps(meta, indent=2) + "\n")
+    (out / "events.json").write_text(json.dumps(events, indent=2) + "\n")
+    log.info("Bundle written to %s (%d cycles, %d events)", out, rows, len(events))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a bridge traffic log to a SPHERE run bundle")
+    parser.add_argument("log", help="Recorder log written by bridge.py --record")
+    parser.add_argument("output", help="Output run bundle directory")
+    parser.add_argument("--usecase-id", default="bridge-capture",
+                        help="usecase_id recorded in meta.json")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+
+    try:
+        log_to_bundle(args.log, args.output, usecase_id=args.usecase_id)
+    except (OSError, ValueError) as e:
+        log.error("%s", e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Bridge failover tests
+
+Runs an active/standby pair over loopback UDP with short cycles, drives each
+node the way the bridge loop does (a heartbeat per cycle, a write check per
+transfer) and checks that lost heartbeats never let both nodes write.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bridge"))
+
+from failover import FLAG_ACK, FailoverNode
+
+CYCLE_MS = 100
+WRITES_PER_CYCLE = 10
+
+
+class LossyNode(FailoverNode):
+    """FailoverNode whose outgoing heartbeats can be dropped on demand."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.drop = 0        # drop this many upcoming heartbeats (acks still go out)
+        self.mute = False    # drop everything
+
+    def _send(self, flags=0):
+        if self.mute:
+            return
+        if self.drop and not flags & FLAG_ACK:
+            self.drop -= 1
+            return
+        super()._send(flags)
+
+
+class BridgeLoop(threading.Thread):
+    """Stand-in for the bridge loop, logging every write it is allowed."""
+
+    def __init__(self, node, log, log_lock):
+        super().__init__(daemon=True)
+        self.node = node
+        self.log = log
+        self.log_lock = log_lock
+        self.done = threading.Event()
+
+    def run(self):
+        cycle = CYCLE_MS / 1000
+        cycles = 0
+        while not self.done.is_set():
+            if not self.node.active:
+                self.node.wait_active(cycle)
+                continue
+            self.node.heartbeat(cycles, 0)
+            cycles += 1
+            for _ in range(WRITES_PER_CYCLE):
+                if self.node.may_write():
+                    with self.log_lock:
+                        self.log.append((time.monotonic(), self.node.node_id))
+                time.sleep(cycle / WRITES_PER_CYCLE)
+
+
+@pytest.fixture
+def pair():
+    active = LossyNode(1, ("127.0.0.1", 0), None, CYCLE_MS)
+    standby = LossyNode(2, ("127.0.0.1", 0), None, CYCLE_MS, prefer_active=False)
+    active.peer = standby.sock.getsockname()
+    standby.peer = active.sock.getsockname()
+    log, log_lock = [], threading.Lock()
+    loops = [BridgeLoop(node, log, log_lock) for node in (active, standby)]
+    active.start()
+    standby.start()
+    for loop in loops:
+        loop.start()
+    assert active.wait_active(1.0)
+    time.sleep(5 * CYCLE_MS / 1000)
+    assert not standby.active
+    yield active, standby, log
+    for loop in loops:
+        loop.done.set()
+        loop.join(timeout=2)
+    active.stop()
+    standby.stop()
+
+
+def assert_single_writer(log):
+    """Writes may hand over from one node to the other once, never interleave."""
+    writers = [node_id for _, node_id in sorted(log)]
+    changes = sum(1 for prev, cur in zip(writers, writers[1:]) if prev != cur)
+    assert changes <= 1, f"writers interleaved: {writers}"
+
+
+class TestFailover:
+    """Lease and takeover behaviour of an active/standby pair."""
+
+    def test_dropped_heartbeat_does_not_double_write(self, pair):
+        active, standby, log = pair
+        active.drop = 1
+        time.sleep(10 * CYCLE_MS / 1000)
+        assert_single_writer(log)
+        assert active.active != standby.active
+        assert log[-1][1] == (1 if active.active else 2)
+
+    def test_muted_active_stops_before_standby_takes_over(self, pair):
+        active, standby, log = pair
+        active.mute = True
+        time.sleep(5 * CYCLE_MS / 1000)
+        active.mute = False
+        time.sleep(5 * CYCLE_MS / 1000)
+        assert standby.active and not active.active
+        assert standby.epoch > 1
+        assert_single_writer(log)
+        assert log[-1][1] == 2
+
+    def test_active_writes_alone_when_standby_is_down(self, pair):
+        active, standby, log = pair
+        standby.mute = True
+        time.sleep(5 * CYCLE_MS / 1000)
+        start = len(log)
+        time.sleep(3 * CYCLE_MS / 1000)
+        assert active.active
+        assert len(log) - start >= 2 * WRITES_PER_CYCLE
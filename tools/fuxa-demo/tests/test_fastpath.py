@@ -0,0 +1,90 @@
+"""
+Bridge fast path tests
+
+The precompiled requests run against a client whose transaction is answered
+in-process from a register table, so the frames and decoding are checked
+without a socket.
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bridge"))
+
+from fastpath import (FC_READ_COILS, FC_READ_HOLDING, FC_WRITE_COILS, FC_WRITE_REGISTERS,
+                      FastModbusClient)
+
+
+class TableClient(FastModbusClient):
+    """Answers each frame from hr/coils the way a Modbus server would."""
+
+    def __init__(self):
+        super().__init__("127.0.0.1")
+        self.hr = [0] * 100
+        self.coils = [0] * 100
+
+    def _transact(self, frame, function):
+        _, _, _, unit, fc, address, count = struct.unpack_from(">HHHBBHH", frame)
+        if fc == FC_READ_HOLDING:
+            pdu = struct.pack(f">BB{count}H", fc, 2 * count, *self.hr[address:address + count])
+        elif fc == FC_READ_COILS:
+            data = bytearray((count + 7) // 8)
+            for i, bit in enumerate(self.coils[address:address + count]):
+                data[i >> 3] |= bit << (i & 7)
+            pdu = bytes([fc, len(data)]) + data
+        elif fc == FC_WRITE_REGISTERS:
+            self.hr[address:address + count] = struct.unpack_from(f">{count}H", frame, 13)
+            pdu = struct.pack(">BHH", fc, address, count)
+        else:
+            for i in range(count):
+                self.coils[address + i] = (frame[13 + (i >> 3)] >> (i & 7)) & 1
+            pdu = struct.pack(">BHH", fc, address, count)
+        reply = struct.pack(">HHHB", 0, 0, 1 + len(pdu), unit) + pdu
+        self._rx[:len(reply)] = reply
+        return len(reply)
+
+
+@pytest.fixture
+def client():
+    return TableClient()
+
+
+class TestReads:
+    """Each call returns its own list of decoded values."""
+
+    def test_registers_are_fresh_lists(self, client):
+        read = client.read_op(FC_READ_HOLDING, 10, 3)
+        client.hr[10:13] = [1, 2, 3]
+        first = read()
+        client.hr[10:13] = [4, 5, 6]
+        second = read()
+        assert first == [1, 2, 3] and second == [4, 5, 6]
+
+    def test_coils_are_fresh_lists(self, client):
+        read = client.read_op(FC_READ_COILS, 0, 10)
+        client.coils[:10] = [1, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+        first = read()
+        client.coils[9] = 0
+        assert first == [1, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+        assert read() == [1] + [0] * 9
+
+
+class TestWrites:
+    """Filtered values are accepted the way the pymodbus path took them."""
+
+    def test_registers_are_wrapped_to_16_bits(self, client):
+        write = client.write_op(FC_WRITE_REGISTERS, 20, 4)
+        assert write([12.7, -1, 70000, True])
+        assert client.hr[20:24] == [12, 0xFFFF, 70000 & 0xFFFF, 1]
+
+    def test_coils(self, client):
+        write = client.write_op(FC_WRITE_COILS, 0, 9)
+        assert write([1, 0, True, 0, 0, 0, 0, 0, 2.0])
+        assert client.coils[:9] == [1, 0, 1, 0, 0, 0, 0, 0, 1]
+
+    @pytest.mark.parametrize("values", [[1, 2], [1, 2, float("nan")], [1, 2, "x"]])
+    def test_unusable_payload_is_a_failed_write(self, client, values):
+        assert not client.write_op(FC_WRITE_REGISTERS, 20, 3)(values)
@@ -0,0 +1,169 @@
+"""
+Bridge hot reload tests
+
+ConfigWatcher runs against a fake bridge that records the staged reloads,
+so each config file change can be checked for what it hands the bridge:
+a new plan, the running filter kept, a new filter, or no filter.
+"""
+
+import itertools
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bridge"))
+
+from hotreload import ConfigWatcher, load_config_file
+
+USECASES = {
+    "wt": {"name": "wt", "transfers": [
+        {"type": "coils_to_hr", "src_client": "ctrl", "src_addr": 40, "src_count": 12,
+         "dst_client": "sim", "dst_addr": 200}]},
+    "ps": {"name": "ps", "transfers": [
+        {"type": "hr_to_hr", "src_client": "ctrl", "src_addr": 60, "src_count": 1,
+         "dst_client": "sim", "dst_addr": 60}]},
+}
+TRANSFER = {"type": "hr_to_hr", "src_client": "sim", "src_addr": 300, "src_count": 6,
+            "dst_client": "ctrl", "dst_addr": 100}
+
+
+class FakeBridge:
+    KEEP_FILTER = object()
+
+    def __init__(self):
+        self.staged = []
+
+    def stage_reload(self, config, attack_filter, source=None, attack=None):
+        if config["transfers"][0]["src_count"] > 125:
+            raise ValueError("block too large")
+        self.staged.append((config, attack_filter, attack))
+
+
+class Filter:
+    def __init__(self, name, **params):
+        self.name = name
+        self.params = params
+
+
+def load_filter(name, **params):
+    return None if name == "missing" else Filter(name, **params)
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    return tmp_path / "bridge.json"
+
+
+_MTIMES = itertools.count(1_000_000_000)
+
+
+def write(path, data):
+    """Write a config and move its mtime on, so every write is a change."""
+    path.write_text(json.dumps(data))
+    stamp = next(_MTIMES) * 10**9
+    os.utime(path, ns=(stamp, stamp))
+
+
+def watcher(path, attack=None):
+    return ConfigWatcher(str(path), FakeBridge(), USECASES.__getitem__, load_filter, "wt",
+                         attack=attack)
+
+
+class TestLoadConfigFile:
+    """The attack key: absent (Ellipsis), null, or a filter section."""
+
+    def test_absent_attack_is_ellipsis(self, config_path):
+        write(config_path, {"usecase": "ps"})
+        config, attack = load_config_file(str(config_path), USECASES.__getitem__, "wt")
+        assert config["name"] == "ps" and attack is ...
+
+    def test_null_attack(self, config_path):
+        write(config_path, {"attack": None})
+        assert load_config_file(str(config_path), USECASES.__getitem__, "wt")[1] is None
+
+    def test_transfers_override(self, config_path):
+        write(config_path, {"name": "custom", "transfers": [TRANSFER]})
+        config, _ = load_config_file(str(config_path), USECASES.__getitem__, "wt")
+        assert config["name"] == "custom" and config["transfers"] == [TRANSFER]
+        assert USECASES["wt"]["transfers"][0]["src_addr"] == 40     # not modified
+
+    @pytest.mark.parametrize("data, message", [
+        ([], "top level"),
+        ({"transfers": []}, "non-empty list"),
+        ({"transfers": [{"type": "hr_to_hr"}]}, "missing src_client"),
+        ({"transfers": [dict(TRANSFER, dst_client="hmi")]}, "ctrl or sim"),
+        ({"attack": "harvey_hydro"}, "attack must be"),
+        ({"attack": {"start_sample": 3}}, "attack must be"),
+    ])
+    def test_malformed(self, config_path, data, message):
+        write(config_path, data)
+        with pytest.raises(ValueError, match=message):
+            load_config_file(str(config_path), USECASES.__getitem__, "wt")
+
+    def test_not_json(self, config_path):
+        config_path.write_text("{")
+        with pytest.raises(ValueError, match="cannot read"):
+            load_config_file(str(config_path), USECASES.__getitem__, "wt")
+
+
+class TestConfigWatcher:
+    """Changes are staged on the bridge; bad files leave it as it was."""
+
+    def test_unchanged_file_is_not_reloaded(self, config_path):
+        write(config_path, {"usecase": "ps"})
+        w = watcher(config_path)
+        assert not w.check() and w.bridge.staged == []
+
+    def test_valid_reload(self, config_path):
+        write(config_path, {"usecase": "wt"})
+        w = watcher(config_path)
+        write(config_path, {"usecase": "ps",
+                            "attack": {"filter": "harvey_hydro", "start_sample": 40}})
+        assert w.check()
+        config, attack_filter, attack = w.bridge.staged[-1]
+        assert config["name"] == "ps"
+        assert attack_filter.name == "harvey_hydro" and attack_filter.params == {"start_sample": 40}
+        assert w.attack == attack == {"filter": "harvey_hydro", "start_sample": 40}
+
+        # Same attack section again: the running filter (and its counters) is kept
+        write(config_path, {"usecase": "wt",
+                            "attack": {"filter": "harvey_hydro", "start_sample": 40}})
+        assert w.check()
+        assert w.bridge.staged[-1][1] is FakeBridge.KEEP_FILTER
+
+    def test_attack_key_removed_keeps_the_flags(self, config_path):
+        flags = {"filter": "replay", "start_sample": 5}
+        write(config_path, {"usecase": "wt", "attack": flags})
+        w = watcher(config_path, attack=flags)
+        write(config_path, {"usecase": "ps"})
+        assert w.check()
+        _, attack_filter, attack = w.bridge.staged[-1]
+        assert attack_filter is FakeBridge.KEEP_FILTER and attack == flags
+
+    def test_null_attack_removes_the_filter(self, config_path):
+        flags = {"filter": "replay"}
+        write(config_path, {"attack": flags})
+        w = watcher(config_path, attack=flags)
+        write(config_path, {"attack": None})
+        assert w.check()
+        assert w.bridge.staged[-1][1:] == (None, None) and w.attack is None
+
+    @pytest.mark.parametrize("data", [
+        {"transfers": [dict(TRANSFER, src_count=200)]},        # bridge rejects the plan
+        {"attack": {"filter": "missing"}},                     # filter does not load
+        {"transfers": "all"},                                  # malformed file
+    ])
+    def test_invalid_config_is_rejected(self, config_path, data):
+        flags = {"filter": "replay"}
+        write(config_path, {"usecase": "wt"})
+        w = watcher(config_path, attack=flags)
+        write(config_path, data)
+        assert not w.check()
+        assert w.bridge.staged == [] and w.attack == flags
+        # The same bad file is not retried until it changes again
+        assert not w.check()
+        write(config_path, {"usecase": "ps"})
+        assert w.check()
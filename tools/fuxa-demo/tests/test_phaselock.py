@@ -0,0 +1,115 @@
+"""
+Bridge phase lock tests
+
+ScanClock probes a fake PLC whose client has pymodbus 3.7+'s keyword-only
+count, and fit_scan recovers period and phase from synthetic boundaries.
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bridge"))
+
+pytest.importorskip("pymodbus")
+
+from phaselock import ScanClock, fit_scan
+
+PERIOD = 0.01
+
+
+class Reply:
+    def __init__(self, registers=(), bits=()):
+        self.registers = list(registers)
+        self.bits = list(bits)
+
+    def isError(self):
+        return False
+
+
+class ScanningClient:
+    """A PLC whose scan counter (hr) and toggle bit (coil) advance every PERIOD."""
+
+    connected = True
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+
+    def _scan(self):
+        return int((time.monotonic() - self.t0) / PERIOD)
+
+    def read_holding_registers(self, address, *, count=1, slave=1):
+        return Reply(registers=[self._scan() & 0xFFFF] * count)
+
+    def read_coils(self, address, *, count=1, slave=1):
+        return Reply(bits=[self._scan() % 2 == 1] * count)
+
+    def close(self):
+        pass
+
+
+def scan_clock(kind, counter=False):
+    clock = ScanClock("plc", "127.0.0.1", 1, {"client": "ctrl", "kind": kind,
+                                               "address": 0, "count": 2},
+                      counter=counter)
+    clock.client = ScanningClient()
+    return clock
+
+
+class TestProbe:
+    """Probes go through the keyword-only client signature."""
+
+    def test_registers(self):
+        assert len(scan_clock("hr")._probe()) == 2
+
+    def test_coils(self):
+        value = scan_clock("coil")._probe()
+        assert len(value) == 2 and value[0] in (True, False)
+
+    def test_error_logged_once_per_window(self, caplog):
+        clock = scan_clock("hr")
+
+        def broken(address, *, count=1, slave=1):
+            raise ConnectionError("reset by peer")
+
+        clock.client.read_holding_registers = broken
+        with caplog.at_level(logging.WARNING, logger="bridge_phaselock"):
+            assert not clock.calibrate(window_sec=0.05)
+        probe_errors = [r for r in caplog.records if "probe error" in r.getMessage()]
+        assert len(probe_errors) == 1
+
+    @pytest.mark.parametrize("kind, counter", [("hr", True), ("hr", False), ("coil", False)])
+    def test_calibrate_finds_scan_period(self, kind, counter):
+        clock = scan_clock(kind, counter)
+        assert clock.calibrate(window_sec=0.3)
+        phase, period, _ = clock.estimate
+        assert period == pytest.approx(PERIOD, rel=0.05)
+        # Boundaries fall on t0 + k * PERIOD
+        offset = (clock.client.t0 - phase) % period
+        assert min(offset, period - offset) < period * 0.3
+
+
+class TestFitScan:
+    """Period and phase come back from boundary times alone."""
+
+    def test_value_change_with_missed_scans(self):
+        scans = [0, 1, 2, 4, 5, 8, 9, 10, 13, 14]
+        events = [(0.123 + 0.02 * k + (0.0002 if k % 2 else -0.0002), None) for k in scans]
+        phase, period, jitter = fit_scan(events)
+        assert period == pytest.approx(0.02, rel=1e-2)
+        assert phase == pytest.approx(0.123 % period, abs=1e-3)
+        assert jitter < 0.001
+
+    def test_counter_wraps(self):
+        counts = [65533, 65534, 65535, 0, 1, 3, 4]
+        index = [0, 1, 2, 3, 4, 6, 7]
+        events = [(1.0 + 0.005 * i, c) for i, c in zip(index, counts)]
+        _, period, jitter = fit_scan(events, counter=True)
+        assert period == pytest.approx(0.005) and jitter == pytest.approx(0, abs=1e-9)
+
+    def test_too_few_boundaries(self):
+        with pytest.raises(ValueError):
+            fit_scan([(0.0, 1), (0.01, 2)], counter=True)
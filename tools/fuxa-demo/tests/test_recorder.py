@@ -0,0 +1,124 @@
+"""
+Bridge traffic recorder tests
+
+Cycles appended to a TrafficRecorder must come back unchanged from
+read_log and from the run bundle conversion, including failed reads and
+writes and a layout change mid-log.
+"""
+
+import csv
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bridge"))
+
+from recorder import MAGIC, TrafficRecorder, log_to_bundle, read_log
+
+FIRST = {"name": "wt", "transfers": [
+    {"type": "coils_to_hr", "src_client": "ctrl", "src_addr": 40, "src_count": 3,
+     "dst_client": "sim", "dst_addr": 200},
+    {"type": "hr_to_hr", "src_client": "sim", "src_addr": 300, "src_count": 2,
+     "dst_client": "ctrl", "dst_addr": 100},
+]}
+SECOND = {"name": "wt-reloaded", "transfers": [
+    {"type": "hr_to_hr", "src_client": "sim", "src_addr": 300, "src_count": 1,
+     "dst_client": "ctrl", "dst_addr": 100},
+]}
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """A log of three cycles on FIRST, then a layout change and two on SECOND."""
+    path = tmp_path / "bridge.log"
+    rec = TrafficRecorder(path, flush_interval=0.01)
+    rec.open(FIRST, cycle_ms=50)
+    rec.append(10.0, 1, [(0.001, [1, 0, 1], [1, 0, 1], True), (0.002, [600, 7], [600, 7], True)])
+    # Source read of the second transfer failed; first transfer's write failed
+    rec.append(10.05, 2, [(0.001, [1, 1, 0], [1, 1, 0], False), None])
+    # A filter tampered with the sensor values (a float and a negative value)
+    rec.append(10.1, 3, [(0.001, [0, 0, 0], [0, 0, 0], True),
+                         (0.0025, [601, 7], [650.7, -1], True)])
+    rec.set_layout(SECOND, cycle_ms=20)
+    rec.append(10.2, 4, [(0.0005, [602], [70000], True)])
+    rec.append(10.25, 5, [(0.0005, [603], [603], True)])
+    rec.close()
+    return path, rec
+
+
+class TestRoundTrip:
+    """append → flush → read_log returns what the bridge saw."""
+
+    def test_stats(self, recorded):
+        path, rec = recorded
+        assert rec.records == 5 and rec.dropped == 0
+        assert path.stat().st_size == rec.bytes_written + len(MAGIC)
+
+    def test_read_log(self, recorded):
+        path, _ = recorded
+        entries = list(read_log(path))
+        assert [kind for kind, _ in entries] == ["layout", "cycle", "cycle", "cycle",
+                                                 "layout", "cycle", "cycle"]
+        assert entries[0][1]["transfers"][0]["src_count"] == 3
+        assert entries[4][1]["name"] == "wt-reloaded" and entries[4][1]["cycle_ms"] == 20
+
+        first, failed, tampered, reloaded, _ = (e for kind, e in entries if kind == "cycle")
+        assert first["t_mono"] == 10.0 and first["cycle"] == 1
+        assert first["transfers"][1] == {"read_ok": True, "write_ok": True,
+                                         "read_offset_sec": 0.002, "pre": [600, 7],
+                                         "post": [600, 7]}
+        assert failed["transfers"][0]["read_ok"] and not failed["transfers"][0]["write_ok"]
+        assert failed["transfers"][1] == {"read_ok": False, "write_ok": False,
+                                          "read_offset_sec": 0.0, "pre": [0, 0],
+                                          "post": [0, 0]}
+        assert tampered["transfers"][1]["post"] == [650, 0xFFFF]
+        assert reloaded["transfers"] == [{"read_ok": True, "write_ok": True,
+                                          "read_offset_sec": 0.0005, "pre": [602],
+                                          "post": [70000 & 0xFFFF]}]
+
+    def test_truncated_final_record_is_ignored(self, recorded):
+        path, _ = recorded
+        path.write_bytes(path.read_bytes()[:-3])
+        assert sum(kind == "cycle" for kind, _ in read_log(path)) == 4
+
+    def test_not_a_log(self, tmp_path):
+        path = tmp_path / "other.log"
+        path.write_bytes(b"not a log")
+        with pytest.raises(ValueError, match="not a bridge recorder log"):
+            list(read_log(path))
+
+
+class TestBundle:
+    """The bundle has a row per cycle, blank cells for failed slots."""
+
+    def test_rows_and_events(self, recorded, tmp_path):
+        path, _ = recorded
+        out = log_to_bundle(path, tmp_path / "bundle")
+        with open(out / "tags.csv", newline="") as f:
+            rows = list(csv.reader(f))
+
+        header = rows[0]
+        assert header == ["timestamp_utc", "cycle",
+                          "ctrl_coil_40_pre", "ctrl_coil_41_pre", "ctrl_coil_42_pre",
+                          "sim_hr_200_post", "sim_hr_201_post", "sim_hr_202_post",
+                          "sim_hr_300_pre", "sim_hr_301_pre",
+                          "ctrl_hr_100_post", "ctrl_hr_101_post"]
+        assert rows[1][1:] == ["1", "1", "0", "1", "1", "0", "1", "600", "7", "600", "7"]
+        assert rows[2][1:] == ["2", "1", "1", "0", "", "", "", "", "", "", ""]
+        assert rows[3][1:] == ["3", "0", "0", "0", "0", "0", "0", "601", "7", "650", "65535"]
+        # The layout change starts a new header
+        assert rows[4] == ["timestamp_utc", "cycle", "sim_hr_300_pre", "ctrl_hr_100_post"]
+        assert rows[5][1:] == ["4", "602", str(70000 & 0xFFFF)]
+        assert rows[6][1:] == ["5", "603", "603"]
+
+        meta = json.loads((out / "meta.json").read_text())
+        assert meta["sample_count"] == 5 and meta["layout_count"] == 2
+        assert meta["duration_sec"] == pytest.approx(0.25, abs=1e-3)
+        assert meta["poll_interval_ms"] == 20
+
+        events = json.loads((out / "events.json").read_text())
+        assert [e["type"] for e in events] == ["layout", "filter", "layout", "filter"]
+        assert "cycle 3" in events[1]["msg"] and "diverge" in events[1]["msg"]
+        assert "cycle 5" in events[3]["msg"] and "match source again" in events[3]["msg"]
@@ -0,0 +1,9 @@
+"""
+SPHERE shared tooling for use-case scripts.
+
+Importable from any use case by putting the repository's tools/ directory
+on sys.path:
+
+    sys.path.insert(0, str(REPO_ROOT / "tools"))
+    from spherekit.invariants import StreamingChecker, load_rules
+"""
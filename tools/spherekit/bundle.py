@@ -0,0 +1,323 @@
+"""
+SPHERE run bundle output — one-pass, atomically published bundle files
+
+TagsWriter streams polled rows straight into the bundle directory.  Each
+output is written to a hidden .partial file next to its final name and
+renamed into place on close(), so tags.csv is written once (no temp copy)
+and a reader never sees a half-written file.  The same rows can feed, in
+the same pass:
+
+  - tags.csv.gz   gzip-compressed copy of tags.csv
+  - tags.npz      columnar copy: float64 array per tag (NaN = missing)
+                  plus the timestamp_utc strings
+
+and every row is kept in self.buffer (a ColumnBuffer) for in-memory
+consumers such as the invariant engine.  Pass keep=False when nothing
+reads the capture back, so a long run holds no rows in memory.
+
+    with TagsWriter(out_dir, header, gzip=True, columnar=True) as tags:
+        for row in rows:
+            tags.writerow(row)
+    tags.files      # {"tags_file": "tags.csv", "tags_gzip_file": ..., ...}
+
+Rows sit in the .partial file until close(), but are flushed and fsynced
+every FLUSH_ROWS rows or FLUSH_SEC seconds, whichever comes first, so a
+crash loses at most that much of the capture.
+
+RunBundleWriter is a TagsWriter that also writes the rest of the bundle.
+It publishes a meta.json with "complete": false as soon as it opens, keeps
+only running metadata between rows (row count, first and last timestamp)
+and the events, and finish() replaces meta.json ("complete": true) and
+publishes events.json once the capture is over:
+
+    bundle = RunBundleWriter(out_dir, header, keep=False)
+    for row in rows:
+        bundle.writerow(row)
+    bundle.add_event({"time_utc": ..., "type": "stop", "msg": "..."})
+    bundle.finish({"usecase_id": ..., "sample_count": bundle.rows,
+                   "start_utc": bundle.start_utc, "end_utc": bundle.end_utc})
+
+A bundle left behind by a crashed run (meta.json "complete": false, rows in
+.tags.csv.partial) is recovered with recover_bundle(), or from the command
+line: the last full row is kept, tags.csv is published and meta.json gets
+the row count with "complete": false and "recovered": true.
+
+    python -m spherekit.bundle --recover runs/validate-nominal
+"""
+
+import argparse
+import csv
+import gzip as gzip_module
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from .columns import TIME_COLUMN, ColumnBuffer
+
+# tags.csv rows are short; a larger buffer batches them into fewer writes
+BUFFER_SIZE = 1 << 16
+# ...but rows reach the disk at least this often
+FLUSH_ROWS = 100
+FLUSH_SEC = 5.0
+
+
+def _partial(path):
+    path = Path(path)
+    return path.with_name(f".{path.name}.partial")
+
+
+def atomic_write_bytes(path, data):
+    """Write a file by writing a sibling .partial file and renaming it."""
+    tmp = _partial(path)
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_text(path, text):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path, obj):
+    atomic_write_text(path, json.dumps(obj, indent=2) + "\n")
+
+
+class TagsWriter:
+    """Stream tags rows into a bundle, publishing each output on close."""
+
+    def __init__(self, bundle_dir, header, name="tags.csv", gzip=False, columnar=False,
+                 compresslevel=6, keep=True, flush_rows=FLUSH_ROWS, flush_sec=FLUSH_SEC):
+        self.dir = Path(bundle_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.header = list(header)
+        self.path = self.dir / name
+        self.gzip_path = self.dir / f"{name}.gz" if gzip else None
+        self.npz_path = self.path.with_suffix(".npz") if columnar else None
+        # The columnar copy is built from the buffer, so it forces keep
+        self.buffer = ColumnBuffer(self.header) if keep or columnar else None
+        self.rows = 0
+        self.closed = False
+        self.flush_rows = flush_rows
+        self.flush_sec = flush_sec
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line)
+        self._file = open(_partial(self.path), "w", newline="", encoding="utf-8",
+                          buffering=BUFFER_SIZE)
+        self._gz = None
+        if self.gzip_path is not None:
+            self._gz = gzip_module.open(_partial(self.gzip_path), "wt", newline="",
+                                        encoding="utf-8", compresslevel=compresslevel)
+        self._emit(self.header)
+
+    @property
+    def files(self):
+        """Bundle-relative names of the outputs, keyed for meta.json."""
+        files = {"tags_file": self.path.name}
+        if self.gzip_path is not None:
+            files["tags_gzip_file"] = self.gzip_path.name
+        if self.npz_path is not None:
+            files["tags_columnar_file"] = self.npz_path.name
+        return files
+
+    def _emit(self, values):
+        self._line.seek(0)
+        self._line.truncate()
+        self._csv.writerow(values)
+        line = self._line.getvalue()
+        self._file.write(line)
+        if self._gz is not None:
+            self._gz.write(line)
+
+    def writerow(self, row):
+        """Write one row (dict keyed by header column)."""
+        self._emit([row.get(c, "") for c in self.header])
+        if self.buffer is not None:
+            self.buffer.append(row)
+        self.rows += 1
+        self._unflushed += 1
+        if (self._unflushed >= self.flush_rows
+                or time.monotonic() - self._flushed_at >= self.flush_sec):
+            self.flush()
+
+    def flush(self):
+        """Push buffered tags.csv rows to disk (fsync), still under the .partial name.
+
+        The .gz copy is not flushed: a sync flush every few rows would cost
+        compression, and recovery rebuilds nothing from it.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        """Finish all outputs and rename them into place."""
+        if self.closed:
+            return
+        self.closed = True
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(_partial(self.path), self.path)
+        if self._gz is not None:
+            self._gz.close()
+            os.replace(_partial(self.gzip_path), self.gzip_path)
+        if self.npz_path is not None:
+            arrays = self.buffer.arrays()
+            arrays[self.buffer.time_column] = np.array(self.buffer.timestamps, dtype=str)
+            tmp = _partial(self.npz_path)
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, self.npz_path)
+
+    def discard(self):
+        """Drop all outputs without publishing them."""
+        if not self.closed:
+            self.closed = True
+            self._file.close()
+            if self._gz is not None:
+                self._gz.close()
+        for path in (self.path, self.gzip_path, self.npz_path):
+            if path is not None:
+                _partial(path).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class RunBundleWriter(TagsWriter):
+    """Stream a run bundle: tags rows as they arrive, meta.json and events.json at the end."""
+
+    def __init__(self, bundle_dir, header, time_column=TIME_COLUMN, **options):
+        super().__init__(bundle_dir, header, **options)
+        self.time_column = time_column
+        self.events = []
+        self.start_utc = None
+        self.end_utc = None
+        # Marks the bundle as in progress until finish() replaces it
+        atomic_write_json(self.dir / "meta.json", {
+            "complete": False,
+            "created_utc": datetime.now(timezone.utc).isoformat(),
+            **self.files,
+        })
+
+    def writerow(self, row):
+        super().writerow(row)
+        ts = row.get(self.time_column)
+        if ts:
+            if self.start_utc is None:
+                self.start_utc = ts
+            self.end_utc = ts
+
+    def add_event(self, event):
+        """Record one events.json entry."""
+        self.events.append(event)
+
+    def finish(self, meta, events=None):
+        """Close the tags outputs, then publish meta.json and events.json.
+
+        meta is extended with the tags file names and events_file; events
+        defaults to those recorded with add_event().
+        """
+        self.close()
+        meta = {**meta, **self.files, "events_file": "events.json", "complete": True}
+        atomic_write_json(self.dir / "meta.json", meta)
+        atomic_write_json(self.dir / "events.json", self.events if events is None else events)
+        return meta
+
+    def discard(self):
+        """Drop all outputs, including the in-progress meta.json."""
+        super().discard()
+        meta = self.dir / "meta.json"
+        try:
+            if not json.loads(meta.read_text()).get("complete", True):
+                meta.unlink()
+        except (OSError, ValueError):
+            pass
+
+
+# ── Crash recovery ───────────────────────────────────────────────────
+
+def recover_bundle(bundle_dir, name="tags.csv", time_column=TIME_COLUMN):
+    """Publish the rows a crashed run left in .<name>.partial.
+
+    Keeps every complete line (a torn last line is dropped), renames the
+    file into place, drops a partial .gz copy (it can be rebuilt from the
+    CSV) and rewrites meta.json with the recovered row count and time span,
+    "complete": false and "recovered": true.  Returns the new meta.json
+    contents; raises FileNotFoundError if there is nothing to recover.
+    """
+    out = Path(bundle_dir)
+    path = out / name
+    partial = _partial(path)
+    if not partial.exists():
+        raise FileNotFoundError(f"{partial}: no partial {name} to recover")
+    data = partial.read_bytes()
+    data = data[:data.rfind(b"\n") + 1]
+    with open(partial, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+    _partial(out / f"{name}.gz").unlink(missing_ok=True)
+
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    header, body = (rows[0], rows[1:]) if rows else ([], [])
+    col = header.index(time_column) if time_column in header else None
+    meta_path = out / "meta.json"
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        meta = {}
+    meta.update({
+        "complete": False,
+        "recovered": True,
+        "recovered_utc": datetime.now(timezone.utc).isoformat(),
+        "tags_file": name,
+        "sample_count": len(body),
+        "start_utc": body[0][col] if body and col is not None else None,
+        "end_utc": body[-1][col] if body and col is not None else None,
+    })
+    meta.pop("tags_gzip_file", None)
+    meta.pop("tags_columnar_file", None)
+    atomic_write_json(meta_path, meta)
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recover run bundles left by a crashed run")
+    parser.add_argument("--recover", nargs="+", required=True, metavar="BUNDLE_DIR",
+                        help="Bundle directory holding a .tags.csv.partial")
+    parser.add_argument("--name", default="tags.csv", help="Tags file name (default: tags.csv)")
+    args = parser.parse_args()
+
+    failed = 0
+    for bundle_dir in args.recover:
+        try:
+            meta = recover_bundle(bundle_dir, args.name)
+        except (FileNotFoundError, UnicodeDecodeError) as e:
+            print(f"{bundle_dir}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"{bundle_dir}: recovered {meta['sample_count']} rows "
+              f"({meta['start_utc']} .. {meta['end_utc']})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
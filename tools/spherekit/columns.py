@@ -0,0 +1,61 @@
+"""
+SPHERE column buffer — polled rows held as float64 columns
+
+Harnesses and collectors append each polled row (a dict keyed by column,
+as written to tags.csv) and hand the whole capture to column-wise
+consumers such as the invariant engine without re-reading tags.csv.
+Values are stored as float64; missing values ("" / None, e.g. a failed
+read) become NaN.
+
+    buf = ColumnBuffer(header)          # header includes timestamp_utc
+    for row in rows:
+        buf.append(row)
+    arrays = buf.arrays()               # {column: np.ndarray}
+"""
+
+import csv
+from array import array
+
+import numpy as np
+
+TIME_COLUMN = "timestamp_utc"
+NAN = float("nan")
+
+
+class ColumnBuffer:
+    """Append-only float64 columns plus the row timestamps."""
+
+    def __init__(self, columns, time_column=TIME_COLUMN):
+        self.time_column = time_column
+        self.columns = [c for c in columns if c != time_column]
+        self.timestamps = []
+        self._data = {c: array("d") for c in self.columns}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, row):
+        self.timestamps.append(row.get(self.time_column, ""))
+        for column, data in self._data.items():
+            value = row.get(column)
+            if value is None or value == "":
+                data.append(NAN)
+            else:
+                try:
+                    data.append(float(value))
+                except (TypeError, ValueError):
+                    data.append(NAN)
+
+    def arrays(self):
+        """Return {column: float64 array} (copies; the buffer stays appendable)."""
+        return {c: np.array(d, dtype=np.float64) for c, d in self._data.items()}
+
+    @classmethod
+    def from_csv(cls, path, time_column=TIME_COLUMN):
+        """Load a tags.csv file into a buffer."""
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            buf = cls(reader.fieldnames or [], time_column)
+            for row in reader:
+                buf.append(row)
+        return buf
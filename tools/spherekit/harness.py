@@ -0,0 +1,690 @@
+"""
+SPHERE validation harness core — the parts every use case's harness shares
+
+A use case's validation_harness.py keeps only what differs per use case
+(default paths, its bridge, extra run modes) and drives a run through this
+module:
+
+    parser = argparse.ArgumentParser(description="SPHERE Validation Harness")
+    add_arguments(parser, profile=..., modbus_map=..., tag_contract=...,
+                  backend_map=..., rules=...)
+    args = parser.parse_args()
+    run = prepare_run(args)                       # tag table, rules, scenario
+    ctrl, sim = parse_host_port(args.controller, 502), parse_host_port(args.simulator, 503)
+    bridge = None if args.no_bridge else ModbusBridge(*ctrl, *sim, args.cycle_ms)
+    events = run_live(args, run, ctrl, sim, bridge)
+    finish_run(args, run, events, profile)        # invariant report, meta.json
+
+Tag polling: the tag table lives in the use case's Modbus map (harness_tags),
+one entry per tags.csv column: {column, plc, register_type, address}.
+Entries on the same PLC and register type are coalesced into block reads,
+bridging small gaps of unused addresses, so each sample costs a handful of
+round trips.
+
+Requires PyYAML and NumPy; live runs also need pymodbus.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from .bundle import RunBundleWriter, TagsWriter
+from .invariants import RuleError, StreamingChecker, check_columns, load_rules, write_report
+from .scenario import AddressBook, ScenarioError, ScheduleRunner, SettleDetector, load_scenario
+
+log = logging.getLogger("validation_harness")
+
+
+class HarnessError(RuntimeError):
+    """A run cannot start (bad inputs or unreachable PLCs)."""
+
+
+# ── Tag polling ──────────────────────────────────────────────────────
+
+# Largest run of unused addresses a block read may span, and the Modbus
+# per-request quantity limits.
+READ_GAP = {"holding_register": 16, "coil": 64}
+READ_MAX = {"holding_register": 125, "coil": 2000}
+
+ReadBlock = namedtuple("ReadBlock", "plc register_type address count tags")
+
+
+def read_hr(client, address, count):
+    """Read holding registers, return list or None."""
+    try:
+        rr = client.read_holding_registers(address, count=count)
+        if rr is None or rr.isError():
+            return None
+        return list(rr.registers[:count])
+    except Exception:
+        return None
+
+
+def read_coils(client, address, count):
+    """Read coils, return list of 0/1 or None."""
+    try:
+        rr = client.read_coils(address, count=count)
+        if rr is None or rr.isError():
+            return None
+        return [1 if b else 0 for b in rr.bits[:count]]
+    except Exception:
+        return None
+
+
+READERS = {"holding_register": read_hr, "coil": read_coils}
+
+
+def load_tag_table(map_path):
+    """Load the harness tag table from a Modbus map YAML file."""
+    with open(map_path) as f:
+        data = yaml.safe_load(f) or {}
+    tags = data.get("harness_tags")
+    if not tags:
+        raise ValueError(f"{map_path}: no harness_tags section")
+    seen = set()
+    for tag in tags:
+        if tag.get("plc") not in ("ctrl", "sim"):
+            raise ValueError(f"{map_path}: {tag.get('column')}: plc must be ctrl or sim")
+        if tag.get("register_type") not in READERS:
+            raise ValueError(f"{map_path}: {tag.get('column')}: unsupported register_type "
+                             f"{tag.get('register_type')}")
+        if tag["column"] in seen:
+            raise ValueError(f"{map_path}: duplicate column {tag['column']}")
+        seen.add(tag["column"])
+    return tags
+
+
+def tag_header(tags):
+    """Return the tags.csv header for a tag table."""
+    return ["timestamp_utc"] + [tag["column"] for tag in tags]
+
+
+def build_read_plan(tags):
+    """Coalesce a tag table into a list of ReadBlocks.
+
+    Each block's tags are (column, offset) pairs into the values it reads.
+    """
+    plan = []
+    ordered = sorted(tags, key=lambda t: (t["plc"], t["register_type"], t["address"]))
+    for tag in ordered:
+        kind = tag["register_type"]
+        last = plan[-1] if plan else None
+        if (last is not None and last.plc == tag["plc"] and last.register_type == kind
+                and tag["address"] - (last.address + last.count) <= READ_GAP[kind]
+                and tag["address"] - last.address < READ_MAX[kind]):
+            count = max(last.count, tag["address"] - last.address + 1)
+            last.tags.append((tag["column"], tag["address"] - last.address))
+            plan[-1] = last._replace(count=count)
+        else:
+            plan.append(ReadBlock(tag["plc"], kind, tag["address"], 1,
+                                  [(tag["column"], 0)]))
+    return plan
+
+
+def poll_tags(ctrl_client, sim_client, plan, ts=None, timing=None, executor=None):
+    """Poll all tags with a read plan and return a dict keyed by column.
+
+    ts is the sample's UTC timestamp string; defaults to now.  If timing
+    is a list it receives one (send, receive) time.monotonic() pair per
+    block, in plan order.  With an executor (two workers) the controller
+    and simulator blocks are read concurrently, each PLC on its own client.
+    """
+    if ts is None:
+        ts = datetime.now(timezone.utc).isoformat()
+    row = {"timestamp_utc": ts}
+    clients = {"ctrl": ctrl_client, "sim": sim_client}
+
+    def read_blocks(indexed):
+        results = []
+        for i, block in indexed:
+            sent = time.monotonic()
+            values = READERS[block.register_type](clients[block.plc], block.address, block.count)
+            results.append((i, values, sent, time.monotonic()))
+        return results
+
+    indexed = list(enumerate(plan))
+    if executor is None:
+        results = read_blocks(indexed)
+    else:
+        futures = [executor.submit(read_blocks, [(i, b) for i, b in indexed if b.plc == plc])
+                   for plc in ("ctrl", "sim")]
+        results = sorted(r for f in futures for r in f.result())
+
+    for i, values, sent, received in results:
+        for column, offset in plan[i].tags:
+            row[column] = values[offset] if values else ""
+        if timing is not None:
+            timing.append((sent, received))
+
+    return row
+
+
+def timing_header(plan):
+    """Header of the read_timing.csv sidecar for a read plan."""
+    header = ["sample", "timestamp_utc", "skew_ms", "span_ms"]
+    for block in plan:
+        kind = "hr" if block.register_type == "holding_register" else "coil"
+        name = f"{block.plc}_{kind}{block.address}"
+        header += [f"{name}_send_ms", f"{name}_recv_ms"]
+    return header
+
+
+def timing_row(header, sample, ts, ref, timing):
+    """One read_timing.csv row.
+
+    Send/receive times are ms after ref (the monotonic time the row is
+    stamped with).  skew_ms is the spread of the reads' midpoints, i.e. how
+    far apart in time the row's values were sampled; span_ms is first send
+    to last receive.
+    """
+    mids = [(sent + received) / 2 for sent, received in timing]
+    row = {
+        "sample": sample,
+        "timestamp_utc": ts,
+        "skew_ms": round((max(mids) - min(mids)) * 1000, 3),
+        "span_ms": round((max(r for _, r in timing) - min(s for s, _ in timing)) * 1000, 3),
+    }
+    for (sent, received), send_col, recv_col in zip(timing, header[4::2], header[5::2]):
+        row[send_col] = round((sent - ref) * 1000, 3)
+        row[recv_col] = round((received - ref) * 1000, 3)
+    return row
+
+
+# ── Timeline ─────────────────────────────────────────────────────────
+
+class RunClock:
+    """Shared run clock: monotonic elapsed time anchored to wall-clock UTC.
+
+    Sampling and timeline threads both timestamp against the same anchor,
+    so tags.csv rows and events.json entries are directly comparable.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.wall_start = time.time()
+
+    def elapsed(self, t=None):
+        return (time.monotonic() if t is None else t) - self.start
+
+    def utc(self, elapsed):
+        return datetime.fromtimestamp(self.wall_start + elapsed, tz=timezone.utc).isoformat()
+
+    def sleep_until(self, elapsed, stop, spin=0.002):
+        """Sleep until elapsed seconds into the run; returns False if stopped.
+
+        Waits on the stop event until spin seconds before the deadline,
+        then spins so the wake-up lands within a fraction of a millisecond.
+        """
+        deadline = self.start + elapsed
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return not stop.is_set()
+            if remaining > spin:
+                if stop.wait(remaining - spin):
+                    return False
+
+
+class TimelineRunner(threading.Thread):
+    """Dispatch the compiled timeline at its absolute times.
+
+    Runs beside the sampling loop with its own Modbus connections (the
+    pymodbus sync client is not thread-safe), so a slow action never
+    delays a sample and a slow sample never delays an action.
+    """
+
+    def __init__(self, steps, clock, ctrl_client, sim_client):
+        super().__init__(name="timeline", daemon=True)
+        self.schedule = ScheduleRunner(steps, {"ctrl": ctrl_client, "sim": sim_client}, clock.utc)
+        self.clock = clock
+        self._halt = threading.Event()
+
+    @property
+    def events(self):
+        return self.schedule.events
+
+    def stop(self):
+        self._halt.set()
+
+    def run(self):
+        while True:
+            due = self.schedule.next_due()
+            if due is None or not self.clock.sleep_until(due, self._halt):
+                return
+            for event in self.schedule.fire(self.clock.elapsed()):
+                log.info("t=%.3fs  %s", event["time_sec"], event["description"])
+
+
+# ── Initial conditions ───────────────────────────────────────────────
+
+# Initial-condition loading: read-back poll interval and the settle detector's
+# window (consecutive reads that must agree)
+SETTLE_POLL_SEC = 0.2
+SETTLE_SAMPLES = 5
+
+
+def apply_initial_conditions(clients, initial, settle_timeout=10.0, tolerance=1.0):
+    """Load a scenario's initial conditions and hold them until they settle.
+
+    initial is the compiled InitialState: writable tags go out as
+    coalesced multi-register writes, then one block read per PLC and
+    register type reads every condition back.  On live PLCs the writes are
+    repeated every SETTLE_POLL_SEC (the simulator's force path) and each
+    read-back is taken a poll interval after its write, so a value the ST
+    logic overwrites on its next scan shows up as off target.  The
+    conditions are honoured once SETTLE_SAMPLES consecutive reads agree
+    within tolerance and are all on target; otherwise the run continues
+    from whatever state the PLCs hold.  settle_timeout 0 writes and reads
+    back once (a virtual plant applies writes immediately).
+
+    Returns the meta.json "initial_state" record, or None without initial
+    conditions: {"honoured": bool, "not_held": {tag: {"wanted", "got"}}}.
+    """
+    if not initial:
+        return None
+    started = time.monotonic()
+    detector = SettleDetector(tolerance, SETTLE_SAMPLES)
+    while True:
+        try:
+            initial.apply(clients)
+        except Exception as e:
+            log.warning("Initial condition writes failed: %s", e)
+        if settle_timeout > 0:
+            time.sleep(SETTLE_POLL_SEC)
+        values = initial.read(clients)
+        off = initial.mismatches(values, tolerance)
+        settled = detector.feed(values)
+        if settle_timeout <= 0 or (settled and not off):
+            break
+        if time.monotonic() - started >= settle_timeout:
+            log.warning("Initial conditions did not hold within %.1fs", settle_timeout)
+            break
+
+    if off:
+        log.warning("Initial conditions not honoured, run starts from the PLCs' own state: %s",
+                    ", ".join(f"{tag} = {'?' if got is None else f'{got:g}'} (wanted {want:g})"
+                              for tag, (want, got) in off.items()))
+    else:
+        log.info("Initial conditions held (%d writes, %d tags verified) in %.2fs",
+                 len(initial.writes), len(values), time.monotonic() - started)
+    return {"honoured": not off,
+            "not_held": {tag: {"wanted": want, "got": got} for tag, (want, got) in off.items()}}
+
+
+# ── Bundle writer ────────────────────────────────────────────────────
+
+def write_bundle(bundle, scenario, events, data_files=None, invariant_report=None,
+                 profile=None, backend_type="openplc"):
+    """Finish the run bundle streaming through bundle (a RunBundleWriter).
+
+    The tags outputs are already in place; data_files holds extra meta.json
+    entries (sidecar file names, the initial_state record).  meta.json and events.json are renamed into
+    place.
+    """
+    out = bundle.dir
+
+    # meta.json
+    meta = {
+        "usecase_id": scenario.get("scenario_id", "unknown"),
+        "description": scenario.get("description", ""),
+        "backend_type": backend_type,
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "duration_sec": scenario.get("duration_sec", 0),
+        "poll_interval_ms": scenario.get("poll_interval_ms", 500),
+        "sample_count": bundle.rows,
+        "start_utc": bundle.start_utc,
+        "end_utc": bundle.end_utc,
+        **(data_files or {}),
+        "bundle_schema_version": "1.1.0",
+    }
+
+    # Add profile metadata if available
+    if profile is not None:
+        meta["profile_name"] = profile.metadata.name
+        meta["params_snapshot"] = profile.to_snapshot()
+
+    # meta.json, events.json
+    bundle.finish(meta, events)
+
+    # Copy scenario for traceability
+    artifacts = out / "artifacts" / "model-validate"
+    artifacts.mkdir(parents=True, exist_ok=True)
+    if invariant_report:
+        for fname in ("report.json", "report.md"):
+            src = Path(invariant_report) / fname
+            dst = artifacts / fname
+            if src.exists() and src.resolve() != dst.resolve():
+                shutil.copy2(src, dst)
+
+    log.info("Bundle written to %s", out)
+
+
+# ── Invariant check ─────────────────────────────────────────────────
+
+def load_invariant_rules(rules_path):
+    """Parse the invariant rules once, or None if there is no rules file.
+
+    A rules file that exists but does not parse raises HarnessError: the
+    run would otherwise go ahead with no invariant checking at all.
+    """
+    if not rules_path or not os.path.exists(rules_path):
+        log.warning("Invariant rules not found at %s, skipping", rules_path)
+        return None
+    try:
+        ruleset = load_rules(rules_path)
+    except RuleError as e:
+        raise HarnessError(f"Cannot use invariant rules: {e}") from e
+    log.info("Loaded %d invariant rules from %s", len(ruleset.rules), rules_path)
+    return ruleset
+
+
+def run_invariant_check(ruleset, samples, output_dir, checker=None):
+    """Evaluate the rules over the buffered samples and write the report.
+
+    Runs in-process on the column buffer (no re-read of tags.csv).  Returns
+    the report directory.
+    """
+    report_dir = os.path.join(output_dir, "artifacts", "model-validate")
+    started = time.perf_counter()
+    report = check_columns(ruleset, samples.arrays(), samples.timestamps,
+                           source_bundle=Path(output_dir).name,
+                           abort_reason=checker.abort_reason if checker else None)
+    write_report(report, report_dir)
+    if report["rules_skipped"]:
+        log.warning("Rules skipped (tags not captured): %s", ", ".join(report["rules_skipped"]))
+    log.info("Invariant check: %d violations in %d samples (%.1f ms)",
+             report["total_violations"], report["total_samples"],
+             (time.perf_counter() - started) * 1000)
+    return report_dir
+
+
+def check_sample(checker, row, elapsed):
+    """Feed one sample to the checker; returns False when the run should stop."""
+    if checker is None:
+        return True
+    for v in checker.feed(row):
+        log.warning("t=%.1fs  invariant %s (%s): %s",
+                    elapsed, v["rule_id"], v["severity"], v["message"])
+    if checker.aborted:
+        log.error("Fatal invariant violation (%s), stopping run", checker.abort_reason)
+        return False
+    return True
+
+
+# ── Run setup ────────────────────────────────────────────────────────
+
+def add_arguments(parser, profile, modbus_map, tag_contract, backend_map, rules):
+    """Add the options every harness shares, with the use case's default paths."""
+    parser.add_argument("--scenario", required=True, help="Scenario YAML file")
+    parser.add_argument("--output", required=True, help="Output run bundle directory")
+    parser.add_argument("--profile", default=os.environ.get("SIM_PROFILE", profile),
+                        help="Simulation profile YAML (default: realistic)")
+    parser.add_argument("--controller", default=os.environ.get("CONTROLLER_ADDR", "controller:502"))
+    parser.add_argument("--simulator", default=os.environ.get("SIMULATOR_ADDR", "simulator:503"))
+    parser.add_argument("--cycle-ms", type=int, default=100, help="Bridge cycle time")
+    parser.add_argument("--modbus-map", default=modbus_map,
+                        help="Modbus map with the harness_tags table")
+    parser.add_argument("--tag-contract", default=tag_contract,
+                        help="Tag contract used to resolve scenario tag names")
+    parser.add_argument("--backend-map", default=backend_map,
+                        help="Backend map (tag -> register) used to resolve scenario tag names")
+    parser.add_argument("--settle-timeout", type=float, default=10.0,
+                        help="Max seconds to hold initial conditions until they settle "
+                             "(0 = write and check once)")
+    parser.add_argument("--settle-tolerance", type=float, default=1.0,
+                        help="Initial-condition read-back and settle tolerance (engineering units)")
+    parser.add_argument("--invariant-rules", default=os.environ.get("INVARIANT_RULES", rules))
+    parser.add_argument("--tags-gzip", action="store_true",
+                        help="Also write tags.csv.gz in the same pass")
+    parser.add_argument("--tags-npz", action="store_true",
+                        help="Also write columnar tags.npz in the same pass")
+    parser.add_argument("--read-timing", action="store_true",
+                        help="Write per-read send/receive times and row skew to read_timing.csv")
+    parser.add_argument("--concurrent-reads", action="store_true",
+                        help="Read controller and simulator concurrently to minimise row skew")
+    parser.add_argument("--abort-on-fatal", action="store_true",
+                        help="Stop the run at the first violation of a fatal-severity rule")
+    parser.add_argument("--no-bridge", action="store_true", help="Assume bridge is running externally")
+    parser.add_argument("-v", "--verbose", action="store_true")
+
+
+class MinimalProfile:
+    """Profile metadata read straight from the YAML when sim.primitives is missing."""
+
+    class Metadata:
+        def __init__(self, data):
+            self.name = data.get("metadata", {}).get("name", "unknown")
+            self.version = data.get("metadata", {}).get("version", "1.0.0")
+
+    def __init__(self, data):
+        self.metadata = self.Metadata(data)
+        self._data = data
+
+    def to_snapshot(self):
+        return self._data
+
+
+def load_profile_metadata(path, loader=None):
+    """Load a simulation profile for meta.json, or None without one.
+
+    loader is sim.primitives.load_profile when the enclave model is
+    importable; otherwise the profile is recorded as MinimalProfile.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    if loader is not None:
+        try:
+            profile = loader(path)
+            log.info("Loaded profile: %s (v%s)", profile.metadata.name, profile.metadata.version)
+            return profile
+        except Exception as e:
+            log.warning("Failed to load profile %s: %s", path, e)
+            return None
+    log.warning("sim.primitives not available, profile metadata will be limited")
+    # Still record profile path even without full parsing
+    with open(path) as f:
+        profile = MinimalProfile(yaml.safe_load(f) or {})
+    log.info("Loaded profile (limited): %s", profile.metadata.name)
+    return profile
+
+
+# meta holds run-specific meta.json entries filled in while the run goes
+PreparedRun = namedtuple("PreparedRun", "scenario steps initial read_plan ruleset checker "
+                                        "bundle read_timing meta")
+
+
+def prepare_run(args, read_timing=True):
+    """Load the tag table, rules and scenario, and open the run bundle.
+
+    Everything that can fail on bad inputs fails here, before anything
+    connects; raises HarnessError.  read_timing=False skips the
+    read_timing.csv sidecar even with --read-timing (runs whose reads are
+    not timed).
+    """
+    # Tag table and read plan
+    try:
+        tag_table = load_tag_table(args.modbus_map)
+    except (OSError, ValueError) as e:
+        raise HarnessError(f"Cannot load tag table: {e}") from e
+    header = tag_header(tag_table)
+    read_plan = build_read_plan(tag_table)
+    log.info("Polling %d tags with %d block reads", len(tag_table), len(read_plan))
+
+    # Rules are parsed once: streamed live per sample, then evaluated over
+    # the whole capture for the report
+    ruleset = load_invariant_rules(args.invariant_rules)
+    checker = StreamingChecker(ruleset, header, args.abort_on_fatal) if ruleset else None
+
+    # Load and compile the scenario before anything connects, so a bad
+    # action or tag name fails here rather than mid-run
+    try:
+        book = AddressBook.load(args.tag_contract, [args.backend_map, args.modbus_map])
+        scenario, steps, initial = load_scenario(args.scenario, book)
+    except ScenarioError as e:
+        raise HarnessError(f"Cannot compile scenario: {e}") from e
+    for name, entry in book.actions.items():
+        if "record" in entry and any(s.action.startswith(name + ":") for s in steps):
+            log.warning("%s has no register to write (%s); recorded as an event only",
+                        name, entry["record"])
+
+    log.info("Scenario: %s", scenario.get("scenario_id", "?"))
+    log.info("Duration: %ds, poll: %dms",
+             scenario.get("duration_sec", 0),
+             scenario.get("poll_interval_ms", 500))
+    log.info("Timeline: %d steps, %d writes", len(steps), sum(len(s.writes) for s in steps))
+
+    # Rows are only held in memory when the invariant check reads them back
+    bundle = RunBundleWriter(args.output, header, gzip=args.tags_gzip, columnar=args.tags_npz,
+                             keep=ruleset is not None)
+    timing = None
+    if args.read_timing and read_timing:
+        timing = TagsWriter(args.output, timing_header(read_plan), name="read_timing.csv")
+    return PreparedRun(scenario, steps, initial, read_plan, ruleset, checker, bundle, timing, {})
+
+
+def discard_run(run):
+    """Drop a prepared run's outputs without publishing them."""
+    run.bundle.discard()
+    if run.read_timing:
+        run.read_timing.discard()
+
+
+def finish_run(args, run, events, profile=None, backend_type="openplc"):
+    """Run the invariant check over the capture and write the bundle."""
+    report_dir = None
+    if run.ruleset is not None:
+        report_dir = run_invariant_check(run.ruleset, run.bundle.buffer, args.output, run.checker)
+    extra = dict(run.meta)
+    if run.read_timing:
+        extra["read_timing_file"] = run.read_timing.path.name
+    write_bundle(run.bundle, run.scenario, events, extra, report_dir, profile, backend_type)
+
+
+# ── Collection ──────────────────────────────────────────────────────
+
+def run_live(args, run, ctrl_addr, sim_addr, bridge=None):
+    """Run the scenario against the PLCs in real time; returns the events.
+
+    ctrl_addr and sim_addr are (host, port) pairs.  bridge is the use
+    case's (not yet connected) Modbus bridge, or None when one runs
+    externally.  Samples go to run.bundle, which is closed
+    when collection ends, and per-read timing to run.read_timing when
+    given.  Raises HarnessError, with the outputs discarded, if the bridge
+    or the polling clients cannot connect.
+    """
+    from pymodbus.client import ModbusTcpClient
+
+    (ctrl_host, ctrl_port), (sim_host, sim_port) = ctrl_addr, sim_addr
+    bundle, read_timing, checker = run.bundle, run.read_timing, run.checker
+
+    # Connect Modbus clients for polling, plus a separate pair for the
+    # timeline thread
+    ctrl_client = ModbusTcpClient(ctrl_host, port=ctrl_port, timeout=3)
+    sim_client = ModbusTcpClient(sim_host, port=sim_port, timeout=3)
+    action_ctrl = ModbusTcpClient(ctrl_host, port=ctrl_port, timeout=3)
+    action_sim = ModbusTcpClient(sim_host, port=sim_port, timeout=3)
+
+    # Start bridge (unless external)
+    if bridge is not None:
+        if not bridge.connect(retries=30):
+            discard_run(run)
+            raise HarnessError("Bridge failed to connect")
+        bridge.start()
+        log.info("Bridge started")
+
+    # Connect polling clients
+    for attempt in range(30):
+        c_ok = ctrl_client.connect() and action_ctrl.connect()
+        s_ok = sim_client.connect() and action_sim.connect()
+        if c_ok and s_ok:
+            break
+        time.sleep(1)
+    else:
+        if bridge is not None:
+            bridge.stop()
+            bridge.disconnect()
+        discard_run(run)
+        raise HarnessError("Polling clients failed to connect")
+
+    # Apply initial conditions
+    initial_state = apply_initial_conditions({"ctrl": ctrl_client, "sim": sim_client}, run.initial,
+                                             args.settle_timeout, args.settle_tolerance)
+    if initial_state is not None:
+        run.meta["initial_state"] = initial_state
+
+    # Prepare data collection
+    duration = run.scenario.get("duration_sec", 60)
+    poll_ms = run.scenario.get("poll_interval_ms", 500)
+    poll_sec = poll_ms / 1000.0
+
+    log.info("Starting data collection for %ds...", duration)
+    clock = RunClock()
+    runner = TimelineRunner(run.steps, clock, action_ctrl, action_sim)
+    runner.start()
+    stop = threading.Event()
+    samples = 0
+    late = 0
+    executor = ThreadPoolExecutor(2, thread_name_prefix="poll") if args.concurrent_reads else None
+
+    try:
+        with bundle:
+            # Samples sit on a fixed grid of the shared clock
+            slot = 0
+            while slot * poll_sec < duration:
+                if not clock.sleep_until(slot * poll_sec, stop):
+                    break
+                elapsed = clock.elapsed()
+                timing = [] if read_timing else None
+                row = poll_tags(ctrl_client, sim_client, run.read_plan, ts=clock.utc(elapsed),
+                                timing=timing, executor=executor)
+                bundle.writerow(row)
+                if read_timing:
+                    read_timing.writerow(timing_row(read_timing.header, samples, row["timestamp_utc"],
+                                                    clock.start + elapsed, timing))
+                samples += 1
+                if not check_sample(checker, row, elapsed):
+                    break
+
+                # Skip grid slots that already passed instead of bursting
+                slot += 1
+                now = clock.elapsed()
+                if now > slot * poll_sec:
+                    late += 1
+                    slot = int(now // poll_sec) + 1
+
+    except KeyboardInterrupt:
+        log.info("Interrupted")
+    finally:
+        runner.stop()
+        runner.join(timeout=5)
+        if executor:
+            executor.shutdown()
+        if read_timing:
+            read_timing.close()
+        ctrl_client.close()
+        sim_client.close()
+        action_ctrl.close()
+        action_sim.close()
+        if bridge is not None:
+            bridge.stop()
+            bridge.disconnect()
+
+    events = sorted(runner.events, key=lambda e: e["time_sec"])
+    if late:
+        log.warning("%d of %d samples overran the poll interval", late, samples)
+    log.info("Collection done: %.1fs, %d samples, %d events", clock.elapsed(), samples, len(events))
+    if read_timing and read_timing.rows:
+        skew = read_timing.buffer.arrays()["skew_ms"]
+        log.info("Read skew: mean %.1fms, p99 %.1fms, max %.1fms (%s reads)",
+                 skew.mean(), np.percentile(skew, 99), skew.max(),
+                 "concurrent" if executor else "sequential")
+    return events
@@ -0,0 +1,569 @@
+"""
+SPHERE invariant engine — in-process evaluation of invariant rules
+
+Rules file (YAML):
+
+    name: water-treatment
+    rules:
+      - id: RW_LEVEL_RANGE
+        type: range
+        tag: RW_Tank_Level
+        min: 0
+        max: 1250
+        severity: error          # warning | error | fatal (default: error)
+      - id: PUMP_RUNNING_FLOW
+        type: correlation        # while `when` holds, `then` must hold
+        when: {tag: RW_Pump_Sts, eq: 1}
+        then: {tag: RW_Pump_Flow, gt: 0}
+        grace_samples: 4         # consecutive mismatches tolerated
+      - id: RW_LEVEL_ROC
+        type: rate_of_change
+        tag: RW_Tank_Level
+        max_delta: 50            # absolute change per sample
+      - id: PUMP_START_STATUS
+        type: causality          # rising edge of `cause` → `effect` within N samples
+        cause: {tag: RW_Pump_Start_Cmd, eq: 1}
+        effect: {tag: RW_Pump_Sts, eq: 1}
+        within_samples: 10
+
+A condition is {tag: NAME, <op>: VALUE} with op one of eq, ne, gt, ge, lt,
+le; a list of conditions must all hold.  Samples whose value is missing
+(empty string / None, e.g. a failed read) are skipped by the rules that
+need it.  Rules naming tags the capture does not have are reported as
+skipped.
+
+A violation is an episode: it opens on the first failing sample and
+extends while consecutive samples keep failing.
+
+Two evaluators produce identical violations:
+
+  - StreamingChecker consumes rows one at a time as the harness polls them,
+    keeping only per-rule state (previous value, open episode, pending
+    causal deadlines), and can stop the run at the first fatal violation.
+  - CompiledRules compiles each rule once into NumPy expressions over
+    whole columns (float64, NaN = missing) and evaluates a full capture in
+    a single pass; a million-row capture takes well under a second.
+
+    rules = load_rules("water-treatment.yaml")
+    checker = StreamingChecker(rules, header, abort_on_fatal=True)
+    for row in rows:
+        checker.feed(row)             # live, per sample
+    report = check_columns(rules, buffer.arrays(), buffer.timestamps)
+    write_report(report, "artifacts/model-validate")
+
+Command line (same interface as the enclave model's invariant_check.py):
+
+    python -m spherekit.invariants --tags-csv tags.csv \\
+        --rules water-treatment.yaml --output artifacts/model-validate
+"""
+
+import argparse
+import json
+import operator
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from .columns import ColumnBuffer
+
+TOOL_VERSION = "1.1.0"
+
+SEVERITIES = ("warning", "error", "fatal")
+OPS = {
+    "eq": operator.eq, "ne": operator.ne,
+    "gt": operator.gt, "ge": operator.ge,
+    "lt": operator.lt, "le": operator.le,
+}
+OP_SYMBOLS = {"eq": "==", "ne": "!=", "gt": ">", "ge": ">=", "lt": "<", "le": "<="}
+
+
+class RuleError(ValueError):
+    """Raised for malformed rules files."""
+
+
+# ── Rules ────────────────────────────────────────────────────────────
+
+class Condition:
+    """A conjunction of tag comparisons."""
+
+    def __init__(self, spec, rule_id):
+        clauses = spec if isinstance(spec, list) else [spec]
+        self.clauses = []
+        for clause in clauses:
+            if not isinstance(clause, dict) or "tag" not in clause:
+                raise RuleError(f"{rule_id}: condition needs a tag: {clause!r}")
+            ops = [k for k in clause if k in OPS]
+            if len(ops) != 1:
+                raise RuleError(f"{rule_id}: condition needs exactly one of "
+                                f"{', '.join(OPS)}: {clause!r}")
+            self.clauses.append((clause["tag"], ops[0], float(clause[ops[0]])))
+
+    @property
+    def tags(self):
+        return [tag for tag, _, _ in self.clauses]
+
+    def evaluate(self, values):
+        """True/False, or None if a value is missing."""
+        result = True
+        for tag, op, ref in self.clauses:
+            v = values.get(tag)
+            if v is None:
+                return None
+            result = result and OPS[op](v, ref)
+        return result
+
+    def mask(self, columns):
+        """Vectorized evaluate: (valid, truth) boolean arrays over columns."""
+        valid = truth = None
+        for tag, op, ref in self.clauses:
+            col = columns[tag]
+            v, t = ~np.isnan(col), OPS[op](col, ref)
+            valid = v if valid is None else valid & v
+            truth = t if truth is None else truth & t
+        return valid, truth & valid
+
+    def __str__(self):
+        return " and ".join(f"{tag} {OP_SYMBOLS[op]} {ref:g}" for tag, op, ref in self.clauses)
+
+
+class Rule:
+    """One parsed invariant rule."""
+
+    TYPES = ("range", "correlation", "rate_of_change", "causality")
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise RuleError(f"rule must be a mapping: {spec!r}")
+        self.id = str(spec.get("id") or "")
+        if not self.id:
+            raise RuleError(f"rule without id: {spec!r}")
+        self.type = spec.get("type")
+        if self.type not in self.TYPES:
+            raise RuleError(f"{self.id}: unknown type {self.type!r}")
+        self.severity = spec.get("severity", "error")
+        if self.severity not in SEVERITIES:
+            raise RuleError(f"{self.id}: severity must be one of {', '.join(SEVERITIES)}")
+        self.description = spec.get("description", "")
+
+        try:
+            if self.type == "range":
+                self.tag = spec["tag"]
+                self.min = float(spec["min"]) if spec.get("min") is not None else None
+                self.max = float(spec["max"]) if spec.get("max") is not None else None
+                if self.min is None and self.max is None:
+                    raise RuleError(f"{self.id}: range rule needs min and/or max")
+                self.tags = [self.tag]
+            elif self.type == "rate_of_change":
+                self.tag = spec["tag"]
+                self.max_delta = float(spec["max_delta"])
+                self.tags = [self.tag]
+            elif self.type == "correlation":
+                self.when = Condition(spec["when"], self.id)
+                self.then = Condition(spec["then"], self.id)
+                self.grace = int(spec.get("grace_samples", 0))
+                self.tags = self.when.tags + self.then.tags
+            else:
+                self.cause = Condition(spec["cause"], self.id)
+                self.effect = Condition(spec["effect"], self.id)
+                self.within = int(spec["within_samples"])
+                self.tags = self.cause.tags + self.effect.tags
+        except KeyError as e:
+            raise RuleError(f"{self.id}: missing {e.args[0]}") from None
+        except (TypeError, ValueError) as e:
+            if isinstance(e, RuleError):
+                raise
+            raise RuleError(f"{self.id}: {e}") from None
+
+    def excess(self, value):
+        """How far a value lies outside a range rule's bounds (> 0 = violation)."""
+        above = value - self.max if self.max is not None else -np.inf
+        below = self.min - value if self.min is not None else -np.inf
+        return np.maximum(above, below)
+
+    def describe(self):
+        if self.type == "range":
+            lo = "-inf" if self.min is None else f"{self.min:g}"
+            hi = "inf" if self.max is None else f"{self.max:g}"
+            return f"{self.tag} in [{lo}, {hi}]"
+        if self.type == "rate_of_change":
+            return f"|Δ{self.tag}| <= {self.max_delta:g}/sample"
+        if self.type == "correlation":
+            return f"{self.when} ⇒ {self.then}"
+        return f"{self.cause} ⇒ {self.effect} within {self.within} samples"
+
+
+class RuleSet:
+    """Rules parsed from one rules file."""
+
+    def __init__(self, rules, name="", source=""):
+        self.rules = rules
+        self.name = name
+        self.source = source
+        ids = [r.id for r in rules]
+        dupes = sorted({i for i in ids if ids.count(i) > 1})
+        if dupes:
+            raise RuleError(f"duplicate rule ids: {', '.join(dupes)}")
+
+    def applicable(self, columns):
+        """Split rules into (usable, skipped) for the given columns."""
+        columns = set(columns)
+        usable, skipped = [], []
+        for rule in self.rules:
+            (usable if all(t in columns for t in rule.tags) else skipped).append(rule)
+        return usable, skipped
+
+
+def load_rules(path):
+    """Parse a rules YAML file into a RuleSet. Raises RuleError."""
+    try:
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise RuleError(f"cannot read {path}: {e}") from e
+    specs = data.get("rules") if isinstance(data, dict) else data
+    if not isinstance(specs, list):
+        raise RuleError(f"{path}: expected a rules list")
+    name = data.get("name", "") if isinstance(data, dict) else ""
+    return RuleSet([Rule(s) for s in specs], name=name or Path(path).stem,
+                   source=Path(path).name)
+
+
+def to_number(value):
+    """CSV/poll value → float, or None when missing."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ── Streaming evaluation ─────────────────────────────────────────────
+
+class StreamingChecker:
+    """Evaluate a RuleSet incrementally, one sample at a time."""
+
+    def __init__(self, ruleset, columns, abort_on_fatal=False):
+        self.ruleset = ruleset
+        self.rules, self.skipped = ruleset.applicable(columns)
+        self.abort_on_fatal = abort_on_fatal
+        self.samples = 0
+        self.violations = []
+        self.aborted = False
+        self.abort_reason = None
+        self._open = {}          # rule id → open violation episode
+        self._prev = {}          # rule id → previous value / condition state
+        self._streak = {}        # correlation rule id → consecutive mismatches
+        self._pending = {}       # causality rule id → list of (sample, deadline, ts)
+        self._tags = sorted({t for r in self.rules for t in r.tags})
+
+    def feed(self, row):
+        """Evaluate one sample; returns the violations it opened."""
+        index = self.samples
+        self.samples += 1
+        ts = row.get("timestamp_utc", "")
+        values = {t: to_number(row.get(t)) for t in self._tags}
+        opened = []
+        for rule in self.rules:
+            failing, value = self._evaluate(rule, index, values, ts, opened)
+            if failing is None:
+                continue
+            self._track(rule, failing, index, ts, value, opened)
+        if self.abort_on_fatal and not self.aborted:
+            fatal = next((v for v in opened if v["severity"] == "fatal"), None)
+            if fatal is not None:
+                self.aborted = True
+                self.abort_reason = f"{fatal['rule_id']} at sample {index}"
+        return opened
+
+    def _evaluate(self, rule, index, values, ts, opened):
+        """Return (failing, value) for per-sample rules, (None, None) to skip."""
+        if rule.type == "range":
+            v = values[rule.tag]
+            if v is None:
+                return None, None
+            return ((rule.min is not None and v < rule.min)
+                    or (rule.max is not None and v > rule.max)), v
+
+        if rule.type == "rate_of_change":
+            v = values[rule.tag]
+            prev = self._prev.get(rule.id)
+            self._prev[rule.id] = v
+            if v is None or prev is None:
+                return None, None
+            return abs(v - prev) > rule.max_delta, v - prev
+
+        if rule.type == "correlation":
+            when = rule.when.evaluate(values)
+            if when is None:
+                return None, None
+            held = not when or rule.then.evaluate(values)
+            if held is None:
+                return None, None
+            streak = 0 if held else self._streak.get(rule.id, 0) + 1
+            self._streak[rule.id] = streak
+            return streak > rule.grace, None
+
+        # causality: arm on rising edges, violate when the deadline passes
+        cause = rule.cause.evaluate(values)
+        effect = rule.effect.evaluate(values)
+        pending = self._pending.setdefault(rule.id, [])
+        if effect:
+            pending.clear()
+        if cause and not self._prev.get(rule.id) and not effect:
+            pending.append((index, index + rule.within, ts))
+        if cause is not None:
+            self._prev[rule.id] = cause
+        while pending and pending[0][1] <= index:
+            armed, _, armed_ts = pending.pop(0)
+            v = _causal_violation(rule, armed, armed_ts)
+            self.violations.append(v)
+            opened.append(v)
+        return None, None
+
+    def _track(self, rule, failing, index, ts, value, opened):
+        episode = self._open.get(rule.id)
+        if failing:
+            if episode is None:
+                episode = _violation(rule, index, ts, value)
+                self._open[rule.id] = episode
+                self.violations.append(episode)
+                opened.append(episode)
+            episode["end_sample"] = index
+            episode["samples"] += 1
+            if rule.type == "range":
+                if rule.excess(value) > rule.excess(episode["value"]):
+                    episode["value"] = value
+            elif value is not None and abs(value) > abs(episode["value"]):
+                episode["value"] = value
+        elif episode is not None:
+            del self._open[rule.id]
+
+    def finish(self):
+        """Close open episodes. Causal deadlines past the end are not judged."""
+        self._open.clear()
+        self._pending.clear()
+
+    def report(self, source_bundle=""):
+        """Report dict for what has been fed so far."""
+        return build_report(self.ruleset, self.samples, self.violations, self.rules,
+                            self.skipped, source_bundle, self.abort_reason)
+
+
+def _violation(rule, index, ts, value):
+    return {
+        "rule_id": rule.id,
+        "type": rule.type,
+        "severity": rule.severity,
+        "sample": index,
+        "end_sample": index,
+        "samples": 0 if rule.type != "causality" else 1,
+        "timestamp": ts,
+        "value": value,
+        "message": rule.describe(),
+    }
+
+
+def _causal_violation(rule, armed, ts):
+    v = _violation(rule, armed, ts, None)
+    v["end_sample"] = armed + rule.within
+    v["message"] = (f"{rule.effect} not seen within {rule.within} samples "
+                    f"of {rule.cause} at sample {armed}")
+    return v
+
+
+# ── Column evaluation ────────────────────────────────────────────────
+
+def _runs(fail):
+    """(start, end) positions of the runs of True in a boolean array."""
+    if not fail.any():
+        return []
+    edges = np.diff(np.concatenate(([0], fail.astype(np.int8), [0])))
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1)
+
+
+class CompiledRules:
+    """A RuleSet compiled to column-wise NumPy evaluators.
+
+    Compile once per rules file and column set, then evaluate any number
+    of captures with evaluate(columns, timestamps).
+    """
+
+    def __init__(self, ruleset, columns):
+        self.ruleset = ruleset
+        self.rules, self.skipped = ruleset.applicable(columns)
+        self._compiled = [getattr(self, f"_{r.type}")(r) for r in self.rules]
+
+    def evaluate(self, columns, timestamps=None):
+        """Return the violations for full columns, in detection order."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        ts = timestamps if timestamps is not None else [""] * n
+        found = []
+        for pos, fn in enumerate(self._compiled):
+            for detected, v in fn(columns, n, ts):
+                found.append((detected, pos, v))
+        found.sort(key=lambda item: (item[0], item[1]))
+        return [v for _, _, v in found]
+
+    # Each compiler returns fn(columns, n, ts) -> [(detect_index, violation)]
+
+    @staticmethod
+    def _episodes(rule, idx, fail, ts, values=None, score=None):
+        out = []
+        for start, end in _runs(fail):
+            value = None
+            if values is not None:
+                k = start + int(np.argmax(score[start:end + 1]))
+                value = float(values[k])
+            v = _violation(rule, int(idx[start]), ts[idx[start]], value)
+            v["end_sample"] = int(idx[end])
+            v["samples"] = int(end - start + 1)
+            out.append((int(idx[start]), v))
+        return out
+
+    def _range(self, rule):
+        def fn(columns, n, ts):
+            col = columns[rule.tag]
+            idx = np.flatnonzero(~np.isnan(col))
+            values = col[idx]
+            excess = rule.excess(values)
+            return self._episodes(rule, idx, excess > 0, ts, values, excess)
+        return fn
+
+    def _rate_of_change(self, rule):
+        def fn(columns, n, ts):
+            col = columns[rule.tag]
+            delta = np.diff(col)
+            idx = np.flatnonzero(~np.isnan(delta)) + 1
+            delta = delta[idx - 1]
+            size = np.abs(delta)
+            return self._episodes(rule, idx, size > rule.max_delta, ts, delta, size)
+        return fn
+
+    def _correlation(self, rule):
+        def fn(columns, n, ts):
+            when_valid, when = rule.when.mask(columns)
+            then_valid, then = rule.then.mask(columns)
+            evaluated = when_valid & (~when | then_valid)
+            idx = np.flatnonzero(evaluated)
+            miss = (when & ~then)[idx]
+            count = np.cumsum(miss)
+            streak = count - np.maximum.accumulate(np.where(miss, 0, count))
+            return self._episodes(rule, idx, streak > rule.grace, ts)
+        return fn
+
+    def _causality(self, rule):
+        def fn(columns, n, ts):
+            cause_valid, cause = rule.cause.mask(columns)
+            _, effect = rule.effect.mask(columns)
+            # Cause state at the previous evaluated sample (missing samples hold it)
+            last = np.maximum.accumulate(np.where(cause_valid, np.arange(n), -1))
+            prev_idx = np.concatenate(([-1], last))[:n]
+            prev = np.where(prev_idx >= 0, cause[np.maximum(prev_idx, 0)], False)
+            armed = np.flatnonzero(cause & ~prev & ~effect)
+            armed = armed[armed + rule.within < n]
+            seen = np.concatenate(([0], np.cumsum(effect)))
+            missed = armed[seen[armed + rule.within + 1] - seen[armed + 1] == 0]
+            return [(int(i) + rule.within, _causal_violation(rule, int(i), ts[i]))
+                    for i in missed]
+        return fn
+
+
+def check_columns(ruleset, columns, timestamps=None, source_bundle="", abort_reason=None,
+                  compiled=None):
+    """Evaluate a RuleSet over whole columns and return the report dict."""
+    if compiled is None:
+        compiled = CompiledRules(ruleset, columns.keys())
+    violations = compiled.evaluate(columns, timestamps)
+    n = len(next(iter(columns.values()))) if columns else 0
+    return build_report(ruleset, n, violations, compiled.rules, compiled.skipped,
+                        source_bundle, abort_reason)
+
+
+# ── Reporting ────────────────────────────────────────────────────────
+
+def build_report(ruleset, total_samples, violations, evaluated, skipped,
+                 source_bundle="", abort_reason=None):
+    """Report dict in the invariant-check report.json format."""
+    report = {
+        "tool": "invariant-check",
+        "version": TOOL_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "rules_file": ruleset.source,
+        "source_bundle": source_bundle,
+        "total_samples": total_samples,
+        "total_violations": len(violations),
+        "violations": violations,
+        "rules_evaluated": len(evaluated),
+        "rules_skipped": [r.id for r in skipped],
+    }
+    if abort_reason:
+        report["aborted"] = True
+        report["abort_reason"] = abort_reason
+    return report
+
+
+def write_report(report, output_dir):
+    """Write report.json and report.md to output_dir."""
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    (out / "report.json").write_text(json.dumps(report, indent=2) + "\n")
+    (out / "report.md").write_text(format_markdown(report))
+
+
+def format_markdown(report):
+    """Render a report dict as report.md."""
+    lines = [
+        "# Invariant Check Report",
+        "",
+        f"- Bundle: {report.get('source_bundle') or '-'}",
+        f"- Rules: {report['rules_file']}",
+        f"- Samples: {report['total_samples']}",
+        f"- Violations: {report['total_violations']}",
+    ]
+    if report.get("aborted"):
+        lines.append(f"- **Aborted** on fatal violation: {report['abort_reason']}")
+    if report.get("rules_skipped"):
+        lines.append(f"- Skipped (tags not captured): {', '.join(report['rules_skipped'])}")
+    lines.append("")
+    if not report["violations"]:
+        lines.append("No violations detected.")
+    else:
+        lines += ["| Rule | Type | Severity | Samples | Start | Value | Detail |",
+                  "|---|---|---|---|---|---|---|"]
+        for v in report["violations"]:
+            span = (f"{v['sample']}" if v["end_sample"] == v["sample"]
+                    else f"{v['sample']}-{v['end_sample']}")
+            value = "" if v["value"] is None else f"{v['value']:g}"
+            message = v["message"].replace("|", "\\|")
+            lines.append(f"| {v['rule_id']} | {v['type']} | {v['severity']} | {span} | "
+                         f"{v['timestamp']} | {value} | {message} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a tags.csv against invariant rules")
+    parser.add_argument("--tags-csv", required=True)
+    parser.add_argument("--rules", required=True)
+    parser.add_argument("--output", required=True, help="Directory for report.json/report.md")
+    parser.add_argument("--bundle", default=None, help="Bundle name (default: CSV's directory)")
+    args = parser.parse_args()
+
+    try:
+        ruleset = load_rules(args.rules)
+    except RuleError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    buf = ColumnBuffer.from_csv(args.tags_csv)
+    bundle = args.bundle or Path(args.tags_csv).resolve().parent.name
+    report = check_columns(ruleset, buf.arrays(), buf.timestamps, source_bundle=bundle)
+    write_report(report, args.output)
+    print(f"{report['total_violations']} violations in {report['total_samples']} samples")
+    return 1 if report["total_violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""
+SPHERE plant models — batched hydro and water treatment physics
+
+Python ports of the use-case simulators, built from the blocks in
+process.py and parameterized from each use case's SimProfile.  Every model
+advances M independent plants per step() and returns (M, len(OUTPUTS))
+engineering values; registers() gives the simulator PLC's integer image of
+the same state.
+
+HydroStation — sector-energy/olmsted-hydro, the physics of
+st/ps_hydro_simulator.st (reservoir -> penstock -> wicket gate -> turbine
+-> generator -> breaker, plus spillway), HydroParams.from_profile() reads
+profiles/{realistic,demo,olmsted}.yaml (olmsted: extends + unit_selector).
+
+P1Plant — sector-water/rovisys-treatment Process One (raw water tank and
+pump, chemical dosing tanks, UF feed tank) on the simulator PLC's bridge
+layout: 12 command bits + pump speed in, 6 levels/flow + 12 status bits
+out.  virtual_plant.py and sim_plc.py run on it; P1Params.from_profile()
+reads profiles/{realistic,demo}.yaml.
+
+    params = HydroParams.from_profile("profiles/olmsted.yaml")
+    plant = HydroStation(1000, params)
+    for _ in range(600):
+        out = plant.step(gate_cmd_pct, breaker_cmd, spill_cmd)   # (1000, 13)
+"""
+
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import yaml
+
+from .process import (G, RHO_WATER, DelayedSwitch, FirstOrderLag, Pump, SlewLimitedServo, Tank,
+                      TurbineGenerator)
+
+
+def _merge(base: dict, overlay: dict) -> dict:
+    """Recursive dict merge; overlay wins."""
+    merged = dict(base)
+    for key, value in (overlay or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_sim_profile(path) -> dict:
+    """A SimProfile with metadata.extends resolved (sibling <name>.yaml) and
+    units[unit_selector] merged over the common sections."""
+    path = Path(path)
+    with open(path) as f:
+        profile = yaml.safe_load(f) or {}
+    extends = (profile.get("metadata") or {}).get("extends")
+    if extends:
+        profile = _merge(load_sim_profile(path.with_name(f"{extends}.yaml")), profile)
+    units = profile.get("units")
+    if units and profile.get("unit_selector") is not None:
+        profile = _merge(profile, units.get(profile["unit_selector"]) or {})
+    return profile
+
+
+def _pick(profile: dict, dotted: str):
+    node = profile
+    for key in dotted.split("."):
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node
+
+
+def _from_profile(cls, profile: dict, fields: dict):
+    """cls(**values) for each field whose dotted profile key is set."""
+    values = {name: _pick(profile, key) for name, key in fields.items()}
+    return cls(**{k: type(cls._field_defaults[k])(v) for k, v in values.items() if v is not None})
+
+
+# ── Hydro station ────────────────────────────────────────────────────
+
+class HydroParams(NamedTuple):
+    """Hydro station parameters; defaults are ps_hydro_simulator.st's."""
+    dt_sec: float = 0.1
+    res_area_m2: float = 10000.0
+    res_level_m: float = 20.0
+    res_inflow_m3s: float = 50.0
+    res_max_m: float = 25.0
+    spill_crest_m: float = 22.0
+    spill_coeff: float = 20.0           # m³/s per m above the crest
+    spill_open_sec: float = 5.0
+    static_head_m: float = 100.0
+    tailwater_m: float = 0.0
+    penstock_tau_sec: float = 5.0
+    hammer_rate_m3s2: float = 20.0      # |dQ/dt| above which pressure spikes
+    hammer_factor: float = 1.5
+    q_max_m3s: float = 100.0
+    eta_t: float = 0.90
+    k_q: float = 10.0
+    eta_g: float = 0.97
+    p_rated_mw: float = 80.0
+    inertia_h_sec: float = 4.0
+    gate_tau_sec: float = 1.0
+    gate_slew_pct_s: float = 10.0
+    breaker_open_sec: float = 0.06
+    breaker_close_sec: float = 0.05
+    overspeed_trip_pct: float = 110.0
+    overpressure_trip_pct: float = 150.0
+    min_head_m: float = 10.0
+
+    @classmethod
+    def from_profile(cls, path) -> "HydroParams":
+        """Parameters from a hydro SimProfile; anything it does not set keeps its default."""
+        profile = load_sim_profile(path)
+        params = _from_profile(cls, profile, {
+            "dt_sec": "timing.dt_sec",
+            "res_area_m2": "reservoir.area_m2",
+            "res_level_m": "reservoir.initial_level_m",
+            "res_inflow_m3s": "reservoir.inflow_m3s",
+            "res_max_m": "reservoir.max_level_m",
+            "static_head_m": "penstock.static_head_m",
+            "penstock_tau_sec": "penstock.tau_sec",
+            "q_max_m3s": "turbine.q_max_m3s",
+            "eta_t": "turbine.eta_t",
+            "k_q": "turbine.k_q",
+            "eta_g": "generator.eta_g",
+            "p_rated_mw": "generator.p_rated_mw",
+            "inertia_h_sec": "generator.inertia_h_sec",
+            "gate_tau_sec": "gate.tau_servo_sec",
+            "gate_slew_pct_s": "gate.slew_rate_pct_s",
+            "breaker_open_sec": "breaker.open_time_sec",
+            "breaker_close_sec": "breaker.close_time_sec",
+            "overspeed_trip_pct": "safety.overspeed_trip_pct",
+            "overpressure_trip_pct": "safety.overpressure_trip_pct",
+            "min_head_m": "safety.min_head_m",
+        })
+        # The ST spillway crest sits 3 m under the high water mark
+        replace = {"spill_crest_m": params.res_max_m - 3.0}
+        rise = _pick(profile, "penstock.max_pressure_rise_pct")
+        if rise is not None:
+            replace["hammer_factor"] = float(rise) / 100.0
+        return params._replace(**replace)
+
+
+HYDRO_OUTPUTS = (
+    "HY_Gate_Pos", "HY_Res_Level", "HY_Head", "HY_Flow", "HY_Pressure", "HY_Speed_Pct",
+    "HY_Freq_Hz", "HY_Power_MW", "HY_Breaker_Sts", "HY_Spill_Sts",
+    "HY_Trip_Overspeed", "HY_Trip_Overpressure", "HY_Trip_LowHead",
+)
+# out_* register scaling of ps_hydro_simulator.st (%QW300-307)
+HYDRO_REGISTER_SCALE = np.array([10.0, 100.0, 10.0, 10.0, 1.0, 10.0, 100.0, 10.0])
+
+
+class HydroStation:
+    """M hydro stations stepped together (ps_hydro_simulator.st, in scan order)."""
+
+    def __init__(self, m: int, params: HydroParams = HydroParams(), gate_pct=0.0,
+                 res_level_m=None, speed_pct=0.0):
+        p = self.params = params
+        self.m = m
+        self.gate = SlewLimitedServo(m, p.gate_tau_sec, p.gate_slew_pct_s, initial=gate_pct)
+        self.reservoir = Tank(m, p.res_area_m2,
+                              p.res_level_m if res_level_m is None else res_level_m,
+                              max_level=p.res_max_m)
+        self.penstock = FirstOrderLag(m, p.penstock_tau_sec, exact=False)
+        self.unit = TurbineGenerator(m, p.eta_t, p.eta_g, p.p_rated_mw, p.inertia_h_sec,
+                                     speed_pct=speed_pct)
+        self.breaker = DelayedSwitch(m, p.breaker_close_sec, p.breaker_open_sec)
+        self.spillway = DelayedSwitch(m, p.spill_open_sec, p.spill_open_sec)
+        self.head = np.maximum(self.reservoir.level + p.static_head_m - p.tailwater_m, 0.0)
+        self.pressure = RHO_WATER * G * self.head / 1000.0
+        self._overpressure_kpa = RHO_WATER * G * p.static_head_m / 1000.0 * (
+            p.overpressure_trip_pct / 100.0)
+        self._out = np.empty((m, len(HYDRO_OUTPUTS)))
+
+    @property
+    def flow(self):
+        return self.penstock.state
+
+    def step(self, gate_cmd_pct, breaker_cmd, spill_cmd, dt: float = None) -> np.ndarray:
+        """Advance one scan of dt seconds (default params.dt_sec); returns (M, 13) outputs.
+
+        Inputs are scalars or (M,) arrays.  The returned array is reused by
+        the next step.
+        """
+        p = self.params
+        dt = p.dt_sec if dt is None else dt
+        gate = self.gate.step(gate_cmd_pct, dt)
+
+        # Reservoir mass balance (turbine flow of the previous scan)
+        level = self.reservoir.level
+        spill = np.where(self.spillway.on & (level > p.spill_crest_m),
+                         p.spill_coeff * (level - p.spill_crest_m), 0.0)
+        level = self.reservoir.step(p.res_inflow_m3s - self.flow - spill, dt)
+        self.head = head = np.maximum(level + p.static_head_m - p.tailwater_m, 0.0)
+
+        # Penstock flow towards the gate/head target; water hammer on fast changes
+        target = np.minimum(p.k_q * (gate / 100.0) * np.sqrt(head), p.q_max_m3s)
+        flow = self.penstock.step(target, dt)
+        np.maximum(flow, 0.0, out=flow)
+        pressure = RHO_WATER * G * head / 1000.0
+        self.pressure = np.where(np.abs(self.penstock.rate) > p.hammer_rate_m3s2,
+                                 pressure * p.hammer_factor, pressure)
+
+        self.unit.step(flow, head, self.breaker.on, dt)
+        speed = self.unit.speed
+        self.breaker.step(breaker_cmd, dt, permit=(speed >= 99.0) & (speed <= 101.0))
+        self.spillway.step(spill_cmd, dt)
+
+        out = self._out
+        out[:, 0] = gate
+        out[:, 1] = level
+        out[:, 2] = head
+        out[:, 3] = flow
+        out[:, 4] = self.pressure
+        out[:, 5] = speed
+        out[:, 6] = self.unit.freq
+        out[:, 7] = self.unit.p_elec
+        out[:, 8] = self.breaker.on
+        out[:, 9] = self.spillway.on
+        out[:, 10] = speed > p.overspeed_trip_pct
+        out[:, 11] = self.pressure > self._overpressure_kpa
+        out[:, 12] = head < p.min_head_m
+        return out
+
+    def registers(self):
+        """(words, bits): (M, 8) %QW300-307 values and (M, 2) breaker / spill status."""
+        words = np.rint(self._out[:, :8] * HYDRO_REGISTER_SCALE).astype(np.int64)
+        return words, self._out[:, 8:10].astype(bool)
+
+
+# ── Water treatment Process One ──────────────────────────────────────
+
+# Command / status bit order on the simulator bridge (HR 200-211 / 320-331)
+P1_COMMANDS = (
+    "RW_Tank_PR_Valve", "RW_Tank_P6B_Valve", "RW_Tank_P_Valve", "RW_Pump_Start",
+    "RW_Pump_Stop", "ChemTreat_NaCl_Valve", "ChemTreat_NaOCl_Valve", "ChemTreat_HCl_Valve",
+    "UF_UFFT_Tank_Valve", "UF_Drain_Valve", "UF_ROFT_Valve", "UF_BWP_Valve",
+)
+PR, P6B, P, PUMP_START, PUMP_STOP, NACL, NAOCL, HCL = range(8)
+VALVE_COLUMNS = [i for i in range(len(P1_COMMANDS)) if i not in (PUMP_START, PUMP_STOP)]
+# Analog outputs (HR 300-305)
+P1_OUTPUTS = ("RW_Tank_Level", "RW_Pump_Flow", "ChemTreat_NaCl_Level", "ChemTreat_NaOCl_Level",
+              "ChemTreat_HCl_Level", "UF_UFFT_Tank_Level")
+RW_LEVEL, RW_FLOW, NACL_LEVEL, NAOCL_LEVEL, HCL_LEVEL, UF_LEVEL = range(6)
+CHEM_LEVELS = [NACL_LEVEL, NAOCL_LEVEL, HCL_LEVEL]
+P1_INITIAL_LEVELS = (600.0, 0.0, 800.0, 800.0, 800.0, 400.0)    # mm (flow slot unused)
+
+
+class P1Params(NamedTuple):
+    """Process One parameters; defaults are profiles/realistic.yaml."""
+    motorized_valve_tau_sec: float = 30.0
+    solenoid_valve_tau_sec: float = 0.05
+    solenoid_valves: tuple = ("ChemTreat_NaCl_Valve", "ChemTreat_NaOCl_Valve",
+                              "ChemTreat_HCl_Valve")
+    pump_spinup_sec: float = 2.0
+    pump_vfd_accel_sec: float = 10.0
+    level_tau_sec: float = 5.0
+    level_sigma: float = 2.0
+    flow_tau_sec: float = 2.0
+    flow_sigma: float = 0.5
+    dose_lpm: float = 0.063
+    rw_max_mm: float = 1200.0
+    rw_area_m2: float = 12.0
+    pump_max_lpm: float = 567.0
+    rw_inflow_lpm: float = 189.0
+    uf_max_mm: float = 1200.0
+    uf_area_m2: float = 8.0
+    uf_drain_lpm: float = 114.0
+    chem_max_mm: float = 1000.0
+    chem_area_m2: float = 0.5
+
+    @classmethod
+    def from_profile(cls, path) -> "P1Params":
+        """Parameters from a water treatment SimProfile; unset keys keep their default."""
+        profile = load_sim_profile(path)
+        params = _from_profile(cls, profile, {
+            "motorized_valve_tau_sec": "actuators.motorized_valve.tau_sec",
+            "solenoid_valve_tau_sec": "actuators.solenoid_valve.tau_sec",
+            "pump_spinup_sec": "actuators.pump.spinup_sec",
+            "pump_vfd_accel_sec": "actuators.pump.vfd_accel_sec",
+            "level_tau_sec": "sensors.level.tau_sec",
+            "level_sigma": "sensors.level.noise_sigma",
+            "flow_tau_sec": "sensors.flow.tau_sec",
+            "flow_sigma": "sensors.flow.noise_sigma",
+            "dose_lpm": "dosing.rate_lpm",
+            "rw_max_mm": "physics.RW_Tank.max_mm",
+            "rw_area_m2": "physics.RW_Tank.area_m2",
+            "pump_max_lpm": "physics.RW_Tank.pump_max_lpm",
+            "rw_inflow_lpm": "physics.RW_Tank.inflow_lpm",
+            "uf_max_mm": "physics.UF_Tank.max_mm",
+            "uf_area_m2": "physics.UF_Tank.area_m2",
+            "uf_drain_lpm": "physics.UF_Tank.drain_lpm",
+            "chem_max_mm": "physics.ChemTreat_Tank.max_mm",
+            "chem_area_m2": "physics.ChemTreat_Tank.area_m2",
+        })
+        overrides = _pick(profile, "actuators.overrides")
+        if overrides is not None:
+            solenoids = tuple(name for name, spec in overrides.items()
+                              if (spec or {}).get("type") == "solenoid_valve")
+            params = params._replace(solenoid_valves=solenoids)
+        return params
+
+    def valve_tau(self) -> np.ndarray:
+        """(12,) lag per command column; 0 for the pump start/stop bits."""
+        tau = np.zeros(len(P1_COMMANDS))
+        for i in VALVE_COLUMNS:
+            solenoid = P1_COMMANDS[i] in self.solenoid_valves
+            tau[i] = self.solenoid_valve_tau_sec if solenoid else self.motorized_valve_tau_sec
+        return tau
+
+
+class P1Plant:
+    """M Process One plants on the simulator PLC's bridge layout.
+
+    Valves and sensors are first-order lags (exact discretization), the
+    pump spins up and ramps on its VFD, tank levels integrate inflow minus
+    outflow over tank area.  With seeds (one per plant) registers() adds
+    Gaussian sensor noise from a generator per plant.
+    """
+
+    def __init__(self, m: int, params: P1Params = P1Params(), levels=P1_INITIAL_LEVELS,
+                 seeds=None):
+        p = self.params = params
+        self.m = m
+        self.valves = FirstOrderLag((m, len(P1_COMMANDS)), p.valve_tau())
+        self.pump = Pump(m, p.pump_spinup_sec, p.pump_vfd_accel_sec)
+        self.rw = Tank(m, p.rw_area_m2, levels[RW_LEVEL], p.rw_max_mm, flow_scale=1 / 60)
+        self.uf = Tank(m, p.uf_area_m2, levels[UF_LEVEL], p.uf_max_mm, flow_scale=1 / 60)
+        self.chem = Tank((m, 3), p.chem_area_m2, [levels[i] for i in CHEM_LEVELS],
+                         p.chem_max_mm, flow_scale=1 / 60)
+        self.flow = np.zeros(m)
+        sensor_tau = np.full(len(P1_OUTPUTS), p.level_tau_sec)
+        sensor_tau[RW_FLOW] = p.flow_tau_sec
+        initial = np.array(levels, dtype=float)
+        initial[RW_FLOW] = 0.0
+        self.sensors = FirstOrderLag((m, len(P1_OUTPUTS)), sensor_tau, initial=initial)
+        self.sigma = np.where(np.arange(len(P1_OUTPUTS)) == RW_FLOW, p.flow_sigma, p.level_sigma)
+        self.rngs = None if seeds is None else [np.random.default_rng(s) for s in seeds]
+        self._true = np.empty((m, len(P1_OUTPUTS)))
+
+    def levels(self) -> np.ndarray:
+        """(M, 6) true levels / pump flow in P1_OUTPUTS order."""
+        true = self._true
+        true[:, RW_LEVEL] = self.rw.level
+        true[:, RW_FLOW] = self.flow
+        true[:, CHEM_LEVELS] = self.chem.level
+        true[:, UF_LEVEL] = self.uf.level
+        return true
+
+    def force_level(self, index: int, value, rows=slice(None)):
+        """Force a level and its sensor (set_sim_level, initial conditions)."""
+        if index == RW_FLOW:
+            return
+        tank, col = {RW_LEVEL: (self.rw.level, None), UF_LEVEL: (self.uf.level, None),
+                     NACL_LEVEL: (self.chem.level, 0), NAOCL_LEVEL: (self.chem.level, 1),
+                     HCL_LEVEL: (self.chem.level, 2)}[index]
+        if col is None:
+            tank[rows] = value
+        else:
+            tank[rows, col] = value
+        self.sensors.state[rows, index] = value
+
+    def step(self, commands, speed_pct, dt: float) -> np.ndarray:
+        """Advance dt seconds; returns (M, 6) sensed levels / flow.
+
+        commands is (M, 12) or (12,) command bits in P1_COMMANDS order,
+        speed_pct the pump VFD reference (0 = no reference, full speed).
+        """
+        p = self.params
+        commands = np.broadcast_to(np.asarray(commands) != 0, (self.m, len(P1_COMMANDS)))
+        pos = self.valves.step(commands.astype(np.float64), dt)
+
+        speed_pct = np.asarray(speed_pct, dtype=np.float64)
+        speed_sp = np.where(speed_pct != 0, speed_pct / 100.0, 1.0)
+        speed = self.pump.step(commands[:, PUMP_START], commands[:, PUMP_STOP], speed_sp, dt)
+
+        # Flows [L/min]; the pump runs dry on an empty tank
+        rw_in = p.rw_inflow_lpm * pos[:, PR]
+        self.flow = np.where(self.rw.level <= 0.0, 0.0, p.pump_max_lpm * speed * pos[:, P])
+        self.rw.step(rw_in - self.flow, dt)
+        self.uf.step(self.flow - p.uf_drain_lpm, dt)
+        self.chem.step(-p.dose_lpm * pos[:, [NACL, NAOCL, HCL]], dt)
+
+        return self.sensors.step(self.levels(), dt)
+
+    def status(self) -> np.ndarray:
+        """(M, 12) status bits (HR 320-331): valve open, pump running, pump fault."""
+        status = self.valves.state > 0.5
+        status[:, PUMP_START] = self.pump.running
+        status[:, PUMP_STOP] = False
+        return status
+
+    def registers(self):
+        """(levels, status): (M, 6) HR 300-305 integers and (M, 12) HR 320-331 bits."""
+        sensed = self.sensors.state
+        if self.rngs is not None:
+            noise = np.stack([rng.standard_normal(len(P1_OUTPUTS)) for rng in self.rngs])
+            sensed = sensed + noise * self.sigma
+        return np.maximum(np.rint(sensed), 0).astype(np.int64), self.status()
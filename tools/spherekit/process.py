@@ -0,0 +1,181 @@
+"""
+SPHERE process-model blocks — vectorized plant components
+
+The building blocks of the Python plant models in plants.py.  Each block
+holds the state of many independent instances as one NumPy array (shape
+given at construction, e.g. (M,) for M plants or (M, 12) for twelve valves
+each) and advances all of them in a single step(), so the same model code
+runs one plant behind a Modbus server or a thousand-run sweep.  Inputs and
+parameters broadcast against the state shape.
+
+    valves = FirstOrderLag((m, 12), tau=valve_tau)        # exact discretization
+    tank = Tank(m, area_m2=12.0, level=600.0, max_level=1200.0, flow_scale=1 / 60)
+    tank.step(inflow_lpm - outflow_lpm, dt)               # L/min into mm
+
+Blocks:
+    FirstOrderLag       valve, sensor, penstock inertia
+    SlewLimitedServo    wicket gate: first-order servo with a velocity limit
+    Tank                mass balance: level += net flow / area, clamped
+    valve_flow()        Q = Cv * opening * sqrt(dP)
+    DelayedSwitch       breaker / spillway: follows its command after a hold time
+    Pump                start/stop with spin-up delay and a VFD speed ramp
+    TurbineGenerator    hydraulic power, grid-locked or free-running speed
+"""
+
+import numpy as np
+
+RHO_WATER = 1000.0      # kg/m³
+G = 9.81                # m/s²
+
+
+def _state(shape, initial, dtype=np.float64):
+    return np.broadcast_to(np.asarray(initial, dtype=dtype), shape).copy()
+
+
+class FirstOrderLag:
+    """state -> target with time constant tau (tau <= 0: follows instantly).
+
+    exact=True advances with the exact solution for a target held over the
+    step (stable for any dt); exact=False is forward Euler, matching the ST
+    simulators.  rate is d(state)/dt at the start of the last step.
+    """
+
+    def __init__(self, shape, tau, initial=0.0, exact=True):
+        self.state = _state(shape, initial)
+        self.tau = np.asarray(tau, dtype=np.float64)
+        self.exact = exact
+        self.rate = np.zeros_like(self.state)
+
+    def step(self, target, dt):
+        target = np.asarray(target, dtype=np.float64)
+        instant = self.tau <= 0
+        tau = np.where(instant, 1.0, self.tau)
+        self.rate = np.where(instant, 0.0, (target - self.state) / tau)
+        if self.exact:
+            gain = np.where(instant, 1.0, -np.expm1(-dt / tau))
+        else:
+            gain = np.where(instant, 1.0, dt / tau)
+        self.state += (target - self.state) * gain
+        return self.state
+
+
+class SlewLimitedServo:
+    """Position servo: velocity (cmd - pos) / tau, limited to +-slew per second."""
+
+    def __init__(self, shape, tau, slew, initial=0.0, lo=0.0, hi=100.0):
+        self.pos = _state(shape, initial)
+        self.tau = tau
+        self.slew = slew
+        self.lo = lo
+        self.hi = hi
+
+    def step(self, cmd, dt):
+        cmd = np.clip(cmd, self.lo, self.hi)
+        velocity = np.clip((cmd - self.pos) / self.tau, -self.slew, self.slew)
+        np.clip(self.pos + velocity * dt, self.lo, self.hi, out=self.pos)
+        return self.pos
+
+
+class Tank:
+    """Level from a mass balance: d(level)/dt = net_flow * flow_scale / area.
+
+    flow_scale converts the flow unit into level units per second times
+    area, e.g. 1 for m³/s into m, 1/60 for L/min into mm over m².
+    """
+
+    def __init__(self, shape, area_m2, level, max_level, min_level=0.0, flow_scale=1.0):
+        self.level = _state(shape, level)
+        self.area = np.asarray(area_m2, dtype=np.float64)
+        self.min_level = min_level
+        self.max_level = max_level
+        self.flow_scale = flow_scale
+
+    def step(self, net_inflow, dt):
+        self.level += net_inflow * self.flow_scale / self.area * dt
+        np.clip(self.level, self.min_level, self.max_level, out=self.level)
+        return self.level
+
+
+def valve_flow(cv, opening, dp):
+    """Q = cv * opening * sqrt(dP); no flow against a negative dP."""
+    return cv * opening * np.sqrt(np.maximum(dp, 0.0))
+
+
+class DelayedSwitch:
+    """A breaker / spillway: on follows cmd once cmd has differed for the hold time.
+
+    Switching on can require a permit at the moment the close time elapses
+    (breaker sync check); without it the timer restarts.
+    """
+
+    def __init__(self, shape, on_sec, off_sec, initial=False):
+        self.on = _state(shape, initial, dtype=bool)
+        self.timer = np.zeros(self.on.shape)
+        self.on_sec = on_sec
+        self.off_sec = off_sec
+
+    def step(self, cmd, dt, permit=True):
+        cmd = np.asarray(cmd, dtype=bool)
+        closing = cmd & ~self.on
+        opening = ~cmd & self.on
+        self.timer = np.where(closing | opening, self.timer + dt, 0.0)
+        close_due = closing & (self.timer >= self.on_sec)
+        open_due = opening & (self.timer >= self.off_sec)
+        self.on = (self.on | (close_due & permit)) & ~open_due
+        self.timer[close_due | open_due] = 0.0
+        return self.on
+
+
+class Pump:
+    """Start/stop pump: runs spinup_sec after a held start, speed ramps over ramp_sec.
+
+    speed and setpoints are fractions of full speed (0-1).
+    """
+
+    def __init__(self, shape, spinup_sec, ramp_sec):
+        self.running = np.zeros(shape, dtype=bool)
+        self.spinup = np.zeros(shape)
+        self.speed = np.zeros(shape)
+        self.spinup_sec = spinup_sec
+        self.ramp_sec = ramp_sec
+
+    def step(self, start, stop, speed_sp, dt):
+        enabled = np.asarray(start, dtype=bool) & ~np.asarray(stop, dtype=bool)
+        spinning = enabled & ~self.running
+        self.spinup = np.where(enabled, np.where(spinning, self.spinup + dt, self.spinup), 0.0)
+        self.running = enabled & (self.running | (self.spinup >= self.spinup_sec))
+        target = np.where(self.running, np.clip(speed_sp, 0.0, 1.0), 0.0)
+        ramp = dt / self.ramp_sec if self.ramp_sec > 0 else 1.0
+        self.speed += np.clip(target - self.speed, -ramp, ramp)
+        return self.speed
+
+
+class TurbineGenerator:
+    """Hydraulic turbine driving a synchronous generator.
+
+    P_mech = rho g Q H eta_t.  On grid, speed is locked at 100% / 60 Hz and
+    P_elec = min(P_mech eta_g, rated); off grid, speed (%) follows the
+    simplified swing equation of the hydro ST model and P_elec is 0.
+    """
+
+    def __init__(self, shape, eta_t, eta_g, p_rated_mw, inertia_h, speed_pct=0.0,
+                 freq_nominal_hz=60.0):
+        self.eta_t = eta_t
+        self.eta_g = eta_g
+        self.p_rated = p_rated_mw
+        self.inertia_h = inertia_h
+        self.freq_nominal = freq_nominal_hz
+        self.speed = _state(shape, speed_pct)
+        self.freq = self.speed * freq_nominal_hz / 100.0
+        self.p_mech = np.zeros(self.speed.shape)
+        self.p_elec = np.zeros(self.speed.shape)
+
+    def step(self, flow, head, on_grid, dt):
+        self.p_mech = RHO_WATER * G * flow * head * self.eta_t / 1e6
+        driven = (self.p_mech / (self.p_rated * 0.1) - self.speed / 50.0) / self.inertia_h
+        coasting = -self.speed / (self.inertia_h * 10.0)
+        free_speed = np.clip(self.speed + np.where(flow > 0.1, driven, coasting) * dt, 0.0, 150.0)
+        self.speed = np.where(on_grid, 100.0, free_speed)
+        self.freq = np.where(on_grid, self.freq_nominal, self.freq_nominal * self.speed / 100.0)
+        self.p_elec = np.where(on_grid, np.minimum(self.p_mech * self.eta_g, self.p_rated), 0.0)
+        return self.p_elec
@@ -0,0 +1,140 @@
+"""
+SPHERE register scaling — linear raw <-> engineering conversion
+
+Every analog tag in the source maps is a linear map between a raw register
+range and an engineering range.  LinearScale folds that into a gain and an
+offset once (eng = raw * gain + offset), so a conversion is one multiply-add
+instead of re-deriving the span ratio per value; to_raw() is the inverse
+used for setpoint writes.
+
+BlockScaler stacks the coefficients of a fixed list of tags into arrays and
+converts a whole register block in one vectorized step.  Raw values outside
+a tag's raw range are clamped and flagged, and missing values (None / NaN,
+e.g. a failed read) come back as NaN:
+
+    scaler = BlockScaler([LinearScale(0, 65535, 0, 3200), ...])
+    eng, quality = scaler.to_eng(registers)   # float64, uint8 (GOOD/LOW/HIGH/MISSING)
+    raw, quality = scaler.to_raw(setpoints)   # int64 register values
+"""
+
+import numpy as np
+
+RAW_MIN = 0
+RAW_MAX = 65535
+
+# Per-value quality flags
+GOOD = 0
+LOW = 1        # below the range, clamped to its minimum
+HIGH = 2       # above the range, clamped to its maximum
+MISSING = 3    # no value (failed read)
+QUALITY_NAMES = {GOOD: "good", LOW: "low", HIGH: "high", MISSING: "missing"}
+
+
+class LinearScale:
+    """eng = raw * gain + offset, with the raw range kept for clamping.
+
+    raw_min/raw_max of None leave that side unbounded (a plain factor).
+    """
+
+    __slots__ = ("gain", "offset", "raw_min", "raw_max")
+
+    def __init__(self, raw_min=RAW_MIN, raw_max=RAW_MAX, eng_min=0.0, eng_max=100.0):
+        self.raw_min = raw_min
+        self.raw_max = raw_max
+        if raw_max == raw_min:
+            self.gain = 0.0
+        else:
+            self.gain = (float(eng_max) - float(eng_min)) / (raw_max - raw_min)
+        self.offset = float(eng_min) - raw_min * self.gain
+
+    @classmethod
+    def from_gain(cls, gain, offset=0.0, raw_min=None, raw_max=None):
+        """A scale given directly as eng = raw * gain + offset."""
+        scale = cls.__new__(cls)
+        scale.gain = float(gain)
+        scale.offset = float(offset)
+        scale.raw_min = raw_min
+        scale.raw_max = raw_max
+        return scale
+
+    @classmethod
+    def from_config(cls, config):
+        """A scale from a source-map block (raw_min, raw_max, eng_min, eng_max)."""
+        config = config or {}
+        return cls(int(config.get("raw_min", RAW_MIN)), int(config.get("raw_max", RAW_MAX)),
+                   float(config.get("eng_min", 0.0)), float(config.get("eng_max", 100.0)))
+
+    def to_eng(self, raw):
+        """Engineering value of one raw register value (clamped to the raw range)."""
+        if self.raw_min is not None and raw < self.raw_min:
+            raw = self.raw_min
+        elif self.raw_max is not None and raw > self.raw_max:
+            raw = self.raw_max
+        return raw * self.gain + self.offset
+
+    def to_raw(self, eng):
+        """Raw register value for an engineering value (rounded, clamped)."""
+        if self.gain == 0.0:
+            return self.raw_min if self.raw_min is not None else 0
+        raw = int(round((eng - self.offset) / self.gain))
+        if self.raw_min is not None and raw < self.raw_min:
+            return self.raw_min
+        if self.raw_max is not None and raw > self.raw_max:
+            return self.raw_max
+        return raw
+
+    def __repr__(self):
+        return (f"LinearScale(gain={self.gain!r}, offset={self.offset!r}, "
+                f"raw_min={self.raw_min!r}, raw_max={self.raw_max!r})")
+
+
+def _as_float(values):
+    """float64 array of values, with None -> NaN."""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class BlockScaler:
+    """Coefficient arrays for a fixed list of tags; converts whole blocks at once."""
+
+    def __init__(self, scales, digits=None):
+        self.scales = list(scales)
+        self.digits = digits
+        self.gain = np.array([s.gain for s in self.scales], dtype=np.float64)
+        self.offset = np.array([s.offset for s in self.scales], dtype=np.float64)
+        self.raw_min = np.array([-np.inf if s.raw_min is None else s.raw_min
+                                 for s in self.scales], dtype=np.float64)
+        self.raw_max = np.array([np.inf if s.raw_max is None else s.raw_max
+                                 for s in self.scales], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.scales)
+
+    @staticmethod
+    def _clamp(values, lo, hi):
+        quality = np.full(values.shape, GOOD, dtype=np.uint8)
+        quality[values < lo] = LOW
+        quality[values > hi] = HIGH
+        quality[np.isnan(values)] = MISSING
+        return np.clip(values, lo, hi), quality
+
+    def to_eng(self, raw):
+        """(eng, quality) for one raw value per tag; None / NaN -> NaN, MISSING."""
+        raw, quality = self._clamp(_as_float(raw), self.raw_min, self.raw_max)
+        eng = raw * self.gain + self.offset
+        if self.digits is not None:
+            eng = np.round(eng, self.digits)
+        return eng, quality
+
+    def to_raw(self, eng):
+        """(raw, quality) register values for one engineering value per tag.
+
+        Missing values come back as raw 0 with quality MISSING; check the
+        flags before writing.
+        """
+        eng = _as_float(eng)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw = np.where(self.gain != 0.0, (eng - self.offset) / self.gain, self.raw_min)
+        raw, quality = self._clamp(np.rint(raw), self.raw_min, self.raw_max)
+        return np.nan_to_num(raw, nan=0.0, posinf=0.0, neginf=0.0).astype(np.int64), quality
@@ -0,0 +1,615 @@
+"""
+SPHERE scenario compiler — timeline YAML to a precomputed Modbus write schedule
+
+A scenario's timeline is compiled once, before the run: every tag name is
+resolved to a (PLC, register type, address, scale) through the use case's
+tag contract and backend map(s), every value is scaled to its raw register
+value, ramps and waveforms are expanded into their individual writes, and
+writes to adjacent addresses in one step are coalesced into a single
+multi-write.  The run loop only dispatches the prebuilt writes.
+
+Timeline actions:
+
+    - {time_sec: 5, action: hmi_start}            # also hmi_stop, hmi_estop
+    - {time_sec: 3, action: set_tag, tag: HY_Power_Setpoint_MW, value: 40.0}
+    - {time_sec: 5, action: start_cmd}            # also stop_cmd, reset_cmd: pulse the
+                                                  # contract's *_Start_Cmd (or tag: NAME)
+    - {time_sec: 8, action: pulse, tag: HY_Reset_Cmd, width_sec: 1}
+    - {time_sec: 10, action: ramp, tag: RW_Tank_Level, from: 600, to: 1250,
+       duration_sec: 30, step_sec: 1}
+    - {time_sec: 10, action: waveform, tag: RW_Pump_Speed, shape: sine,
+       offset: 50, amplitude: 20, period_sec: 20, duration_sec: 60, step_sec: 0.5}
+    - {time_sec: 20, action: wait_until, until: {tag: SYS_RUNNING, eq: 1},
+       timeout_sec: 60}
+    - {time_sec: 45, action: attack_start, attack_id: harvey_overspeed}
+    - {time_sec: 10, action: "set_sim_level:300:1250"}   # legacy raw simulator HR write
+
+Waveform shapes are sine, square, triangle and sawtooth.  wait_until
+conditions use the invariant rules' syntax ({tag: NAME, <op>: VALUE}, a list
+must all hold) on engineering values.  A wait holds back itself and every
+later step until it is met or times out; the time it held the schedule
+shifts the rest of the timeline.  attack_start, attack_stop, inject_fault
+and note are markers: they are recorded as events but write nothing.
+
+A backend map can declare legacy "name:value" shorthands in its
+scenario_actions section: {tag: NAME} compiles the action as set_tag on
+that tag (set_supply_tank_level:1200), {record: REASON} compiles it as a
+marker for actions the backend has no register for.
+
+    book = AddressBook.load("tag_contract.yaml", ["configs/openplc_map.yaml"])
+    steps = compile_scenario(scenario, book)
+    schedule = ScheduleRunner(steps, {"ctrl": ctrl, "sim": sim}, clock.utc)
+    while (due := schedule.next_due()) is not None:
+        ...wait until due...
+        schedule.fire(now)
+    schedule.events           # events.json entries
+
+initial_conditions are compiled too (InitialState): writable tags are
+loaded with coalesced writes, read-only ones are only checked, and one
+block read per PLC and register type reads them all back.
+
+Command line (compile and print the schedule, no PLC needed):
+
+    python -m spherekit.scenario --scenario scenarios/alarm_hh.yaml \\
+        --contract ../tag_contract.yaml --map configs/openplc_map.yaml
+"""
+
+import argparse
+import math
+import sys
+import time
+from collections import namedtuple
+
+import yaml
+
+from .invariants import OP_SYMBOLS, OPS
+
+ROLE_PLC = {"controller": "ctrl", "simulator": "sim"}
+READ_FUNCTIONS = {
+    "coil": "read_coils",
+    "discrete_input": "read_discrete_inputs",
+    "holding_register": "read_holding_registers",
+    "input_register": "read_input_registers",
+}
+WRITABLE = ("coil", "holding_register")
+READ_LIMITS = {"coil": 2000, "discrete_input": 2000, "holding_register": 125, "input_register": 125}
+BIT_TYPES = ("coil", "discrete_input")
+
+DEFAULT_STEP_SEC = 1.0
+DEFAULT_PULSE_SEC = 1.0
+DEFAULT_WAIT_TIMEOUT_SEC = 60.0
+WAIT_POLL_SEC = 0.1
+
+HMI_ACTIONS = {
+    "hmi_start": ([("HMI_Start_PB", 1), ("HMI_Stop_PB", 0)], "HMI Start pressed"),
+    "hmi_stop": ([("HMI_Start_PB", 0), ("HMI_Stop_PB", 1)], "HMI Stop pressed"),
+    "hmi_estop": ([("HMI_Start_PB", 0), ("HMI_Stop_PB", 1)], "Emergency stop pressed"),
+}
+COMMAND_SUFFIXES = {"start_cmd": "_Start_Cmd", "stop_cmd": "_Stop_Cmd", "reset_cmd": "_Reset_Cmd"}
+MARKERS = ("attack_start", "attack_stop", "inject_fault", "note")
+
+SHAPES = {
+    "sine": lambda phase: math.sin(2 * math.pi * phase),
+    "square": lambda phase: 1.0 if phase < 0.5 else -1.0,
+    "triangle": lambda phase: 1.0 - 4.0 * abs(phase - 0.5),
+    "sawtooth": lambda phase: 2.0 * phase - 1.0,
+}
+
+Address = namedtuple("Address", "plc register_type address scale")
+Write = namedtuple("Write", "plc register_type address values")
+Read = namedtuple("Read", "plc register_type address count")
+Clause = namedtuple("Clause", "tag address op ref")
+Wait = namedtuple("Wait", "clauses timeout_sec")
+Step = namedtuple("Step", "time_sec action description writes wait record")
+
+
+class ScenarioError(ValueError):
+    """Raised for scenarios that cannot be compiled."""
+
+
+class WriteError(RuntimeError):
+    """Raised when a PLC answers a scenario write with an exception response."""
+
+
+# ── Tag resolution ───────────────────────────────────────────────────
+
+def _load_yaml(path):
+    try:
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    except OSError as e:
+        raise ScenarioError(f"cannot read {path}: {e.strerror}") from None
+
+
+class AddressBook:
+    """Tag name → Modbus Address, resolved from a use case's files."""
+
+    def __init__(self, addresses=None, contract=None, actions=None):
+        self.addresses = dict(addresses or {})
+        self.contract = dict(contract or {})
+        self.actions = dict(actions or {})
+
+    @classmethod
+    def load(cls, contract_path=None, map_paths=()):
+        """Build the book from a tag contract and backend maps.
+
+        Each map contributes its `mappings` (canonical tag → register_type,
+        address, scale; the PLC follows the contract's role) and then its
+        `harness_tags` (explicit plc/address, e.g. the bridge registers the
+        harness polls) and its `scenario_actions` shorthands.  Later entries
+        override earlier ones.
+        """
+        contract = {}
+        actions = {}
+        if contract_path:
+            for tag in _load_yaml(contract_path).get("tags") or []:
+                if isinstance(tag, dict) and "name" in tag:
+                    contract[tag["name"]] = tag
+        addresses = {}
+        for path in dict.fromkeys(map_paths):
+            data = _load_yaml(path)
+            for name, entry in (data.get("mappings") or {}).items():
+                if not isinstance(entry, dict) or entry.get("register_type") not in READ_FUNCTIONS:
+                    continue
+                role = contract.get(name, {}).get("role")
+                addresses[name] = Address(entry.get("plc") or ROLE_PLC.get(role, "ctrl"),
+                                          entry["register_type"], int(entry["address"]),
+                                          float(entry.get("scale", 1.0)))
+            for entry in data.get("harness_tags") or []:
+                prior = addresses.get(entry["column"])
+                scale = entry.get("scale", prior.scale if prior else 1.0)
+                addresses[entry["column"]] = Address(entry["plc"], entry["register_type"],
+                                                     int(entry["address"]), float(scale))
+            for name, entry in (data.get("scenario_actions") or {}).items():
+                if not isinstance(entry, dict) or len(entry.keys() & {"tag", "record"}) != 1:
+                    raise ScenarioError(f"{path}: scenario_actions.{name}: needs tag or record")
+                actions[name] = entry
+        return cls(addresses, contract, actions)
+
+    def resolve(self, tag):
+        try:
+            return self.addresses[tag]
+        except KeyError:
+            raise ScenarioError(f"unknown tag {tag!r}") from None
+
+    def writable(self, tag):
+        addr = self.resolve(tag)
+        if addr.register_type not in WRITABLE:
+            raise ScenarioError(f"{tag} is a {addr.register_type} on the {addr.plc} PLC, "
+                                f"which Modbus cannot write")
+        return addr
+
+    def encode(self, tag, addr, value):
+        """Engineering value → raw coil/register value."""
+        if addr.register_type in BIT_TYPES:
+            return bool(value)
+        raw = int(round(float(value) * addr.scale))
+        if not 0 <= raw <= 0xFFFF:
+            raise ScenarioError(f"{tag} = {value} is raw {raw}, outside a 16-bit register")
+        return raw
+
+    def command_tag(self, suffix):
+        """The contract's single actuator tag named *<suffix>."""
+        names = [name for name, tag in self.contract.items()
+                 if name.endswith(suffix) and tag.get("direction") == "actuator"]
+        if len(names) != 1:
+            raise ScenarioError(f"need exactly one actuator tag *{suffix} in the tag contract, "
+                                f"found {names or 'none'}; give tag: explicitly")
+        return names[0]
+
+
+def coalesce(book, assignments):
+    """(tag, value) pairs → Writes, adjacent addresses merged per PLC and type."""
+    raw = {}
+    for tag, value in assignments:
+        addr = book.writable(tag)
+        raw[(addr.plc, addr.register_type, addr.address)] = book.encode(tag, addr, value)
+    writes = []
+    for (plc, kind, address), value in sorted(raw.items()):
+        last = writes[-1] if writes else None
+        if (last is not None and (last.plc, last.register_type) == (plc, kind)
+                and last.address + len(last.values) == address):
+            last.values.append(value)
+        else:
+            writes.append(Write(plc, kind, address, [value]))
+    return tuple(w._replace(values=tuple(w.values)) for w in writes)
+
+
+# ── Compiler ─────────────────────────────────────────────────────────
+
+def _number(params, key, default=None):
+    value = params.get(key, default)
+    if value is None:
+        raise KeyError(key)
+    return float(value)
+
+
+def _set_tag(t, action, params, book):
+    tag, value = params["tag"], params["value"]
+    return [Step(t, action, f"Set {tag} = {value}", coalesce(book, [(tag, value)]), None, True)]
+
+
+def _hmi(t, action, params, book):
+    assignments, description = HMI_ACTIONS[action]
+    return [Step(t, action, description, coalesce(book, assignments), None, True)]
+
+
+def _set_register(t, action, params, book):
+    try:
+        reg, val = int(params["register"]), int(params["value"])
+    except ValueError:
+        raise ScenarioError(f"expected set_sim_level:<register>:<value>, got {action!r}") from None
+    if not 0 <= val <= 0xFFFF:
+        raise ScenarioError(f"{val} does not fit a 16-bit register")
+    writes = (Write("sim", "holding_register", reg, (val,)),)
+    return [Step(t, action, f"Set simulator HR {reg} = {val}", writes, None, True)]
+
+
+def _pulse(t, action, params, book):
+    tag = params.get("tag") or book.command_tag(COMMAND_SUFFIXES[action])
+    width = _number(params, "width_sec", DEFAULT_PULSE_SEC)
+    if width <= 0:
+        raise ScenarioError("width_sec must be positive")
+    return [
+        Step(t, action, f"Pulse {tag} for {width:g}s", coalesce(book, [(tag, 1)]), None, True),
+        Step(t + width, action, f"Release {tag}", coalesce(book, [(tag, 0)]), None, False),
+    ]
+
+
+def _series(t, action, params, book, value_at, description):
+    """Writes of value_at(elapsed) every step_sec over duration_sec."""
+    tag = params["tag"]
+    duration = _number(params, "duration_sec")
+    step = _number(params, "step_sec", DEFAULT_STEP_SEC)
+    if duration <= 0 or step <= 0:
+        raise ScenarioError("duration_sec and step_sec must be positive")
+    n = max(1, int(round(duration / step)))
+    steps = []
+    for k in range(n + 1):
+        elapsed = duration * k / n
+        writes = coalesce(book, [(tag, value_at(elapsed))])
+        steps.append(Step(t + elapsed, action, description if k == 0 else "", writes, None, k == 0))
+    return steps
+
+
+def _ramp(t, action, params, book):
+    start, end = _number(params, "from"), _number(params, "to")
+    duration = _number(params, "duration_sec")
+    return _series(t, action, params, book,
+                   lambda e: start + (end - start) * e / duration,
+                   f"Ramp {params['tag']} {start:g} → {end:g} over {duration:g}s")
+
+
+def _waveform(t, action, params, book):
+    shape = params.get("shape", "sine")
+    if shape not in SHAPES:
+        raise ScenarioError(f"shape must be one of {', '.join(SHAPES)}")
+    offset = _number(params, "offset", 0.0)
+    amplitude = _number(params, "amplitude")
+    period = _number(params, "period_sec")
+    if period <= 0:
+        raise ScenarioError("period_sec must be positive")
+    wave = SHAPES[shape]
+    return _series(t, action, params, book,
+                   lambda e: offset + amplitude * wave((e / period) % 1.0),
+                   f"{shape.capitalize()} on {params['tag']}: {offset:g} ± {amplitude:g}, "
+                   f"period {period:g}s")
+
+
+def _wait_until(t, action, params, book):
+    spec = params["until"]
+    clauses = []
+    for clause in spec if isinstance(spec, list) else [spec]:
+        if not isinstance(clause, dict) or "tag" not in clause:
+            raise ScenarioError(f"condition needs a tag: {clause!r}")
+        ops = [k for k in clause if k in OPS]
+        if len(ops) != 1:
+            raise ScenarioError(f"condition needs exactly one of {', '.join(OPS)}: {clause!r}")
+        clauses.append(Clause(clause["tag"], book.resolve(clause["tag"]), ops[0],
+                              float(clause[ops[0]])))
+    timeout = _number(params, "timeout_sec", DEFAULT_WAIT_TIMEOUT_SEC)
+    condition = " and ".join(f"{c.tag} {OP_SYMBOLS[c.op]} {c.ref:g}" for c in clauses)
+    return [Step(t, action, f"Wait until {condition}", (), Wait(tuple(clauses), timeout), True)]
+
+
+def _marker(t, action, params, book):
+    detail = params.get("attack_id") or params.get("fault_type") or ""
+    description = " ".join(filter(None, [action, detail, params.get("comment", "")]))
+    return [Step(t, action, description, (), None, True)]
+
+
+ACTIONS = {
+    **{name: _hmi for name in HMI_ACTIONS},
+    **{name: _pulse for name in COMMAND_SUFFIXES},
+    **{name: _marker for name in MARKERS},
+    "set_tag": _set_tag,
+    "set_sim_level": _set_register,
+    "pulse": _pulse,
+    "ramp": _ramp,
+    "waveform": _waveform,
+    "wait_until": _wait_until,
+}
+
+
+def _parse_action(entry, shorthands):
+    """Return (kind, params) for a timeline entry."""
+    action = entry["action"]
+    if not isinstance(action, str):
+        raise ScenarioError(f"action must be a string: {action!r}")
+    if ":" not in action:
+        return action, entry
+    name, *args = action.split(":")
+    if name == "set_sim_level" and len(args) == 2:
+        return name, {"register": args[0], "value": args[1]}
+    shorthand = shorthands.get(name)
+    if shorthand is not None and len(args) == 1:
+        if "tag" in shorthand:
+            return "set_tag", {"tag": shorthand["tag"], "value": float(args[0])}
+        return "note", {"comment": f"(recorded only: {shorthand['record']})"}
+    raise ScenarioError(f"unknown action {action!r}")
+
+
+def compile_scenario(scenario, book):
+    """Compile a scenario's timeline into a time-ordered list of Steps."""
+    steps = []
+    for i, entry in enumerate(scenario.get("timeline") or []):
+        if not isinstance(entry, dict) or "action" not in entry:
+            raise ScenarioError(f"timeline[{i}]: needs an action: {entry!r}")
+        label = f"timeline[{i}] ({entry['action']})"
+        try:
+            kind, params = _parse_action(entry, book.actions)
+            if kind not in ACTIONS:
+                raise ScenarioError("unknown action")
+            steps += ACTIONS[kind](float(entry.get("time_sec", 0)), entry["action"], params, book)
+        except KeyError as e:
+            raise ScenarioError(f"{label}: missing {e.args[0]}") from None
+        except (TypeError, ValueError) as e:
+            raise ScenarioError(f"{label}: {e}") from None
+    steps.sort(key=lambda s: s.time_sec)
+    return steps
+
+
+def load_scenario(path, book):
+    """Load and compile a scenario file; returns (scenario, steps, initial)."""
+    scenario = _load_yaml(path)
+    try:
+        steps = compile_scenario(scenario, book)
+        return scenario, steps, InitialState(book, scenario.get("initial_conditions"))
+    except ScenarioError as e:
+        raise ScenarioError(f"{path}: {e}") from None
+
+
+# ── Dispatch ─────────────────────────────────────────────────────────
+
+def dispatch(writes, clients):
+    """Issue prebuilt writes on clients ({"ctrl": client, "sim": client}).
+
+    Raises WriteError at the first write the PLC rejects (an exception
+    response or no response), like a write that raised.
+    """
+    for w in writes:
+        client = clients[w.plc]
+        if w.register_type == "coil":
+            if len(w.values) == 1:
+                rr = client.write_coil(w.address, w.values[0])
+            else:
+                rr = client.write_coils(w.address, list(w.values))
+        elif len(w.values) == 1:
+            rr = client.write_register(w.address, w.values[0])
+        else:
+            rr = client.write_registers(w.address, list(w.values))
+        if rr is None or rr.isError():
+            raise WriteError(f"{w.plc} {w.register_type} {w.address}: {rr or 'no response'}")
+
+
+def read_block(client, register_type, address, count):
+    """Read count raw values (bits as 0/1), or None on a failed read."""
+    try:
+        rr = getattr(client, READ_FUNCTIONS[register_type])(address, count=count)
+        if rr is None or rr.isError():
+            return None
+        values = rr.bits if register_type in BIT_TYPES else rr.registers
+        return [int(v) for v in values[:count]]
+    except Exception:
+        return None
+
+
+def read_value(clients, addr):
+    """Read one tag's engineering value, or None on a failed read."""
+    raw = read_block(clients[addr.plc], addr.register_type, addr.address, 1)
+    return None if raw is None else raw[0] / addr.scale
+
+
+class ScheduleRunner:
+    """Dispatch compiled Steps as a run's clock advances.
+
+    Clock-agnostic: next_due() gives the run time (seconds since start) at
+    which something is next due, and fire(now) dispatches everything due by
+    now.  Live runs sleep until the due time; virtual runs step the plant to
+    it.  While a wait is pending, next_due() is its next condition check.
+    """
+
+    def __init__(self, steps, clients, utc):
+        self.steps = steps
+        self.clients = clients
+        self.utc = utc
+        self.events = []
+        self.offset = 0.0
+        self._index = 0
+        self._wait_since = None
+        self._next_check = None
+
+    @property
+    def done(self):
+        return self._index >= len(self.steps)
+
+    def next_due(self):
+        if self.done:
+            return None
+        if self._wait_since is not None:
+            return self._next_check
+        return self.steps[self._index].time_sec + self.offset
+
+    def fire(self, now):
+        """Fire every step due by now; returns the events recorded."""
+        fired = []
+        while not self.done:
+            step = self.steps[self._index]
+            if step.time_sec + self.offset > now:
+                break
+            description = step.description
+            if step.wait is not None:
+                if self._wait_since is None:
+                    self._wait_since = step.time_sec + self.offset
+                waited = now - self._wait_since
+                if all(self._holds(c) for c in step.wait.clauses):
+                    description += f": met after {waited:.1f}s"
+                elif waited >= step.wait.timeout_sec:
+                    description += f": timed out after {waited:.1f}s"
+                else:
+                    self._next_check = min(now + WAIT_POLL_SEC,
+                                           self._wait_since + step.wait.timeout_sec)
+                    break
+                self.offset = now - step.time_sec
+                self._wait_since = None
+            started = time.perf_counter()
+            error = None
+            try:
+                dispatch(step.writes, self.clients)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                description += f" (write failed: {error})"
+            self._index += 1
+            if step.record or error:
+                event = {
+                    "time_sec": round(now, 3),
+                    "action": step.action,
+                    "description": description,
+                    "timestamp_utc": self.utc(now),
+                    "scheduled_sec": step.time_sec,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                }
+                self.events.append(event)
+                fired.append(event)
+        return fired
+
+    def _holds(self, clause):
+        value = read_value(self.clients, clause.address)
+        return value is not None and OPS[clause.op](value, clause.ref)
+
+
+# ── Initial conditions ───────────────────────────────────────────────
+
+class InitialState:
+    """A scenario's initial_conditions, resolved for one batched load.
+
+    Writable tags are written with coalesced multi-writes; read-only tags
+    (sensor inputs, status bits) are only checked.  All of them are read
+    back with one block read per PLC and register type.
+    """
+
+    def __init__(self, book, conditions):
+        if conditions is not None and not isinstance(conditions, dict):
+            raise ScenarioError("initial_conditions must be a mapping of tag: value")
+        self.targets = {}
+        assignments = []
+        for tag, value in (conditions or {}).items():
+            addr = book.resolve(tag)
+            try:
+                self.targets[tag] = (addr, float(value))
+            except (TypeError, ValueError):
+                raise ScenarioError(f"initial_conditions: {tag}: not a number: {value!r}") from None
+            if addr.register_type in WRITABLE:
+                assignments.append((tag, value))
+        self.writes = coalesce(book, assignments)
+        self.reads = []
+        for addr in sorted({a for a, _ in self.targets.values()}):
+            last = self.reads[-1] if self.reads else None
+            if (last is not None and (last.plc, last.register_type) == (addr.plc, addr.register_type)
+                    and addr.address - last.address < READ_LIMITS[addr.register_type]):
+                self.reads[-1] = last._replace(count=addr.address - last.address + 1)
+            else:
+                self.reads.append(Read(addr.plc, addr.register_type, addr.address, 1))
+
+    def __bool__(self):
+        return bool(self.targets)
+
+    def apply(self, clients):
+        dispatch(self.writes, clients)
+
+    def read(self, clients):
+        """One read-back: {tag: engineering value or None}."""
+        blocks = {}
+        for plc, kind, address, count in self.reads:
+            raw = read_block(clients[plc], kind, address, count)
+            for i, value in enumerate(raw or []):
+                blocks[(plc, kind, address + i)] = value
+        return {tag: (None if blocks.get((a.plc, a.register_type, a.address)) is None
+                      else blocks[(a.plc, a.register_type, a.address)] / a.scale)
+                for tag, (a, _) in self.targets.items()}
+
+    def mismatches(self, values, tolerance):
+        """{tag: (wanted, got)} for read-back values off target by more than
+        tolerance (or one raw count, if coarser)."""
+        off = {}
+        for tag, (addr, want) in self.targets.items():
+            got = values.get(tag)
+            if got is None or abs(got - want) > max(tolerance, 1.0 / addr.scale):
+                off[tag] = (want, got)
+        return off
+
+
+class SettleDetector:
+    """Settled once `samples` consecutive reads agree within tolerance."""
+
+    def __init__(self, tolerance, samples=5):
+        self.tolerance = tolerance
+        self.samples = samples
+        self.window = []
+
+    def feed(self, values):
+        if any(v is None for v in values.values()):
+            self.window = []
+            return False
+        self.window = (self.window + [values])[-self.samples:]
+        if len(self.window) < self.samples:
+            return False
+        return all(max(w[tag] for w in self.window) - min(w[tag] for w in self.window)
+                   <= self.tolerance for tag in values)
+
+
+# ── Command line ─────────────────────────────────────────────────────
+
+def format_write(w):
+    values = ", ".join(str(int(v)) if isinstance(v, bool) else str(v) for v in w.values)
+    kind = "coil" if w.register_type == "coil" else "HR"
+    return f"{w.plc} {kind} {w.address} ← [{values}]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a scenario and print its write schedule")
+    parser.add_argument("--scenario", required=True)
+    parser.add_argument("--contract", help="Tag contract YAML")
+    parser.add_argument("--map", action="append", default=[],
+                        help="Backend map YAML (mappings and/or harness_tags); repeatable")
+    args = parser.parse_args()
+
+    try:
+        book = AddressBook.load(args.contract, args.map)
+        _, steps, initial = load_scenario(args.scenario, book)
+    except ScenarioError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if initial:
+        writes = "; ".join(format_write(w) for w in initial.writes)
+        print(f"initial         {len(initial.targets)} conditions  [{writes}]")
+    for step in steps:
+        writes = "; ".join(format_write(w) for w in step.writes)
+        print(f"t={step.time_sec:8.3f}  {step.action:<14} {step.description}"
+              + (f"  [{writes}]" if writes else ""))
+    print(f"{len(steps)} steps, {sum(len(s.writes) for s in steps)} writes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""
+Pytest setup for the spherekit unit tests.
+
+Puts the repository's tools/ directory on sys.path, as the use-case scripts
+do.  Paths into the use cases live in paths.py.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(REPO_ROOT / "tools"))
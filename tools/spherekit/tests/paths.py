@@ -0,0 +1,15 @@
+"""
+Paths into the use cases whose files the spherekit tests compile.
+
+Kept out of conftest.py: other test directories have their own conftest
+module, and importing one by name picks whichever pytest loaded first.
+"""
+
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+TREATMENT = REPO_ROOT / "sector-water" / "rovisys-treatment"
+P1_ONBOARDING = TREATMENT / "usecases" / "p1-onboarding"
+DISTRIBUTION = REPO_ROOT / "sector-water" / "rovisys-distribution"
+HYDRO = REPO_ROOT / "sector-energy" / "olmsted-hydro"
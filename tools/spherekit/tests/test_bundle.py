@@ -0,0 +1,83 @@
+"""
+Run bundle writer tests
+
+Rows must reach the disk while a run is still going, meta.json must say
+whether the bundle is complete, and a crashed run's rows must be
+recoverable from the .partial file.
+"""
+
+import json
+
+import pytest
+
+from spherekit.bundle import RunBundleWriter, _partial, main, recover_bundle
+
+HEADER = ["timestamp_utc", "level"]
+
+
+def row(i):
+    return {"timestamp_utc": f"2026-01-01T00:00:{i:02d}+00:00", "level": i}
+
+
+def read_meta(bundle_dir):
+    return json.loads((bundle_dir / "meta.json").read_text())
+
+
+class TestRunBundleWriter:
+    """Streaming, flushing and publishing."""
+
+    def test_rows_are_flushed_before_close(self, tmp_path):
+        bundle = RunBundleWriter(tmp_path, HEADER, flush_rows=10, flush_sec=3600)
+        for i in range(25):
+            bundle.writerow(row(i))
+        lines = _partial(tmp_path / "tags.csv").read_text().splitlines()
+        assert len(lines) == 1 + 20           # header + two flushes of ten rows
+        assert not (tmp_path / "tags.csv").exists()
+        bundle.discard()
+
+    def test_meta_marks_the_bundle_in_progress_until_finish(self, tmp_path):
+        bundle = RunBundleWriter(tmp_path, HEADER)
+        assert read_meta(tmp_path)["complete"] is False
+        bundle.writerow(row(0))
+        meta = bundle.finish({"sample_count": bundle.rows})
+        assert meta["complete"] is True and read_meta(tmp_path) == meta
+        assert (tmp_path / "tags.csv").exists()
+
+    def test_discard_removes_the_in_progress_meta(self, tmp_path):
+        bundle = RunBundleWriter(tmp_path, HEADER, gzip=True)
+        bundle.writerow(row(0))
+        bundle.discard()
+        assert sorted(p.name for p in tmp_path.iterdir()) == []
+
+
+class TestRecovery:
+    """A crashed run's .partial rows are published with honest metadata."""
+
+    def crash(self, tmp_path, rows):
+        bundle = RunBundleWriter(tmp_path, HEADER, gzip=True, flush_rows=1)
+        for i in range(rows):
+            bundle.writerow(row(i))
+        # The process dies mid-row: the file ends in a torn line
+        with open(_partial(tmp_path / "tags.csv"), "a") as f:
+            f.write("2026-01-01T00:01")
+
+    def test_recover_keeps_complete_rows(self, tmp_path):
+        self.crash(tmp_path, 5)
+        meta = recover_bundle(tmp_path)
+        lines = (tmp_path / "tags.csv").read_text().splitlines()
+        assert lines == ["timestamp_utc,level"] + [f"{row(i)['timestamp_utc']},{i}" for i in range(5)]
+        assert meta["complete"] is False and meta["recovered"] is True
+        assert meta["sample_count"] == 5
+        assert (meta["start_utc"], meta["end_utc"]) == (row(0)["timestamp_utc"], row(4)["timestamp_utc"])
+        assert "tags_gzip_file" not in meta and read_meta(tmp_path) == meta
+        assert not list(tmp_path.glob(".*.partial"))
+
+    def test_nothing_to_recover(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            recover_bundle(tmp_path)
+
+    def test_command_line(self, tmp_path, monkeypatch, capsys):
+        self.crash(tmp_path, 3)
+        monkeypatch.setattr("sys.argv", ["bundle", "--recover", str(tmp_path)])
+        assert main() == 0
+        assert "recovered 3 rows" in capsys.readouterr().out
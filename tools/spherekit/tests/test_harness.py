@@ -0,0 +1,267 @@
+"""
+Validation harness core tests
+
+Initial conditions are checked against fake PLC clients: one that keeps
+written values (a simulator force path) and one whose ST logic overwrites
+them on every scan, which must not be reported as honoured.  Read plans,
+the read_timing.csv rows and the timeline thread run against the same
+fakes.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from spherekit import harness
+from spherekit.scenario import Address, AddressBook, InitialState, compile_scenario
+
+
+class Response:
+    def __init__(self, registers=(), bits=()):
+        self.registers = list(registers)
+        self.bits = list(bits)
+
+    def isError(self):
+        return False
+
+
+class FakePLC:
+    """Holding registers behind the pymodbus 3 client calls the harness uses.
+
+    owned maps addresses the PLC logic rewrites on every scan to the value
+    it writes; a scan runs before each read.
+    """
+
+    def __init__(self, owned=None):
+        self.hr = {}
+        self.owned = dict(owned or {})
+        self.writes = 0
+
+    def write_register(self, address, value, **kwargs):
+        self.hr[address] = value
+        self.writes += 1
+        return Response()
+
+    def write_registers(self, address, values, **kwargs):
+        for i, value in enumerate(values):
+            self.hr[address + i] = value
+        self.writes += 1
+        return Response()
+
+    def read_holding_registers(self, address, *, count=1, **kwargs):
+        self.hr.update(self.owned)
+        return Response([self.hr.get(address + i, 0) for i in range(count)])
+
+
+@pytest.fixture
+def initial():
+    book = AddressBook({"Level": Address("sim", "holding_register", 300, 1.0),
+                        "Flow": Address("sim", "holding_register", 301, 10.0)})
+    return InitialState(book, {"Level": 700, "Flow": 12.5})
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(harness, "SETTLE_POLL_SEC", 0.0)
+
+
+class TestInitialConditions:
+    """apply_initial_conditions reports whether the state actually held."""
+
+    def test_held_values_are_honoured(self, initial):
+        sim = FakePLC()
+        state = harness.apply_initial_conditions({"sim": sim}, initial, settle_timeout=1.0)
+        assert state == {"honoured": True, "not_held": {}}
+        assert sim.hr == {300: 700, 301: 125}
+        assert sim.writes >= harness.SETTLE_SAMPLES    # held, not written once
+
+    def test_values_the_logic_overwrites_are_not_honoured(self, initial):
+        sim = FakePLC(owned={300: 450})
+        state = harness.apply_initial_conditions({"sim": sim}, initial, settle_timeout=0.05)
+        assert state == {"honoured": False, "not_held": {"Level": {"wanted": 700.0, "got": 450.0}}}
+
+    def test_single_check_without_settling(self, initial):
+        sim = FakePLC()
+        state = harness.apply_initial_conditions({"sim": sim}, initial, settle_timeout=0)
+        assert state["honoured"] and sim.writes == 1
+
+    def test_no_initial_conditions(self):
+        assert harness.apply_initial_conditions({}, InitialState(AddressBook(), None)) is None
+
+
+class TestReadPlan:
+    """Tag tables coalesce into block reads."""
+
+    def test_nearby_addresses_share_a_block(self):
+        tags = [{"column": "a", "plc": "sim", "register_type": "holding_register", "address": 300},
+                {"column": "b", "plc": "sim", "register_type": "holding_register", "address": 305},
+                {"column": "c", "plc": "sim", "register_type": "holding_register", "address": 400},
+                {"column": "d", "plc": "ctrl", "register_type": "coil", "address": 3}]
+        plan = harness.build_read_plan(tags)
+        assert [(b.plc, b.address, b.count) for b in plan] == [
+            ("ctrl", 3, 1), ("sim", 300, 6), ("sim", 400, 1)]
+        row = harness.poll_tags(FakePLC(), FakePLC(owned={305: 9}), plan[1:], ts="t")
+        assert row == {"timestamp_utc": "t", "a": 0, "b": 9, "c": 0}
+
+    @staticmethod
+    def plan(register_type, addresses):
+        tags = [{"column": f"t{a}", "plc": "sim", "register_type": register_type, "address": a}
+                for a in addresses]
+        return [(b.address, b.count) for b in harness.build_read_plan(tags)]
+
+    @pytest.mark.parametrize("register_type", ["holding_register", "coil"])
+    def test_gap_split(self, register_type):
+        gap = harness.READ_GAP[register_type]
+        # A gap of exactly READ_GAP unused addresses is bridged, one more is not
+        assert self.plan(register_type, [100, 101 + gap]) == [(100, gap + 2)]
+        assert self.plan(register_type, [100, 102 + gap]) == [(100, 1), (102 + gap, 1)]
+
+    @pytest.mark.parametrize("register_type", ["holding_register", "coil"])
+    def test_max_split(self, register_type):
+        limit, step = harness.READ_MAX[register_type], harness.READ_GAP[register_type]
+        addresses = list(range(0, 2 * limit, step))
+        plan = self.plan(register_type, addresses)
+        assert len(plan) > 1
+        assert all(count <= limit for _, count in plan)
+        # Blocks are back to back: every address is read by exactly one block
+        covered = [a for address, count in plan for a in addresses
+                   if address <= a < address + count]
+        assert covered == addresses
+
+    def test_plans_are_per_plc_and_type(self):
+        tags = [{"column": "a", "plc": "sim", "register_type": "holding_register", "address": 1},
+                {"column": "b", "plc": "ctrl", "register_type": "holding_register", "address": 2},
+                {"column": "c", "plc": "sim", "register_type": "coil", "address": 2}]
+        assert [(b.plc, b.register_type, b.address) for b in harness.build_read_plan(tags)] == [
+            ("ctrl", "holding_register", 2), ("sim", "coil", 2), ("sim", "holding_register", 1)]
+
+
+class TestReadTiming:
+    """read_timing.csv: per-block send/receive times, skew and span."""
+
+    PLAN = [harness.ReadBlock("ctrl", "coil", 40, 12, []),
+            harness.ReadBlock("sim", "holding_register", 300, 6, [])]
+
+    def test_header(self):
+        assert harness.timing_header(self.PLAN) == [
+            "sample", "timestamp_utc", "skew_ms", "span_ms",
+            "ctrl_coil40_send_ms", "ctrl_coil40_recv_ms",
+            "sim_hr300_send_ms", "sim_hr300_recv_ms"]
+
+    def test_row(self):
+        header = harness.timing_header(self.PLAN)
+        row = harness.timing_row(header, 7, "t", 100.0, [(100.001, 100.003), (100.004, 100.010)])
+        assert row == {"sample": 7, "timestamp_utc": "t", "skew_ms": 5.0, "span_ms": 9.0,
+                       "ctrl_coil40_send_ms": 1.0, "ctrl_coil40_recv_ms": 3.0,
+                       "sim_hr300_send_ms": 4.0, "sim_hr300_recv_ms": 10.0}
+
+    @pytest.mark.parametrize("concurrent", [False, True])
+    def test_poll_records_one_pair_per_block_in_plan_order(self, concurrent):
+        tags = [{"column": "a", "plc": "sim", "register_type": "holding_register", "address": 300},
+                {"column": "b", "plc": "ctrl", "register_type": "holding_register", "address": 5},
+                {"column": "c", "plc": "sim", "register_type": "holding_register", "address": 900}]
+        plan = harness.build_read_plan(tags)
+        timing = []
+        with ThreadPoolExecutor(2) as executor:
+            row = harness.poll_tags(FakePLC(owned={5: 1}), FakePLC(owned={900: 2}), plan,
+                                    ts="t", timing=timing,
+                                    executor=executor if concurrent else None)
+        assert row == {"timestamp_utc": "t", "a": 0, "b": 1, "c": 2}
+        assert len(timing) == len(plan)
+        assert all(sent <= received for sent, received in timing)
+        csv_row = harness.timing_row(harness.timing_header(plan), 0, "t", timing[0][0], timing)
+        assert csv_row["span_ms"] >= csv_row["skew_ms"] >= 0
+
+
+class SlowPLC(FakePLC):
+    """Logs each write's arrival time; writes to `slow` take `delay` seconds."""
+
+    def __init__(self, slow=(), delay=0.0):
+        super().__init__()
+        self.slow = set(slow)
+        self.delay = delay
+        self.log = []
+
+    def write_register(self, address, value, **kwargs):
+        self.log.append((time.monotonic(), address, value))
+        if address in self.slow:
+            time.sleep(self.delay)
+        return super().write_register(address, value)
+
+
+def timeline(*entries):
+    book = AddressBook({"Level": Address("sim", "holding_register", 300, 1.0),
+                        "Flow": Address("sim", "holding_register", 301, 1.0)})
+    return compile_scenario({"timeline": [
+        {"time_sec": t, "action": "set_tag", "tag": tag, "value": v} for t, tag, v in entries]},
+        book)
+
+
+def run_timeline(steps, sim, timeout=5.0):
+    clock = harness.RunClock()
+    runner = harness.TimelineRunner(steps, clock, FakePLC(), sim)
+    runner.start()
+    runner.join(timeout)
+    return clock, runner
+
+
+class TestTimelineRunner:
+    """Steps fire at their absolute times, in order, late ones as soon as possible."""
+
+    def test_fires_in_order_on_time(self):
+        sim = SlowPLC()
+        steps = timeline((0.06, "Level", 3), (0.0, "Level", 1), (0.03, "Flow", 2))
+        clock, runner = run_timeline(steps, sim)
+        assert not runner.is_alive()
+        assert [(a, v) for _, a, v in sim.log] == [(300, 1), (301, 2), (300, 3)]
+        for (at, _, _), event in zip(sim.log, runner.events):
+            assert event["scheduled_sec"] <= clock.elapsed(at) < event["scheduled_sec"] + 0.05
+            assert event["time_sec"] >= event["scheduled_sec"]
+
+    def test_overrun_fires_overdue_steps_in_order(self):
+        # The first write takes 0.2 s: the next two are overdue when it returns
+        sim = SlowPLC(slow={300}, delay=0.2)
+        steps = timeline((0.0, "Level", 1), (0.05, "Flow", 2), (0.1, "Flow", 3),
+                         (0.4, "Flow", 4))
+        clock, runner = run_timeline(steps, sim)
+        assert [v for _, _, v in sim.log] == [1, 2, 3, 4]
+        late = [clock.elapsed(at) for at, _, _ in sim.log[1:3]]
+        assert 0.2 <= late[0] <= late[1] < 0.3           # back to back once the write returns
+        assert 0.4 <= clock.elapsed(sim.log[3][0]) < 0.45  # the schedule is not shifted
+        assert [e["scheduled_sec"] for e in runner.events] == [0.0, 0.05, 0.1, 0.4]
+
+    def test_stop_cancels_pending_steps(self):
+        sim = SlowPLC()
+        clock = harness.RunClock()
+        runner = harness.TimelineRunner(timeline((0.0, "Level", 1), (30.0, "Level", 2)),
+                                        clock, FakePLC(), sim)
+        runner.start()
+        while not sim.log:
+            time.sleep(0.005)
+        runner.stop()
+        runner.join(1.0)
+        assert not runner.is_alive() and [v for _, _, v in sim.log] == [1]
+
+
+class TestInvariantRules:
+    """A rules file that is there but broken stops the run before it starts."""
+
+    def test_missing_file_skips_checking(self, tmp_path):
+        assert harness.load_invariant_rules(str(tmp_path / "absent.yaml")) is None
+
+    def test_valid_rules_load(self, tmp_path):
+        path = tmp_path / "rules.yaml"
+        path.write_text("rules:\n  - {id: L, type: range, tag: a, max: 5}\n")
+        assert [r.id for r in harness.load_invariant_rules(str(path)).rules] == ["L"]
+
+    @pytest.mark.parametrize("text", [
+        "invariants:\n  - {id: L, check: a < 5}\n",          # not a rules list
+        "rules:\n  - {id: L, type: spline, tag: a}\n",         # unknown rule type
+        "rules: [\n",                                         # not YAML
+    ])
+    def test_unparsable_rules_are_fatal(self, tmp_path, text):
+        path = tmp_path / "rules.yaml"
+        path.write_text(text)
+        with pytest.raises(harness.HarnessError, match="invariant rules"):
+            harness.load_invariant_rules(str(path))
@@ -0,0 +1,38 @@
+"""
+Register scaling tests
+
+BlockScaler must give the same values as converting each tag with its
+LinearScale, with per-value quality flags, and to_raw() must invert
+to_eng() on the register grid.
+"""
+
+import numpy as np
+
+from spherekit.scaling import GOOD, HIGH, LOW, MISSING, BlockScaler, LinearScale
+
+SCALES = [LinearScale(0, 65535, 0, 3200), LinearScale(4000, 20000, -50, 150),
+          LinearScale.from_gain(0.1), LinearScale.from_gain(1.0, raw_min=0, raw_max=1000)]
+
+
+class TestBlockScaler:
+    """Whole-block conversion matches the per-tag scales."""
+
+    def test_matches_per_tag_conversion(self):
+        rng = np.random.default_rng(0)
+        scaler = BlockScaler(SCALES)
+        for raw in rng.integers(0, 65536, size=(200, len(SCALES))):
+            eng, _ = scaler.to_eng(raw.tolist())
+            np.testing.assert_allclose(eng, [s.to_eng(int(r)) for s, r in zip(SCALES, raw)])
+
+    def test_quality_flags(self):
+        eng, quality = BlockScaler(SCALES).to_eng([None, 3000, 123, 2000])
+        assert quality.tolist() == [MISSING, LOW, GOOD, HIGH]
+        assert np.isnan(eng[0]) and eng[1] == -50 and eng[3] == 1000
+
+    def test_to_raw_inverts_to_eng(self):
+        scaler = BlockScaler(SCALES)
+        raw = [1234, 8000, 600, 999]
+        eng, _ = scaler.to_eng(raw)
+        back, quality = scaler.to_raw(eng)
+        assert back.tolist() == raw and (quality == GOOD).all()
+        assert [s.to_raw(e) for s, e in zip(SCALES, eng)] == raw
@@ -0,0 +1,189 @@
+"""
+Scenario compiler tests
+
+Every scenario shipped with a use case must compile against that use
+case's tag contract and maps, exactly as its validation harness loads
+them, so a broken action or tag name fails here instead of at run start.
+"""
+
+import pytest
+
+from paths import DISTRIBUTION, HYDRO, P1_ONBOARDING, TREATMENT
+from spherekit.scenario import (Address, AddressBook, ScenarioError, ScheduleRunner, Write,
+                                WriteError, compile_scenario, dispatch, load_scenario)
+
+# (tag contract, backend maps in harness order, scenario directories)
+USE_CASES = {
+    "treatment": (TREATMENT / "tag_contract.yaml",
+                  [P1_ONBOARDING / "implementations" / "openplc" / "configs" / "openplc_map.yaml",
+                   P1_ONBOARDING / "implementations" / "openplc" / "configs" / "modbus_map.yaml"],
+                  [P1_ONBOARDING / "scenarios"]),
+    "distribution": (DISTRIBUTION / "tag_contract.yaml",
+                     [DISTRIBUTION / "implementations" / "openplc" / "configs" / "openplc_map.yaml"],
+                     [DISTRIBUTION / "implementations" / "openplc" / "scenarios"]),
+    "hydro": (HYDRO / "tag_contract.yaml",
+              [HYDRO / "implementations" / "openplc" / "configs" / "openplc_map.yaml"],
+              [HYDRO / "scenarios", HYDRO / "implementations" / "openplc" / "scenarios"]),
+}
+
+SHIPPED = [pytest.param(name, path, id=f"{name}/{path.parent.parent.name}/{path.name}")
+           for name, (_, _, directories) in USE_CASES.items()
+           for directory in directories
+           for path in sorted(directory.glob("*.yaml"))]
+
+
+def book_for(use_case):
+    contract, maps, _ = USE_CASES[use_case]
+    return AddressBook.load(contract, maps)
+
+
+class TestShippedScenarios:
+    """Every scenarios/*.yaml compiles for its use case."""
+
+    def test_use_cases_have_scenarios(self):
+        for name, (_, _, directories) in USE_CASES.items():
+            for directory in directories:
+                assert list(directory.glob("*.yaml")), f"no scenarios in {directory}"
+
+    @pytest.mark.parametrize("use_case,path", SHIPPED)
+    def test_compiles(self, use_case, path):
+        scenario, steps, initial = load_scenario(path, book_for(use_case))
+        assert len(steps) >= len(scenario.get("timeline") or [])
+        assert [s.time_sec for s in steps] == sorted(s.time_sec for s in steps)
+        for step in steps:
+            for write in step.writes:
+                assert write.register_type in ("coil", "holding_register")
+
+    def test_demand_multiplier_is_recorded_only(self):
+        path = USE_CASES["distribution"][2][0] / "high_demand.yaml"
+        _, steps, _ = load_scenario(path, book_for("distribution"))
+        demand = [s for s in steps if s.action.startswith("set_demand_mult:")]
+        assert [s.time_sec for s in demand] == [30.0, 80.0]
+        assert all(s.record and not s.writes for s in demand)
+
+    def test_harvey_overspeed_commands_are_writes(self):
+        path = USE_CASES["hydro"][2][0] / "harvey_overspeed.yaml"
+        _, steps, initial = load_scenario(path, book_for("hydro"))
+        writes = {s.time_sec: s.writes for s in steps if s.writes}
+        assert writes[3.0] == (("ctrl", "holding_register", 60, (400,)),)      # 40 MW
+        assert writes[5.0] == (("ctrl", "coil", 0, (True,)),)                  # start
+        assert writes[6.0] == (("ctrl", "coil", 0, (False,)),)
+        assert writes[120.0] == (("ctrl", "coil", 1, (True,)),)                # stop
+        assert ("ctrl", "coil", 4, (True,)) in initial.writes                  # run enable
+
+
+class TestCompiler:
+    """Action expansion on a small hand-built address book."""
+
+    @pytest.fixture
+    def book(self):
+        return AddressBook(
+            {
+                "Level": Address("sim", "holding_register", 300, 1.0),
+                "Speed": Address("ctrl", "holding_register", 100, 10.0),
+                "HMI_Start_PB": Address("ctrl", "coil", 0, 1.0),
+                "HMI_Stop_PB": Address("ctrl", "coil", 1, 1.0),
+                "Status": Address("sim", "discrete_input", 16, 1.0),
+            },
+            actions={"set_level": {"tag": "Level"}, "set_mult": {"record": "no input"}},
+        )
+
+    def compile(self, book, *timeline):
+        return compile_scenario({"timeline": list(timeline)}, book)
+
+    def test_set_tag_scales_to_raw(self, book):
+        (step,) = self.compile(book, {"time_sec": 1, "action": "set_tag", "tag": "Speed",
+                                      "value": 42.5})
+        assert step.writes[0].values == (425,)
+
+    def test_adjacent_writes_coalesce(self, book):
+        (step,) = self.compile(book, {"time_sec": 0, "action": "hmi_start"})
+        assert step.writes == (("ctrl", "coil", 0, (True, False)),)
+
+    def test_ramp_expands_to_one_write_per_step(self, book):
+        steps = self.compile(book, {"time_sec": 10, "action": "ramp", "tag": "Level",
+                                    "from": 0, "to": 100, "duration_sec": 10, "step_sec": 2})
+        assert [s.time_sec for s in steps] == [10, 12, 14, 16, 18, 20]
+        assert [s.writes[0].values[0] for s in steps] == [0, 20, 40, 60, 80, 100]
+        assert [s.record for s in steps] == [True] + [False] * 5
+
+    def test_pulse_releases_after_width(self, book):
+        steps = self.compile(book, {"time_sec": 5, "action": "pulse", "tag": "HMI_Start_PB",
+                                    "width_sec": 0.5})
+        assert [(s.time_sec, s.writes[0].values) for s in steps] == [(5, (True,)), (5.5, (False,))]
+
+    def test_shorthands(self, book):
+        level, mult = self.compile(book, {"time_sec": 1, "action": "set_level:1200"},
+                                   {"time_sec": 2, "action": "set_mult:2.0"})
+        assert level.writes[0].values == (1200,)
+        assert mult.writes == () and "recorded only" in mult.description
+
+    def test_unknown_action(self, book):
+        with pytest.raises(ScenarioError, match="unknown action"):
+            self.compile(book, {"time_sec": 1, "action": "set_other:2.0"})
+
+    def test_read_only_tag_is_not_writable(self, book):
+        with pytest.raises(ScenarioError, match="cannot write"):
+            self.compile(book, {"time_sec": 1, "action": "set_tag", "tag": "Status", "value": 1})
+
+
+class Reply:
+    def __init__(self, error=False):
+        self.error = error
+
+    def isError(self):
+        return self.error
+
+    def __str__(self):
+        return "Exception Response (134, 6, IllegalAddress)" if self.error else "ok"
+
+
+class RejectingPLC:
+    """Accepts writes below `limit` and answers the rest with an exception response."""
+
+    def __init__(self, limit=1000):
+        self.limit = limit
+        self.writes = []
+
+    def _write(self, address, values):
+        if address >= self.limit:
+            return Reply(error=True)
+        self.writes.append((address, values))
+        return Reply()
+
+    def write_coil(self, address, value, **kwargs):
+        return self._write(address, [value])
+
+    write_coils = write_registers = _write
+
+    def write_register(self, address, value, **kwargs):
+        return self._write(address, [value])
+
+
+class TestDispatch:
+    """Exception responses count as failed writes."""
+
+    def test_accepted_writes(self):
+        plc = RejectingPLC()
+        dispatch([Write("sim", "coil", 1, (True,)), Write("sim", "holding_register", 5, (1, 2))],
+                 {"sim": plc})
+        assert plc.writes == [(1, [True]), (5, [1, 2])]
+
+    @pytest.mark.parametrize("write", [Write("sim", "coil", 1000, (True,)),
+                                       Write("sim", "coil", 1000, (True, False)),
+                                       Write("sim", "holding_register", 1000, (7,)),
+                                       Write("sim", "holding_register", 1000, (7, 8))])
+    def test_exception_response_raises(self, write):
+        with pytest.raises(WriteError, match="sim .* 1000"):
+            dispatch([write], {"sim": RejectingPLC()})
+
+    def test_rejected_step_is_recorded_as_failed(self):
+        book = AddressBook({"Level": Address("sim", "holding_register", 300, 1.0),
+                            "Flow": Address("sim", "holding_register", 1300, 1.0)})
+        steps = compile_scenario({"timeline": [
+            {"time_sec": 0, "action": "set_tag", "tag": "Level", "value": 5},
+            {"time_sec": 1, "action": "set_tag", "tag": "Flow", "value": 5}]}, book)
+        runner = ScheduleRunner(steps, {"sim": RejectingPLC()}, utc=str)
+        runner.fire(2.0)
+        assert "write failed" not in runner.events[0]["description"]
+        assert "write failed: sim holding_register 1300" in runner.events[1]["description"]
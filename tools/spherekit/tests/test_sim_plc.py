@@ -0,0 +1,130 @@
+"""
+Simulator PLC stand-in tests
+
+sim_plc.py answers Modbus requests from its register images: reads of each
+table, writes to the command and level registers, and exception replies
+for everything a real simulator PLC would reject.  Requests are checked at
+the PDU level and once end to end over TCP with the pymodbus client.
+"""
+
+import importlib.util
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+from paths import P1_ONBOARDING
+from spherekit.plants import P1Params
+
+SCRIPT = P1_ONBOARDING / "implementations" / "openplc" / "scripts" / "sim_plc.py"
+
+# Loaded from its file: scripts/ also holds an operator.py that would
+# shadow the standard library module if the directory went on sys.path
+_spec = importlib.util.spec_from_file_location("sim_plc", SCRIPT)
+sim_plc = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sim_plc)
+
+
+def pdu(fc, address, value, payload=b""):
+    return struct.pack(">BHH", fc, address, value) + payload
+
+
+def registers(reply):
+    assert reply[1] == len(reply) - 2
+    return list(struct.unpack(f">{reply[1] // 2}H", reply[2:]))
+
+
+@pytest.fixture
+def plc():
+    return sim_plc.SimulatorPLC(1, P1Params(), rate_hz=10.0)
+
+
+class TestReads:
+    """Each table reads back the published plant state."""
+
+    def test_levels_and_legacy_mirror(self, plc):
+        levels = registers(plc.process(1, pdu(sim_plc.READ_HOLDING, 300, 6)))
+        assert levels == [600, 0, 800, 800, 800, 400]
+        assert registers(plc.process(1, pdu(sim_plc.READ_INPUT, 70, 6))) == levels
+
+    def test_command_reaches_status_bits(self, plc):
+        assert plc.process(1, pdu(sim_plc.WRITE_REGISTER, 205, 1)) == pdu(6, 205, 1)
+        for _ in range(5):
+            plc.step()
+        status = registers(plc.process(1, pdu(sim_plc.READ_HOLDING, 320, 12)))
+        assert status[5] == 1 and sum(status) == 1      # NaCl solenoid valve open
+        reply = plc.process(1, pdu(sim_plc.READ_DISCRETE_INPUTS, 16, 7))
+        assert reply[:2] == bytes([2, 1]) and reply[2] == 1 << 5
+
+    def test_unused_addresses_read_zero(self, plc):
+        assert registers(plc.process(1, pdu(sim_plc.READ_HOLDING, 0, 125))) == [0] * 125
+        assert plc.process(1, pdu(sim_plc.READ_COILS, 0, 10)) == bytes([1, 2, 0, 0])
+
+
+class TestWrites:
+    """Writes land in the command registers or force a level."""
+
+    def test_write_multiple_registers(self, plc):
+        values = [1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0]
+        payload = bytes([24]) + struct.pack(">12H", *values)
+        assert plc.process(1, pdu(sim_plc.WRITE_REGISTERS, 200, 12, payload)) == pdu(16, 200, 12)
+        assert plc.hr[0, 200:212].tolist() == values
+
+    def test_level_write_forces_the_tank(self, plc):
+        plc.process(1, pdu(sim_plc.WRITE_REGISTER, 300, 1000))
+        plc.step()
+        assert registers(plc.process(1, pdu(sim_plc.READ_HOLDING, 300, 1))) == [1000]
+        assert plc.plant.rw.level[0] == pytest.approx(1000, abs=0.1)
+
+
+class TestExceptions:
+    """Rejected requests get the Modbus exception reply a PLC would send."""
+
+    @pytest.mark.parametrize("request_pdu, code", [
+        (pdu(sim_plc.WRITE_REGISTER, 250, 1), sim_plc.ILLEGAL_ADDRESS),       # not writable
+        (pdu(sim_plc.WRITE_REGISTER, 320, 1), sim_plc.ILLEGAL_ADDRESS),       # status bits
+        (pdu(sim_plc.WRITE_REGISTERS, 210, 3, bytes([6]) + bytes(6)),
+         sim_plc.ILLEGAL_ADDRESS),                                           # runs past 211
+        (pdu(sim_plc.WRITE_COIL, 40, 0xFF00), sim_plc.ILLEGAL_ADDRESS),       # no coil inputs
+        (pdu(sim_plc.WRITE_REGISTERS, 200, 2, bytes([2]) + bytes(2)),
+         sim_plc.ILLEGAL_VALUE),                                             # byte count
+        (pdu(sim_plc.READ_HOLDING, 300, 0), sim_plc.ILLEGAL_VALUE),
+        (pdu(sim_plc.READ_HOLDING, 300, 126), sim_plc.ILLEGAL_VALUE),
+        (pdu(sim_plc.READ_HOLDING, 1000, 100), sim_plc.ILLEGAL_ADDRESS),      # past the image
+        (pdu(0x2B, 0, 0), sim_plc.ILLEGAL_FUNCTION),
+        (bytes([sim_plc.READ_HOLDING, 1]), sim_plc.ILLEGAL_VALUE),            # truncated
+    ])
+    def test_exception_reply(self, plc, request_pdu, code):
+        assert plc.process(1, request_pdu) == bytes([request_pdu[0] | 0x80, code])
+
+    def test_unit_ids_select_plants(self):
+        plc = sim_plc.SimulatorPLC(2, P1Params(), rate_hz=10.0)
+        plc.process(2, pdu(sim_plc.WRITE_REGISTER, 300, 100))
+        assert registers(plc.process(1, pdu(sim_plc.READ_HOLDING, 300, 1))) == [600]
+        assert registers(plc.process(2, pdu(sim_plc.READ_HOLDING, 300, 1))) == [100]
+        assert plc.process(3, pdu(sim_plc.READ_HOLDING, 300, 1)) == bytes(
+            [0x83, sim_plc.TARGET_FAILED])
+
+
+class TestOverTcp:
+    """The pymodbus client the bridge and harness use talks to the server."""
+
+    def test_round_trip(self, plc):
+        client_module = pytest.importorskip("pymodbus.client")
+        server = sim_plc.ModbusServer(("127.0.0.1", 0), plc)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        client = client_module.ModbusTcpClient("127.0.0.1", port=server.server_address[1])
+        try:
+            assert client.connect()
+            assert not client.write_registers(200, [1, 0, 1]).isError()
+            rr = client.read_holding_registers(200, count=3)
+            assert rr.registers == [1, 0, 1]
+            rr = client.write_register(320, 1)
+            assert rr.isError() and rr.exception_code == sim_plc.ILLEGAL_ADDRESS
+            assert np.array_equal(plc.hr[0, 200:203], [1, 0, 1])
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()